@@ -2,11 +2,20 @@ import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
+from shared.utils import startup_timing
+from shared.utils.startup_timing import timed
+
+import asyncio
+import inspect
 import logging
+import threading
+import time
 import traceback
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+with timed('import', 'flask'):
+    from flask import Flask, request, jsonify
+    from flask_jwt_extended import JWTManager
+from shared.middleware.admission import AdmissionController
+from shared.middleware.cors import CorsPolicy, init_cors
 from datetime import timedelta
 from dotenv import load_dotenv
 import os
@@ -30,10 +39,32 @@ except Exception as e:
     logger.error(f"Error loading environment variables: {str(e)}")
     traceback.print_exc()
 
+def start_prewarm():
+    """Start the background service pre-warm thread (once per process)"""
+    threading.Thread(target=_prewarm, name='service-prewarm', daemon=True).start()
+
+def _prewarm():
+    """Warm services up off the request path once the server is listening"""
+    from services.factory import get_config, prewarm_services, warm_up_database
+    # Give the server a moment to bind and pass its startup probe first
+    time.sleep(get_config().SERVICE_PREWARM_DELAY)
+    with timed('prewarm', 'services'):
+        if get_config().SERVICE_PREWARM:
+            prewarm_services()
+        else:
+            warm_up_database()
+    startup_timing.log_report()
+
 def create_app():
     """Application factory function"""
     try:
         app = Flask(__name__)
+
+        # Request latency, status and in-flight metrics, exposed at /metrics
+        from services.factory import get_config
+        if get_config().METRICS_ENABLED:
+            from shared.middleware.metrics import init_metrics
+            init_metrics(app)
         
         # Log startup information
         logger.info("Starting application...")
@@ -53,52 +84,24 @@ def create_app():
         app.config['JWT_COOKIE_CSRF_PROTECT'] = is_production
         app.config['JWT_COOKIE_SAMESITE'] = 'None' if is_production else 'Lax'
         
-        # Configure CORS based on environment
-        allowed_origins = [
-            "http://localhost:5173",  # Your local frontend
-            "https://universalmatchingv2.web.app",
-            "https://universalmatchingv2.firebaseapp.com",
-            "https://universalmatchingv2-181579031870.asia-southeast1.run.app"
-        ]
-        
-        CORS(app, resources={
-            r"/*": {
-                "origins": allowed_origins,
-                "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-                "allow_headers": ["Content-Type", "Authorization"],
-                "supports_credentials": True,
-                "expose_headers": ["Set-Cookie", "Access-Control-Allow-Credentials"]
-            }
-        })
+        # One precomputed CORS policy handles preflights and response headers,
+        # including error responses
+        cors_policy = CorsPolicy(get_config().CORS_ORIGINS)
+        init_cors(app, cors_policy)
 
-        # Add CORS headers to all responses
-        @app.after_request
-        def after_request(response):
-            origin = request.headers.get('Origin')
-            
-            # Only process CORS for actual origins (not None or empty)
-            if origin and origin in allowed_origins:
-                response.headers['Access-Control-Allow-Origin'] = origin
-                response.headers['Access-Control-Allow-Credentials'] = 'true'
-                response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-                response.headers['Access-Control-Expose-Headers'] = 'Set-Cookie'
-                
-                if is_production and 'Set-Cookie' in response.headers:
-                    cookie_parts = response.headers['Set-Cookie'].split(';')[0]
-                    response.headers['Set-Cookie'] = f"{cookie_parts}; SameSite=None; Secure"
-            
-            # Log response details for debugging
-            logger.debug({
-                "message": "Response details",
-                "origin": origin,
-                "method": request.method,
-                "path": request.path,
-                "status": response.status_code,
-                "headers": dict(response.headers)
-            })
-            
-            return response
+        # Log response details for debugging, without building them when debug is off
+        if logger.isEnabledFor(logging.DEBUG):
+            @app.after_request
+            def log_response(response):
+                logger.debug({
+                    "message": "Response details",
+                    "origin": request.headers.get('Origin'),
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "headers": dict(response.headers)
+                })
+                return response
 
         @app.errorhandler(Exception)
         def handle_error(error):
@@ -121,24 +124,49 @@ def create_app():
             
             response = jsonify(error_response)
             
-            # Handle CORS for error responses
-            origin = request.headers.get('Origin')
-            if origin and origin in allowed_origins:
-                response.headers['Access-Control-Allow-Origin'] = origin
-                response.headers['Access-Control-Allow-Credentials'] = 'true'
-                if request.method == 'OPTIONS':
-                    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-                    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-                    response.headers['Access-Control-Max-Age'] = '3600'
-                    status_code = 200  # Return 200 for OPTIONS requests
-            
             return response, status_code
 
         jwt = JWTManager(app)
 
         # Register blueprints with proper URL prefix
-        from apps.auth.routes import auth_bp
+        with timed('import', 'apps.auth.routes'):
+            from apps.auth.routes import auth_bp
         app.register_blueprint(auth_bp, url_prefix='/api/auth')
+        from apps.app1.routes import files_bp
+        app.register_blueprint(files_bp, url_prefix='/api/v1/files')
+        from apps.matching.routes import matching_bp
+        app.register_blueprint(matching_bp, url_prefix='/api/v1/matching')
+        from apps.jobs.routes import jobs_bp
+        app.register_blueprint(jobs_bp, url_prefix='/api/v1/jobs')
+        from apps.parser.routes import parser_bp
+        app.register_blueprint(parser_bp, url_prefix='/api/v1/parser')
+        from apps.comparison.routes import comparison_bp
+        app.register_blueprint(comparison_bp, url_prefix='/api/v1/comparison')
+
+        # Services are built lazily; SERVICE_PREWARM builds them in the background
+        # once the server is up, instead of on the first request, and
+        # DATABASE_WARMUP opens the database pool there (never before the port is bound)
+        # With gunicorn preload_app this runs in the master; gunicorn.conf.py
+        # resets the services and starts pre-warming in each worker instead
+        from services.factory import get_config, get_database_service
+        preloading = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+        if (get_config().SERVICE_PREWARM or get_config().DATABASE_WARMUP) and not preloading:
+            start_prewarm()
+
+        # Apply the declarative index registry (idempotent)
+        if get_config().DATABASE_ENSURE_INDEXES:
+            try:
+                result = get_database_service().ensure_indexes()
+                if inspect.isawaitable(result):
+                    asyncio.run(result)
+            except Exception as e:
+                logger.error(f"Ensuring database indexes failed: {str(e)}")
+
+        # Local development: run queued jobs inside this process instead of in
+        # separate python -m apps.jobs.worker processes
+        if get_config().JOBS_EMBEDDED_WORKER and not preloading:
+            from apps.jobs.worker import JobWorker
+            JobWorker().start_in_thread()
 
         # Add health check route with minimal processing
         @app.route('/', methods=['GET'])
@@ -153,22 +181,24 @@ def create_app():
         def health_check():
             return jsonify({'status': 'healthy'}), 200
 
-        # Add OPTIONS handler for CORS preflight requests
-        @app.route('/', defaults={'path': ''}, methods=['OPTIONS'])
-        @app.route('/<path:path>', methods=['OPTIONS'])
-        def handle_options(path):
-            response = app.make_default_options_response()
-            origin = request.headers.get('Origin')
-            
-            if origin in allowed_origins:
-                response.headers['Access-Control-Allow-Origin'] = origin
-                response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-                response.headers['Access-Control-Allow-Credentials'] = 'true'
-                response.headers['Access-Control-Max-Age'] = '3600'
-            
-            return response
+        @app.route('/api/health/startup', methods=['GET'])
+        def startup_report():
+            return jsonify(startup_timing.report()), 200
+
+        # Shed load with 503 + Retry-After once the worker's admission queue is full
+        config = get_config()
+        if config.ADMISSION_MAX_IN_FLIGHT > 0:
+            app.wsgi_app = AdmissionController(
+                app.wsgi_app,
+                max_in_flight=config.ADMISSION_MAX_IN_FLIGHT,
+                max_queue=config.ADMISSION_MAX_QUEUE,
+                queue_timeout=config.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+                retry_after=config.ADMISSION_RETRY_AFTER,
+                exempt_paths=('/', '/api/health', '/metrics'),
+                reject_headers=lambda environ: cors_policy.headers_for(environ.get('HTTP_ORIGIN'))
+            )
 
+        startup_timing.log_report()
         return app
     except Exception as e:
         logger.error(f"Error creating application: {str(e)}")
@@ -176,7 +206,8 @@ def create_app():
         raise
 
 # Create the application instance
-application = create_app()
+with timed('app', 'create_app'):
+    application = create_app()
 
 # For local development
 if __name__ == '__main__':
@@ -0,0 +1,16 @@
+from apps.jobs.registry import job_handler
+from apps.app1.services.file_service import FileService
+
+
+@job_handler('files.delete')
+async def delete_files(context):
+    """
+    Delete {"filenames": [...]} of the job's user. Failed deletes fail the
+    attempt so it is retried; a file that is already gone (e.g. deleted by an
+    earlier attempt) counts as done.
+    """
+    results = await FileService().delete_user_files(context.user_id, context.payload.get('filenames') or [])
+    errors = [result for result in results if result['error'] not in (None, 'HTTP 404')]
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(results)} files could not be deleted: {errors[0]['error']}")
+    return {'deleted': sum(result['deleted'] for result in results), 'files': len(results)}
@@ -0,0 +1,53 @@
+from flask import Blueprint, g, jsonify, request
+from shared.middleware.auth import require_user
+from apps.app1.services.file_service import FileService
+import logging
+
+# Async handlers: within a request the per-file storage calls, each on a
+# worker thread, overlap. Requests themselves each hold a server thread,
+# under the WSGI and ASGI entry points alike.
+files_bp = Blueprint('files', __name__)
+logger = logging.getLogger(__name__)
+
+
+@files_bp.route('', methods=['POST'])
+@require_user
+async def upload_files():
+    """Upload one or more files (multipart field 'files') for the current user"""
+    files = request.files.getlist('files')
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    results = await FileService().store_user_files(g.user['user_id'], files)
+    status = 200 if all(result['error'] is None for result in results) else 207
+    return jsonify({'files': results}), status
+
+
+@files_bp.route('', methods=['DELETE'])
+@require_user
+async def delete_files():
+    """
+    Delete the files named in the JSON body {"filenames": [...]}. With
+    "background": true the deletion is queued as a job and its id returned at once.
+    """
+    body = request.get_json(silent=True) or {}
+    filenames = body.get('filenames') or []
+    if not filenames:
+        return jsonify({'error': 'No filenames provided'}), 400
+    if body.get('background'):
+        job = await FileService().schedule_delete_user_files(
+            g.user['user_id'], filenames, idempotency_key=request.headers.get('Idempotency-Key')
+        )
+        return jsonify({'job_id': job['_id'], 'status': job['status']}), 202
+    results = await FileService().delete_user_files(g.user['user_id'], filenames)
+    return jsonify({'files': results}), 200
+
+
+@files_bp.route('/download-urls', methods=['GET'])
+@require_user
+async def download_urls():
+    """Signed download URLs for ?filename=a&filename=b"""
+    filenames = request.args.getlist('filename')
+    if not filenames:
+        return jsonify({'error': 'No filenames provided'}), 400
+    urls = await FileService().get_user_file_urls(g.user['user_id'], filenames)
+    return jsonify({'urls': urls}), 200
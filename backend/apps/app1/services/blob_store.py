@@ -0,0 +1,180 @@
+from datetime import datetime, UTC
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+import uuid
+from services.factory import get_database_service, get_storage_service
+from services.implementations.database.indexes import is_duplicate_key
+from shared.utils.concurrency import call_maybe_async
+from shared.utils.hashing import HashingReader, hash_file
+
+logger = logging.getLogger(__name__)
+
+BLOBS_COLLECTION = 'file_blobs'
+# Storage prefixes: stored content by SHA-256, and streamed uploads whose hash is not known yet
+BLOB_PREFIX = 'blobs'
+STAGING_PREFIX = 'uploads/staging'
+
+# Compare-and-set retries before a reference count update gives up
+_MAX_RETRIES = 50
+# A blob left 'deleting' this long (its deleter died) is taken over
+_STALE_DELETE_SECONDS = 300
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+def blob_path(sha256: str) -> str:
+    return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256}"
+
+
+class BlobStore:
+    """
+    Content-addressed file storage: each distinct content is stored once,
+    at blobs/<sha256[:2]>/<sha256>, however many files reference it.
+
+    A document per blob in file_blobs holds its reference count. Counts are
+    changed with compare-and-set updates on the previous count (the
+    DatabaseService update has no $inc), retried on contention. Content is
+    always in storage before its document says 'ready', and the last
+    release marks the blob 'deleting' before removing it, so a concurrent
+    put either takes a reference on a live blob or stores the content again.
+    """
+
+    def __init__(self, db=None, storage=None):
+        self._db = db
+        self._storage = storage
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_database_service()
+        return self._db
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_storage_service()
+        return self._storage
+
+    async def put(self, file_data: BinaryIO) -> Tuple[str, int, bool]:
+        """
+        Reference the content of a seekable file, uploading it only if it is
+        not stored yet. Returns (sha256, size, uploaded).
+        """
+        sha256, size = await asyncio.to_thread(hash_file, file_data)
+        uploaded = await self._acquire(sha256, size, lambda path: self.storage.upload_file(file_data, path))
+        return sha256, size, uploaded
+
+    async def put_stream(self, stream: BinaryIO, content_type: Optional[str] = None,
+                         sha256: Optional[str] = None, known: bool = False) -> Tuple[str, int, bool]:
+        """
+        Reference the content of a forward-only stream. Returns (sha256, size, uploaded).
+
+        The stream is uploaded to a staging path while it is hashed, then
+        moved into place (server-side) or, if the content was stored
+        meanwhile, discarded; a given sha256 must match the content. A hash
+        alone does not prove the sender holds the content, so only when the
+        caller vouches for it (known, e.g. its user already has a file of
+        it) is stored content referenced without reading the stream.
+        """
+        if sha256 is not None and known:
+            blob = await self._increment(sha256)
+            if blob is not None:
+                return sha256, blob['size'], False
+        staging = f"{STAGING_PREFIX}/{uuid.uuid4().hex}"
+        reader = HashingReader(stream)
+        await self.storage.upload_stream(reader, staging, content_type=content_type)
+        moved = False
+        try:
+            if sha256 is not None and reader.hexdigest() != sha256:
+                raise ValueError("The content does not match its SHA-256")
+
+            async def move(path: str) -> None:
+                nonlocal moved
+                await self.storage.move(staging, path)
+                moved = True
+            await self._acquire(reader.hexdigest(), reader.size, move)
+        finally:
+            if not moved:
+                await self.storage.delete_file(staging)
+        return reader.hexdigest(), reader.size, moved
+
+    async def release(self, sha256: str) -> bool:
+        """Drop one reference; the last one deletes the content. Returns whether the blob was deleted"""
+        for _ in range(_MAX_RETRIES):
+            blob = await call_maybe_async(self.db.find_one, BLOBS_COLLECTION, {'_id': sha256})
+            if blob is None or blob['status'] != 'ready':
+                logger.warning(f"Released blob {sha256} has no live reference count")
+                return False
+            if blob['refs'] > 1:
+                if await call_maybe_async(self.db.update_one, BLOBS_COLLECTION,
+                                          {'_id': sha256, 'refs': blob['refs'], 'status': 'ready'},
+                                          {'refs': blob['refs'] - 1, 'updated_at': _now()}):
+                    return False
+                continue
+            if not await call_maybe_async(self.db.update_one, BLOBS_COLLECTION,
+                                          {'_id': sha256, 'refs': 1, 'status': 'ready'},
+                                          {'refs': 0, 'status': 'deleting', 'deleting_at': time.time(),
+                                           'updated_at': _now()}):
+                continue
+            try:
+                await self.storage.delete_file(blob['path'])
+            except Exception as e:
+                # The orphaned content is found by exists() and reused by the next put
+                logger.warning(f"Deleting blob {sha256} failed: {str(e)}")
+            await call_maybe_async(self.db.delete_one, BLOBS_COLLECTION, {'_id': sha256, 'status': 'deleting'})
+            return True
+        raise RuntimeError(f"Releasing blob {sha256} kept conflicting with other updates")
+
+    async def _increment(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Take a reference on a ready blob; None if there is none (or it is being deleted)"""
+        for _ in range(_MAX_RETRIES):
+            blob = await call_maybe_async(self.db.find_one, BLOBS_COLLECTION, {'_id': sha256})
+            if blob is None or blob['status'] != 'ready':
+                return None
+            if await call_maybe_async(self.db.update_one, BLOBS_COLLECTION,
+                                      {'_id': sha256, 'refs': blob['refs'], 'status': 'ready'},
+                                      {'refs': blob['refs'] + 1, 'updated_at': _now()}):
+                return blob
+        raise RuntimeError(f"Referencing blob {sha256} kept conflicting with other updates")
+
+    async def _acquire(self, sha256: str, size: int, store: Callable[[str], Awaitable[Any]]) -> bool:
+        """Take a reference on the content, calling store(path) first if it is not stored; returns whether it stored"""
+        path = blob_path(sha256)
+        stored = False
+        for attempt in range(_MAX_RETRIES):
+            if await self._increment(sha256) is not None:
+                return stored
+            blob = await call_maybe_async(self.db.find_one, BLOBS_COLLECTION, {'_id': sha256})
+            if blob is not None:
+                if blob['status'] == 'deleting':
+                    if time.time() - blob.get('deleting_at', 0) > _STALE_DELETE_SECONDS:
+                        await call_maybe_async(self.db.delete_one, BLOBS_COLLECTION,
+                                               {'_id': sha256, 'status': 'deleting'})
+                    else:
+                        # Wait for the deleter to finish, then store the content again
+                        await asyncio.sleep(min(0.05 * 2 ** attempt, 1.0))
+                continue
+            if not stored and not await self.storage.exists(path):
+                await store(path)
+                stored = True
+            try:
+                await call_maybe_async(self.db.insert_one, BLOBS_COLLECTION, {
+                    '_id': sha256,
+                    'path': path,
+                    'size': size,
+                    'refs': 1,
+                    'status': 'ready',
+                    'created_at': _now(),
+                    'updated_at': _now()
+                })
+                return stored
+            except Exception as e:
+                if not is_duplicate_key(e):
+                    raise
+                # A concurrent put recorded the same content first; reference it on the next pass
+                continue
+        raise RuntimeError(f"Storing blob {sha256} kept conflicting with other updates")
@@ -1,27 +1,149 @@
-from typing import BinaryIO
-from backend.services.factory import get_storage_service
+from datetime import datetime, UTC
+from typing import Any, BinaryIO, Dict, List, Optional
+import uuid
+from apps.app1.services.blob_store import BlobStore, blob_path
+from apps.jobs.services.job_queue import JobQueue
+from services.factory import get_database_service, get_storage_service
+from services.implementations.database.indexes import is_duplicate_key, register_indexes
+from shared.utils.concurrency import call_maybe_async, gather_bounded
+
+FILE_REFS_COLLECTION = 'file_refs'
+
+register_indexes(FILE_REFS_COLLECTION, {
+    'keys': [('user_id', 1), ('filename', 1)],
+    'name': 'user_filename',
+    'unique': True
+})
+
+# Compare-and-set retries before linking a filename gives up
+_MAX_RETRIES = 50
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
 
 class FileService:
-    def __init__(self):
-        self.storage = get_storage_service()
+    """
+    A user's files, stored content-addressed through BlobStore.
+
+    A file is a reference in file_refs from (user_id, filename) to the
+    SHA-256 of its content; identical content uploaded again (by anyone) is
+    not stored again, and re-using a filename moves its reference to the
+    new content. Whether content was already stored is not disclosed. Files stored before content addressing, at
+    users/<user_id>/files/<filename>, are still read and deleted there.
+    """
+
+    def __init__(self, storage=None, db=None):
+        self.storage = storage or get_storage_service()
+        self._db = db
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_database_service()
+        return self._db
+
+    @property
+    def blobs(self) -> BlobStore:
+        return BlobStore(self.db, self.storage)
 
     async def store_user_file(self, user_id: str, file_data: BinaryIO) -> str:
         """
-        Store a user's file and return the public URL
+        Store a user's file and return a download URL
+        
+        Args:
+            user_id (str): The ID of the user
+            file_data (BinaryIO): The file data to store (seekable, with a filename)
+            
+        Returns:
+            str: The signed URL of the stored file
+        """
+        return (await self._store(user_id, file_data))['url']
+
+    async def stream_user_file(self, user_id: str, filename: str, stream: BinaryIO,
+                               content_type: Optional[str] = None, sha256: Optional[str] = None) -> str:
+        """
+        Store a user's file from a forward-only stream (e.g. Flask's request.stream)
+        without buffering it in memory or on disk
+        
+        Args:
+            user_id (str): The ID of the user
+            filename (str): The name to store the file under
+            stream (BinaryIO): The file data stream
+            content_type (str): Optional MIME type of the file
+            sha256 (str): Optional hex SHA-256 of the content; if the user already has a file
+                of it, the stream is not read
+            
+        Returns:
+            str: The URL of the stored file
+        """
+        known = sha256 is not None and await call_maybe_async(
+            self.db.find_one, FILE_REFS_COLLECTION, {'user_id': user_id, 'sha256': sha256}) is not None
+        digest, size, _ = await self.blobs.put_stream(stream, content_type, sha256, known)
+        await self._link_or_release(user_id, filename, digest, size, content_type)
+        return await self.storage.get_download_url(blob_path(digest))
+
+    async def store_user_files(self, user_id: str, files: List[BinaryIO]) -> List[Dict]:
+        """
+        Store several of a user's files concurrently
+        
+        Args:
+            user_id (str): The ID of the user
+            files (List[BinaryIO]): The uploaded files; each must have a filename
+            
+        Returns:
+            List[Dict]: One {'filename', 'path', 'url', 'sha256', 'error'} result per file,
+                in input order
+        """
+        results = await gather_bounded([lambda f=file_data: self._store(user_id, f) for file_data in files],
+                                       self.storage.max_concurrency)
+        return [
+            result if error is None else
+            {'filename': file_data.filename, 'path': None, 'url': None, 'sha256': None, 'error': str(error)}
+            for file_data, (result, error) in zip(files, results)
+        ]
+
+    async def file_path(self, user_id: str, filename: str) -> str:
+        """The storage path holding the content of a user's file"""
+        ref = await self._ref(user_id, filename)
+        return blob_path(ref['sha256']) if ref else self._legacy_path(user_id, filename)
+
+    async def get_user_file_url(self, user_id: str, filename: str) -> str:
+        """
+        Get a time-limited download URL for a user's file
+        
+        Args:
+            user_id (str): The ID of the user
+            filename (str): The name of the file
+            
+        Returns:
+            str: The signed URL of the file
+        """
+        return await self.storage.get_download_url(await self.file_path(user_id, filename))
+
+    async def get_user_file_urls(self, user_id: str, filenames: List[str]) -> Dict[str, str]:
+        """
+        Get download URLs for a list of a user's files, e.g. for a file list page
         
         Args:
             user_id (str): The ID of the user
-            file_data (BinaryIO): The file data to store
+            filenames (List[str]): The names of the files
             
         Returns:
-            str: The public URL of the stored file
+            Dict[str, str]: Filename to signed URL
         """
-        path = f"users/{user_id}/files/{file_data.filename}"
-        return await self.storage.upload_file(file_data, path)
+        refs = await call_maybe_async(self.db.find_many, FILE_REFS_COLLECTION,
+                                      {'user_id': user_id, 'filename': {'$in': filenames}})
+        paths = {ref['filename']: blob_path(ref['sha256']) for ref in refs}
+        # URLs are signed locally, so only the lookup above goes to the database
+        return {filename: await self.storage.get_download_url(paths.get(filename)
+                                                              or self._legacy_path(user_id, filename))
+                for filename in filenames}
 
     async def delete_user_file(self, user_id: str, filename: str) -> bool:
         """
-        Delete a user's file
+        Delete a user's file; its content is deleted with the last file referencing it
         
         Args:
             user_id (str): The ID of the user
@@ -30,5 +152,110 @@ class FileService:
         Returns:
             bool: True if deletion was successful
         """
-        path = f"users/{user_id}/files/{filename}"
-        return await self.storage.delete_file(path) 
\ No newline at end of file
+        ref = await self._ref(user_id, filename)
+        if ref is None:
+            return await self.storage.delete_file(self._legacy_path(user_id, filename))
+        sha256 = ref['sha256']
+        # Conditional on the content, so a concurrent re-upload of the name is not released twice
+        if not await call_maybe_async(self.db.delete_one, FILE_REFS_COLLECTION, {'_id': ref['_id'], 'sha256': sha256}):
+            return False
+        await self.blobs.release(sha256)
+        return True
+
+    async def delete_user_files(self, user_id: str, filenames: List[str]) -> List[Dict]:
+        """
+        Delete several of a user's files in as few storage round trips as possible
+        
+        Args:
+            user_id (str): The ID of the user
+            filenames (List[str]): The names of the files to delete
+            
+        Returns:
+            List[Dict]: One {'path', 'deleted', 'error'} result per file, in input order
+        """
+        refs = await call_maybe_async(self.db.find_many, FILE_REFS_COLLECTION,
+                                      {'user_id': user_id, 'filename': {'$in': filenames}})
+        referenced = {ref['filename']: ref for ref in refs}
+        # Files stored before content addressing are deleted in storage batches
+        legacy = [filename for filename in filenames if filename not in referenced]
+        results = dict(zip(legacy, await self.storage.delete_many(
+            [self._legacy_path(user_id, filename) for filename in legacy]))) if legacy else {}
+        names = [filename for filename in filenames if filename in referenced]
+        deleted = await gather_bounded([lambda f=filename: self.delete_user_file(user_id, f) for filename in names],
+                                       self.storage.max_concurrency)
+        for filename, (done, error) in zip(names, deleted):
+            results[filename] = {'path': blob_path(referenced[filename]['sha256']), 'deleted': bool(done),
+                                 'error': str(error) if error else None}
+        return [results[filename] for filename in filenames]
+
+    async def schedule_delete_user_files(self, user_id: str, filenames: List[str],
+                                         idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue the deletion of several of a user's files as a background job
+        
+        Args:
+            user_id (str): The ID of the user
+            filenames (List[str]): The names of the files to delete
+            idempotency_key (str): Optional key; scheduling the same key again returns the first job
+            
+        Returns:
+            Dict: The queued job ('files.delete'); poll GET /api/v1/jobs/<job_id>
+        """
+        job, _ = await JobQueue().submit('files.delete', {'filenames': filenames}, user_id=user_id,
+                                         idempotency_key=idempotency_key)
+        return job
+
+    async def _store(self, user_id: str, file_data: BinaryIO) -> Dict[str, Any]:
+        sha256, size, _ = await self.blobs.put(file_data)
+        await self._link_or_release(user_id, file_data.filename, sha256, size, getattr(file_data, 'content_type', None))
+        path = blob_path(sha256)
+        return {'filename': file_data.filename, 'path': path, 'url': await self.storage.get_download_url(path),
+                'sha256': sha256, 'error': None}
+
+    async def _ref(self, user_id: str, filename: str) -> Optional[Dict[str, Any]]:
+        return await call_maybe_async(self.db.find_one, FILE_REFS_COLLECTION,
+                                      {'user_id': user_id, 'filename': filename})
+
+    async def _link_or_release(self, user_id: str, filename: str, sha256: str, size: int,
+                               content_type: Optional[str]) -> None:
+        """Point the filename at content the caller holds a reference on, dropping that reference on failure"""
+        try:
+            await self._link(user_id, filename, sha256, size, content_type)
+        except Exception:
+            await self.blobs.release(sha256)
+            raise
+
+    async def _link(self, user_id: str, filename: str, sha256: str, size: int, content_type: Optional[str]) -> None:
+        for _ in range(_MAX_RETRIES):
+            ref = await self._ref(user_id, filename)
+            if ref is None:
+                try:
+                    await call_maybe_async(self.db.insert_one, FILE_REFS_COLLECTION, {
+                        '_id': uuid.uuid4().hex,
+                        'user_id': user_id,
+                        'filename': filename,
+                        'sha256': sha256,
+                        'size': size,
+                        'content_type': content_type,
+                        'created_at': _now(),
+                        'updated_at': _now()
+                    })
+                    return
+                except Exception as e:
+                    if not is_duplicate_key(e):
+                        raise
+                    # A concurrent upload of the same name won the unique index
+                    continue
+            replaced = ref['sha256']
+            if await call_maybe_async(self.db.update_one, FILE_REFS_COLLECTION,
+                                      {'_id': ref['_id'], 'sha256': replaced},
+                                      {'sha256': sha256, 'size': size, 'content_type': content_type,
+                                       'updated_at': _now()}):
+                # The caller's reference now backs the name; the replaced content loses its one
+                await self.blobs.release(replaced)
+                return
+        raise RuntimeError(f"Storing {filename} kept conflicting with other uploads of the same name")
+
+    @staticmethod
+    def _legacy_path(user_id: str, filename: str) -> str:
+        return f"users/{user_id}/files/{filename}"
@@ -0,0 +1,150 @@
+"""
+External merge sort for inputs larger than memory.
+
+Items are tuples compared as a whole, so the caller puts the sort key
+first and a unique tie-breaker (the row number) second. They are buffered
+until their estimated size reaches the memory budget, and each full buffer
+is sorted and spilled to a run file; the sorted output is a heap merge of
+the runs and what is still buffered. Run files are written as pickled
+blocks and read back a block at a time, so the merge holds one block per
+run rather than the runs themselves.
+"""
+from heapq import merge
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+# Runs merged at once; with more, groups of this many are first merged into longer runs
+DEFAULT_FAN_IN = 64
+# One item in this many is measured to estimate the buffer's memory
+_SAMPLE_EVERY = 64
+
+
+def item_size(item: Tuple) -> int:
+    """Approximate memory of a buffered item: its slot in the buffer, the tuple, its members and their values"""
+    size = 8 + sys.getsizeof(item)
+    for member in item:
+        size += sys.getsizeof(member)
+        if isinstance(member, (tuple, list)):
+            size += sum(map(sys.getsizeof, member))
+    return size
+
+
+class ExternalSorter:
+    """
+    Sorts the items passed to add() within memory_bytes.
+
+    Run files go to a private folder under directory (the temp directory by
+    default), removed by close(). With more than fan_in runs, sorted()
+    first merges them in passes of fan_in, so at most fan_in files are open
+    at once. Blocks are sized so that the merge's blocks take at most a
+    quarter of the budget.
+    """
+
+    def __init__(self, memory_bytes: int, directory: Optional[str] = None, fan_in: int = DEFAULT_FAN_IN):
+        self.memory_bytes = max(memory_bytes, 1)
+        self.directory = directory
+        self.fan_in = max(fan_in, 2)
+        self.rows = 0
+        self.runs = 0
+        self.spilled_rows = 0
+        self.spilled_bytes = 0
+        self.merge_passes = 0
+        self._buffer: List[Tuple] = []
+        self._sampled = 0
+        self._sampled_bytes = 0
+        self._buffer_rows = 1
+        self._paths: List[str] = []
+        self._files = 0
+        self._workdir: Optional[str] = None
+
+    def add(self, item: Tuple) -> None:
+        self._buffer.append(item)
+        self.rows += 1
+        if self.rows % _SAMPLE_EVERY == 1:
+            self._sampled += 1
+            self._sampled_bytes += item_size(item)
+            self._buffer_rows = max(self.memory_bytes * self._sampled // self._sampled_bytes, 1)
+        if len(self._buffer) >= self._buffer_rows:
+            self._spill()
+
+    def extend(self, items: Iterable[Tuple]) -> None:
+        for item in items:
+            self.add(item)
+
+    def sorted(self) -> Iterator[Tuple]:
+        """All items in order. Call once, after the last add()"""
+        self._buffer.sort()
+        buffer, self._buffer = self._buffer, []
+        if not self._paths:
+            return iter(buffer)
+        while len(self._paths) + 1 > self.fan_in:
+            self.merge_passes += 1
+            paths, self._paths = self._paths, []
+            for start in range(0, len(paths), self.fan_in):
+                group = paths[start:start + self.fan_in]
+                self._write_run(merge(*map(self._read_run, group)))
+                for path in group:
+                    os.remove(path)
+        return merge(iter(buffer), *map(self._read_run, self._paths))
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {'rows': self.rows, 'runs': self.runs, 'spilled_rows': self.spilled_rows,
+                'spilled_bytes': self.spilled_bytes, 'merge_passes': self.merge_passes}
+
+    def close(self) -> None:
+        """Delete the run files"""
+        self._buffer = []
+        self._paths = []
+        if self._workdir is not None:
+            shutil.rmtree(self._workdir, ignore_errors=True)
+            self._workdir = None
+
+    def __enter__(self) -> 'ExternalSorter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _spill(self) -> None:
+        self._buffer.sort()
+        self.runs += 1
+        self.spilled_rows += len(self._buffer)
+        self._write_run(self._buffer)
+        self._buffer = []
+
+    def _block_rows(self) -> int:
+        # Both sides of a comparison may merge at once, each with up to fan_in blocks
+        return max(self._buffer_rows // (4 * self.fan_in), 1)
+
+    def _write_run(self, items: Iterable[Tuple]) -> None:
+        if self._workdir is None:
+            self._workdir = tempfile.mkdtemp(prefix='sort-', dir=self.directory or None)
+        self._files += 1
+        path = os.path.join(self._workdir, f"run-{self._files}")
+        block_rows = self._block_rows()
+        with open(path, 'wb') as run:
+            block = []
+            for item in items:
+                block.append(item)
+                if len(block) >= block_rows:
+                    pickle.dump(block, run, pickle.HIGHEST_PROTOCOL)
+                    block = []
+            if block:
+                pickle.dump(block, run, pickle.HIGHEST_PROTOCOL)
+            self.spilled_bytes += run.tell()
+        self._paths.append(path)
+
+    @staticmethod
+    def _read_run(path: str) -> Iterator[Tuple]:
+        with open(path, 'rb') as run:
+            while True:
+                try:
+                    block = pickle.load(run)
+                except EOFError:
+                    return
+                yield from block
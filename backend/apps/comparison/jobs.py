@@ -0,0 +1,15 @@
+from apps.jobs.registry import job_handler
+from apps.comparison.services.comparison_service import ComparisonService
+
+
+@job_handler('comparison.run')
+async def run_comparison(context):
+    """
+    Compare two of the job's user's files (a ComparisonService spec) and
+    write the NDJSON diff to comparisons/<user_id>/<job_id>.ndjson; a retry
+    rewrites it from the start.
+    """
+    service = ComparisonService()
+    await context.progress(stage='comparing')
+    return await service.compare_to_storage(context.user_id, context.payload,
+                                            service.result_path(context.user_id, context.job_id))
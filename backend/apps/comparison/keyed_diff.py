@@ -0,0 +1,83 @@
+"""
+Merge-join of two key-sorted record streams into a row-level diff.
+
+Records are (sort_key, row, values) items as sorted by ExternalSorter.
+Walking both sides in key order pairs records with equal keys: an
+unpaired record on the right was 'inserted', one on the left 'deleted',
+and a pair whose compared fields differ 'changed'. Records sharing a key
+within a file pair up in row order; the surplus counts as inserted or
+deleted.
+"""
+from itertools import groupby, zip_longest
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+Item = Tuple[Tuple, int, List[Any]]
+
+# Numbers order before text, blanks before both; values of different kinds never compare equal
+_BLANK, _NUMBER, _TEXT = 0, 1, 2
+
+
+def sort_key(values: Sequence[Any]) -> Tuple:
+    """
+    An orderable key from (normalised) key values that may mix types across
+    rows: 10 and 10.0 are equal, and numbers, text and blanks each sort
+    together.
+    """
+    parts = []
+    for value in values:
+        if value is None:
+            parts.append((_BLANK, 0))
+        elif isinstance(value, (int, float)):
+            parts.append((_NUMBER, value))
+        else:
+            parts.append((_TEXT, str(value)))
+    return tuple(parts)
+
+
+class MergeJoin:
+    """
+    Iterating yields (kind, left, right) for every record of either side,
+    kind being 'inserted' (left is None), 'deleted' (right is None) or
+    'matched'. duplicate_keys counts keys held by more than one record of a
+    side.
+    """
+
+    def __init__(self, left: Iterator[Item], right: Iterator[Item]):
+        self.left = left
+        self.right = right
+        self.duplicate_keys = 0
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[Item], Optional[Item]]]:
+        lefts, rights = groupby(self.left, key=itemgetter(0)), groupby(self.right, key=itemgetter(0))
+        left, right = next(lefts, None), next(rights, None)
+        while left is not None or right is not None:
+            if right is None or (left is not None and left[0] < right[0]):
+                yield from self._unpaired('deleted', left[1], 0)
+                left = next(lefts, None)
+            elif left is None or right[0] < left[0]:
+                yield from self._unpaired('inserted', right[1], 1)
+                right = next(rights, None)
+            else:
+                pairs = 0
+                for old, new in zip_longest(left[1], right[1]):
+                    pairs += 1
+                    yield ('matched' if old is not None and new is not None
+                           else 'deleted' if new is None else 'inserted'), old, new
+                if pairs > 1:
+                    self.duplicate_keys += 1
+                left, right = next(lefts, None), next(rights, None)
+
+    def _unpaired(self, kind: str, group: Iterator[Item], side: int):
+        count = 0
+        for item in group:
+            count += 1
+            yield (kind, item, None) if side == 0 else (kind, None, item)
+        if count > 1:
+            self.duplicate_keys += 1
+
+
+def field_differences(fields: Sequence[Tuple[str, int, int]], old: Sequence[Any],
+                      new: Sequence[Any]) -> Dict[str, List[Any]]:
+    """{field: [old value, new value]} for the (name, left index, right index) fields that differ"""
+    return {name: [old[i], new[j]] for name, i, j in fields if old[i] != new[j]}
@@ -0,0 +1,61 @@
+from flask import Blueprint, Response, g, jsonify, request
+from shared.middleware.auth import require_user
+from apps.comparison.services.comparison_service import NDJSON, ComparisonService, ComparisonTooLargeError
+import logging
+
+# Small comparisons (up to COMPARISON_STREAM_MAX_BYTES) stream back in the
+# response; large ones run as a 'comparison.run' job that writes the diff to storage
+comparison_bp = Blueprint('comparison', __name__)
+logger = logging.getLogger(__name__)
+
+
+@comparison_bp.route('', methods=['POST'])
+@require_user
+async def compare_files():
+    """
+    Compare two of the user's stored files by key columns (a comparison
+    spec, see ComparisonService). The diff streams back as NDJSON while it
+    is produced; the files are read and sorted before the first line. Files
+    totalling more than COMPARISON_STREAM_MAX_BYTES get 413: queue those
+    with POST /jobs.
+    """
+    service = ComparisonService()
+    try:
+        comparison = await service.prepare(g.user['user_id'], request.get_json(silent=True),
+                                           max_bytes=service.stream_max_bytes)
+    except ComparisonTooLargeError as e:
+        return jsonify({'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    return Response(comparison.ndjson(), mimetype=NDJSON)
+
+
+@comparison_bp.route('/jobs', methods=['POST'])
+@require_user
+async def queue_comparison():
+    """Queue a comparison (the same spec); poll GET /api/v1/jobs/<job_id>, then fetch /jobs/<job_id>/download-url"""
+    try:
+        spec = ComparisonService.validate(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Imported here: the queue is only needed for queued comparisons
+    from apps.jobs.services.job_queue import JobQueue
+    job, _ = await JobQueue().submit('comparison.run', spec, user_id=g.user['user_id'])
+    return jsonify({'job_id': job['_id'], 'status': job['status']}), 202
+
+
+@comparison_bp.route('/jobs/<job_id>/download-url', methods=['GET'])
+@require_user
+async def get_comparison_url(job_id):
+    """A download URL for the NDJSON diff of a finished comparison job, with its summary"""
+    from apps.jobs.services.job_queue import JobQueue
+    job = await JobQueue().get(job_id, g.user['user_id'])
+    if job is None or job['kind'] != 'comparison.run':
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != 'succeeded':
+        return jsonify({'error': 'The comparison has not finished', 'status': job['status']}), 409
+    service = ComparisonService()
+    url = await service.storage.get_download_url(job['result']['path'])
+    return jsonify({'url': url, 'summary': job['result']}), 200
@@ -0,0 +1,322 @@
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import time
+from apps.comparison.external_sort import ExternalSorter
+from apps.comparison.keyed_diff import MergeJoin, field_differences, sort_key
+from apps.parser.readers import RowNormaliser, detect_format, reader_for
+from services.factory import get_config, get_database_service, get_storage_service
+
+logger = logging.getLogger(__name__)
+
+NDJSON = 'application/x-ndjson'
+# Job output: comparisons/<user_id>/<job_id>.ndjson
+RESULTS_PREFIX = 'comparisons'
+# Bytes of NDJSON lines gathered before a chunk is sent
+_CHUNK_BYTES = 64 * 1024
+
+
+class ComparisonTooLargeError(ValueError):
+    """The files are larger than a comparison run in the request may read"""
+
+
+class ChunkReader:
+    """A forward-only binary stream over an iterator of byte chunks, for StorageService.upload_stream"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = bytearray()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._pending) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._pending += chunk
+        if size < 0 or size >= len(self._pending):
+            data, self._pending = bytes(self._pending), bytearray()
+        else:
+            data = bytes(self._pending[:size])
+            del self._pending[:size]
+        return data
+
+    def close(self) -> None:
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class SortedFile:
+    """One side of a comparison: a file's column names and its records sorted by key"""
+
+    def __init__(self, filename: str, fields: List[str], sorter: ExternalSorter, invalid_values: int):
+        self.filename = filename
+        self.fields = fields
+        self.sorter = sorter
+        self.invalid_values = invalid_values
+
+    def record(self, values: List[Any]) -> Dict[str, Any]:
+        return dict(zip(self.fields, values))
+
+
+class Comparison:
+    """
+    Two files sorted by key, ready to be diffed. events() merge-joins them,
+    producing one event per difference:
+
+        {"type": "columns", "key": [...], "compared": [...], "left_only": [...], "right_only": [...]}
+        {"type": "inserted", "key": {...}, "right_row": 7, "record": {...}}
+        {"type": "deleted", "key": {...}, "left_row": 3, "record": {...}}
+        {"type": "changed", "key": {...}, "left_row": 4, "right_row": 4, "fields": {"amount": [10, 12]}}
+        {"type": "summary", "inserted": 1, "deleted": 1, "changed": 1, "unchanged": 96, ...}
+
+    Rows are the 1-based data rows of each file. Unchanged records are only
+    counted. close() deletes the sorted runs; ndjson() does so when done.
+    """
+
+    def __init__(self, key: List[str], compared: List[str], left: SortedFile, right: SortedFile,
+                 sort_seconds: float):
+        self.key = key
+        self.compared = compared
+        self.left = left
+        self.right = right
+        self.sort_seconds = sort_seconds
+        self.summary: Optional[Dict[str, Any]] = None
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        left, right = self.left, self.right
+        yield {'type': 'columns', 'key': self.key, 'compared': self.compared,
+               'left_only': [name for name in left.fields if name not in right.fields],
+               'right_only': [name for name in right.fields if name not in left.fields]}
+        fields = [(name, left.fields.index(name), right.fields.index(name)) for name in self.compared]
+        left_key, right_key = ([side.fields.index(name) for name in self.key] for side in (left, right))
+        counts = {'inserted': 0, 'deleted': 0, 'changed': 0, 'unchanged': 0}
+        started = time.perf_counter()
+        join = MergeJoin(left.sorter.sorted(), right.sorter.sorted())
+        for kind, old, new in join:
+            if kind == 'matched':
+                differences = field_differences(fields, old[2], new[2])
+                if not differences:
+                    counts['unchanged'] += 1
+                    continue
+                kind = 'changed'
+                event = {'type': kind, 'key': self._key(left_key, old[2]), 'left_row': old[1],
+                         'right_row': new[1], 'fields': differences}
+            elif kind == 'deleted':
+                event = {'type': kind, 'key': self._key(left_key, old[2]), 'left_row': old[1],
+                         'record': left.record(old[2])}
+            else:
+                event = {'type': kind, 'key': self._key(right_key, new[2]), 'right_row': new[1],
+                         'record': right.record(new[2])}
+            counts[kind] += 1
+            yield event
+        self.summary = {
+            **counts,
+            'duplicate_keys': join.duplicate_keys,
+            'left_rows': left.sorter.rows,
+            'right_rows': right.sorter.rows,
+            'invalid_values': left.invalid_values + right.invalid_values,
+            'sort': {'left': left.sorter.stats, 'right': right.sorter.stats},
+            'seconds': {'sort': round(self.sort_seconds, 4), 'merge': round(time.perf_counter() - started, 4)}
+        }
+        yield {'type': 'summary', **self.summary}
+
+    def ndjson(self, report_errors: bool = True) -> Iterator[bytes]:
+        """
+        The events as NDJSON, in chunks of about 64 KiB. With report_errors a
+        failure mid-way ends the output with an {"type": "error"} line, since
+        the response status was already sent; otherwise it is raised.
+        """
+        lines, size = [], 0
+        try:
+            for event in self.events():
+                line = json.dumps(event, separators=(',', ':'), default=str).encode() + b'\n'
+                lines.append(line)
+                size += len(line)
+                if size >= _CHUNK_BYTES:
+                    yield b''.join(lines)
+                    lines, size = [], 0
+            if lines:
+                yield b''.join(lines)
+        except Exception as e:
+            if not report_errors:
+                raise
+            logger.error(f"Comparing {self.left.filename} with {self.right.filename} failed: {str(e)}",
+                         exc_info=True)
+            yield b''.join(lines) + json.dumps({'type': 'error', 'error': str(e)}).encode() + b'\n'
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        self.left.sorter.close()
+        self.right.sorter.close()
+
+    def _key(self, positions: List[int], values: List[Any]) -> Dict[str, Any]:
+        return {name: values[position] for name, position in zip(self.key, positions)}
+
+
+class ComparisonService:
+    """
+    Compares two of a user's stored files (FileService) by key columns.
+
+    Each file is streamed from storage, normalised like a parser ingest
+    (apps/parser/readers.py) and sorted by key with an external merge sort,
+    so neither file has to fit in memory: COMPARISON_MEMORY_BYTES is split
+    between the two sorts, and what does not fit spills to sorted runs under
+    COMPARISON_TEMP_DIR. The diff is then produced by merge-joining the
+    sorted sides and streamed, to the client or to storage, as it is
+    produced. The ceiling bounds the records held for sorting; reading adds
+    a few PARSER_READ_CHUNK_SIZE chunks per file, and an upload one storage
+    chunk.
+
+    A comparison spec:
+
+        {"left": "old.csv", "right": "new.csv", "key": ["invoice", "line"],
+         "compare": ["amount", "date"], "schema": {"amount": "float"}}
+
+    compare defaults to every non-key column the files share; schema (column
+    types, as for the parser) applies to both files.
+    """
+
+    def __init__(self, storage=None, db=None, memory_bytes: Optional[int] = None,
+                 directory: Optional[str] = None):
+        config = get_config()
+        self._storage = storage
+        self._db = db
+        self.memory_bytes = memory_bytes or config.COMPARISON_MEMORY_BYTES
+        self.directory = directory or config.COMPARISON_TEMP_DIR or None
+        self.read_chunk_size = config.PARSER_READ_CHUNK_SIZE
+        self.stream_max_bytes = config.COMPARISON_STREAM_MAX_BYTES
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_storage_service()
+        return self._storage
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = get_database_service()
+        return self._db
+
+    @staticmethod
+    def validate(spec: Any) -> Dict[str, Any]:
+        """The spec with defaults filled in; ValueError if it is invalid"""
+        if not isinstance(spec, dict):
+            raise ValueError("The comparison spec must be a JSON object")
+        for side in ('left', 'right'):
+            if not isinstance(spec.get(side), str) or not spec[side]:
+                raise ValueError(f"'{side}' must be a filename")
+            detect_format(spec[side])
+        for option in ('key', 'compare'):
+            names = spec.get(option)
+            if names is None and option == 'compare':
+                continue
+            if not isinstance(names, list) or not names or not all(isinstance(name, str) for name in names):
+                raise ValueError(f"'{option}' must be a non-empty list of column names")
+        schema = spec.get('schema')
+        if schema is not None and not isinstance(schema, dict):
+            raise ValueError("'schema' must be an object")
+        return {'left': spec['left'], 'right': spec['right'], 'key': spec['key'],
+                'compare': spec.get('compare'), 'schema': schema}
+
+    async def prepare(self, user_id: str, spec: Any, max_bytes: int = 0) -> Comparison:
+        """
+        Read and sort both files. ValueError if the spec does not fit the
+        files, FileNotFoundError if one of them does not exist, and
+        ComparisonTooLargeError if max_bytes is set and the files' combined
+        size (from storage metadata) exceeds it.
+        """
+        spec = self.validate(spec)
+        paths = await asyncio.gather(*(self._locate(user_id, spec[side]) for side in ('left', 'right')))
+        total = sum(size for _, size in paths)
+        if max_bytes and total > max_bytes:
+            raise ComparisonTooLargeError(
+                f"The files total {total} bytes, over the {max_bytes} compared in the request; "
+                f"queue the comparison with POST /api/v1/comparison/jobs"
+            )
+        started = time.perf_counter()
+        sides = await asyncio.gather(*(self._sort_file(spec[side], path, spec)
+                                       for side, (path, _) in zip(('left', 'right'), paths)),
+                                     return_exceptions=True)
+        errors = [side for side in sides if isinstance(side, BaseException)]
+        if errors:
+            for side in sides:
+                if isinstance(side, SortedFile):
+                    side.sorter.close()
+            raise errors[0]
+        left, right = sides
+        try:
+            compared = spec['compare'] or [name for name in left.fields
+                                            if name in right.fields and name not in spec['key']]
+            for name in compared:
+                if name not in left.fields or name not in right.fields:
+                    raise ValueError(f"Compared column not in both files: {name}")
+        except ValueError:
+            left.sorter.close()
+            right.sorter.close()
+            raise
+        return Comparison(spec['key'], compared, left, right, time.perf_counter() - started)
+
+    async def compare_to_storage(self, user_id: str, spec: Any, path: str) -> Dict[str, Any]:
+        """Write the NDJSON diff to path in storage as it is produced; returns the summary"""
+        comparison = await self.prepare(user_id, spec)
+        reader = ChunkReader(comparison.ndjson(report_errors=False))
+        try:
+            # The merge runs inside the upload's reads, which storage services make off the event loop
+            await self.storage.upload_stream(reader, path, content_type=NDJSON)
+        finally:
+            reader.close()
+        return {'path': path, **comparison.summary}
+
+    @staticmethod
+    def result_path(user_id: str, job_id: str) -> str:
+        return f"{RESULTS_PREFIX}/{user_id}/{job_id}.ndjson"
+
+    async def _locate(self, user_id: str, filename: str) -> Tuple[str, int]:
+        """The storage path and size of a user's file; FileNotFoundError if it does not exist"""
+        # Imported here: the files app is only needed once a comparison runs
+        from apps.app1.services.file_service import FileService
+        path = await FileService(self.storage, self.db).file_path(user_id, filename)
+        size = await self.storage.size(path)
+        if size is None:
+            raise FileNotFoundError(f"File not found: {filename}")
+        return path, size
+
+    async def _sort_file(self, filename: str, path: str, spec: Dict[str, Any]) -> SortedFile:
+        stream = await self.storage.open_stream(path, chunk_size=self.read_chunk_size)
+        try:
+            return await asyncio.to_thread(self._sort, filename, stream, spec)
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+
+    def _sort(self, filename: str, stream: BinaryIO, spec: Dict[str, Any]) -> SortedFile:
+        file_format = detect_format(filename)
+        rows = reader_for(file_format)(stream, chunk_size=self.read_chunk_size) if file_format == 'csv' \
+            else reader_for(file_format)(stream)
+        header = next(rows, None)
+        if header is None:
+            raise ValueError(f"The file is empty: {filename}")
+        normaliser = RowNormaliser(header, spec['schema'])
+        missing = [name for name in spec['key'] if name not in normaliser.fields]
+        if missing:
+            raise ValueError(f"Key column(s) not in {filename}: {', '.join(missing)}")
+        positions = [normaliser.fields.index(name) for name in spec['key']]
+        sorter = ExternalSorter(self.memory_bytes // 2, self.directory)
+        try:
+            for number, row in enumerate(rows, start=1):
+                # Blank lines carry no record
+                if any(cell not in (None, '') for cell in row):
+                    values = list(normaliser(row).values())
+                    sorter.add((sort_key([values[position] for position in positions]), number, values))
+        except BaseException:
+            sorter.close()
+            raise
+        return SortedFile(filename, normaliser.fields, sorter, normaliser.invalid_values)
@@ -0,0 +1,65 @@
+"""
+Job handlers by kind.
+
+A handler is a sync or async function taking a JobContext and returning a
+JSON-serialisable result; raising marks the attempt as failed (and retried
+while attempts remain). Handler modules register their handlers on import
+with @job_handler. HANDLER_MODULES lists them so the web process (which
+validates submissions) and the workers (which run them) see the same kinds.
+"""
+from typing import Callable, Dict, Optional
+import importlib
+import threading
+
+HANDLER_MODULES = (
+    'apps.app1.jobs',
+    'apps.comparison.jobs',
+    'apps.matching.jobs',
+    'apps.parser.jobs',
+)
+
+_handlers: Dict[str, 'Handler'] = {}
+_loaded = False
+_lock = threading.Lock()
+
+
+class Handler:
+    """
+    A registered job kind.
+
+    max_attempts overrides JOBS_MAX_ATTEMPTS for the kind. Kinds that are not
+    submittable can only be queued by server code, e.g. when their payload
+    refers to documents whose ownership the API could not check.
+    """
+
+    def __init__(self, kind: str, function: Callable, max_attempts: Optional[int] = None,
+                 submittable: bool = True):
+        self.kind = kind
+        self.function = function
+        self.max_attempts = max_attempts
+        self.submittable = submittable
+
+
+def job_handler(kind: str, max_attempts: Optional[int] = None, submittable: bool = True) -> Callable:
+    """Register the decorated function as the handler of kind"""
+    def register(function: Callable) -> Callable:
+        _handlers[kind] = Handler(kind, function, max_attempts, submittable)
+        return function
+    return register
+
+
+def load_handlers() -> None:
+    """Import the handler modules (once per process)"""
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            for module in HANDLER_MODULES:
+                importlib.import_module(module)
+            _loaded = True
+
+
+def get_handler(kind: str) -> Optional[Handler]:
+    load_handlers()
+    return _handlers.get(kind)
@@ -0,0 +1,81 @@
+from flask import Blueprint, g, jsonify, request
+from shared.middleware.auth import require_user
+from apps.jobs.registry import get_handler
+from apps.jobs.services.job_queue import FINISHED, JobQueue
+import logging
+
+# Handlers only read and write job documents; the work runs in job workers
+# (python -m apps.jobs.worker)
+jobs_bp = Blueprint('jobs', __name__)
+logger = logging.getLogger(__name__)
+
+_PRIVATE_FIELDS = {'user_id', 'lease_token'}
+
+
+def _public(job):
+    return {key: value for key, value in job.items() if key not in _PRIVATE_FIELDS} | {'job_id': job['_id']}
+
+
+@jobs_bp.route('', methods=['POST'])
+@require_user
+async def submit_job():
+    """
+    Queue a job: {"kind": "...", "payload": {...}, "idempotency_key": "...", "max_attempts": 3}.
+    The key may also be sent as an Idempotency-Key header; resubmitting it returns the existing job.
+    """
+    body = request.get_json(silent=True) or {}
+    kind = body.get('kind')
+    handler = get_handler(kind) if isinstance(kind, str) else None
+    if handler is None or not handler.submittable:
+        return jsonify({'error': f"Unknown job kind: {kind}"}), 400
+    payload = body.get('payload') or {}
+    if not isinstance(payload, dict):
+        return jsonify({'error': "'payload' must be an object"}), 400
+    max_attempts = body.get('max_attempts')
+    if max_attempts is not None and (not isinstance(max_attempts, int) or max_attempts < 1):
+        return jsonify({'error': "'max_attempts' must be a positive integer"}), 400
+    try:
+        job, created = await JobQueue().submit(
+            kind, payload, user_id=g.user['user_id'], max_attempts=max_attempts,
+            idempotency_key=body.get('idempotency_key') or request.headers.get('Idempotency-Key')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(_public(job)), 202 if created else 200
+
+
+@jobs_bp.route('/<job_id>', methods=['GET'])
+@require_user
+async def get_job(job_id):
+    """Status, attempts and progress of one of the user's jobs"""
+    job = await JobQueue().get(job_id, g.user['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_public(job)), 200
+
+
+@jobs_bp.route('/<job_id>/cancel', methods=['POST'])
+@require_user
+async def cancel_job(job_id):
+    """Cancel a queued job, or ask the worker running it to stop"""
+    queue = JobQueue()
+    job = await queue.get(job_id, g.user['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in FINISHED:
+        return jsonify({'error': f"Job already {job['status']}"}), 409
+    job = await queue.cancel(job_id, g.user['user_id'])
+    return jsonify(_public(job)), 202
+
+
+@jobs_bp.route('/<job_id>/result', methods=['GET'])
+@require_user
+async def get_job_result(job_id):
+    """The result of a succeeded job (or the error of a failed one)"""
+    job = await JobQueue().get(job_id, g.user['user_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] not in FINISHED:
+        return jsonify({'error': f"Job is {job['status']}", 'status': job['status']}), 409
+    return jsonify({'job_id': job['_id'], 'status': job['status'], 'result': job['result'],
+                    'error': job['error']}), 200
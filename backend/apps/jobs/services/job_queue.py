@@ -0,0 +1,235 @@
+from datetime import datetime, UTC
+from typing import Any, Dict, Optional, Tuple
+import logging
+import random
+import time
+import uuid
+from apps.jobs.registry import get_handler
+from services.factory import get_config, get_database_service
+from services.implementations.database.indexes import register_indexes
+from shared.utils.concurrency import call_maybe_async
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = 'jobs'
+FINISHED = ('succeeded', 'failed', 'cancelled')
+
+register_indexes(JOBS_COLLECTION, {
+    'keys': [('status', 1), ('run_at', 1)],
+    'name': 'status_run_at'
+}, {
+    'keys': [('status', 1), ('lease_until', 1)],
+    'name': 'status_lease_until'
+}, {
+    'keys': [('user_id', 1), ('idempotency_key', 1)],
+    'name': 'user_idempotency_key',
+    'unique': True,
+    'partialFilterExpression': {'idempotency_key': {'$type': 'string'}}
+})
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+class JobQueue:
+    """
+    Persistent job queue in MongoDB, through DatabaseService.
+
+    Each job is one document. Its status moves from queued to running to
+    succeeded, failed or cancelled; a failed attempt goes back to queued
+    with a later run_at while attempts remain.
+
+    Workers claim a due job with a compare-and-set update_one whose filter
+    repeats the state they read (status and lease_token), so only one
+    worker's update can match. A claim is a lease: the worker must heartbeat
+    before lease_until, and a job whose lease expired (its worker died) is
+    claimed again by the next worker. Every later write by the worker is
+    conditional on the same lease_token, so a worker that lost its lease
+    cannot overwrite the new owner's state.
+    """
+
+    def __init__(self, db=None):
+        config = get_config()
+        self.db = db or get_database_service()
+        self.max_attempts = config.JOBS_MAX_ATTEMPTS
+        self.lease_seconds = config.JOBS_LEASE_SECONDS
+        self.retry_base = config.JOBS_RETRY_BASE_SECONDS
+        self.retry_max = config.JOBS_RETRY_MAX_SECONDS
+
+    async def submit(self, kind: str, payload: Optional[Dict[str, Any]] = None, user_id: Optional[str] = None,
+                     idempotency_key: Optional[str] = None, max_attempts: Optional[int] = None,
+                     delay: float = 0.0) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job.
+
+        Args:
+            kind: A registered handler kind
+            payload: JSON-serialisable handler input
+            user_id: The owner; status and cancel requests are scoped to it
+            idempotency_key: Submitting the same key again (per user) returns
+                the existing job instead of queueing another
+            max_attempts: Attempts before the job fails; defaults to the
+                handler's, then JOBS_MAX_ATTEMPTS
+            delay: Seconds before the job becomes due
+
+        Returns:
+            Tuple[Dict, bool]: The job and whether it was created by this call
+        """
+        handler = get_handler(kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if idempotency_key is not None:
+            existing = await self._find_idempotent(kind, user_id, idempotency_key)
+            if existing is not None:
+                return existing, False
+        job = {
+            '_id': uuid.uuid4().hex,
+            'kind': kind,
+            'payload': payload or {},
+            'user_id': user_id,
+            'idempotency_key': idempotency_key,
+            'status': 'queued',
+            'attempts': 0,
+            'max_attempts': max_attempts or handler.max_attempts or self.max_attempts,
+            'run_at': time.time() + delay,
+            'lease_token': None,
+            'lease_until': None,
+            'worker': None,
+            'cancel_requested': False,
+            'progress': None,
+            'result': None,
+            'error': None,
+            'created_at': _now(),
+            'updated_at': _now(),
+            'finished_at': None
+        }
+        try:
+            await call_maybe_async(self.db.insert_one, JOBS_COLLECTION, job)
+        except Exception:
+            # A concurrent submit with the same key won the unique index
+            if idempotency_key is not None:
+                existing = await self._find_idempotent(kind, user_id, idempotency_key)
+                if existing is not None:
+                    return existing, False
+            raise
+        return job, True
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The job, or None if it does not exist (or belongs to another user when user_id is given)"""
+        query = {'_id': job_id} if user_id is None else {'_id': job_id, 'user_id': user_id}
+        return await call_maybe_async(self.db.find_one, JOBS_COLLECTION, query)
+
+    async def cancel(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job: a queued job is cancelled at once, a running one is
+        flagged and its worker cancels it at the next heartbeat.
+        """
+        job = await self.get(job_id, user_id)
+        if job is None or job['status'] in FINISHED:
+            return job
+        if job['status'] == 'queued':
+            cancelled = await call_maybe_async(
+                self.db.update_one, JOBS_COLLECTION,
+                {'_id': job_id, 'status': 'queued', 'lease_token': job['lease_token']},
+                {'status': 'cancelled', 'finished_at': _now(), 'updated_at': _now()}
+            )
+            if cancelled:
+                return await self.get(job_id)
+        # Running (or claimed since it was read)
+        await call_maybe_async(self.db.update_one, JOBS_COLLECTION, {'_id': job_id, 'status': 'running'},
+                               {'cancel_requested': True, 'updated_at': _now()})
+        return await self.get(job_id)
+
+    async def claim(self, worker_id: str, candidates: int = 10) -> Optional[Dict[str, Any]]:
+        """Lease the next due job to worker_id; None when nothing is due"""
+        now = time.time()
+        due = await call_maybe_async(
+            self.db.find_many, JOBS_COLLECTION, {'status': 'queued', 'run_at': {'$lt': now}},
+            sort=[('run_at', 1)], limit=candidates
+        )
+        expired = await call_maybe_async(
+            self.db.find_many, JOBS_COLLECTION, {'status': 'running', 'lease_until': {'$lt': now}},
+            sort=[('lease_until', 1)], limit=candidates
+        )
+        for job in list(due) + list(expired):
+            if job['status'] == 'running' and job['attempts'] >= job['max_attempts']:
+                await self._finish(job, 'failed', error=job.get('error') or 'Worker lease expired')
+                continue
+            if job['status'] == 'running':
+                logger.warning(f"Job {job['_id']} lease of {job['worker']} expired; reclaiming")
+            lease = {
+                'status': 'running',
+                'attempts': job['attempts'] + 1,
+                'worker': worker_id,
+                'lease_token': uuid.uuid4().hex,
+                'lease_until': now + self.lease_seconds,
+                'updated_at': _now()
+            }
+            claimed = await call_maybe_async(
+                self.db.update_one, JOBS_COLLECTION,
+                {'_id': job['_id'], 'status': job['status'], 'lease_token': job['lease_token']}, lease
+            )
+            if claimed:
+                return {**job, **lease}
+        return None
+
+    async def heartbeat(self, job: Dict[str, Any], progress: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Extend the lease of a running job (and record progress).
+
+        Returns:
+            str: 'ok', 'cancelled' when a cancel was requested, or 'lost'
+                when another worker has taken the job over
+        """
+        update = {'lease_until': time.time() + self.lease_seconds, 'updated_at': _now()}
+        if progress is not None:
+            update['progress'] = progress
+        extended = await call_maybe_async(
+            self.db.update_one, JOBS_COLLECTION,
+            {'_id': job['_id'], 'lease_token': job['lease_token'], 'cancel_requested': False}, update
+        )
+        if extended:
+            return 'ok'
+        current = await self.get(job['_id'])
+        if current is not None and current['lease_token'] == job['lease_token'] and current['cancel_requested']:
+            return 'cancelled'
+        return 'lost'
+
+    async def complete(self, job: Dict[str, Any], result: Any = None) -> bool:
+        return await self._finish(job, 'succeeded', result=result)
+
+    async def fail(self, job: Dict[str, Any], error: str, retry: bool = True) -> str:
+        """Record a failed attempt; returns the job's new status ('queued' when it will be retried)"""
+        if retry and job['attempts'] < job['max_attempts']:
+            delay = self.backoff(job['attempts'])
+            retried = await call_maybe_async(
+                self.db.update_one, JOBS_COLLECTION, {'_id': job['_id'], 'lease_token': job['lease_token']},
+                {'status': 'queued', 'run_at': time.time() + delay, 'lease_until': None,
+                 'error': error, 'updated_at': _now()}
+            )
+            logger.info(f"Job {job['_id']} attempt {job['attempts']} failed, retrying in {delay:.1f}s: {error}")
+            return 'queued' if retried else 'lost'
+        finished = await self._finish(job, 'failed', error=error)
+        return 'failed' if finished else 'lost'
+
+    async def mark_cancelled(self, job: Dict[str, Any]) -> bool:
+        return await self._finish(job, 'cancelled')
+
+    def backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter: half fixed, half random, capped at JOBS_RETRY_MAX_SECONDS"""
+        delay = min(self.retry_base * 2 ** max(attempts - 1, 0), self.retry_max)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _finish(self, job: Dict[str, Any], status: str, **fields) -> bool:
+        return await call_maybe_async(
+            self.db.update_one, JOBS_COLLECTION, {'_id': job['_id'], 'lease_token': job['lease_token']},
+            {'status': status, 'lease_until': None, 'finished_at': _now(), 'updated_at': _now(), **fields}
+        )
+
+    async def _find_idempotent(self, kind: str, user_id: Optional[str], key: str) -> Optional[Dict[str, Any]]:
+        existing = await call_maybe_async(self.db.find_one, JOBS_COLLECTION,
+                                          {'user_id': user_id, 'idempotency_key': key})
+        if existing is not None and existing['kind'] != kind:
+            raise ValueError(f"Idempotency key {key!r} was already used for a {existing['kind']} job")
+        return existing
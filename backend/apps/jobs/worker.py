@@ -0,0 +1,172 @@
+"""
+Job worker: claims due jobs from the queue and runs their handlers.
+
+Run dedicated worker processes next to the web server:
+
+    python -m apps.jobs.worker --concurrency 4 --processes 2
+
+or, for local development, set JOBS_EMBEDDED_WORKER=true to run one worker
+thread inside the web process. Stopping a worker (SIGINT/SIGTERM) lets its
+running jobs finish; a worker that dies mid-job leaves a lease that expires
+after JOBS_LEASE_SECONDS, and the job is then retried by another worker.
+"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from typing import Any, Dict, Optional, Set
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import uuid
+from apps.jobs.registry import get_handler, load_handlers
+from apps.jobs.services.job_queue import JobQueue
+from services.factory import get_config
+from shared.utils.concurrency import call_maybe_async
+
+logger = logging.getLogger(__name__)
+
+
+class JobContext:
+    """What a handler gets: the job's payload and owner, and a way to report progress"""
+
+    def __init__(self, job: Dict[str, Any], queue: JobQueue):
+        self.job = job
+        self.queue = queue
+        self.job_id: str = job['_id']
+        self.payload: Dict[str, Any] = job['payload']
+        self.user_id: Optional[str] = job['user_id']
+        self.attempt: int = job['attempts']
+
+    async def progress(self, **fields) -> None:
+        """Record progress on the job document (readable through the status API)"""
+        await self.queue.heartbeat(self.job, progress=fields)
+
+
+class JobWorker:
+    """
+    Runs up to concurrency jobs at a time on the calling event loop.
+
+    Async handlers run on the loop; sync handlers run on a thread. While a
+    handler runs, the worker extends the job's lease every third of
+    JOBS_LEASE_SECONDS, and cancels the handler if the job was cancelled or
+    the lease was lost.
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None, worker_id: Optional[str] = None):
+        config = get_config()
+        self.queue = queue or JobQueue()
+        self.concurrency = max(concurrency or config.JOBS_WORKER_CONCURRENCY, 1)
+        self.poll_interval = config.JOBS_POLL_INTERVAL_MS / 1000 if poll_interval is None else poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._running: Set[asyncio.Task] = set()
+
+    async def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Claim and run jobs until stop is set, then wait for the running ones"""
+        load_handlers()
+        logger.info(f"Job worker {self.worker_id} started (concurrency {self.concurrency})")
+        while stop is None or not stop.is_set():
+            if len(self._running) >= self.concurrency:
+                await asyncio.wait(self._running, return_when=asyncio.FIRST_COMPLETED)
+                continue
+            try:
+                job = await self.queue.claim(self.worker_id)
+            except Exception as e:
+                logger.error(f"Claiming a job failed: {str(e)}")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            task = asyncio.create_task(self.execute(job))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        if self._running:
+            await asyncio.wait(self._running)
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    async def run_once(self) -> Optional[Dict[str, Any]]:
+        """Claim and run one job; returns it (with its final status), or None when nothing was due"""
+        job = await self.queue.claim(self.worker_id)
+        if job is None:
+            return None
+        await self.execute(job)
+        return await self.queue.get(job['_id'])
+
+    async def execute(self, job: Dict[str, Any]) -> None:
+        handler = get_handler(job['kind'])
+        if handler is None:
+            await self.queue.fail(job, f"Unknown job kind: {job['kind']}", retry=False)
+            return
+        logger.info(f"Job {job['_id']} ({job['kind']}) attempt {job['attempts']} on {self.worker_id}")
+        task = asyncio.create_task(call_maybe_async(handler.function, JobContext(job, self.queue)))
+        interval = max(self.queue.lease_seconds / 3, 0.01)
+        state = 'ok'
+        while state == 'ok':
+            done, _ = await asyncio.wait({task}, timeout=interval)
+            if done:
+                break
+            state = await self.queue.heartbeat(job)
+        if state != 'ok':
+            # A sync handler's thread cannot be interrupted; its result is discarded
+            task.cancel()
+            if state == 'cancelled':
+                await self.queue.mark_cancelled(job)
+                logger.info(f"Job {job['_id']} cancelled")
+            else:
+                logger.warning(f"Job {job['_id']} lease lost; abandoning this attempt")
+            return
+        try:
+            result = task.result()
+        except Exception as e:
+            logger.error(f"Job {job['_id']} ({job['kind']}) failed: {str(e)}", exc_info=True)
+            await self.queue.fail(job, str(e))
+            return
+        await self.queue.complete(job, result)
+
+    def start_in_thread(self, stop: Optional[threading.Event] = None) -> threading.Thread:
+        """Run the worker on a daemon thread with its own event loop"""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run(stop)),
+                                  name=f"job-worker-{self.worker_id}", daemon=True)
+        thread.start()
+        return thread
+
+
+def _serve(concurrency: int, stop: Any) -> None:
+    """Process entry point: run one worker until stop is set"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    asyncio.run(JobWorker(concurrency=concurrency).run(stop))
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description="Run job queue workers")
+    parser.add_argument('--concurrency', type=int, default=get_config().JOBS_WORKER_CONCURRENCY,
+                        help="Jobs run at a time per process")
+    parser.add_argument('--processes', type=int, default=1, help="Worker processes")
+    args = parser.parse_args()
+
+    # Spawned, not forked: each process builds its own database client
+    context = multiprocessing.get_context('spawn')
+    stop = context.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    processes = [context.Process(target=_serve, args=(args.concurrency, stop), name=f"job-worker-{i}")
+                 for i in range(max(args.processes, 1))]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Blocking keys for record linkage.
+
+A blocking key maps a record to a short string; only records that share a
+key (or sit close together in a sorted neighbourhood) are compared, instead
+of every left record against every right record.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+import re
+import unicodedata
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'),
+    **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'),
+    'l': '4',
+    **dict.fromkeys('mn', '5'),
+    'r': '6'
+}
+
+
+def normalize(value: Any) -> str:
+    """Lower-case ASCII with accents removed and punctuation collapsed to single spaces"""
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return _NON_ALNUM.sub(' ', text).strip()
+
+
+def soundex(value: Any) -> str:
+    """American Soundex code (letter + 3 digits) of the letters in value"""
+    letters = [char for char in normalize(value) if char.isalpha()]
+    if not letters:
+        return ''
+    first = letters[0]
+    digits = []
+    previous = _SOUNDEX_CODES.get(first, '')
+    for char in letters[1:]:
+        code = _SOUNDEX_CODES.get(char, '')
+        if code and code != previous:
+            digits.append(code)
+        # h and w do not separate letters with the same code; vowels do
+        if char not in 'hw':
+            previous = code
+    return (first.upper() + ''.join(digits) + '000')[:4]
+
+
+def field_value(record: Dict[str, Any], path: str) -> Any:
+    """Value of a dotted field path in a document, or None"""
+    value: Any = record
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class BlockingKey:
+    """Derives one blocking key from a field; records without a value get no key"""
+
+    def __init__(self, name: str, field: str, transform: Callable[[Any], str]):
+        self.name = name
+        self.field = field
+        self.transform = transform
+
+    def key(self, record: Dict[str, Any]) -> Optional[str]:
+        value = self.transform(field_value(record, self.field))
+        # Namespaced, so equal values from different rules never share a block
+        return f"{self.name}:{value}" if value else None
+
+
+def exact_key(field: str) -> BlockingKey:
+    """Block on the whole normalized value"""
+    return BlockingKey(f"exact:{field}", field, normalize)
+
+
+def prefix_key(field: str, length: int = 4) -> BlockingKey:
+    """Block on the first length characters of the normalized value, spaces removed"""
+    return BlockingKey(f"prefix{length}:{field}", field, lambda value: normalize(value).replace(' ', '')[:length])
+
+
+def phonetic_key(field: str) -> BlockingKey:
+    """Block on the Soundex code of the value, so spelling variants share a block"""
+    return BlockingKey(f"soundex:{field}", field, soundex)
+
+
+def record_keys(record: Dict[str, Any], keys: Iterable[BlockingKey]) -> List[str]:
+    """Distinct blocking keys of a record, sorted"""
+    return sorted({key for key in (rule.key(record) for rule in keys) if key})
+
+
+class SortedNeighbourhood:
+    """
+    Sorted-neighbourhood blocking: both datasets are sorted together on a key
+    and each record is compared with the window records sorted just before it.
+
+    Catches near-duplicates whose keys differ in a way no exact block would,
+    e.g. a typo in the last characters.
+    """
+
+    def __init__(self, field: str, window: int = 10, transform: Callable[[Any], str] = normalize):
+        if window < 2:
+            raise ValueError("Sorted neighbourhood window must be at least 2")
+        self.field = field
+        self.window = window
+        self.transform = transform
+
+    def sort_key(self, record: Dict[str, Any]) -> Optional[str]:
+        return self.transform(field_value(record, self.field)) or None
@@ -0,0 +1,12 @@
+from apps.jobs.registry import job_handler
+
+
+@job_handler('matching.run', max_attempts=1, submittable=False)
+async def run_match_job(context):
+    """Run the match job {"job_id": ...}; queued by MatchJobService.start after the spec was validated"""
+    # Imported here: the scoring stack pulls in NumPy, which the web process only loads on demand
+    from apps.matching.services.match_job_service import MatchJobService
+    stats = await MatchJobService().run(context.payload['job_id'])
+    if stats is None:
+        raise RuntimeError(f"Match job {context.payload['job_id']} failed")
+    return stats
@@ -0,0 +1,147 @@
+"""
+Process-pool scoring over shared-memory columns.
+
+The encoded columns of a match job are copied once into a single
+SharedMemory segment. Worker processes attach to it by name and score blocks
+of candidate pairs, sent as two index arrays, so record dicts are never
+pickled and every worker reads the same physical pages.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import threading
+import numpy as np
+from .scoring import DateColumn, FieldComparator, NumericColumn, StringColumn, score_columns
+
+_COLUMN_TYPES = {'string': StringColumn, 'numeric': NumericColumn, 'date': DateColumn}
+_ALIGNMENT = 64
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_lock = threading.RLock()
+
+# Worker-side: the segment of the job currently being scored
+_attached: Optional[Tuple[str, shared_memory.SharedMemory, Dict[str, Dict[str, Any]]]] = None
+
+
+class SharedColumns:
+    """
+    Both sides' columns, {'left': {field: column}, 'right': {...}}, copied
+    into one shared-memory segment.
+
+    spec is a small picklable description (segment name plus dtype, shape and
+    offset of every array) from which attach() rebuilds the columns as views.
+    The creator must close() the segment when the job ends.
+    """
+
+    def __init__(self, sides: Dict[str, Dict[str, Any]]):
+        layout: Dict[str, Dict[str, Any]] = {}
+        size = 0
+        for side, columns in sides.items():
+            layout[side] = {}
+            for field, column in columns.items():
+                kind = next(name for name, column_type in _COLUMN_TYPES.items() if isinstance(column, column_type))
+                arrays = {}
+                for name, array in column.arrays().items():
+                    arrays[name] = (array.dtype.str, array.shape, size)
+                    size += -(-array.nbytes // _ALIGNMENT) * _ALIGNMENT
+                layout[side][field] = {'type': kind, 'arrays': arrays}
+        self._memory = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for side, columns in sides.items():
+            for field, column in columns.items():
+                for name, array in column.arrays().items():
+                    _view(self._memory, *layout[side][field]['arrays'][name])[...] = array
+        self.spec = {'name': self._memory.name, 'sides': layout}
+        self.nbytes = size
+
+    def close(self) -> None:
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> 'SharedColumns':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _view(memory: shared_memory.SharedMemory, dtype: str, shape: Tuple[int, ...], offset: int) -> np.ndarray:
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+
+
+def attach(spec: Dict[str, Any]) -> Tuple[shared_memory.SharedMemory, Dict[str, Dict[str, Any]]]:
+    """Open a SharedColumns segment and rebuild its columns as zero-copy views"""
+    memory = shared_memory.SharedMemory(name=spec['name'])
+    sides = {}
+    for side, columns in spec['sides'].items():
+        sides[side] = {
+            field: _COLUMN_TYPES[entry['type']].from_arrays(
+                {name: _view(memory, *layout) for name, layout in entry['arrays'].items()}
+            )
+            for field, entry in columns.items()
+        }
+    return memory, sides
+
+
+def _columns_for(spec: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """The columns of spec, attaching once per job in each worker process"""
+    global _attached
+    if _attached is None or _attached[0] != spec['name']:
+        if _attached is not None:
+            _attached[1].close()
+        memory, sides = attach(spec)
+        _attached = (spec['name'], memory, sides)
+    return _attached[2]
+
+
+def score_block(spec: Dict[str, Any], comparators: List[FieldComparator],
+                left_index: np.ndarray, right_index: np.ndarray, threshold: float) -> Dict[str, Any]:
+    """
+    Score one block of candidate pairs (runs in a worker process).
+
+    Returns the pairs reaching threshold as arrays: left/right row indexes,
+    scores and the per-field similarities.
+    """
+    sides = _columns_for(spec)
+    scores, fields = score_columns(comparators, sides['left'], sides['right'], left_index, right_index)
+    keep = scores >= threshold
+    return {
+        'left_index': left_index[keep],
+        'right_index': right_index[keep],
+        'scores': scores[keep],
+        'fields': {name: values[keep] for name, values in fields.items()}
+    }
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_process_pool(workers: int = 0) -> ProcessPoolExecutor:
+    """
+    The shared scoring pool, created on first use.
+
+    Workers are spawned rather than forked: the web process runs threads
+    (gunicorn, the job coordinator) and forking those is unsafe.
+    """
+    global _pool, _pool_workers
+    workers = workers or available_cpus()
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_process_pool() -> None:
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
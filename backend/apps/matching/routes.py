@@ -0,0 +1,56 @@
+from flask import Blueprint, g, jsonify, request
+from shared.middleware.auth import require_user
+import logging
+
+# The job runs in a job worker (apps/jobs) with its scoring in a process pool,
+# so these handlers only read and write job documents.
+matching_bp = Blueprint('matching', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS_PAGE = 1000
+
+
+def _service():
+    # Imported here: the scoring stack pulls in NumPy, which app start-up avoids
+    from apps.matching.services.match_job_service import MatchJobService
+    return MatchJobService()
+
+
+def _public(job):
+    return {key: value for key, value in job.items() if key != 'user_id'} | {'job_id': job['_id']}
+
+
+@matching_bp.route('/jobs', methods=['POST'])
+@require_user
+async def create_job():
+    """Start a match job from the JSON job spec; poll GET /jobs/<job_id> for progress"""
+    spec = request.get_json(silent=True)
+    service = _service()
+    try:
+        job = await service.create(g.user['user_id'], spec)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    await service.start(job['_id'], g.user['user_id'])
+    return jsonify(_public(job)), 202
+
+
+@matching_bp.route('/jobs/<job_id>', methods=['GET'])
+@require_user
+async def get_job(job_id):
+    """Status, progress and (when completed) stats of one of the user's jobs"""
+    job = await _service().get(g.user['user_id'], job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_public(job)), 200
+
+
+@matching_bp.route('/jobs/<job_id>/results', methods=['GET'])
+@require_user
+async def get_job_results(job_id):
+    """Matches of a job, best first: ?limit=100&skip=0"""
+    limit = min(request.args.get('limit', 100, type=int), MAX_RESULTS_PAGE)
+    skip = max(request.args.get('skip', 0, type=int), 0)
+    results = await _service().results(g.user['user_id'], job_id, limit=max(limit, 1), skip=skip)
+    if results is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'results': results}), 200
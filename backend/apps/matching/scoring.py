@@ -0,0 +1,460 @@
+"""
+Vectorised similarity scoring for candidate pairs.
+
+Field values are encoded once per dataset into array-backed columns
+(StringColumn, NumericColumn, DateColumn). A batch of pairs is then two index
+arrays into the left and right columns, and every similarity is computed for
+the whole batch with NumPy, with no Python work per pair:
+
+    levenshtein   1 - edit distance / longer length (bit-parallel, Myers/Hyyrö)
+    jaro_winkler  Jaro similarity with Winkler's common-prefix boost (bit-parallel)
+    jaccard       |intersection| / |union| of the word sets
+    exact         1 when the normalized values are equal
+    numeric       1 - |a - b| / tolerance, floored at 0
+    date          1 - |days apart| / max_days, floored at 0
+
+Similarities are in [0, 1]; missing or empty values score 0. A pair's score
+is the weighted mean of its field similarities.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import date, datetime
+import zlib
+import numpy as np
+from .blocking import field_value, normalize
+
+# Strings are truncated to 63 characters so one uint64 holds a bit per position
+MAX_LENGTH = 63
+MAX_TOKENS = 16
+# Pairs scored per NumPy pass; small enough for the working arrays to stay in cache
+CHUNK_SIZE = 16384
+
+_ALPHABET = ' 0123456789abcdefghijklmnopqrstuvwxyz'
+_ALPHABET_SIZE = len(_ALPHABET) + 1  # code 0 is padding
+_CODES = np.zeros(256, dtype=np.uint8)
+for _code, _char in enumerate(_ALPHABET, start=1):
+    _CODES[ord(_char)] = _code
+_ONE = np.uint64(1)
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.int64)
+
+
+class StringColumn:
+    """
+    Normalized strings as alphabet codes, zero-padded, plus their lengths.
+
+    codes is position-major, (width, n), so scoring a batch reads one
+    position of many rows from contiguous memory.
+    """
+
+    def __init__(self, values: Iterable[Any], max_length: int = MAX_LENGTH):
+        if not 1 <= max_length <= MAX_LENGTH:
+            raise ValueError(f"max_length must be between 1 and {MAX_LENGTH}")
+        self.texts = [normalize(value)[:max_length] for value in values]
+        self.lengths = np.fromiter(map(len, self.texts), dtype=np.int64, count=len(self.texts))
+        width = max(int(self.lengths.max(initial=0)), 1)
+        raw = np.array([text.encode('ascii') for text in self.texts], dtype=f'S{width}')
+        self.codes = np.ascontiguousarray(_CODES[raw.view(np.uint8).reshape(len(self.texts), width)].T)
+        self._bits: Optional[np.ndarray] = None
+        self._tokens: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """The column's arrays, including the bit and token tables built so far"""
+        arrays = {'codes': self.codes, 'lengths': self.lengths}
+        if self._bits is not None:
+            arrays['bits'] = self._bits
+        if self._tokens is not None:
+            arrays['tokens'], arrays['token_counts'] = self._tokens
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'StringColumn':
+        """Rebuild a column around existing arrays (e.g. views of shared memory); texts are not kept"""
+        column = cls.__new__(cls)
+        column.texts = None
+        column.codes, column.lengths = arrays['codes'], arrays['lengths']
+        column._bits = arrays.get('bits')
+        column._tokens = (arrays['tokens'], arrays['token_counts']) if 'tokens' in arrays else None
+        return column
+
+    @property
+    def bits(self) -> np.ndarray:
+        """Flattened (n, alphabet) table of bitmasks: the positions holding each code, per row"""
+        if self._bits is None:
+            bits = np.zeros(len(self) * _ALPHABET_SIZE, dtype=np.uint64)
+            base = np.arange(len(self)) * _ALPHABET_SIZE
+            for position, codes in enumerate(self.codes):
+                # Padding sets bits under code 0, which no real character uses
+                bits[base + codes] |= _ONE << np.uint64(position)
+            self._bits = bits
+        return self._bits
+
+    @property
+    def tokens(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(n, k) array of word ids (0 = padding) and the word count per row, built on first use"""
+        if self._tokens is None:
+            if self.texts is None:
+                raise ValueError("Token table was not built before the column was shared")
+            token_sets = [sorted({zlib.crc32(word.encode()) + 1 for word in text.split()})[:MAX_TOKENS]
+                          for text in self.texts]
+            counts = np.fromiter(map(len, token_sets), dtype=np.int64, count=len(token_sets))
+            tokens = np.zeros((len(token_sets), max(int(counts.max(initial=0)), 1)), dtype=np.uint64)
+            for row, token_set in enumerate(token_sets):
+                tokens[row, :len(token_set)] = token_set
+            self._tokens = tokens, counts
+        return self._tokens
+
+
+class NumericColumn:
+    """Float64 values; missing or unparseable values are NaN"""
+
+    def __init__(self, values: Iterable[Any]):
+        self.values = np.fromiter((_to_float(value) for value in values), dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {'values': self.values}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]):
+        column = cls.__new__(cls)
+        column.values = arrays['values']
+        return column
+
+
+class DateColumn:
+    """Day-resolution datetime64 values; missing or unparseable values are NaT"""
+
+    def __init__(self, values: Iterable[Any]):
+        self.values = np.array([_to_date(value) for value in values], dtype='datetime64[D]')
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {'values': self.values}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]):
+        column = cls.__new__(cls)
+        column.values = arrays['values']
+        return column
+
+
+def _to_float(value: Any) -> float:
+    if value is None or isinstance(value, bool):
+        return np.nan
+    try:
+        return float(str(value).replace(',', '')) if isinstance(value, str) else float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _to_date(value: Any) -> np.datetime64:
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return np.datetime64(value, 'D')
+    try:
+        return np.datetime64(str(value)[:10], 'D') if value else np.datetime64('NaT')
+    except ValueError:
+        return np.datetime64('NaT')
+
+
+def _popcount(values: np.ndarray) -> np.ndarray:
+    return _POPCOUNT[values.view(np.uint8)].reshape(len(values), 8).sum(axis=1, dtype=np.int64)
+
+
+def _longest_first(lengths: np.ndarray) -> np.ndarray:
+    """Stable order of pairs by descending length (uint8 keys let NumPy radix sort)"""
+    return np.argsort((MAX_LENGTH - lengths).astype(np.uint8), kind='stable')
+
+
+def _levenshtein_distance(bits: np.ndarray, base: np.ndarray, m: np.ndarray,
+                          text: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    Edit distances, one pair per element (Myers/Hyyrö bit-vector algorithm).
+
+    The pattern of each pair is the bit table row starting at base with length
+    m; text is the other side's (width, pairs) codes with lengths n, sorted
+    longest first so each position only touches the pairs still inside their text.
+    """
+    pv = np.full(len(m), np.iinfo(np.uint64).max, dtype=np.uint64)
+    mv = np.zeros(len(m), dtype=np.uint64)
+    active = np.searchsorted(-n, -np.arange(len(text)), side='left')
+    for j, k in enumerate(active):
+        if k == 0:
+            break
+        # Pairs past k have consumed their text; their vectors keep their final values
+        pv_k, mv_k = pv[:k], mv[:k]
+        eq = bits.take(base[:k] + text[j, :k])
+        xv = eq | mv_k
+        xh = eq & pv_k
+        xh += pv_k
+        xh ^= pv_k
+        xh |= eq
+        ph = xh | pv_k
+        np.invert(ph, out=ph)
+        ph |= mv_k
+        mh = pv_k & xh
+        ph <<= _ONE
+        ph |= _ONE
+        mh <<= _ONE
+        np.bitwise_or(xv, ph, out=xh)
+        np.invert(xh, out=xh)
+        np.bitwise_and(ph, xv, out=mv_k)
+        np.bitwise_or(mh, xh, out=pv_k)
+    # The last column's vertical deltas run from D[0][n] = n down to D[m][n]
+    rows = (_ONE << m.astype(np.uint64)) - _ONE
+    return n + _popcount(pv & rows) - _popcount(mv & rows)
+
+
+def _compact(codes: np.ndarray, keep: np.ndarray, width: int) -> np.ndarray:
+    """Per pair, the kept codes in order, zero-padded to width; all arrays are (positions, pairs)"""
+    rank = np.empty(keep.shape, dtype=np.uint8)
+    seen = np.zeros(keep.shape[1], dtype=np.uint8)
+    for position, kept in enumerate(keep):
+        seen += kept
+        np.multiply(seen, kept, out=rank[position])
+    # Codes that are not kept all land in row 0, which is dropped
+    out = np.zeros((width + 1, codes.shape[1]), dtype=codes.dtype)
+    out[rank, np.arange(codes.shape[1])] = codes
+    return out[1:]
+
+
+def _jaro_winkler(a: np.ndarray, la: np.ndarray, bits_b: np.ndarray, base_b: np.ndarray,
+                  b: np.ndarray, lb: np.ndarray, prefix_scale: float, boost_threshold: float) -> np.ndarray:
+    """
+    Jaro-Winkler similarities; a and b are (width, pairs) codes, sorted by la
+    descending. Each character of a takes the first unmatched equal character
+    of b inside its window, found for all pairs at once as the lowest set bit
+    of b's position mask.
+    """
+    window = np.maximum(np.maximum(la, lb) // 2 - 1, 0)
+    # Positions of b within reach of a's current position, and those not yet matched
+    band = (_ONE << (window + 1).astype(np.uint64)) - _ONE
+    available = (_ONE << lb.astype(np.uint64)) - _ONE
+    matched_a = np.zeros(a.shape, dtype=bool)
+    active = np.searchsorted(-la, -np.arange(len(a)), side='left')
+    for i, k in enumerate(active):
+        if k == 0:
+            break
+        band_k, available_k = band[:k], available[:k]
+        candidates = bits_b.take(base_b[:k] + a[i, :k])
+        candidates &= band_k
+        candidates &= available_k
+        lowest = ~candidates
+        lowest += _ONE
+        lowest &= candidates
+        available_k ^= lowest
+        np.not_equal(lowest, 0, out=matched_a[i, :k])
+        band_k <<= _ONE
+        # The window's lower edge leaves position 0 once i reaches the window size
+        np.bitwise_or(band_k, window[:k] > i, out=band_k)
+
+    matched_b = ((_ONE << lb.astype(np.uint64)) - _ONE) & ~available
+    matches = matched_a.sum(axis=0)
+    # Half the places where the matched characters of a and b, read in order, disagree
+    width = min(len(a), len(b))
+    in_b = ((matched_b >> np.arange(len(b), dtype=np.uint64)[:, None]) & _ONE).astype(bool)
+    transpositions = (_compact(a, matched_a, width) != _compact(b, in_b, width)).sum(axis=0) / 2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        jaro = np.where(
+            matches > 0,
+            (matches / la + matches / lb + (matches - transpositions) / matches) / 3,
+            0.0
+        )
+    prefix_width = min(4, width)
+    same = (a[:prefix_width] == b[:prefix_width]) & (np.arange(prefix_width)[:, None] < np.minimum(la, lb))
+    prefix = np.cumprod(same, axis=0).sum(axis=0)
+    return np.where(jaro > boost_threshold, jaro + prefix * prefix_scale * (1 - jaro), jaro)
+
+
+def _chunked(kernel: Callable[..., np.ndarray], left_index: np.ndarray, right_index: np.ndarray,
+             *columns) -> np.ndarray:
+    """Apply kernel to CHUNK_SIZE pairs at a time"""
+    out = np.empty(len(left_index), dtype=np.float64)
+    for start in range(0, len(left_index), CHUNK_SIZE):
+        li = left_index[start:start + CHUNK_SIZE]
+        ri = right_index[start:start + CHUNK_SIZE]
+        out[start:start + CHUNK_SIZE] = kernel(li, ri, *columns)
+    return out
+
+
+def levenshtein_similarity(left: StringColumn, right: StringColumn,
+                           left_index: np.ndarray, right_index: np.ndarray) -> np.ndarray:
+    def kernel(li, ri, left, right):
+        order = _longest_first(right.lengths[ri])
+        li, ri = li[order], ri[order]
+        la, lb = left.lengths[li], right.lengths[ri]
+        distance = _levenshtein_distance(left.bits, li * _ALPHABET_SIZE, la, right.codes.take(ri, axis=1), lb)
+        longest = np.maximum(la, lb)
+        similarity = np.empty(len(order), dtype=np.float64)
+        similarity[order] = np.where(longest > 0, 1 - distance / np.maximum(longest, 1), 0.0)
+        return similarity
+    return _chunked(kernel, left_index, right_index, left, right)
+
+
+def jaro_winkler_similarity(left: StringColumn, right: StringColumn,
+                            left_index: np.ndarray, right_index: np.ndarray,
+                            prefix_scale: float = 0.1, boost_threshold: float = 0.7) -> np.ndarray:
+    def kernel(li, ri, left, right):
+        order = _longest_first(left.lengths[li])
+        li, ri = li[order], ri[order]
+        similarity = np.empty(len(order), dtype=np.float64)
+        similarity[order] = _jaro_winkler(
+            left.codes.take(li, axis=1), left.lengths[li], right.bits, ri * _ALPHABET_SIZE,
+            right.codes.take(ri, axis=1), right.lengths[ri], prefix_scale, boost_threshold
+        )
+        return similarity
+    return _chunked(kernel, left_index, right_index, left, right)
+
+
+def jaccard_similarity(left: StringColumn, right: StringColumn,
+                       left_index: np.ndarray, right_index: np.ndarray) -> np.ndarray:
+    def kernel(li, ri, left, right):
+        (left_tokens, left_counts), (right_tokens, right_counts) = left.tokens, right.tokens
+        ta, tb = left_tokens[li], right_tokens[ri]
+        shared = ((ta[:, :, None] == tb[:, None, :]) & (ta[:, :, None] != 0)).sum(axis=(1, 2))
+        union = left_counts[li] + right_counts[ri] - shared
+        return np.where(union > 0, shared / np.maximum(union, 1), 0.0)
+    return _chunked(kernel, left_index, right_index, left, right)
+
+
+def exact_similarity(left: StringColumn, right: StringColumn,
+                     left_index: np.ndarray, right_index: np.ndarray) -> np.ndarray:
+    def kernel(li, ri, left, right):
+        la, lb = left.lengths[li], right.lengths[ri]
+        width = min(len(left.codes), len(right.codes))
+        # Positions past the shorter width are padding in any pair whose lengths agree
+        same = (left.codes[:width].take(li, axis=1) == right.codes[:width].take(ri, axis=1)).all(axis=0)
+        return ((la == lb) & (la > 0) & same).astype(np.float64)
+    return _chunked(kernel, left_index, right_index, left, right)
+
+
+def numeric_similarity(left: NumericColumn, right: NumericColumn,
+                       left_index: np.ndarray, right_index: np.ndarray,
+                       absolute: float = 0.0, relative: float = 0.0) -> np.ndarray:
+    """1 for equal values, falling linearly to 0 at max(absolute, relative * larger value) apart"""
+    a, b = left.values[left_index], right.values[right_index]
+    difference = np.abs(a - b)
+    tolerance = np.maximum(absolute, relative * np.maximum(np.abs(a), np.abs(b)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(tolerance > 0, 1 - difference / tolerance, (difference == 0).astype(np.float64))
+    return np.nan_to_num(np.clip(similarity, 0.0, 1.0), nan=0.0)
+
+
+def date_similarity(left: DateColumn, right: DateColumn,
+                    left_index: np.ndarray, right_index: np.ndarray,
+                    max_days: float = 30.0) -> np.ndarray:
+    """1 on the same day, falling linearly to 0 at max_days apart"""
+    a, b = left.values[left_index], right.values[right_index]
+    days = np.abs((a - b).astype(np.float64))
+    missing = np.isnat(a) | np.isnat(b)
+    similarity = 1 - days / max_days if max_days > 0 else (days == 0).astype(np.float64)
+    return np.where(missing, 0.0, np.clip(similarity, 0.0, 1.0))
+
+
+# method -> (column type, similarity function)
+METHODS: Dict[str, Tuple[type, Callable[..., np.ndarray]]] = {
+    'levenshtein': (StringColumn, levenshtein_similarity),
+    'jaro_winkler': (StringColumn, jaro_winkler_similarity),
+    'jaccard': (StringColumn, jaccard_similarity),
+    'exact': (StringColumn, exact_similarity),
+    'numeric': (NumericColumn, numeric_similarity),
+    'date': (DateColumn, date_similarity)
+}
+
+
+class FieldComparator:
+    """
+    Compares one field with a named method.
+
+    Similarities below threshold count as 0, so weak agreement on one field
+    cannot lift a pair's score. Extra keyword options are passed to the
+    similarity function (e.g. absolute/relative for numeric, max_days for date).
+    """
+
+    def __init__(self, field: str, method: str = 'levenshtein', weight: float = 1.0,
+                 threshold: float = 0.0, **options):
+        if method not in METHODS:
+            raise ValueError(f"Unknown comparison method: {method}")
+        self.field = field
+        self.method = method
+        self.weight = weight
+        self.threshold = threshold
+        self.options = options
+
+    def column(self, values: Iterable[Any]):
+        """Encode one dataset's values of this field"""
+        column_type, _ = METHODS[self.method]
+        return column_type(values)
+
+    def prepare(self, column) -> None:
+        """Build the lookup tables this method reads, so a shared column needs no rebuilding"""
+        if self.method in ('levenshtein', 'jaro_winkler'):
+            column.bits
+        elif self.method == 'jaccard':
+            column.tokens
+
+    def similarity(self, left, right, left_index: np.ndarray, right_index: np.ndarray) -> np.ndarray:
+        _, function = METHODS[self.method]
+        similarity = function(left, right, left_index, right_index, **self.options)
+        if self.threshold:
+            similarity = np.where(similarity >= self.threshold, similarity, 0.0)
+        return similarity
+
+
+def encode_columns(records: Sequence[Dict[str, Any]], comparators: Iterable[FieldComparator]) -> Dict[str, Any]:
+    """Encode the compared fields of a list of records, one column per comparator"""
+    return {
+        comparator.field: comparator.column([field_value(record, comparator.field) for record in records])
+        for comparator in comparators
+    }
+
+
+def score_columns(comparators: Iterable[FieldComparator], left: Dict[str, Any], right: Dict[str, Any],
+                  left_index: np.ndarray, right_index: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Weighted scores and per-field similarities for pairs (left_index[k], right_index[k])"""
+    comparators = list(comparators)
+    total_weight = sum(comparator.weight for comparator in comparators) or 1.0
+    left_index = np.asarray(left_index, dtype=np.int64)
+    right_index = np.asarray(right_index, dtype=np.int64)
+    scores = np.zeros(len(left_index), dtype=np.float64)
+    fields = {}
+    for comparator in comparators:
+        similarity = comparator.similarity(left[comparator.field], right[comparator.field], left_index, right_index)
+        fields[comparator.field] = similarity
+        scores += comparator.weight * similarity
+    return scores / total_weight, fields
+
+
+def score_pairs(pairs: Sequence[Tuple[Dict[str, Any], Dict[str, Any]]],
+                comparators: Iterable[FieldComparator]) -> List[Tuple[float, Dict[str, float]]]:
+    """Score a batch of (left, right) records; returns (score, per-field similarity) per pair"""
+    comparators = list(comparators)
+    if not pairs:
+        return []
+    # Records repeat across the pairs of a block; encode each once
+    positions: List[Dict[int, int]] = [{}, {}]
+    unique: List[List[Dict[str, Any]]] = [[], []]
+    indexes = np.empty((2, len(pairs)), dtype=np.int64)
+    for k, pair in enumerate(pairs):
+        for side in (0, 1):
+            record = pair[side]
+            position = positions[side].get(id(record))
+            if position is None:
+                position = positions[side][id(record)] = len(unique[side])
+                unique[side].append(record)
+            indexes[side, k] = position
+    scores, fields = score_columns(
+        comparators, encode_columns(unique[0], comparators), encode_columns(unique[1], comparators),
+        indexes[0], indexes[1]
+    )
+    names = list(fields)
+    field_rows = np.column_stack([fields[name] for name in names]).tolist() if names else [[]] * len(pairs)
+    return [(score, dict(zip(names, row))) for score, row in zip(scores.tolist(), field_rows)]
@@ -0,0 +1,450 @@
+from array import array
+from collections import deque
+from concurrent.futures import Executor, Future
+from datetime import datetime, UTC
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import re
+import time
+import uuid
+import numpy as np
+from apps.jobs.services.job_queue import JobQueue
+from apps.matching.blocking import SortedNeighbourhood, exact_key, field_value, phonetic_key, prefix_key
+from apps.matching.parallel import SharedColumns, available_cpus, get_process_pool, score_block
+from apps.matching.scoring import METHODS, FieldComparator
+from apps.matching.services.matching_service import (
+    BLOCK_COLLECTION, RESULTS_COLLECTION, Dataset, MatchingService
+)
+from services.factory import get_config, get_database_service
+from shared.utils.concurrency import call_maybe_async, iterate_maybe_async
+
+logger = logging.getLogger(__name__)
+
+JOBS_COLLECTION = 'match_jobs'
+
+_KEY_TYPES = {'exact': exact_key, 'prefix': prefix_key, 'soundex': phonetic_key}
+_COLLECTION_NAME = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9_.-]{0,119}$')
+# Internal collections a job may not read as a dataset
+_RESERVED_COLLECTIONS = {'users', JOBS_COLLECTION, BLOCK_COLLECTION, RESULTS_COLLECTION}
+
+
+def _dataset(spec: Any, side: str) -> Dataset:
+    if not isinstance(spec, dict) or not isinstance(spec.get('collection'), str):
+        raise ValueError(f"'{side}' must be an object with a 'collection'")
+    collection = spec['collection']
+    if not _COLLECTION_NAME.match(collection) or collection in _RESERVED_COLLECTIONS \
+            or collection.startswith('system.'):
+        raise ValueError(f"'{side}' collection {collection!r} cannot be matched")
+    query = spec.get('query') or {}
+    if not isinstance(query, dict):
+        raise ValueError(f"'{side}.query' must be an object")
+    return Dataset(collection, query, spec.get('id_field', '_id'))
+
+
+def _parsed_dataset_id(dataset: Dataset) -> Optional[str]:
+    """The dataset_id of a side that is exactly one parsed dataset (apps/parser), else None"""
+    # Imported here: the parser app is only needed when its datasets are matched
+    from apps.parser.services.parser_service import RECORDS_COLLECTION
+    if dataset.collection != RECORDS_COLLECTION or dataset.id_field != '_id' \
+            or list(dataset.query) != ['dataset_id'] or not isinstance(dataset.query['dataset_id'], str):
+        return None
+    return dataset.query['dataset_id']
+
+
+class MatchJob:
+    """
+    A validated match request. Built from the JSON spec stored on the job:
+
+        {"left": {"collection": "...", "query": {...}, "id_field": "_id"},
+         "right": {...},
+         "comparators": [{"field": "name", "method": "jaro_winkler", "weight": 2,
+                          "threshold": 0.5, "options": {...}}],
+         "keys": [{"type": "soundex" | "prefix" | "exact", "field": "name", "length": 4}],
+         "neighbourhood": {"field": "name", "window": 10},
+         "threshold": 0.85,
+         "incremental": {"previous_job": "<job_id>"}}
+
+    An incremental job re-matches new versions of the datasets of a
+    completed previous job with the same comparators, keys and threshold
+    (both sides must be parsed datasets, see MatchJobService).
+    """
+
+    def __init__(self, left: Dataset, right: Dataset, comparators: List[FieldComparator],
+                 keys: List[Any], neighbourhood: Optional[SortedNeighbourhood], threshold: float,
+                 previous_job: Optional[str] = None):
+        self.left = left
+        self.right = right
+        self.comparators = comparators
+        self.keys = keys
+        self.neighbourhood = neighbourhood
+        self.threshold = threshold
+        self.previous_job = previous_job
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> 'MatchJob':
+        """Raises ValueError describing the first invalid part of spec"""
+        if not isinstance(spec, dict):
+            raise ValueError("Job spec must be a JSON object")
+        comparators = []
+        for entry in spec.get('comparators') or []:
+            try:
+                comparators.append(FieldComparator(
+                    entry['field'], entry.get('method', 'levenshtein'), float(entry.get('weight', 1.0)),
+                    float(entry.get('threshold', 0.0)), **(entry.get('options') or {})
+                ))
+            except (KeyError, TypeError, AttributeError):
+                raise ValueError(f"Invalid comparator: {entry!r}")
+        if not comparators:
+            raise ValueError("At least one comparator is required")
+        keys = []
+        for entry in spec.get('keys') or []:
+            if not isinstance(entry, dict) or entry.get('type') not in _KEY_TYPES or 'field' not in entry:
+                raise ValueError(f"Invalid blocking key: {entry!r}")
+            if entry['type'] == 'prefix':
+                keys.append(prefix_key(entry['field'], int(entry.get('length', 4))))
+            else:
+                keys.append(_KEY_TYPES[entry['type']](entry['field']))
+        neighbourhood = None
+        if spec.get('neighbourhood'):
+            entry = spec['neighbourhood']
+            if not isinstance(entry, dict) or 'field' not in entry:
+                raise ValueError(f"Invalid neighbourhood: {entry!r}")
+            neighbourhood = SortedNeighbourhood(entry['field'], int(entry.get('window', 10)))
+        if not keys and neighbourhood is None:
+            raise ValueError("At least one blocking key or a neighbourhood is required")
+        threshold = float(spec.get('threshold', 0.8))
+        left, right = _dataset(spec.get('left'), 'left'), _dataset(spec.get('right'), 'right')
+        previous_job = None
+        if spec.get('incremental'):
+            entry = spec['incremental']
+            if not isinstance(entry, dict) or not isinstance(entry.get('previous_job'), str):
+                raise ValueError(f"Invalid incremental: {entry!r}")
+            if neighbourhood is not None:
+                # Windows shift as records come and go, so unchanged pairs cannot be carried forward
+                raise ValueError("Incremental matching supports blocking keys only, not a neighbourhood")
+            if _parsed_dataset_id(left) is None or _parsed_dataset_id(right) is None:
+                raise ValueError("Incremental matching needs parsed datasets on both sides")
+            previous_job = entry['previous_job']
+        return cls(left, right, comparators, keys, neighbourhood, threshold, previous_job)
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+class MatchJobService:
+    """
+    Runs match jobs off the request thread.
+
+    The coordinator (a background thread with its own event loop) streams
+    candidate pairs from MatchingService's blocking and collects them as row
+    indexes into blocks. Each block is scored in the process pool against
+    the job's columns in shared memory, so scoring scales with cores while
+    the coordinator only moves index arrays and writes results. Progress is
+    kept on the job document in match_jobs.
+
+    A side that is a whole parsed dataset ({"collection": "dataset_records",
+    "query": {"dataset_id": ...}}) is loaded from the dataset cache when its
+    columnar copy is there: the compared columns are memory-mapped, and the
+    columns encoded for scoring are stored beside them for the next job.
+
+    An incremental job diffs each side against the previous job's dataset
+    by record fingerprint (ParserService.diff_records). Only candidate pairs
+    with an added or changed record are scored; matches between records
+    unchanged on both sides are copied from the previous job's results. A
+    blocking key block that crosses MATCHING_MAX_BLOCK_SIZE between the
+    versions keeps its earlier matches.
+    """
+
+    def __init__(self, db=None, matching: Optional[MatchingService] = None, workers: Optional[int] = None,
+                 block_pairs: Optional[int] = None, pool: Optional[Executor] = None, cache=None):
+        config = get_config()
+        self.db = db or get_database_service()
+        self.matching = matching or MatchingService(self.db)
+        self.workers = workers if workers is not None else config.MATCHING_WORKERS
+        self.block_pairs = block_pairs or config.MATCHING_BLOCK_PAIRS
+        self.pool = pool
+        self._cache = cache
+        self.cache_enabled = cache is not None or config.DATASET_CACHE_MAX_BYTES > 0
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            # Imported here: the parser app is only needed when its datasets are matched
+            from apps.parser.services.dataset_cache import get_dataset_cache
+            self._cache = get_dataset_cache()
+        return self._cache
+
+    async def create(self, user_id: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate spec (ValueError if invalid) and store a queued job"""
+        match_job = MatchJob.from_dict(spec)
+        if match_job.previous_job:
+            await self._previous_job(user_id, spec)
+        job = {
+            '_id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'status': 'queued',
+            'spec': spec,
+            'progress': {},
+            'stats': None,
+            'error': None,
+            'created_at': _now(),
+            'updated_at': _now()
+        }
+        await call_maybe_async(self.db.insert_one, JOBS_COLLECTION, job)
+        return job
+
+    async def start(self, job_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Queue the job for a job worker (the 'matching.run' kind); returns the queue job"""
+        queued, _ = await JobQueue(self.db).submit('matching.run', {'job_id': job_id}, user_id=user_id,
+                                                  idempotency_key=f"match:{job_id}")
+        return queued
+
+    async def get(self, user_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job, or None if it does not exist or belongs to another user"""
+        return await call_maybe_async(self.db.find_one, JOBS_COLLECTION, {'_id': job_id, 'user_id': user_id})
+
+    async def results(self, user_id: str, job_id: str, limit: int = 100, skip: int = 0) -> Optional[List[Dict]]:
+        """A page of the job's matches, best first; None for an unknown job"""
+        if await self.get(user_id, job_id) is None:
+            return None
+        return await call_maybe_async(
+            self.db.find_many, RESULTS_COLLECTION, {'run_id': job_id},
+            projection={'_id': 0, 'left_id': 1, 'right_id': 1, 'score': 1, 'fields': 1},
+            sort=[('score', -1)], limit=limit, skip=skip
+        )
+
+    async def run(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Execute a stored job, recording progress, stats or the failure on its document"""
+        job_doc = await call_maybe_async(self.db.find_one, JOBS_COLLECTION, {'_id': job_id})
+        if job_doc is None:
+            logger.error(f"Match job {job_id} not found")
+            return None
+        started = time.perf_counter()
+        try:
+            job = MatchJob.from_dict(job_doc['spec'])
+            diffs = None
+            if job.previous_job:
+                await self._update(job_id, status='running', progress={'phase': 'diffing'})
+                diffs = await self._diffs(await self._previous_job(job_doc['user_id'], job_doc['spec']), job)
+            await self._update(job_id, status='running', progress={'phase': 'loading'})
+            sources: Dict[str, str] = {}
+            left_ids, left_columns = await self._load(job.left, job.comparators, sources, 'left')
+            right_ids, right_columns = await self._load(job.right, job.comparators, sources, 'right')
+            load_seconds = round(time.perf_counter() - started, 3)
+            with SharedColumns({'left': left_columns, 'right': right_columns}) as shared:
+                stats = await self._score(job_id, job, shared, left_ids, right_ids,
+                                          (diffs['left'].affected, diffs['right'].affected) if diffs else None)
+            if diffs:
+                carried = await self._carry_forward(job_id, job.previous_job, diffs)
+                stats['matches'] += carried
+                stats['incremental'] = {'previous_job': job.previous_job, 'carried_forward': carried,
+                                        'left': diffs['left'].summary(), 'right': diffs['right'].summary()}
+            stats['loaded_from'] = sources
+            stats['load_seconds'] = load_seconds
+            stats['seconds'] = round(time.perf_counter() - started, 3)
+            await self._update(job_id, status='completed', stats=stats)
+            logger.info(f"Match job {job_id}: {stats}")
+            return stats
+        except Exception as e:
+            logger.error(f"Match job {job_id} failed: {str(e)}", exc_info=True)
+            await self._update(job_id, status='failed', error=str(e))
+            return None
+
+    async def _update(self, job_id: str, **fields) -> None:
+        await call_maybe_async(self.db.update_one, JOBS_COLLECTION, {'_id': job_id},
+                               {**fields, 'updated_at': _now()})
+
+    async def _load(self, dataset: Dataset, comparators: List[FieldComparator], sources: Dict[str, str],
+                    side: str) -> Tuple[List[Any], Dict[str, Any]]:
+        """Read the compared fields of one side and encode them as columns"""
+        cached = await self._open_cached(dataset)
+        if cached is not None:
+            sources[side] = 'cache'
+            return await asyncio.to_thread(self._load_cached, cached, dataset.query['dataset_id'], comparators)
+        sources[side] = 'database'
+        fields = sorted({comparator.field for comparator in comparators})
+        projection = {field: 1 for field in fields}
+        projection[dataset.id_field] = 1
+        records = self.db.iter_many(dataset.collection, dataset.query, projection=projection,
+                                    batch_size=self.matching.batch_size)
+        ids = []
+        values: Dict[str, List[Any]] = {field: [] for field in fields}
+        async for record in iterate_maybe_async(records, self.matching.batch_size):
+            ids.append(record.get(dataset.id_field))
+            for field in fields:
+                values[field].append(field_value(record, field))
+        columns: Dict[str, Any] = {}
+        for comparator in comparators:
+            if comparator.field not in columns:
+                columns[comparator.field] = comparator.column(values.pop(comparator.field))
+            # Built before sharing: workers only get read-only views
+            comparator.prepare(columns[comparator.field])
+        return ids, columns
+
+    async def _open_cached(self, dataset: Dataset):
+        """The cached columnar copy of a side that is exactly one parsed dataset, or None"""
+        dataset_id = _parsed_dataset_id(dataset)
+        if not self.cache_enabled or dataset_id is None:
+            return None
+        from apps.parser.services.parser_service import DATASETS_COLLECTION
+        parsed = await call_maybe_async(self.db.find_one, DATASETS_COLLECTION, {'_id': dataset_id})
+        if not parsed or parsed.get('status') != 'ready' or not parsed.get('cache_key'):
+            return None
+        try:
+            return await self.cache.open(parsed['cache_key'])
+        except Exception as e:
+            logger.warning(f"Opening cached dataset {parsed['_id']} failed: {str(e)}")
+            return None
+
+    @staticmethod
+    def _load_cached(cached, dataset_id: str, comparators: List[FieldComparator]) -> Tuple[List[Any], Dict[str, Any]]:
+        # Same _id as the records (the copy may come from another dataset with the same file)
+        ids = [f"{dataset_id}:{row}" for row in cached.row_numbers.tolist()]
+        columns: Dict[str, Any] = {}
+        for comparator in comparators:
+            column_type, _ = METHODS[comparator.method]
+            kind = column_type.__name__
+            field = comparator.field
+            if field not in columns:
+                try:
+                    columns[field] = column_type.from_arrays(cached.encoded(field, kind))
+                except KeyError:
+                    columns[field] = comparator.column(cached.values(field))
+            try:
+                comparator.prepare(columns[field])
+            except ValueError:
+                # A table that needs the texts, which a stored column does not keep
+                columns[field] = comparator.column(cached.values(field))
+                comparator.prepare(columns[field])
+            if isinstance(columns[field], column_type):
+                try:
+                    cached.add_encoded(field, kind, columns[field].arrays())
+                except OSError as e:
+                    logger.warning(f"Storing encoded column {field} in the dataset cache failed: {str(e)}")
+        return ids, columns
+
+    async def _previous_job(self, user_id: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """The completed job an incremental spec builds on; ValueError if it cannot"""
+        previous = await call_maybe_async(self.db.find_one, JOBS_COLLECTION,
+                                          {'_id': spec['incremental']['previous_job'], 'user_id': user_id})
+        if previous is None or previous['status'] != 'completed':
+            raise ValueError("The previous job must be a completed job of the same user")
+        compared = ('comparators', 'keys', 'neighbourhood', 'threshold')
+        if any(previous['spec'].get(name) != spec.get(name) for name in compared):
+            raise ValueError("The previous job must use the same comparators, keys and threshold")
+        previous_job = MatchJob.from_dict(previous['spec'])
+        if _parsed_dataset_id(previous_job.left) is None or _parsed_dataset_id(previous_job.right) is None:
+            raise ValueError("The previous job must have matched parsed datasets")
+        return previous
+
+    async def _diffs(self, previous: Dict[str, Any], job: MatchJob) -> Dict[str, Any]:
+        """Per side, the diff from the previous job's dataset to this job's"""
+        from apps.parser.services.parser_service import ParserService
+        parser = ParserService(self.db)
+        previous_job = MatchJob.from_dict(previous['spec'])
+        return {
+            side: await parser.diff_records(_parsed_dataset_id(getattr(previous_job, side)),
+                                            _parsed_dataset_id(getattr(job, side)))
+            for side in ('left', 'right')
+        }
+
+    async def _carry_forward(self, job_id: str, previous_id: str, diffs: Dict[str, Any]) -> int:
+        """Copy the previous job's matches between records unchanged on both sides; returns how many"""
+        results = self.db.iter_many(RESULTS_COLLECTION, {'run_id': previous_id},
+                                    projection={'_id': 0, 'left_id': 1, 'right_id': 1, 'score': 1, 'fields': 1},
+                                    batch_size=self.matching.batch_size)
+        carried, batch = 0, []
+        async for result in iterate_maybe_async(results, self.matching.batch_size):
+            left_id, right_id = diffs['left'].carried(result['left_id']), diffs['right'].carried(result['right_id'])
+            if left_id is None or right_id is None:
+                continue
+            batch.append({'run_id': job_id, 'left_id': left_id, 'right_id': right_id,
+                          'score': result['score'], 'fields': result['fields']})
+            if len(batch) >= self.matching.batch_size:
+                await call_maybe_async(self.db.insert_many, RESULTS_COLLECTION, batch)
+                carried += len(batch)
+                batch = []
+        if batch:
+            await call_maybe_async(self.db.insert_many, RESULTS_COLLECTION, batch)
+            carried += len(batch)
+        return carried
+
+    async def _score(self, job_id: str, job: MatchJob, shared: SharedColumns,
+                     left_ids: List[Any], right_ids: List[Any],
+                     changed: Optional[Tuple[set, set]] = None) -> Dict[str, Any]:
+        pool = self.pool or get_process_pool(self.workers)
+        # Enough blocks queued to keep every worker busy, without holding all candidates
+        max_in_flight = 2 * (self.workers or available_cpus())
+        left_rows = {record_id: row for row, record_id in enumerate(left_ids)}
+        right_rows = {record_id: row for row, record_id in enumerate(right_ids)}
+        stats: Dict[str, Any] = {}
+        progress = {'phase': 'scoring', 'blocks_submitted': 0, 'blocks_done': 0, 'pairs_scored': 0, 'matches': 0}
+        in_flight: Deque[Tuple[Future, int]] = deque()
+        left_block, right_block = array('q'), array('q')
+
+        def submit() -> None:
+            nonlocal left_block, right_block
+            future = pool.submit(score_block, shared.spec, job.comparators,
+                                 np.frombuffer(left_block, dtype=np.int64),
+                                 np.frombuffer(right_block, dtype=np.int64), job.threshold)
+            in_flight.append((future, len(left_block)))
+            progress['blocks_submitted'] += 1
+            # Fresh buffers: the pool pickles the submitted ones later, on its own thread
+            left_block, right_block = array('q'), array('q')
+
+        async def drain(limit: int) -> None:
+            while len(in_flight) > limit:
+                future, pairs = in_flight.popleft()
+                result = await asyncio.wrap_future(future)
+                await self._store(job_id, result, left_ids, right_ids)
+                progress['blocks_done'] += 1
+                progress['pairs_scored'] += pairs
+                progress['matches'] += len(result['scores'])
+                await self._update(job_id, progress=dict(progress, candidates=stats.get('candidates', 0)))
+
+        try:
+            async for left_record, right_record in self.matching.candidate_pairs(
+                    job.left, job.right, job.keys, job.neighbourhood, stats=stats, run_id=job_id,
+                    changed=changed):
+                left_row = left_rows.get(left_record['_id'])
+                right_row = right_rows.get(right_record['_id'])
+                if left_row is None or right_row is None:
+                    continue  # inserted after the columns were loaded
+                left_block.append(left_row)
+                right_block.append(right_row)
+                if len(left_block) >= self.block_pairs:
+                    submit()
+                    await drain(max_in_flight)
+            if left_block:
+                submit()
+            await drain(0)
+        finally:
+            for future, _ in in_flight:
+                future.cancel()
+
+        cross_product = stats['left_records'] * stats['right_records']
+        stats['comparisons_avoided'] = round(1 - stats['candidates'] / cross_product, 6) if cross_product else 0.0
+        stats['matches'] = progress['matches']
+        stats['score_blocks'] = progress['blocks_done']
+        stats['shared_bytes'] = shared.nbytes
+        return stats
+
+    async def _store(self, job_id: str, result: Dict[str, Any], left_ids: List[Any], right_ids: List[Any]) -> None:
+        names = list(result['fields'])
+        field_rows = zip(*(result['fields'][name].tolist() for name in names)) if names else ()
+        documents = [
+            {
+                'run_id': job_id,
+                'left_id': left_ids[left],
+                'right_id': right_ids[right],
+                'score': round(score, 6),
+                'fields': dict(zip(names, row))
+            }
+            for left, right, score, row in zip(result['left_index'].tolist(), result['right_index'].tolist(),
+                                               result['scores'].tolist(), field_rows)
+        ]
+        for start in range(0, len(documents), self.matching.batch_size):
+            await call_maybe_async(self.db.insert_many, RESULTS_COLLECTION,
+                                   documents[start:start + self.matching.batch_size])
@@ -0,0 +1,267 @@
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+from apps.matching.blocking import BlockingKey, SortedNeighbourhood, record_keys
+from apps.matching.scoring import FieldComparator, score_pairs
+from services.factory import get_config, get_database_service
+from services.implementations.database.indexes import register_indexes
+from shared.utils.concurrency import call_maybe_async, iterate_maybe_async
+import logging
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Scratch collection holding one document per (record, blocking key) while a run is in progress
+BLOCK_COLLECTION = 'match_block_keys'
+RESULTS_COLLECTION = 'match_results'
+
+register_indexes(BLOCK_COLLECTION, {
+    'keys': [('run_id', 1), ('pass', 1), ('key', 1), ('side', 1)],
+    'name': 'run_pass_key_side'
+})
+register_indexes(RESULTS_COLLECTION, {
+    'keys': [('run_id', 1), ('score', -1)],
+    'name': 'run_score'
+})
+
+_LEFT, _RIGHT = 0, 1
+Pair = Tuple[Dict[str, Any], Dict[str, Any]]
+
+
+class Dataset:
+    """The records of one side of a match: a collection and an optional filter"""
+
+    def __init__(self, collection: str, query: Optional[Dict[str, Any]] = None, id_field: str = '_id'):
+        self.collection = collection
+        self.query = query or {}
+        self.id_field = id_field
+
+
+class MatchingService:
+    """
+    Links records of two datasets without comparing the full cross product.
+
+    Records are streamed from DatabaseService once per side and their blocking
+    keys written to a scratch collection. Candidate pairs are then read back
+    sorted by key, so only one block (or one sorted-neighbourhood window) is in
+    memory at a time, whatever the size of the datasets.
+    """
+
+    def __init__(self, db=None, batch_size: Optional[int] = None, max_block_size: Optional[int] = None):
+        config = get_config()
+        self.db = db or get_database_service()
+        self.batch_size = batch_size or config.MATCHING_BATCH_SIZE
+        self.max_block_size = max_block_size or config.MATCHING_MAX_BLOCK_SIZE
+
+    async def candidate_pairs(self, left: Dataset, right: Dataset, keys: Iterable[BlockingKey] = (),
+                              neighbourhood: Optional[SortedNeighbourhood] = None,
+                              fields: Iterable[str] = (), stats: Optional[Dict[str, Any]] = None,
+                              run_id: Optional[str] = None,
+                              changed: Optional[Tuple[Set[Any], Set[Any]]] = None) -> AsyncIterator[Pair]:
+        """
+        Stream candidate (left, right) record pairs, each pair at most once.
+
+        Args:
+            left, right: The datasets to link
+            keys: Blocking keys; records sharing any key are candidates
+            neighbourhood: Optional sorted-neighbourhood pass over both datasets
+            fields: Record fields to carry into the pairs (e.g. the compared fields)
+            stats: Optional dict updated with record, block and candidate counts
+            run_id: Scratch-data namespace; generated when omitted
+            changed: Optional (left ids, right ids); only pairs with a record
+                in one of them are emitted (incremental re-matching)
+        """
+        keys = list(keys)
+        if not keys and neighbourhood is None:
+            raise ValueError("At least one blocking key or a sorted neighbourhood is required")
+        stats = stats if stats is not None else {}
+        stats.update({'left_records': 0, 'right_records': 0, 'blocks': 0,
+                      'oversized_blocks': 0, 'candidates': 0})
+        run_id = run_id or uuid.uuid4().hex
+        fields = set(fields) | {rule.field for rule in keys}
+        if neighbourhood is not None:
+            fields.add(neighbourhood.field)
+
+        try:
+            for side, dataset in ((_LEFT, left), (_RIGHT, right)):
+                stats['left_records' if side == _LEFT else 'right_records'] = await self._index(
+                    run_id, side, dataset, fields, keys, neighbourhood
+                )
+            # Oversized blocks' keys; pairs sharing only these are never emitted by the key pass
+            skipped: Set[str] = set()
+            if keys:
+                async for pair in self._key_pairs(run_id, stats, skipped, changed):
+                    yield pair
+            if neighbourhood is not None:
+                async for pair in self._neighbourhood_pairs(run_id, neighbourhood.window, stats, skipped, changed):
+                    yield pair
+        finally:
+            await call_maybe_async(self.db.bulk_write, BLOCK_COLLECTION,
+                                   [{'op': 'delete_many', 'filter': {'run_id': run_id}}])
+
+    async def match(self, left: Dataset, right: Dataset, comparators: Iterable[FieldComparator],
+                    threshold: float = 0.8, keys: Iterable[BlockingKey] = (),
+                    neighbourhood: Optional[SortedNeighbourhood] = None,
+                    stats: Optional[Dict[str, Any]] = None,
+                    run_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the candidate pairs whose weighted score reaches threshold"""
+        comparators = list(comparators)
+        stats = stats if stats is not None else {}
+        batch: List[Pair] = []
+
+        def matches(pairs: List[Pair]) -> List[Dict[str, Any]]:
+            found = []
+            for (left_record, right_record), (score, fields) in zip(pairs, score_pairs(pairs, comparators)):
+                if score >= threshold:
+                    found.append({
+                        'left_id': left_record['_id'],
+                        'right_id': right_record['_id'],
+                        'score': round(score, 6),
+                        'fields': fields
+                    })
+            stats['matches'] = stats.get('matches', 0) + len(found)
+            return found
+
+        async for pair in self.candidate_pairs(left, right, keys, neighbourhood,
+                                               [comparator.field for comparator in comparators],
+                                               stats, run_id):
+            batch.append(pair)
+            if len(batch) >= self.batch_size:
+                for result in matches(batch):
+                    yield result
+                batch = []
+        if batch:
+            for result in matches(batch):
+                yield result
+
+    async def link(self, left: Dataset, right: Dataset, comparators: Iterable[FieldComparator],
+                   threshold: float = 0.8, keys: Iterable[BlockingKey] = (),
+                   neighbourhood: Optional[SortedNeighbourhood] = None,
+                   run_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Match two datasets and store the matches in match_results
+
+        Returns:
+            Dict: run_id plus record, block, candidate and match counts
+        """
+        run_id = run_id or uuid.uuid4().hex
+        stats: Dict[str, Any] = {'run_id': run_id, 'matches': 0}
+        started = time.perf_counter()
+        batch = []
+        async for result in self.match(left, right, comparators, threshold, keys, neighbourhood, stats, run_id):
+            batch.append({'run_id': run_id, **result})
+            if len(batch) >= self.batch_size:
+                await call_maybe_async(self.db.insert_many, RESULTS_COLLECTION, batch)
+                batch = []
+        if batch:
+            await call_maybe_async(self.db.insert_many, RESULTS_COLLECTION, batch)
+
+        cross_product = stats['left_records'] * stats['right_records']
+        stats['comparisons_avoided'] = round(1 - stats['candidates'] / cross_product, 6) if cross_product else 0.0
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        logger.info(f"Matching run {run_id}: {stats}")
+        return stats
+
+
+    async def _index(self, run_id: str, side: int, dataset: Dataset, fields: set,
+                     keys: List[BlockingKey], neighbourhood: Optional[SortedNeighbourhood]) -> int:
+        """Write one scratch document per (record, key) for one side; returns the record count"""
+        projection = {field: 1 for field in fields}
+        if dataset.id_field != '_id':
+            projection[dataset.id_field] = 1
+        records = self.db.iter_many(dataset.collection, dataset.query, projection=projection,
+                                    batch_size=self.batch_size)
+        count = 0
+        buffer = []
+        async for record in iterate_maybe_async(records, self.batch_size):
+            count += 1
+            carried = {field: record.get(field) for field in fields if field in record}
+            carried['_id'] = record.get(dataset.id_field)
+            record_key_list = record_keys(record, keys)
+            base = {'run_id': run_id, 'side': side, 'keys': record_key_list, 'record': carried}
+            for key in record_key_list:
+                buffer.append({**base, 'pass': 'key', 'key': key})
+            if neighbourhood is not None:
+                sort_key = neighbourhood.sort_key(record)
+                if sort_key is not None:
+                    buffer.append({**base, 'pass': 'neighbourhood', 'key': sort_key})
+            if len(buffer) >= self.batch_size:
+                await call_maybe_async(self.db.insert_many, BLOCK_COLLECTION, buffer)
+                buffer = []
+        if buffer:
+            await call_maybe_async(self.db.insert_many, BLOCK_COLLECTION, buffer)
+        return count
+
+    def _scan(self, run_id: str, pass_name: str) -> AsyncIterator[Dict[str, Any]]:
+        entries = self.db.iter_many(
+            BLOCK_COLLECTION, {'run_id': run_id, 'pass': pass_name},
+            projection={'key': 1, 'side': 1, 'keys': 1, 'record': 1},
+            sort=[('key', 1), ('side', 1)], batch_size=self.batch_size
+        )
+        return iterate_maybe_async(entries, self.batch_size)
+
+    @staticmethod
+    def _unchanged(changed: Optional[Tuple[Set[Any], Set[Any]]], left: Dict[str, Any], right: Dict[str, Any]) -> bool:
+        return changed is not None and left['_id'] not in changed[_LEFT] and right['_id'] not in changed[_RIGHT]
+
+    async def _key_pairs(self, run_id: str, stats: Dict[str, Any], skipped: Set[str],
+                         changed: Optional[Tuple[Set[Any], Set[Any]]] = None) -> AsyncIterator[Pair]:
+        """
+        Cross left and right entries within each block, one block in memory
+        at a time. Oversized blocks' keys are added to skipped.
+        """
+        current = None
+        sides: Tuple[List, List] = ([], [])
+        size = 0
+
+        def block_pairs() -> Iterable[Pair]:
+            if size > self.max_block_size:
+                # Stop-word-like keys (e.g. a common surname prefix) would explode the candidates
+                stats['oversized_blocks'] += 1
+                skipped.add(current)
+                logger.info(f"Skipping block {current}: {size} records > {self.max_block_size}")
+                return
+            stats['blocks'] += 1
+            if changed is not None and not any(entry['record']['_id'] in changed[side]
+                                               for side in (_LEFT, _RIGHT) for entry in sides[side]):
+                return
+            for left_entry in sides[_LEFT]:
+                left_keys = set(left_entry['keys'])
+                for right_entry in sides[_RIGHT]:
+                    # A pair sharing several keys is emitted only from its smallest shared key
+                    # that was not skipped; blocks are scanned in key order, so skipped already
+                    # holds every oversized key below current
+                    if min(left_keys.intersection(right_entry['keys']) - skipped) == current \
+                            and not self._unchanged(changed, left_entry['record'], right_entry['record']):
+                        stats['candidates'] += 1
+                        yield left_entry['record'], right_entry['record']
+
+        async for entry in self._scan(run_id, 'key'):
+            if entry['key'] != current:
+                for pair in block_pairs():
+                    yield pair
+                current, sides, size = entry['key'], ([], []), 0
+            size += 1
+            if size <= self.max_block_size:
+                sides[entry['side']].append(entry)
+        if current is not None:
+            for pair in block_pairs():
+                yield pair
+
+    async def _neighbourhood_pairs(self, run_id: str, window: int, stats: Dict[str, Any], skipped: Set[str],
+                                   changed: Optional[Tuple[Set[Any], Set[Any]]] = None) -> AsyncIterator[Pair]:
+        """Pair each entry with the opposite-side entries among the window - 1 sorted before it"""
+        recent = deque(maxlen=window - 1)
+        async for entry in self._scan(run_id, 'neighbourhood'):
+            entry_keys = set(entry['keys'])
+            for other in recent:
+                # Pairs sharing a blocking key were already emitted by the key pass, unless it was skipped
+                if other['side'] == entry['side'] or entry_keys.intersection(other['keys']) - skipped:
+                    continue
+                pair = (entry['record'], other['record']) if entry['side'] == _LEFT \
+                    else (other['record'], entry['record'])
+                if self._unchanged(changed, *pair):
+                    continue
+                stats['candidates'] += 1
+                yield pair
+            recent.append(entry)
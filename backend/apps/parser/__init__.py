@@ -0,0 +1 @@
+# This can be empty 
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+On-disk columnar form of a parsed dataset.
+
+A dataset is a directory of NumPy .npy files plus manifest.json:
+
+    rows.npy              int64 _row of each record
+    c<i>.offsets.npy      int64, rows + 1 offsets into c<i>.text.npy
+    c<i>.text.npy         uint8, the UTF-8 text of every value of column i
+    c<i>.null.npy         bool, True where the value is None
+    c<i>.<Type>.<name>.npy  arrays of an encoded scoring column (derived)
+
+Values are kept as text: every scoring column type encodes str(value)
+exactly as it encodes the value itself. Derived files hold a column as
+encoded for scoring (StringColumn codes and lookup tables, NumericColumn
+floats...), added the first time a match job needs it, so later jobs map
+them instead of encoding again.
+
+ColumnarBuilder appends batches of records to temporary binary files, so
+building needs no more memory than one batch. ColumnarDataset opens the
+files with mmap: nothing is read until a column is used, and the pages
+are shared by every process mapping the same dataset.
+"""
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import numpy as np
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+_COPY_ITEMS = 1 << 20
+
+
+def _write_npy(path: Path, raw: Path, dtype: str, count: int, first: Optional[Any] = None) -> None:
+    """Turn a raw binary file into an .npy file (header + data), copying in bounded chunks"""
+    shape = (count + (first is not None),)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    position = 0
+    if first is not None:
+        out[0] = first
+        position = 1
+    with open(raw, 'rb') as source:
+        while True:
+            chunk = np.fromfile(source, dtype=dtype, count=_COPY_ITEMS)
+            if not len(chunk):
+                break
+            out[position:position + len(chunk)] = chunk
+            position += len(chunk)
+    out.flush()
+    del out
+    raw.unlink()
+
+
+class ColumnarBuilder:
+    """Writes records batch by batch into a dataset directory"""
+
+    def __init__(self, directory: Path, columns: List[str]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True)
+        self.columns = list(columns)
+        self.rows = 0
+        self._text_bytes = [0] * len(self.columns)
+        self._files = {name: open(self.directory / f"{name}.raw", 'wb') for name in self._raw_names()}
+
+    def _raw_names(self) -> List[str]:
+        names = ['rows']
+        for index in range(len(self.columns)):
+            names += [f"c{index}.offsets", f"c{index}.text", f"c{index}.null"]
+        return names
+
+    def append(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Append records (documents with _row and the column fields)"""
+        records = list(records)
+        array('q', (record['_row'] for record in records)).tofile(self._files['rows'])
+        for index, column in enumerate(self.columns):
+            offsets, nulls, texts = array('q'), bytearray(), []
+            position = self._text_bytes[index]
+            for record in records:
+                value = record.get(column)
+                text = b'' if value is None else str(value).encode()
+                texts.append(text)
+                position += len(text)
+                offsets.append(position)
+                nulls.append(value is None)
+            self._text_bytes[index] = position
+            offsets.tofile(self._files[f"c{index}.offsets"])
+            self._files[f"c{index}.text"].write(b''.join(texts))
+            self._files[f"c{index}.null"].write(nulls)
+        self.rows += len(records)
+
+    def finish(self, **metadata) -> Dict[str, Any]:
+        """Write the .npy files and the manifest; returns the manifest"""
+        for handle in self._files.values():
+            handle.close()
+        directory = self.directory
+        _write_npy(directory / 'rows.npy', directory / 'rows.raw', 'int64', self.rows)
+        for index in range(len(self.columns)):
+            _write_npy(directory / f"c{index}.offsets.npy", directory / f"c{index}.offsets.raw", 'int64',
+                       self.rows, first=0)
+            _write_npy(directory / f"c{index}.text.npy", directory / f"c{index}.text.raw", 'uint8',
+                       self._text_bytes[index])
+            _write_npy(directory / f"c{index}.null.npy", directory / f"c{index}.null.raw", 'bool', self.rows)
+        manifest = {'version': FORMAT_VERSION, 'rows': self.rows, 'columns': self.columns, **metadata}
+        manifest['files'] = sorted(path.name for path in directory.glob('*.npy')) + [MANIFEST]
+        manifest['bytes'] = sum((directory / name).stat().st_size for name in manifest['files'][:-1])
+        (directory / MANIFEST).write_text(json.dumps(manifest))
+        return manifest
+
+    def abort(self) -> None:
+        for handle in self._files.values():
+            handle.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ColumnarDataset:
+    """A dataset directory opened read-only, its arrays memory-mapped on first use"""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.manifest = json.loads((self.directory / MANIFEST).read_text())
+        if self.manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset format {self.manifest.get('version')}")
+        self.columns: List[str] = self.manifest['columns']
+        self.rows: int = self.manifest['rows']
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(self.directory / f"{name}.npy", mmap_mode='r')
+
+    @property
+    def row_numbers(self) -> np.ndarray:
+        return self._load('rows')
+
+    def values(self, column: str) -> List[Optional[str]]:
+        """A column's values as text (None where missing); all None for a column the file did not have"""
+        if column not in self.columns:
+            return [None] * self.rows
+        index = self.columns.index(column)
+        offsets = self._load(f"c{index}.offsets").tolist()
+        data = self._load(f"c{index}.text").tobytes()
+        nulls = self._load(f"c{index}.null").tolist()
+        if data.isascii():
+            # Byte offsets are character offsets: slice one decoded string
+            text = data.decode()
+            return [None if null else text[start:end] for start, end, null in zip(offsets, offsets[1:], nulls)]
+        return [None if null else data[start:end].decode() for start, end, null in zip(offsets, offsets[1:], nulls)]
+
+    def _file_prefix(self, column: str) -> str:
+        if column in self.columns:
+            return f"c{self.columns.index(column)}"
+        # A column the file did not have (all None) is named by a hash, never by the untrusted name
+        return f"x{hashlib.sha1(column.encode()).hexdigest()[:16]}"
+
+    def encoded(self, column: str, kind: str) -> Dict[str, np.ndarray]:
+        """The stored arrays of a column encoded as kind (a scoring column class name); {} when absent"""
+        prefix = f"{self._file_prefix(column)}.{kind}."
+        return {path.name[len(prefix):-4]: np.load(path, mmap_mode='r')
+                for path in self.directory.glob(f"{prefix}*.npy")}
+
+    def add_encoded(self, column: str, kind: str, arrays: Dict[str, np.ndarray]) -> int:
+        """Store the arrays of an encoded column that are not stored yet; returns the bytes written"""
+        prefix = f"{self._file_prefix(column)}.{kind}."
+        written = 0
+        for name, values in arrays.items():
+            path = self.directory / f"{prefix}{name}.npy"
+            if path.exists():
+                continue
+            # Written under a temporary name and renamed, so readers never map a partial file
+            temporary = self.directory / f".{uuid.uuid4().hex}.tmp"
+            with open(temporary, 'wb') as handle:
+                np.save(handle, np.ascontiguousarray(values))
+            os.replace(temporary, path)
+            written += path.stat().st_size
+        return written
+
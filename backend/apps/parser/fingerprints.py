@@ -0,0 +1,111 @@
+"""
+Record fingerprints and the diff between two versions of a dataset.
+
+Every parsed record carries _fp, a digest of its values, and, when the
+dataset names key columns, _key, a digest of the key values. Two versions
+of a file are compared on those alone:
+
+    key columns    records pair up by _key; a pair with different _fp is
+                   'changed', an unpaired new record 'added', an unpaired
+                   old record 'removed'
+    no key         records pair up by _fp, so an edited record shows as one
+                   removed and one added record
+
+Digests are of the normalised values, so a re-export that only changes
+formatting the parser normalises away (1,000 vs 1000.0, 02/03/2024 vs
+2024-03-02) leaves records unchanged.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+import hashlib
+
+# Added to every record next to the column fields
+FINGERPRINT_FIELD = '_fp'
+KEY_FIELD = '_key'
+
+
+class Fingerprinter:
+    """
+    Digests (128-bit hex) of records with a fixed set of fields, independent
+    of field order and of 10 vs 10.0. The field names are hashed once, so a
+    record costs one repr() and one hash update.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.order = sorted(fields)
+        self._names = hashlib.blake2b(repr(self.order).encode(), digest_size=16)
+
+    def __call__(self, values: Dict[str, Any]) -> str:
+        digest = self._names.copy()
+        digest.update(repr([int(value) if value.__class__ is float and value.is_integer() else value
+                            for value in map(values.get, self.order)]).encode())
+        return digest.hexdigest()
+
+
+def row_of(record_id: str) -> int:
+    """The _row of a parsed record from its _id ("<dataset_id>:<_row>")"""
+    return int(record_id.rsplit(':', 1)[1])
+
+
+class DatasetDiff:
+    """
+    Added, removed, changed and unchanged records between a previous and a
+    current version of a dataset.
+
+    Feed every previous record (_id, _fp and optional _key) to previous(),
+    then every current record to current(), then call finish(). Only the
+    previous version's digests are held in memory while the current one
+    streams through.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Deque[Tuple[str, str]]] = {}
+        self.unchanged: Dict[str, str] = {}
+        self.changed: Dict[str, str] = {}
+        self.added: List[str] = []
+        self.removed: List[str] = []
+
+    @staticmethod
+    def _identity(record: Dict[str, Any]) -> str:
+        return record.get(KEY_FIELD) or record[FINGERPRINT_FIELD]
+
+    def previous(self, record: Dict[str, Any]) -> None:
+        self._pending.setdefault(self._identity(record), deque()).append((record[FINGERPRINT_FIELD], record['_id']))
+
+    def current(self, record: Dict[str, Any]) -> None:
+        candidates = self._pending.get(self._identity(record))
+        if not candidates:
+            self.added.append(record['_id'])
+            return
+        digest = record[FINGERPRINT_FIELD]
+        # Among records sharing a key, prefer one with identical values
+        match = next((entry for entry in candidates if entry[0] == digest), candidates[0])
+        candidates.remove(match)
+        (self.unchanged if match[0] == digest else self.changed)[match[1]] = record['_id']
+
+    def finish(self) -> 'DatasetDiff':
+        self.removed = [record_id for entries in self._pending.values() for _, record_id in entries]
+        self._pending = {}
+        return self
+
+    @property
+    def affected(self) -> Set[str]:
+        """Current record ids whose matches may differ from the previous version's: added or changed"""
+        return set(self.added) | set(self.changed.values())
+
+    def carried(self, previous_id: str) -> Optional[str]:
+        """The current id of an unchanged previous record; None if it changed or was removed"""
+        return self.unchanged.get(previous_id)
+
+    def summary(self, limit: int = 0) -> Dict[str, Any]:
+        """Counts, plus up to limit row numbers of each kind of change (changed rows as [previous, current])"""
+        summary: Dict[str, Any] = {'added': len(self.added), 'removed': len(self.removed),
+                                   'changed': len(self.changed), 'unchanged': len(self.unchanged)}
+        if limit:
+            summary['rows'] = {
+                'added': sorted(map(row_of, self.added))[:limit],
+                'removed': sorted(map(row_of, self.removed))[:limit],
+                'changed': sorted([row_of(old), row_of(new)] for old, new in self.changed.items())[:limit]
+            }
+        return summary
+
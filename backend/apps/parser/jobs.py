@@ -0,0 +1,8 @@
+from apps.jobs.registry import job_handler
+from apps.parser.services.parser_service import ParserService
+
+
+@job_handler('parser.ingest', submittable=False)
+async def ingest_file(context):
+    """Parse the stored file of the dataset {"dataset_id": ...}; queued by POST /api/v1/parser/datasets/from-file"""
+    return await ParserService().ingest_file(context.payload['dataset_id'])
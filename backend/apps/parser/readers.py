@@ -0,0 +1,273 @@
+"""
+Row readers for uploaded data files, and cell normalisation.
+
+Readers take a binary stream and yield one list of raw cell values per row,
+so a file is never held in memory: CSV is decoded and split incrementally,
+and XLSX (a zip archive, which needs random access) is spooled to a
+temporary file when the source cannot seek and then read in openpyxl's
+read-only mode.
+"""
+from datetime import date, datetime, time as time_of_day
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional
+import codecs
+import csv
+import re
+import shutil
+import tempfile
+
+FORMATS = ('csv', 'xlsx')
+# Fields every parsed record has
+RESERVED_FIELDS = ('_id', '_row', 'dataset_id', '_fp', '_key')
+
+_INTEGER = re.compile(r'^[+-]?(0|[1-9][0-9]{0,17}|[1-9][0-9]{0,2}(,[0-9]{3}){1,5})$')
+_DECIMAL = re.compile(r'^[+-]?([0-9]+|[0-9]{1,3}(,[0-9]{3})+)?\.[0-9]+$|^[+-]?[0-9]+\.?[0-9]*[eE][+-]?[0-9]+$')
+_ISO_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$')
+_BOOLEANS = {'true': True, 'false': False}
+_NUMBER_START = frozenset('+-.0123456789')
+# Bytes of text searched for the header line when sniffing the delimiter
+_SNIFF_LIMIT = 64 * 1024
+# XLSX files are spooled in memory up to this size, then on disk
+_SPOOL_MEMORY = 8 * 1024 * 1024
+
+
+def detect_format(filename: str, content_type: Optional[str] = None) -> str:
+    """'csv' or 'xlsx' from the file extension (or content type); ValueError otherwise"""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('csv', 'txt', 'tsv'):
+        return 'csv'
+    if extension == 'xlsx' or (content_type or '').endswith('spreadsheetml.sheet'):
+        return 'xlsx'
+    if (content_type or '').startswith('text/csv'):
+        return 'csv'
+    raise ValueError(f"Unsupported file type: {filename}")
+
+
+def read_csv(stream: BinaryIO, encoding: str = 'utf-8-sig', delimiter: Optional[str] = None,
+             chunk_size: int = 1024 * 1024) -> Iterator[List[str]]:
+    """
+    Yield the rows of a CSV stream, decoding chunk_size bytes at a time.
+
+    Without a delimiter it is sniffed (',', ';', tab or '|') from the
+    header line. Undecodable bytes are replaced rather than failing the file.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    first = decoder.decode(stream.read(chunk_size))
+    while delimiter is None and '\n' not in first and len(first) < _SNIFF_LIMIT:
+        more = stream.read(chunk_size)
+        if not more:
+            break
+        first += decoder.decode(more)
+    if delimiter is None:
+        delimiter = _sniff_delimiter(first)
+
+    def text_lines():
+        # Lines keep their endings so csv can rejoin quoted fields that span lines
+        pending, chunk = first, True
+        while chunk:
+            chunk = stream.read(chunk_size)
+            pending += decoder.decode(chunk, final=not chunk)
+            lines = pending.split('\n')
+            # The last piece may be a partial line; keep it until more text arrives
+            pending = lines.pop()
+            yield from (line + '\n' for line in lines)
+        if pending:
+            yield pending
+
+    yield from csv.reader(text_lines(), delimiter=delimiter)
+
+
+def _sniff_delimiter(sample: str) -> str:
+    header = sample.split('\n', 1)[0]
+    counts = {delimiter: header.count(delimiter) for delimiter in (',', ';', '\t', '|')}
+    best = max(counts, key=counts.get)
+    return best if counts[best] else ','
+
+
+def read_xlsx(stream: BinaryIO, sheet: Optional[str] = None) -> Iterator[List[Any]]:
+    """Yield the rows of one worksheet (the first unless sheet is given) of an XLSX stream"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("XLSX support requires the openpyxl package")
+    seekable = getattr(stream, 'seekable', lambda: False)()
+    source = stream if seekable else tempfile.SpooledTemporaryFile(max_size=_SPOOL_MEMORY)
+    try:
+        if not seekable:
+            shutil.copyfileobj(stream, source, 1024 * 1024)
+            source.seek(0)
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+            for row in worksheet.iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    finally:
+        if source is not stream:
+            source.close()
+
+
+def reader_for(file_format: str) -> Callable[..., Iterator[List[Any]]]:
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported format: {file_format}")
+    return read_csv if file_format == 'csv' else read_xlsx
+
+
+def field_names(header: List[Any]) -> List[str]:
+    """
+    Document field names from a header row: blank names become column_<n>,
+    characters MongoDB does not allow in field names ('.', leading '$') are
+    replaced, and duplicates (or the record fields the parser adds) get a
+    _2, _3... suffix.
+    """
+    names, seen = [], set(RESERVED_FIELDS)
+    for position, value in enumerate(header, start=1):
+        name = str(value).strip() if value is not None else ''
+        name = name.replace('.', '_').lstrip('$') or f"column_{position}"
+        candidate, suffix = name, 2
+        while candidate in seen:
+            candidate, suffix = f"{name}_{suffix}", suffix + 1
+        seen.add(candidate)
+        names.append(candidate)
+    return names
+
+
+def normalise(value: Any) -> Any:
+    """
+    A cell as a JSON/BSON-friendly value: numbers, booleans and ISO
+    dates as such, blanks as None, everything else a stripped string.
+    Integers with leading zeros (codes, account numbers) stay strings.
+    """
+    if value.__class__ is not str:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if isinstance(value, datetime):
+            return value.date().isoformat() if value.time() == time_of_day() else value.isoformat()
+        if isinstance(value, (date, time_of_day)):
+            return value.isoformat()
+    text = str(value).strip()
+    if not text:
+        return None
+    # Only text starting like a number is matched against the number patterns
+    if text[0] not in _NUMBER_START:
+        return _BOOLEANS.get(text.lower(), text) if len(text) in (4, 5) else text
+    if text.isdigit() and text.isascii():
+        return int(text) if text[0] != '0' or len(text) == 1 else text
+    if _INTEGER.match(text):
+        return int(text.replace(',', ''))
+    if _DECIMAL.match(text):
+        return float(text.replace(',', ''))
+    lowered = text.lower()
+    if lowered in _BOOLEANS:
+        return _BOOLEANS[lowered]
+    return text
+
+
+def _as_str(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value.strip() or None
+    value = normalise(value)
+    return None if value is None else str(value)
+
+
+def _as_int(value: Any) -> Optional[int]:
+    value = normalise(value)
+    if value is None or (isinstance(value, int) and not isinstance(value, bool)):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str) and value.lstrip('+-').isdigit():
+        return int(value)
+    raise ValueError(f"Not an integer: {value!r}")
+
+
+def _as_float(value: Any) -> Optional[float]:
+    if value.__class__ is str and value[:1].isdigit() and ',' not in value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    value = normalise(value)
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str) and value.lstrip('+-').replace('.', '', 1).isdigit():
+        return float(value)
+    raise ValueError(f"Not a number: {value!r}")
+
+
+def _as_bool(value: Any) -> Optional[bool]:
+    value = normalise(value)
+    if value is None or isinstance(value, bool):
+        return value
+    if value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.lower() in ('yes', 'no', 'y', 'n'):
+        return value.lower().startswith('y')
+    raise ValueError(f"Not a boolean: {value!r}")
+
+
+def _as_date(value: Any) -> Optional[str]:
+    if value.__class__ is str and len(value) == 10 and value[4] == '-':
+        return date.fromisoformat(value).isoformat()
+    value = normalise(value)
+    if value is None:
+        return None
+    if isinstance(value, str) and _ISO_DATE.match(value):
+        return date.fromisoformat(value[:10]).isoformat()
+    if isinstance(value, str):
+        for layout in ('%d/%m/%Y', '%d.%m.%Y', '%Y/%m/%d', '%d-%b-%Y', '%d %b %Y'):
+            try:
+                return datetime.strptime(value, layout).date().isoformat()
+            except ValueError:
+                continue
+    raise ValueError(f"Not a date: {value!r}")
+
+
+# Column types a schema may declare
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'str': _as_str, 'int': _as_int, 'float': _as_float, 'bool': _as_bool, 'date': _as_date
+}
+
+
+class RowNormaliser:
+    """
+    Turns raw rows into documents keyed by the header's field names.
+
+    Columns named in schema ({field: 'str' | 'int' | 'float' | 'bool' |
+    'date'}) are converted to that type; a value that does not convert is
+    stored as None and counted in invalid_values. Other columns are inferred
+    cell by cell with normalise(). Short rows are padded with None and
+    extra cells dropped; both are counted in ragged_rows.
+    """
+
+    def __init__(self, header: List[Any], schema: Optional[Dict[str, str]] = None):
+        self.fields = field_names(header)
+        schema = schema or {}
+        unknown = [kind for kind in schema.values() if kind not in CONVERTERS]
+        if unknown:
+            raise ValueError(f"Unknown column type(s): {', '.join(sorted(set(unknown)))}")
+        self.converters = [CONVERTERS[schema[field]] if field in schema else normalise for field in self.fields]
+        self.ragged_rows = 0
+        self.invalid_values = 0
+
+    def __call__(self, row: List[Any]) -> Dict[str, Any]:
+        width = len(self.fields)
+        if len(row) != width:
+            self.ragged_rows += 1
+            row = (list(row) + [None] * width)[:width]
+        try:
+            return dict(zip(self.fields, [converter(value) for converter, value in zip(self.converters, row)]))
+        except ValueError:
+            pass
+        # Some value did not convert: redo the row cell by cell
+        document = {}
+        for field, converter, value in zip(self.fields, self.converters, row):
+            try:
+                document[field] = converter(value)
+            except ValueError:
+                self.invalid_values += 1
+                document[field] = None
+        return document
+
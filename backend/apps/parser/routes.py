@@ -0,0 +1,115 @@
+from flask import Blueprint, g, jsonify, request
+from shared.middleware.auth import require_user
+import json
+import logging
+
+# A file sent in the request body is parsed while it streams in; a stored
+# file is parsed by a job worker (the 'parser.ingest' job kind)
+parser_bp = Blueprint('parser', __name__)
+logger = logging.getLogger(__name__)
+
+MAX_RECORDS_PAGE = 1000
+
+
+def _service():
+    # Imported here: the columnar dataset cache pulls in NumPy, which app start-up avoids
+    from apps.parser.services.parser_service import ParserService
+    return ParserService()
+
+
+def _public(dataset):
+    return {key: value for key, value in dataset.items() if key != 'user_id'} | {'dataset_id': dataset['_id']}
+
+
+@parser_bp.route('/datasets', methods=['POST'])
+@require_user
+async def ingest_upload():
+    """
+    Parse a CSV/XLSX file into a dataset: either a multipart 'file' field or
+    the raw request body with ?filename=. Optional ?format=csv|xlsx,
+    ?schema={"amount": "float", ...} and ?key=invoice,line (the columns
+    identifying a record across versions of the file, for /diff).
+    """
+    upload = request.files.get('file')
+    filename = upload.filename if upload else request.args.get('filename')
+    if not filename:
+        return jsonify({'error': 'No file provided'}), 400
+    try:
+        schema = json.loads(request.args['schema']) if 'schema' in request.args else None
+    except json.JSONDecodeError:
+        return jsonify({'error': "'schema' must be JSON"}), 400
+    key = request.args['key'].split(',') if request.args.get('key') else None
+    service = _service()
+    try:
+        dataset = await service.create(g.user['user_id'], filename, request.args.get('format'), schema,
+                                       content_type=upload.content_type if upload else request.content_type,
+                                       key=key)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        await service.ingest(dataset, upload.stream if upload else request.stream)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'dataset_id': dataset['_id']}), 400
+    return jsonify(_public(await service.get(g.user['user_id'], dataset['_id']))), 201
+
+
+@parser_bp.route('/datasets/from-file', methods=['POST'])
+@require_user
+async def ingest_stored_file():
+    """
+    Queue parsing of one of the user's stored files:
+    {"filename": "...", "format": "csv", "schema": {...}, "key": ["invoice"]}
+    """
+    body = request.get_json(silent=True) or {}
+    if not body.get('filename'):
+        return jsonify({'error': 'No filename provided'}), 400
+    service = _service()
+    try:
+        dataset = await service.create(g.user['user_id'], body['filename'], body.get('format'),
+                                       body.get('schema'), source='storage', key=body.get('key'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Imported here: the queue is only needed for stored files
+    from apps.jobs.services.job_queue import JobQueue
+    job, _ = await JobQueue(service.db).submit('parser.ingest', {'dataset_id': dataset['_id']},
+                                               user_id=g.user['user_id'])
+    return jsonify(_public(dataset) | {'job_id': job['_id']}), 202
+
+
+@parser_bp.route('/datasets/<dataset_id>', methods=['GET'])
+@require_user
+async def get_dataset(dataset_id):
+    """Status, columns, row count and per-stage ingest stats of one of the user's datasets"""
+    dataset = await _service().get(g.user['user_id'], dataset_id)
+    if dataset is None:
+        return jsonify({'error': 'Dataset not found'}), 404
+    return jsonify(_public(dataset)), 200
+
+
+@parser_bp.route('/datasets/<dataset_id>/records', methods=['GET'])
+@require_user
+async def get_dataset_records(dataset_id):
+    """Records of a dataset in file order: ?limit=100&skip=0"""
+    limit = min(request.args.get('limit', 100, type=int), MAX_RECORDS_PAGE)
+    skip = max(request.args.get('skip', 0, type=int), 0)
+    records = await _service().records(g.user['user_id'], dataset_id, limit=max(limit, 1), skip=skip)
+    if records is None:
+        return jsonify({'error': 'Dataset not found'}), 404
+    return jsonify({'records': records}), 200
+
+
+@parser_bp.route('/datasets/<dataset_id>/diff', methods=['GET'])
+@require_user
+async def get_dataset_diff(dataset_id):
+    """Added, removed and changed records since an earlier version: ?previous=<dataset_id>&limit=100"""
+    previous_id = request.args.get('previous')
+    if not previous_id:
+        return jsonify({'error': "'previous' is required"}), 400
+    limit = min(max(request.args.get('limit', 100, type=int), 1), MAX_RECORDS_PAGE)
+    try:
+        diff = await _service().diff(g.user['user_id'], dataset_id, previous_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if diff is None:
+        return jsonify({'error': 'Dataset not found'}), 404
+    return jsonify(diff.summary(limit)), 200
@@ -0,0 +1,190 @@
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from apps.parser.columnar import MANIFEST, ColumnarBuilder, ColumnarDataset
+from services.factory import get_config, get_storage_service
+
+logger = logging.getLogger(__name__)
+
+# Storage prefix of the durable copies, content-addressed by cache key
+STORAGE_PREFIX = 'dataset-cache'
+
+_cache: Optional['DatasetCache'] = None
+_lock = threading.Lock()
+
+
+def cache_key(content_hash: str, file_format: str, schema: Optional[Dict[str, str]] = None) -> str:
+    """The cache key of a file parsed with given options: the same bytes parsed the same way share a key"""
+    options = json.dumps([content_hash, file_format, schema or {}], sort_keys=True)
+    return hashlib.sha256(options.encode()).hexdigest()
+
+
+class DatasetCache:
+    """
+    Columnar copies of parsed datasets (apps/parser/columnar.py), keyed by
+    the content hash of the source file and the parse options.
+
+    Each dataset is a directory under DATASET_CACHE_DIR, opened with mmap.
+    The directories form an LRU cache bounded by DATASET_CACHE_MAX_BYTES:
+    opening a dataset marks it used, and adding one evicts the least
+    recently used others until the cache fits. The files are also copied to
+    StorageService under dataset-cache/<key>/ (DATASET_CACHE_STORAGE), so an
+    instance with a cold or evicted cache downloads them instead of going
+    back to the database.
+
+    Directories are built under a temporary name and renamed into place, so
+    processes sharing the directory never see a partial dataset.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None,
+                 storage=None, use_storage: Optional[bool] = None):
+        config = get_config()
+        directory = directory or config.DATASET_CACHE_DIR or os.path.join(
+            tempfile.gettempdir(), 'universal-matching-dataset-cache')
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = config.DATASET_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.use_storage = config.DATASET_CACHE_STORAGE if use_storage is None else use_storage
+        self._storage = storage
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_storage_service()
+        return self._storage
+
+    def builder(self, columns: List[str]) -> ColumnarBuilder:
+        """A builder writing into a fresh temporary directory of the cache"""
+        return ColumnarBuilder(self.directory / f".build-{uuid.uuid4().hex}", columns)
+
+    async def publish(self, key: str, builder: ColumnarBuilder, **metadata) -> Dict[str, Any]:
+        """Finish builder as the dataset of key, copy it to storage and evict to the budget"""
+        manifest = await asyncio.to_thread(builder.finish, key=key, **metadata)
+        target = self.directory / key
+        if not await asyncio.to_thread(self._install, builder.directory, target):
+            logger.info(f"Dataset cache {key} was already built")
+        elif self.use_storage:
+            try:
+                await self._upload(key, target, manifest['files'])
+            except Exception as e:
+                logger.warning(f"Copying dataset cache {key} to storage failed: {str(e)}")
+        await asyncio.to_thread(self.evict, keep=key)
+        return manifest
+
+    async def open(self, key: str) -> Optional[ColumnarDataset]:
+        """The dataset of key (downloading it from storage when not on local disk), or None"""
+        target = self.directory / key
+        if not (target / MANIFEST).exists():
+            if not self.use_storage or not await self._download(key, target):
+                return None
+            await asyncio.to_thread(self.evict, keep=key)
+        try:
+            # The manifest's modification time is the LRU clock
+            os.utime(target / MANIFEST)
+            return ColumnarDataset(target)
+        except FileNotFoundError:
+            # Evicted by another process in the meantime
+            return None
+
+    def evict(self, keep: Optional[str] = None) -> List[str]:
+        """Remove least recently used datasets until the cache fits max_bytes; returns the evicted keys"""
+        entries = []
+        for path in self.directory.iterdir():
+            manifest = path / MANIFEST
+            if path.name.startswith('.') or not manifest.exists():
+                continue
+            size = sum(item.stat().st_size for item in path.iterdir())
+            entries.append((manifest.stat().st_mtime, size, path))
+        total = sum(size for _, size, _ in entries)
+        evicted = []
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+            if path.name == keep:
+                continue
+            # Processes that mapped the files keep reading them after the unlink
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted.append(path.name)
+        if evicted:
+            logger.info(f"Dataset cache evicted {len(evicted)} dataset(s); {total} bytes in use")
+        return evicted
+
+    def clean_builds(self, older_than: float = 3600) -> None:
+        """Remove temporary directories left by builds that died"""
+        for path in self.directory.glob('.build-*'):
+            if time.time() - path.stat().st_mtime > older_than:
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _install(source: Path, target: Path) -> bool:
+        try:
+            os.rename(source, target)
+            return True
+        except OSError:
+            # Another process installed the same key first; the contents are identical
+            shutil.rmtree(source, ignore_errors=True)
+            return False
+
+    async def _upload(self, key: str, directory: Path, files: List[str]) -> None:
+        # The manifest goes last: a storage copy without one is incomplete and ignored
+        for name in sorted(files, key=lambda name: name == MANIFEST):
+            with open(directory / name, 'rb') as handle:
+                await self.storage.upload_stream(handle, f"{STORAGE_PREFIX}/{key}/{name}",
+                                                 content_type='application/octet-stream')
+
+    async def _download(self, key: str, target: Path) -> bool:
+        try:
+            manifest = await self._fetch(f"{STORAGE_PREFIX}/{key}/{MANIFEST}")
+        except Exception:
+            return False
+        temporary = self.directory / f".download-{uuid.uuid4().hex}"
+        temporary.mkdir()
+        try:
+            for name in json.loads(manifest)['files']:
+                if name == MANIFEST:
+                    continue
+                stream = await self.storage.open_stream(f"{STORAGE_PREFIX}/{key}/{name}")
+                try:
+                    await asyncio.to_thread(_copy_to, stream, temporary / name)
+                finally:
+                    stream.close()
+            (temporary / MANIFEST).write_bytes(manifest)
+        except Exception as e:
+            logger.warning(f"Downloading dataset cache {key} failed: {str(e)}")
+            shutil.rmtree(temporary, ignore_errors=True)
+            return False
+        await asyncio.to_thread(self._install, temporary, target)
+        logger.info(f"Dataset cache {key} downloaded from storage")
+        return True
+
+    async def _fetch(self, path: str) -> bytes:
+        stream = await self.storage.open_stream(path)
+        try:
+            return await asyncio.to_thread(stream.read)
+        finally:
+            stream.close()
+
+
+def _copy_to(stream, path: Path) -> None:
+    with open(path, 'wb') as handle:
+        shutil.copyfileobj(stream, handle, 1024 * 1024)
+
+
+def get_dataset_cache() -> DatasetCache:
+    """The process-wide dataset cache"""
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = DatasetCache()
+    return _cache
@@ -0,0 +1,334 @@
+from datetime import datetime, UTC
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import asyncio
+import logging
+import time
+import uuid
+from apps.parser.columnar import ColumnarBuilder
+from apps.parser.fingerprints import FINGERPRINT_FIELD, KEY_FIELD, DatasetDiff, Fingerprinter
+from apps.parser.readers import RowNormaliser, detect_format, reader_for
+from apps.parser.services.dataset_cache import cache_key, get_dataset_cache
+from services.factory import get_config, get_database_service, get_storage_service
+from services.implementations.database.indexes import register_indexes
+from shared.utils.concurrency import call_maybe_async, iterate_maybe_async
+from shared.utils.hashing import HashingReader
+
+logger = logging.getLogger(__name__)
+
+DATASETS_COLLECTION = 'datasets'
+RECORDS_COLLECTION = 'dataset_records'
+
+register_indexes(RECORDS_COLLECTION, {
+    'keys': [('dataset_id', 1), ('_row', 1)],
+    'name': 'dataset_row'
+})
+register_indexes(DATASETS_COLLECTION, {
+    'keys': [('user_id', 1), ('created_at', -1)],
+    'name': 'user_created_at'
+})
+
+
+def _now() -> str:
+    return datetime.now(UTC).isoformat()
+
+
+class StageTimer:
+    """Rows through one pipeline stage and the time spent producing them"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.seconds = 0.0
+
+    def wrap(self, items: Iterable[Any], rows=lambda item: 1) -> Iterator[Any]:
+        """Yield items, timing each step of the iterator (which includes the stages before it)"""
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.seconds += time.perf_counter() - started
+                return
+            self.seconds += time.perf_counter() - started
+            self.rows += rows(item)
+            yield item
+
+
+def stage_report(stages: List[StageTimer], wall_seconds: float) -> Dict[str, Any]:
+    """Rows, seconds and rows/sec per stage, and for the whole pipeline (wall clock)"""
+    report = {
+        stage.name: {
+            'rows': stage.rows,
+            'seconds': round(stage.seconds, 4),
+            'rows_per_second': round(stage.rows / stage.seconds) if stage.seconds > 0 else None
+        }
+        for stage in stages
+    }
+    rows = stages[-1].rows if stages else 0
+    report['total'] = {'rows': rows, 'seconds': round(wall_seconds, 4),
+                       'rows_per_second': round(rows / wall_seconds) if wall_seconds > 0 else None}
+    return report
+
+
+class ParserService:
+    """
+    Parses uploaded CSV/XLSX files into records in MongoDB.
+
+    A file is read as a stream (a request body or a StorageService file) and
+    pushed through a generator pipeline: read rows, normalise them into
+    documents, group them into batches of PARSER_BATCH_SIZE, write each batch
+    with insert_many. Parsing the next batch (on a worker thread) overlaps
+    writing the previous one, and at most those two batches are in memory,
+    so peak memory does not grow with the file.
+
+    Each ingest is a dataset: a document in 'datasets' (columns, row count,
+    per-stage throughput) and its rows in 'dataset_records' tagged with
+    dataset_id and a 1-based _row (_id is "<dataset_id>:<_row>"), plus the
+    fingerprints of apps/parser/fingerprints.py (_fp, and _key when the
+    dataset names key columns) that diff() compares versions of a file by.
+    A match job reads it as
+    {"collection": "dataset_records", "query": {"dataset_id": ...}}.
+
+    The same batches are also written to a columnar copy in the dataset
+    cache, keyed by the SHA-256 of the file (hashed as it streams) and the
+    parse options, which match jobs map instead of reading the records back.
+    """
+
+    def __init__(self, db=None, storage=None, batch_size: Optional[int] = None,
+                 read_chunk_size: Optional[int] = None, cache=None):
+        config = get_config()
+        self.db = db or get_database_service()
+        self._storage = storage
+        self._cache = cache
+        self.cache_enabled = cache is not None or config.DATASET_CACHE_MAX_BYTES > 0
+        self.batch_size = batch_size or config.PARSER_BATCH_SIZE
+        self.read_chunk_size = read_chunk_size or config.PARSER_READ_CHUNK_SIZE
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = get_storage_service()
+        return self._storage
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            self._cache = get_dataset_cache()
+        return self._cache
+
+    async def create(self, user_id: str, filename: str, file_format: Optional[str] = None,
+                     schema: Optional[Dict[str, str]] = None, source: str = 'upload',
+                     content_type: Optional[str] = None, key: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Validate the options (ValueError if invalid) and store a pending dataset.
+        key names the columns identifying a record across versions of the file.
+        """
+        file_format = file_format or detect_format(filename, content_type)
+        reader_for(file_format)
+        if schema is not None and not isinstance(schema, dict):
+            raise ValueError("'schema' must be an object of column types")
+        RowNormaliser([], schema)
+        if key is not None and (not isinstance(key, list) or not all(isinstance(name, str) for name in key)):
+            raise ValueError("'key' must be a list of column names")
+        dataset = {
+            '_id': uuid.uuid4().hex,
+            'user_id': user_id,
+            'filename': filename,
+            'source': source,
+            'format': file_format,
+            'schema': schema or {},
+            'key': key or [],
+            'status': 'pending',
+            'columns': [],
+            'rows': 0,
+            'stats': None,
+            'error': None,
+            'created_at': _now(),
+            'updated_at': _now()
+        }
+        await call_maybe_async(self.db.insert_one, DATASETS_COLLECTION, dataset)
+        return dataset
+
+    async def get(self, user_id: str, dataset_id: str) -> Optional[Dict[str, Any]]:
+        return await call_maybe_async(self.db.find_one, DATASETS_COLLECTION, {'_id': dataset_id, 'user_id': user_id})
+
+    async def records(self, user_id: str, dataset_id: str, limit: int = 100, skip: int = 0) -> Optional[List[Dict]]:
+        """A page of the dataset's records in file order; None for an unknown dataset"""
+        if await self.get(user_id, dataset_id) is None:
+            return None
+        records = await call_maybe_async(
+            self.db.find_many, RECORDS_COLLECTION, {'dataset_id': dataset_id},
+            sort=[('_row', 1)], limit=limit, skip=skip
+        )
+        hidden = ('_id', 'dataset_id', FINGERPRINT_FIELD, KEY_FIELD)
+        return [{key: value for key, value in record.items() if key not in hidden} for record in records]
+
+    async def diff(self, user_id: str, dataset_id: str, previous_id: str) -> Optional[DatasetDiff]:
+        """The diff from an earlier version of a dataset; None unless the user owns both"""
+        if await self.get(user_id, dataset_id) is None or await self.get(user_id, previous_id) is None:
+            return None
+        return await self.diff_records(previous_id, dataset_id)
+
+    async def diff_records(self, previous_id: str, dataset_id: str) -> DatasetDiff:
+        """
+        Added, removed, changed and unchanged records between two ready
+        datasets with the same key columns (ValueError otherwise).
+        """
+        datasets = {}
+        for record_id in (previous_id, dataset_id):
+            datasets[record_id] = await call_maybe_async(self.db.find_one, DATASETS_COLLECTION, {'_id': record_id})
+            if not datasets[record_id] or datasets[record_id]['status'] != 'ready':
+                raise ValueError(f"Dataset {record_id} is not ready")
+            if 'key' not in datasets[record_id]:
+                raise ValueError(f"Dataset {record_id} was ingested without fingerprints")
+        if datasets[previous_id]['key'] != datasets[dataset_id]['key']:
+            raise ValueError("Datasets with different key columns cannot be compared")
+        result = DatasetDiff()
+        for record_id, add in ((previous_id, result.previous), (dataset_id, result.current)):
+            records = self.db.iter_many(RECORDS_COLLECTION, {'dataset_id': record_id},
+                                        projection={FINGERPRINT_FIELD: 1, KEY_FIELD: 1}, batch_size=self.batch_size)
+            async for record in iterate_maybe_async(records, self.batch_size):
+                add(record)
+        return result.finish()
+
+    async def ingest_file(self, dataset_id: str) -> Dict[str, Any]:
+        """Ingest a dataset whose source is one of the user's stored files (FileService)"""
+        dataset = await call_maybe_async(self.db.find_one, DATASETS_COLLECTION, {'_id': dataset_id})
+        if dataset is None:
+            raise ValueError(f"Dataset {dataset_id} not found")
+        # Imported here: only stored-file ingests need the files app
+        from apps.app1.services.file_service import FileService
+        path = await FileService(self.storage, self.db).file_path(dataset['user_id'], dataset['filename'])
+        stream = await self.storage.open_stream(path, chunk_size=self.read_chunk_size)
+        try:
+            return await self.ingest(dataset, stream)
+        finally:
+            close = getattr(stream, 'close', None)
+            if close is not None:
+                close()
+
+    async def ingest(self, dataset: Dict[str, Any], stream: BinaryIO) -> Dict[str, Any]:
+        """
+        Parse stream into the dataset's records.
+
+        Records of an earlier (failed) attempt are deleted first, so a retried
+        ingest does not duplicate rows. The dataset document ends 'ready' with
+        its columns, row count, per-stage stats, content hash and cache key
+        (None when not cached), or 'failed' with the error.
+        """
+        dataset_id = dataset['_id']
+        await self._update(dataset_id, status='parsing', error=None)
+        await call_maybe_async(self.db.bulk_write, RECORDS_COLLECTION,
+                               [{'op': 'delete_many', 'filter': {'dataset_id': dataset_id}}])
+        try:
+            stats, columns = await self._pipeline(dataset, stream)
+        except Exception as e:
+            logger.error(f"Ingesting dataset {dataset_id} failed: {str(e)}", exc_info=True)
+            await self._update(dataset_id, status='failed', error=str(e))
+            raise
+        rows = stats['stages']['write']['rows']
+        source = {'content_hash': stats.pop('content_hash'), 'cache_key': stats.pop('cache_key')}
+        await self._update(dataset_id, status='ready', rows=rows, columns=columns, stats=stats, **source)
+        logger.info(f"Dataset {dataset_id}: {rows} rows, {stats['stages']['total']['rows_per_second']} rows/s")
+        return {**stats, **source}
+
+    async def _pipeline(self, dataset: Dict[str, Any], stream: BinaryIO) -> Tuple[Dict[str, Any], List[str]]:
+        read, normalise, write = StageTimer('read'), StageTimer('normalise'), StageTimer('write')
+        stream = HashingReader(stream)
+        rows = read.wrap(self._rows(dataset['format'], stream))
+        header = await asyncio.to_thread(next, rows, None)
+        if header is None:
+            raise ValueError("The file is empty")
+        normaliser = RowNormaliser(header, dataset['schema'])
+        missing = [name for name in dataset.get('key', []) if name not in normaliser.fields]
+        if missing:
+            raise ValueError(f"Key column(s) not in the file: {', '.join(missing)}")
+        builder = self.cache.builder(normaliser.fields) if self.cache_enabled else None
+        batches = normalise.wrap(self._batches(dataset['_id'], normaliser, rows, builder, dataset.get('key')), rows=len)
+
+        started = time.perf_counter()
+        inserted = 0
+        pending = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+        try:
+            while True:
+                batch = await pending
+                if batch is None:
+                    break
+                # Parse the next batch while this one is written
+                pending = asyncio.ensure_future(asyncio.to_thread(next, batches, None))
+                write_started = time.perf_counter()
+                result = await call_maybe_async(self.db.insert_many, RECORDS_COLLECTION, batch, ordered=False)
+                write.seconds += time.perf_counter() - write_started
+                if result['errors']:
+                    raise RuntimeError(f"{len(result['errors'])} records could not be written: "
+                                       f"{result['errors'][0]['message']}")
+                write.rows += result['inserted_count']
+                inserted += result['inserted_count']
+                await self._update(dataset['_id'], rows=inserted)
+        except BaseException:
+            # The parser thread may still be appending to the builder
+            await asyncio.gather(pending, return_exceptions=True)
+            if builder is not None:
+                builder.abort()
+            raise
+        finally:
+            # Never leave the parser running on its thread against a stream the caller closes
+            if not pending.done():
+                await asyncio.gather(pending, return_exceptions=True)
+        key = await self._publish(dataset, builder, stream.hexdigest()) if builder is not None else None
+        wall_seconds = time.perf_counter() - started
+        # The header row is not a record, and the normalise timings include reading
+        read.rows -= 1
+        normalise.seconds = max(normalise.seconds - read.seconds, 0.0)
+        stats = {'content_hash': stream.hexdigest(), 'cache_key': key,
+                 'batch_size': self.batch_size, 'ragged_rows': normaliser.ragged_rows,
+                 'invalid_values': normaliser.invalid_values,
+                 'stages': stage_report([read, normalise, write], wall_seconds)}
+        return stats, normaliser.fields
+
+    async def _publish(self, dataset: Dict[str, Any], builder: ColumnarBuilder, content_hash: str) -> Optional[str]:
+        """Add the built columns to the dataset cache; the records are in the database either way"""
+        key = cache_key(content_hash, dataset['format'], dataset['schema'])
+        try:
+            await self.cache.publish(key, builder, content_hash=content_hash, dataset_id=dataset['_id'])
+        except Exception as e:
+            logger.warning(f"Caching dataset {dataset['_id']} failed: {str(e)}")
+            await asyncio.to_thread(builder.abort)
+            return None
+        return key
+
+    def _rows(self, file_format: str, stream: BinaryIO) -> Iterator[List[Any]]:
+        if file_format == 'csv':
+            return reader_for(file_format)(stream, chunk_size=self.read_chunk_size)
+        return reader_for(file_format)(stream)
+
+    def _batches(self, dataset_id: str, normaliser: RowNormaliser, rows: Iterator[List[Any]],
+                 builder: Optional[ColumnarBuilder] = None, key: Optional[List[str]] = None) -> Iterator[List[Dict]]:
+        number = 0
+        fingerprint = Fingerprinter(normaliser.fields)
+        key_fingerprint = Fingerprinter(key) if key else None
+        while True:
+            batch, consumed = [], 0
+            for row in islice(rows, self.batch_size):
+                consumed += 1
+                number += 1
+                # Blank lines carry no record
+                if any(cell not in (None, '') for cell in row):
+                    values = normaliser(row)
+                    record = {'_id': f"{dataset_id}:{number}", 'dataset_id': dataset_id, '_row': number,
+                              **values, FINGERPRINT_FIELD: fingerprint(values)}
+                    if key_fingerprint is not None:
+                        record[KEY_FIELD] = key_fingerprint(values)
+                    batch.append(record)
+            if batch:
+                if builder is not None:
+                    builder.append(batch)
+                yield batch
+            if consumed < self.batch_size:
+                return
+
+    async def _update(self, dataset_id: str, **fields) -> None:
+        await call_maybe_async(self.db.update_one, DATASETS_COLLECTION, {'_id': dataset_id},
+                               {**fields, 'updated_at': _now()})
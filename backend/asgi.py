@@ -0,0 +1,25 @@
+"""
+ASGI entry point, next to the WSGI app:app.
+
+Run with uvicorn workers, e.g.
+    gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+or SERVER_MODE=asgi scripts/startup.sh.
+
+Each request runs the Flask app on a thread from a pool of ASGI_THREADS, so
+that many requests can wait on Firebase/GCS/Atlas at once, as --threads
+allows under gthread workers; at equal thread counts the two modes serve
+about the same load (benchmarks/load_test.py --demo). Async views run on an
+event loop of their own, where independent awaits within a request overlap.
+With admission control on, requests that would wait for a thread get its
+503 at once.
+"""
+import os
+from app import application
+from shared.middleware.admission import AdmissionController
+from shared.middleware.asgi import PooledWsgiToAsgi
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', '256'))
+
+app = PooledWsgiToAsgi(application, ASGI_THREADS,
+                       admission=application.wsgi_app if isinstance(application.wsgi_app, AdmissionController)
+                       else None)
@@ -0,0 +1,113 @@
+"""
+Throughput and peak memory of the keyed file comparison.
+
+Writes two versions of a synthetic CSV in shuffled row order (1% of rows
+changed, 0.5% removed, 0.5% added), then diffs them through
+ComparisonService with a memory ceiling well below the files' size, so the
+sort spills and merges runs. The diff is written to a stand-in storage that
+only counts the bytes, as a comparison job's output would be.
+
+Usage: python benchmarks/bench_comparison.py [--rows 300000] [--memory-mb 16]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from apps.comparison.services.comparison_service import ComparisonService
+
+
+class LocalFiles:
+    """Storage stand-in: users' files from a folder, uploads counted and discarded"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.uploaded = 0
+
+    def _local(self, path: str) -> str:
+        return os.path.join(self.directory, path.rsplit('/', 1)[-1])
+
+    async def size(self, path):
+        return os.path.getsize(self._local(path)) if os.path.exists(self._local(path)) else None
+
+    async def open_stream(self, path, chunk_size=None):
+        return open(self._local(path), 'rb')
+
+    async def upload_stream(self, stream, path, content_type=None, chunk_size=None):
+        while True:
+            chunk = stream.read(chunk_size or 8 * 1024 * 1024)
+            if not chunk:
+                return path
+            self.uploaded += len(chunk)
+
+
+class NoRefs:
+    """Database stand-in: no file references, so files resolve to their per-user paths"""
+
+    async def find_one(self, collection, query):
+        return None
+
+
+def write_versions(directory: str, rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    old, new = [], []
+    for number in range(rows):
+        line = f"{number},Name {rng.randrange(10 ** 6)},{rng.uniform(1, 10 ** 6):.2f},{rng.randrange(10 ** 4):05d}"
+        old.append(line)
+        draw = rng.random()
+        if draw < 0.01:
+            new.append(f"{number},Name {rng.randrange(10 ** 6)},{rng.uniform(1, 10 ** 6):.2f},00000")
+        elif draw >= 0.015:
+            new.append(line)
+        if draw > 0.995:
+            new.append(f"{rows + number},Added,1.00,00000")
+    for name, lines in (('old.csv', old), ('new.csv', new)):
+        rng.shuffle(lines)
+        with open(os.path.join(directory, name), 'w') as file:
+            file.write("id,name,amount,code\n")
+            file.write("\n".join(lines) + "\n")
+
+
+async def run(rows: int, memory_mb: int, directory: str):
+    # Written by a child process, so the peak RSS below is the comparison's alone
+    writer = multiprocessing.Process(target=write_versions, args=(directory, rows))
+    writer.start()
+    writer.join()
+    file_bytes = sum(os.path.getsize(os.path.join(directory, name)) for name in ('old.csv', 'new.csv'))
+    storage = LocalFiles(directory)
+    service = ComparisonService(storage, NoRefs(), memory_bytes=memory_mb * 2 ** 20, directory=directory)
+    started = time.perf_counter()
+    summary = await service.compare_to_storage('bench', {'left': 'old.csv', 'right': 'new.csv', 'key': ['id']},
+                                               'comparisons/bench/result.ndjson')
+    seconds = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'file_megabytes': round(file_bytes / 2 ** 20, 1),
+        'memory_ceiling_megabytes': memory_mb,
+        'peak_rss_megabytes': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'seconds': round(seconds, 2),
+        'rows_per_second': round((summary['left_rows'] + summary['right_rows']) / seconds),
+        'output_megabytes': round(storage.uploaded / 2 ** 20, 2),
+        'summary': summary
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=300000, help="Rows of the old version")
+    parser.add_argument('--memory-mb', type=int, default=16, help="COMPARISON_MEMORY_BYTES in MiB")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        print(json.dumps(asyncio.run(run(args.rows, args.memory_mb, directory)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
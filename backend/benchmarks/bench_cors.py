@@ -0,0 +1,146 @@
+"""
+Micro-benchmark of per-request CORS/post-processing overhead.
+
+Compares a bare Flask app with the previous three-layer handling (flask_cors,
+a global after_request and a blueprint after_request, if flask_cors is still
+installed) and with the precomputed CorsPolicy.
+
+Usage: python benchmarks/bench_cors.py [--requests 20000]
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from flask import Blueprint, Flask, current_app, jsonify, request
+from shared.middleware.cors import CorsPolicy, init_cors
+
+ORIGINS = [
+    "http://localhost:5173",
+    "https://universalmatchingv2.web.app",
+    "https://universalmatchingv2.firebaseapp.com",
+    "https://universalmatchingv2-181579031870.asia-southeast1.run.app"
+]
+ORIGIN = "https://universalmatchingv2.web.app"
+logger = logging.getLogger("bench_cors")
+
+
+def _add_route(app: Flask, after_request=None) -> Flask:
+    blueprint = Blueprint('bench', __name__)
+
+    @blueprint.route('/ping', methods=['GET'])
+    def ping():
+        return jsonify({'status': 'ok'})
+
+    if after_request is not None:
+        blueprint.after_request(after_request)
+
+    app.register_blueprint(blueprint, url_prefix='/api/auth')
+    return app
+
+
+def bare_app() -> Flask:
+    return _add_route(Flask('bare'))
+
+
+def legacy_app() -> Flask:
+    """The handling app.py and apps/auth/routes.py used to stack on every response"""
+    from flask_cors import CORS
+    app = Flask('legacy')
+    CORS(app, resources={r"/*": {
+        "origins": ORIGINS,
+        "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        "allow_headers": ["Content-Type", "Authorization"],
+        "supports_credentials": True,
+        "expose_headers": ["Set-Cookie", "Access-Control-Allow-Credentials"]
+    }})
+
+    @app.after_request
+    def after_request(response):
+        origin = request.headers.get('Origin')
+        if origin and origin in ORIGINS:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+            response.headers['Access-Control-Expose-Headers'] = 'Set-Cookie'
+        logger.debug({"origin": origin, "method": request.method, "path": request.path,
+                      "status": response.status_code, "headers": dict(response.headers)})
+        return response
+
+    def blueprint_after_request(response):
+        origin = request.headers.get('Origin')
+        allowed_origins = current_app.config.get('CORS_ORIGINS', list(ORIGINS))
+        if origin in allowed_origins:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+        return response
+
+    return _add_route(app, blueprint_after_request)
+
+
+def policy_app() -> Flask:
+    app = Flask('policy')
+    init_cors(app, CorsPolicy(ORIGINS))
+    return _add_route(app)
+
+
+def measure_hooks(app: Flask, requests: int) -> float:
+    """Mean microseconds spent in the after_request chain for one GET response"""
+    with app.test_request_context('/api/auth/ping', headers={'Origin': ORIGIN}):
+        start = time.perf_counter()
+        for _ in range(requests):
+            app.process_response(app.response_class('{}', mimetype='application/json'))
+        return (time.perf_counter() - start) / requests * 1e6
+
+
+def measure(app: Flask, requests: int, method: str = 'GET') -> float:
+    """Mean microseconds per request through the full WSGI stack"""
+    client = app.test_client()
+    headers = {'Origin': ORIGIN}
+    if method == 'OPTIONS':
+        headers['Access-Control-Request-Method'] = 'GET'
+    for _ in range(min(requests // 10, 1000)):
+        client.open('/api/auth/ping', method=method, headers=headers)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.open('/api/auth/ping', method=method, headers=headers)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    apps = {'bare': bare_app(), 'policy': policy_app()}
+    try:
+        apps['legacy'] = legacy_app()
+    except ImportError:
+        print("flask_cors not installed; skipping the legacy stack", file=sys.stderr)
+
+    results = {}
+    measure_hooks(apps['bare'], 1000)  # warm up
+    baseline = measure_hooks(apps['bare'], args.requests)
+    for name, app in apps.items():
+        mean = measure_hooks(app, args.requests)
+        results[f"after_request {name}"] = {
+            'us_per_request': round(mean, 2),
+            'overhead_us': round(mean - baseline, 2)
+        }
+    for method in ('GET', 'OPTIONS'):
+        baseline = measure(apps['bare'], args.requests, method)
+        for name, app in apps.items():
+            mean = baseline if name == 'bare' else measure(app, args.requests, method)
+            results[f"{method} {name}"] = {
+                'us_per_request': round(mean, 2),
+                'overhead_us': round(mean - baseline, 2)
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Start-up cost of a repeat match job: re-parsing the file vs the dataset cache.
+
+Ingests a synthetic CSV (bench_ingest.GeneratedCsv) once with the dataset
+cache enabled, then times what a match job does before scoring can start:
+
+    reparse       parse the whole file again (the lower bound for re-reading it)
+    cache_first   open the cached copy, decode and encode the compared columns
+    cache_repeat  open the cached copy and map the already encoded columns
+
+Usage: python benchmarks/bench_dataset_cache.py [--rows 200000]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bench_ingest import CountingDatabase, GeneratedCsv
+from apps.matching.scoring import FieldComparator
+from apps.matching.services.match_job_service import MatchJobService
+from apps.parser.services.dataset_cache import DatasetCache
+from apps.parser.services.parser_service import ParserService
+
+COMPARATORS = [FieldComparator('name', 'jaro_winkler'), FieldComparator('amount', 'numeric'),
+               FieldComparator('date', 'date')]
+
+
+async def run(rows: int, directory: str):
+    cache = DatasetCache(directory, use_storage=False)
+    service = ParserService(CountingDatabase(), cache=cache)
+    dataset = await service.create('bench', 'generated.csv', schema={'amount': 'float', 'date': 'date'})
+    started = time.perf_counter()
+    stats = await service.ingest(dataset, GeneratedCsv(rows))
+    result = {'rows': rows, 'reparse_ms': round((time.perf_counter() - started) * 1000, 1)}
+    for name in ('cache_first', 'cache_repeat'):
+        started = time.perf_counter()
+        cached = await cache.open(stats['cache_key'])
+        ids, columns = MatchJobService._load_cached(cached, dataset['_id'], COMPARATORS)
+        result[f"{name}_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    assert len(ids) == rows
+    result['cache_megabytes'] = round(cached.manifest['bytes'] / 2 ** 20, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000, help="File size in rows")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        print(json.dumps(asyncio.run(run(args.rows, directory)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Throughput and peak memory of the streaming file parser (apps/parser).
+
+Generates a synthetic CSV on the fly as a forward-only stream (never held in
+memory), ingests it through ParserService into a database stand-in that
+only counts what insert_many receives, and reports rows/sec per stage (read,
+normalise, write) and the peak traced memory. Run with two --rows values to
+check that peak memory stays flat as the file grows.
+
+Usage: python benchmarks/bench_ingest.py [--rows 200000,1000000] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import sys
+import tracemalloc
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from apps.parser.services.parser_service import ParserService
+
+
+class GeneratedCsv(io.RawIOBase):
+    """rows lines of CSV produced as they are read"""
+
+    def __init__(self, rows: int, seed: int = 7):
+        self.rng = random.Random(seed)
+        self.remaining = rows
+        self.buffer = b"id,name,amount,date,code\n"
+        self.bytes = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while len(self.buffer) < size and self.remaining:
+            lines = []
+            for _ in range(min(self.remaining, 1000)):
+                self.remaining -= 1
+                lines.append(f"{self.remaining},\"Name {self.rng.randrange(10 ** 6)}, Ltd\","
+                             f"\"{self.rng.uniform(1, 10 ** 6):,.2f}\",2024-{self.rng.randint(1, 12):02d}-"
+                             f"{self.rng.randint(1, 28):02d},{self.rng.randrange(10 ** 4):05d}\n")
+            self.buffer += "".join(lines).encode()
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        self.bytes += len(data)
+        return data
+
+
+class CountingDatabase:
+    """Accepts writes and keeps only the counts"""
+
+    def __init__(self):
+        self.records = 0
+
+    async def insert_one(self, collection, document):
+        return document.get('_id')
+
+    async def update_one(self, collection, query, update, upsert=False):
+        return True
+
+    async def bulk_write(self, collection, operations, ordered=True):
+        return {'inserted_count': 0, 'deleted_count': 0, 'errors': []}
+
+    async def insert_many(self, collection, documents, ordered=False):
+        documents = list(documents)
+        self.records += len(documents)
+        return {'inserted_count': len(documents), 'errors': []}
+
+
+async def ingest(rows: int, batch_size: int, chunk_size: int, trace: bool = False):
+    db = CountingDatabase()
+    service = ParserService(db, batch_size=batch_size, read_chunk_size=chunk_size)
+    dataset = await service.create('bench', 'generated.csv', schema={'amount': 'float', 'date': 'date'})
+    stream = GeneratedCsv(rows)
+    if trace:
+        tracemalloc.start()
+    stats = await service.ingest(dataset, stream)
+    assert db.records == rows
+    result = {'rows': rows, 'megabytes': round(stream.bytes / 2 ** 20, 1), 'stages': stats['stages']}
+    if trace:
+        result['peak_traced_megabytes'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    return result
+
+
+def measure(rows: int, batch_size: int, chunk_size: int):
+    # Timed without tracing (tracemalloc slows allocation-heavy code several times over), then traced
+    result = asyncio.run(ingest(rows, batch_size, chunk_size))
+    result['peak_traced_megabytes'] = asyncio.run(ingest(rows, batch_size, chunk_size, trace=True))[
+        'peak_traced_megabytes']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', default='200000,1000000', help="Comma-separated file sizes in rows")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Records per insert_many")
+    parser.add_argument('--chunk-size', type=int, default=1024 * 1024, help="Bytes read at a time")
+    args = parser.parse_args()
+    results = [measure(int(rows), args.batch_size, args.chunk_size) for rows in args.rows.split(',')]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
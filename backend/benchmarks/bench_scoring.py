@@ -0,0 +1,148 @@
+"""
+Throughput of the vectorised pair scorers (apps/matching/scoring.py).
+
+Builds --records synthetic left records and noisy right copies (typos in the
+names, small differences in amounts and dates), draws --pairs random
+candidate pairs and reports pairs per second for each similarity method, for
+a weighted multi-field score, and for per-pair difflib scoring on a sample
+as the pure-Python reference. Runs on one core; set OMP_NUM_THREADS=1 and
+pin with taskset for stable numbers.
+
+--workers 1,2,4 also scores the weighted pairs through the match-job process
+pool (shared-memory columns, one task per --block-pairs) at each pool size,
+to check that throughput scales with cores.
+
+Usage: python benchmarks/bench_scoring.py [--records 100000] [--pairs 2000000] [--workers 1,2,4]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, timedelta
+from difflib import SequenceMatcher
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import numpy as np
+from apps.matching.parallel import SharedColumns, get_process_pool, score_block, shutdown_process_pool
+from apps.matching.scoring import FieldComparator, encode_columns, score_columns
+
+SYLLABLES = ['an', 'ber', 'cal', 'dor', 'el', 'fin', 'gar', 'hol', 'is', 'jon',
+             'ka', 'lem', 'mor', 'nat', 'ol', 'per', 'quin', 'ros', 'sun', 'tay']
+
+
+def _word(rng: random.Random) -> str:
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def _typo(rng: random.Random, text: str) -> str:
+    position = rng.randrange(len(text))
+    return text[:position] + rng.choice('abcdefghijklmnopqrstuvwxyz') + text[position + 1:]
+
+
+def make_records(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    left, right = [], []
+    for i in range(count):
+        name = f"{_word(rng)} {_word(rng)}"
+        amount = round(rng.uniform(10, 10000), 2)
+        day = date(2024, 1, 1) + timedelta(days=rng.randrange(365))
+        left.append({'name': name, 'amount': amount, 'date': day.isoformat()})
+        right.append({
+            'name': _typo(rng, name) if rng.random() < 0.5 else name,
+            'amount': round(amount * rng.uniform(0.98, 1.02), 2),
+            'date': (day + timedelta(days=rng.randint(-3, 3))).isoformat()
+        })
+    return left, right
+
+
+def pairs_per_second(function, pairs: int) -> float:
+    started = time.perf_counter()
+    function()
+    return round(pairs / (time.perf_counter() - started))
+
+
+def pool_pairs_per_second(shared: SharedColumns, comparators, left_index, right_index,
+                          workers: int, block_pairs: int) -> float:
+    pool = get_process_pool(workers)
+    try:
+        # Start the workers and attach them to the segment before timing
+        list(pool.map(score_block, [shared.spec] * workers, [comparators] * workers,
+                      [left_index[:1]] * workers, [right_index[:1]] * workers, [1.0] * workers))
+        starts = range(0, len(left_index), block_pairs)
+        return pairs_per_second(lambda: list(pool.map(
+            score_block, [shared.spec] * len(starts), [comparators] * len(starts),
+            [left_index[start:start + block_pairs] for start in starts],
+            [right_index[start:start + block_pairs] for start in starts], [0.8] * len(starts)
+        )), len(left_index))
+    finally:
+        shutdown_process_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--records', type=int, default=100000, help="Records per side")
+    parser.add_argument('--pairs', type=int, default=2000000, help="Random candidate pairs scored per method")
+    parser.add_argument('--reference-pairs', type=int, default=20000, help="Pairs scored with difflib")
+    parser.add_argument('--workers', help="Comma-separated process pool sizes to measure, e.g. 1,2,4")
+    parser.add_argument('--block-pairs', type=int, default=200000, help="Pairs per process pool task")
+    args = parser.parse_args()
+
+    left, right = make_records(args.records)
+    comparators = [
+        FieldComparator('name', 'levenshtein', weight=2.0, threshold=0.5),
+        FieldComparator('amount', 'numeric', relative=0.05),
+        FieldComparator('date', 'date', max_days=7)
+    ]
+    started = time.perf_counter()
+    left_columns = encode_columns(left, comparators)
+    right_columns = encode_columns(right, comparators)
+    for columns in (left_columns, right_columns):
+        columns['name'].bits, columns['name'].tokens  # built on first use; keep out of the timings
+    encode_seconds = time.perf_counter() - started
+
+    rng = np.random.default_rng(7)
+    left_index = rng.integers(0, args.records, args.pairs)
+    right_index = rng.integers(0, args.records, args.pairs)
+    # Half the pairs are true matches, as after blocking
+    right_index[::2] = left_index[::2]
+
+    results = {'records': args.records, 'pairs': args.pairs,
+               'encode_records_per_second': round(2 * args.records / encode_seconds), 'pairs_per_second': {}}
+    methods = {
+        'levenshtein': {}, 'jaro_winkler': {}, 'jaccard': {}, 'exact': {},
+        'numeric': {'relative': 0.05}, 'date': {'max_days': 7}
+    }
+    for method, options in methods.items():
+        field = {'numeric': 'amount', 'date': 'date'}.get(method, 'name')
+        comparator = FieldComparator(field, method, **options)
+        results['pairs_per_second'][method] = pairs_per_second(
+            lambda: comparator.similarity(left_columns[field], right_columns[field], left_index, right_index),
+            args.pairs
+        )
+    results['pairs_per_second']['weighted_3_fields'] = pairs_per_second(
+        lambda: score_columns(comparators, left_columns, right_columns, left_index, right_index), args.pairs
+    )
+
+    sample = list(zip(left_index[:args.reference_pairs].tolist(), right_index[:args.reference_pairs].tolist()))
+    results['pairs_per_second']['difflib_reference'] = pairs_per_second(
+        lambda: [SequenceMatcher(None, left[i]['name'], right[j]['name']).ratio() for i, j in sample],
+        len(sample)
+    )
+
+    if args.workers:
+        for comparator in comparators:
+            comparator.prepare(left_columns[comparator.field])
+            comparator.prepare(right_columns[comparator.field])
+        with SharedColumns({'left': left_columns, 'right': right_columns}) as shared:
+            results['process_pool_pairs_per_second'] = {
+                workers: pool_pairs_per_second(shared, comparators, left_index, right_index,
+                                               int(workers), args.block_pairs)
+                for workers in args.workers.split(',')
+            }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
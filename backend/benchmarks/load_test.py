@@ -0,0 +1,202 @@
+"""
+Closed-loop HTTP load generator (stdlib only).
+
+Keeps --concurrency requests in flight against one URL and reports
+throughput and latency percentiles as JSON. Compare the two server modes on
+an endpoint that waits on upstream I/O, with the same number of request
+threads in each, e.g.
+
+    SERVER_MODE=wsgi GUNICORN_THREADS=64 scripts/startup.sh
+    python benchmarks/load_test.py http://localhost:8080/api/v1/files/download-urls?filename=a.csv \\
+        -H "Authorization: Bearer $TOKEN" --concurrency 200 --requests 5000
+
+    SERVER_MODE=asgi ASGI_THREADS=64 scripts/startup.sh
+    (same command)
+
+Both modes run each request, async views included, on one of those threads,
+so with equal thread counts a blocking endpoint's throughput is capped at
+threads / upstream latency in either; what the comparison measures is the
+overhead of each server stack (gthread versus uvicorn handing requests to
+the pool), not extra capacity. Raising the thread count raises the cap in
+both modes alike.
+
+Where a gain does come from is within a request, in either mode: an async
+view that awaits several storage calls, each run on a worker thread, waits
+about as long as the slowest of them instead of their sum.
+
+--demo starts both modes locally with --threads request threads each and
+loads three endpoints whose upstream calls sleep for --upstream-ms (standing
+in for Firebase/GCS/Atlas): one call per request, --files calls awaited
+together, and --files calls one after another.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+async def _request(host: str, port: int, raw: bytes) -> int:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(raw)
+        await writer.drain()
+        status_line = await reader.readline()
+        content_length = 0
+        chunked = False
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin1').partition(':')
+            if name.lower() == 'content-length':
+                content_length = int(value.strip())
+            elif name.lower() == 'transfer-encoding' and 'chunked' in value.lower():
+                chunked = True
+        if chunked:
+            while True:
+                size = int((await reader.readline()).strip() or b'0', 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif content_length:
+            await reader.readexactly(content_length)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def run_load(url: str, concurrency: int, requests: int, method: str = 'GET',
+                   headers: Optional[Dict[str, str]] = None, timeout: float = 30.0) -> Dict:
+    """Issue requests with at most concurrency in flight; one connection per request"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path += '?' + parts.query
+    header_lines = ''.join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    raw = (f"{method} {path} HTTP/1.1\r\nHost: {parts.netloc}\r\n{header_lines}"
+           f"Connection: close\r\n\r\n").encode('latin1')
+    host, port = parts.hostname, parts.port or 80
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                status = str(await asyncio.wait_for(_request(host, port, raw), timeout))
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'requests': requests,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(requests / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+        },
+        'statuses': statuses
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start")
+
+
+def demo(args) -> Dict:
+    """Serve the slow endpoints in both modes, with the same thread count, and load-test each"""
+    env = dict(os.environ, BENCH_UPSTREAM_MS=str(args.upstream_ms), PYTHONPATH=str(BACKEND_DIR),
+               ASGI_THREADS=str(args.threads), BENCH_FILES=str(args.files))
+    modes = {
+        f'wsgi (gthread, {args.threads} threads)': ['--threads', str(args.threads), 'benchmarks.slow_app:app'],
+        f'asgi (uvicorn, {args.threads} threads)': ['--worker-class', 'uvicorn.workers.UvicornWorker',
+                                                    'benchmarks.slow_app:asgi_app'],
+    }
+    results = {}
+    for name, server_args in modes.items():
+        port = _free_port()
+        server = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+             '--log-level', 'warning', *server_args],
+            cwd=BACKEND_DIR, env=env
+        )
+        try:
+            _wait_for_port(port)
+            results[name] = {
+                path: asyncio.run(run_load(f'http://127.0.0.1:{port}{path}', args.concurrency, args.requests))
+                for path in ('/slow', '/files', '/files-serial')
+            }
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('url', nargs='?', help="URL to load (omit with --demo)")
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--method', default='GET')
+    parser.add_argument('-H', '--header', action='append', default=[], help="'Name: value'")
+    parser.add_argument('--demo', action='store_true', help="Compare wsgi and asgi modes locally")
+    parser.add_argument('--upstream-ms', type=int, default=50, help="Simulated upstream latency for --demo")
+    parser.add_argument('--threads', type=int, default=64, help="Request threads per mode for --demo")
+    parser.add_argument('--files', type=int, default=5, help="Upstream calls per /files request for --demo")
+    args = parser.parse_args()
+
+    if args.demo:
+        result = demo(args)
+    elif args.url:
+        headers = dict(h.split(':', 1) for h in args.header)
+        headers = {name.strip(): value.strip() for name, value in headers.items()}
+        result = asyncio.run(run_load(args.url, args.concurrency, args.requests, args.method, headers))
+    else:
+        parser.error("a URL or --demo is required")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
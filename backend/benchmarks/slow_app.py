@@ -0,0 +1,39 @@
+"""
+Minimal app for load_test.py --demo, served as WSGI (app) and ASGI (asgi_app).
+/slow blocks on one simulated upstream call of BENCH_UPSTREAM_MS; /files and
+/files-serial make BENCH_FILES such calls, as a multi-file request to GCS does,
+awaited together on worker threads or one after another.
+"""
+import asyncio
+import os
+import time
+from flask import Flask
+from shared.middleware.asgi import PooledWsgiToAsgi
+
+UPSTREAM_SECONDS = int(os.environ.get('BENCH_UPSTREAM_MS', '50')) / 1000
+FILES = int(os.environ.get('BENCH_FILES', '5'))
+
+app = Flask(__name__)
+
+
+@app.route('/slow', methods=['GET'])
+def slow():
+    time.sleep(UPSTREAM_SECONDS)
+    return {'status': 'ok'}
+
+
+@app.route('/files', methods=['GET'])
+async def files():
+    await asyncio.gather(*(asyncio.to_thread(time.sleep, UPSTREAM_SECONDS) for _ in range(FILES)))
+    return {'status': 'ok'}
+
+
+@app.route('/files-serial', methods=['GET'])
+async def files_serial():
+    for _ in range(FILES):
+        time.sleep(UPSTREAM_SECONDS)
+    return {'status': 'ok'}
+
+
+# load_test.py --demo sets ASGI_THREADS to the gthread server's --threads
+asgi_app = PooledWsgiToAsgi(app, int(os.environ.get('ASGI_THREADS', '64')))
@@ -0,0 +1,242 @@
+"""
+In-process stand-ins for the remote services, used by suite.py.
+
+FakeGCSServer speaks the subset of the Cloud Storage JSON API that
+GCSStorageService uses (multipart and resumable uploads, object metadata,
+deletes, batch requests and the OAuth token endpoint). Point
+google-cloud-storage at it with STORAGE_EMULATOR_HOST=server.url.
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+import uuid
+from email.parser import Parser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import google_crc32c
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+_UPLOAD_PATH = re.compile(r'^/upload/storage/v1/b/([^/]+)/o$')
+_OBJECT_PATH = re.compile(r'^/storage/v1/b/([^/]+)/o/(.+)$')
+_CONTENT_RANGE = re.compile(r'^bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)$')
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?')
+
+
+def write_service_account_key(path: Path, token_uri: str, project_id: str = 'bench-project') -> Path:
+    """Write a service-account key file with a throwaway RSA key and a local token endpoint"""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    path.write_text(json.dumps({
+        'type': 'service_account',
+        'project_id': project_id,
+        'private_key_id': 'bench-key',
+        'private_key': pem,
+        'client_email': f'bench@{project_id}.iam.gserviceaccount.com',
+        'client_id': '1',
+        'token_uri': token_uri
+    }))
+    return path
+
+
+class FakeGCSServer:
+    """Threaded HTTP server holding objects in memory"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        self.objects: Dict[Tuple[str, str], bytes] = {}
+        self.sessions: Dict[str, Dict] = {}
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.store = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeGCSServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-gcs', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeGCSServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def resource(self, bucket: str, name: str) -> Dict:
+        """Object metadata as the JSON API returns it"""
+        data = self.objects[(bucket, name)]
+        crc = google_crc32c.Checksum(data).digest()
+        return {
+            'kind': 'storage#object',
+            'id': f'{bucket}/{name}/1',
+            'bucket': bucket,
+            'name': name,
+            'generation': '1',
+            'metageneration': '1',
+            'size': str(len(data)),
+            'md5Hash': base64.b64encode(hashlib.md5(data).digest()).decode(),
+            'crc32c': base64.b64encode(crc).decode()
+        }
+
+    def delete(self, bucket: str, name: str) -> Tuple[int, Optional[Dict]]:
+        with self.lock:
+            if self.objects.pop((bucket, name), None) is None:
+                return 404, {'error': {'code': 404, 'message': 'No such object'}}
+        return 204, None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every keep-alive request
+    disable_nagle_algorithm = True
+
+    @property
+    def store(self) -> FakeGCSServer:
+        return self.server.store
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        url, query, body = self._parse()
+        if url.path == '/token':
+            return self._send_json(200, {'access_token': 'fake-token', 'expires_in': 3600, 'token_type': 'Bearer'})
+        if url.path == '/batch/storage/v1':
+            return self._batch(body)
+        match = _UPLOAD_PATH.match(url.path)
+        if not match:
+            return self._send_json(404, {'error': {'code': 404, 'message': f'Unknown path {url.path}'}})
+        bucket = match.group(1)
+        upload_type = query.get('uploadType', [''])[0]
+        if upload_type == 'multipart':
+            metadata, data = self._split_multipart(body)
+            return self._store(bucket, metadata.get('name') or query['name'][0], data)
+        if upload_type == 'media':
+            return self._store(bucket, query['name'][0], body)
+        if upload_type == 'resumable':
+            metadata = json.loads(body or b'{}')
+            upload_id = uuid.uuid4().hex
+            with self.store.lock:
+                self.store.sessions[upload_id] = {
+                    'bucket': bucket,
+                    'name': metadata.get('name') or query['name'][0],
+                    'data': b''
+                }
+            location = f'{self.store.url}{url.path}?uploadType=resumable&upload_id={upload_id}'
+            return self._send(200, b'', [('Location', location)])
+        return self._send_json(400, {'error': {'code': 400, 'message': f'Unsupported uploadType {upload_type}'}})
+
+    def do_PUT(self):
+        url, query, body = self._parse()
+        session = self.store.sessions.get(query.get('upload_id', [''])[0])
+        match = _CONTENT_RANGE.match(self.headers.get('Content-Range', ''))
+        if session is None or match is None:
+            return self._send_json(404, {'error': {'code': 404, 'message': 'No such upload session'}})
+        start, _, total = match.groups()
+        if start is not None:
+            session['data'] = session['data'][:int(start)] + body
+        if total != '*' and len(session['data']) == int(total):
+            with self.store.lock:
+                self.store.sessions.pop(query['upload_id'][0], None)
+            return self._store(session['bucket'], session['name'], session['data'])
+        headers = [('Range', f"bytes=0-{len(session['data']) - 1}")] if session['data'] else []
+        return self._send(308, b'', headers)
+
+    def do_GET(self):
+        url, query, _ = self._parse()
+        match = _OBJECT_PATH.match(url.path)
+        if not match:
+            return self._send_json(404, {'error': {'code': 404, 'message': f'Unknown path {url.path}'}})
+        bucket, name = match.group(1), unquote(match.group(2))
+        if (bucket, name) not in self.store.objects:
+            return self._send_json(404, {'error': {'code': 404, 'message': 'No such object'}})
+        if query.get('alt') == ['media']:
+            return self._send(200, self.store.objects[(bucket, name)], [('Content-Type', 'application/octet-stream')])
+        return self._send_json(200, self.store.resource(bucket, name))
+
+    def do_DELETE(self):
+        url, _, _ = self._parse()
+        match = _OBJECT_PATH.match(url.path)
+        if not match:
+            return self._send_json(404, {'error': {'code': 404, 'message': f'Unknown path {url.path}'}})
+        status, payload = self.store.delete(match.group(1), unquote(match.group(2)))
+        if payload is None:
+            return self._send(status, b'')
+        return self._send_json(status, payload)
+
+    def _parse(self):
+        with self.store.lock:
+            self.store.request_count += 1
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        url = urlsplit(self.path)
+        return url, parse_qs(url.query), body
+
+    def _store(self, bucket: str, name: str, data: bytes):
+        with self.store.lock:
+            self.store.objects[(bucket, name)] = data
+        return self._send_json(200, self.store.resource(bucket, name))
+
+    def _split_multipart(self, body: bytes) -> Tuple[Dict, bytes]:
+        """Split a multipart/related upload into its JSON metadata and media parts"""
+        boundary = _BOUNDARY.search(self.headers['Content-Type']).group(1).encode()
+        parts = body.split(b'--' + boundary)
+        metadata = parts[1].partition(b'\r\n\r\n')[2][:-2]
+        data = parts[2].partition(b'\r\n\r\n')[2][:-2]
+        return json.loads(metadata), data
+
+    def _batch(self, body: bytes):
+        """Answer a multipart/mixed batch of object deletes"""
+        message = Parser().parsestr(f"Content-Type: {self.headers['Content-Type']}\n\n{body.decode()}")
+        boundary = 'batch_fake'
+        out = []
+        for index, part in enumerate(message.get_payload(), start=1):
+            method, target, _ = part.get_payload().split('\n', 1)[0].strip().split(' ', 2)
+            match = _OBJECT_PATH.match(urlsplit(target).path)
+            if method == 'DELETE' and match:
+                status, payload = self.store.delete(match.group(1), unquote(match.group(2)))
+            else:
+                status, payload = 400, {'error': {'code': 400, 'message': f'Unsupported {method} in batch'}}
+            reason = self.responses.get(status, ('',))[0]
+            content = json.dumps(payload) if payload is not None else ''
+            content_id = (part.get('Content-ID') or f'<{index}>').replace('<', '<response-', 1)
+            out.append(
+                f'--{boundary}\r\nContent-Type: application/http\r\nContent-ID: {content_id}\r\n\r\n'
+                f'HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(content)}\r\n\r\n{content}\r\n'
+            )
+        out.append(f'--{boundary}--\r\n')
+        return self._send(200, ''.join(out).encode(), [('Content-Type', f'multipart/mixed; boundary={boundary}')])
+
+    def _send_json(self, status: int, payload: Dict):
+        return self._send(status, json.dumps(payload).encode(), [('Content-Type', 'application/json')])
+
+    def _send(self, status: int, body: bytes, headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
@@ -0,0 +1,340 @@
+"""
+Reproducible benchmark suite for the API and the service layer.
+
+Drives the real app (app.create_app through the service factory) against
+local stand-ins, so results depend only on the code and the machine:
+
+    auth      FirebaseAuthService verifying RS256 tokens from FakeTokenIssuer
+    database  MongoDBService on a local mongod (--mongo-uri) or mongomock (requirements-test.txt)
+    storage   GCSStorageService on FakeGCSServer (benchmarks/standins.py)
+
+Each scenario reports req/s and p50/p95/p99 latency as JSON. Save a run
+and compare a later one against it to catch regressions:
+
+    python benchmarks/suite.py --output baseline.json
+    python benchmarks/suite.py --compare baseline.json --tolerance 20
+
+--compare exits with status 1 when a scenario's p95 latency or throughput is
+more than --tolerance percent worse than the baseline.
+"""
+import argparse
+import asyncio
+import inspect
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.load_test import percentile
+from benchmarks.standins import FakeGCSServer, write_service_account_key
+
+PROJECT_ID = 'bench-project'
+BUCKET = 'bench-bucket'
+SCENARIOS = [
+    'validate_token', 'validate_token_cold',
+    'db_insert_one', 'db_find_one', 'db_update_one', 'db_delete_one', 'bulk_ingest',
+    'upload', 'download_urls', 'delete_files'
+]
+
+
+def measure(operation: Callable[[int], bool], requests: int, concurrency: int = 1,
+            warmup: int = 0) -> Dict:
+    """
+    Call operation(i) for i in range(requests), at most concurrency at a time.
+
+    operation returns True on success; exceptions count as errors.
+    """
+    for i in range(warmup):
+        operation(-i - 1)
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    lock = threading.Lock()
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            start = time.perf_counter()
+            try:
+                ok = operation(i)
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        worker()
+    else:
+        with ThreadPoolExecutor(concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+    seconds = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(requests / seconds, 1) if seconds else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 3),
+            'p95': round(percentile(latencies, 95) * 1000, 3),
+            'p99': round(percentile(latencies, 99) * 1000, 3),
+        },
+        'errors': errors
+    }
+
+
+def compare(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Scenarios whose p95 latency or throughput regressed by more than tolerance percent"""
+    regressions = []
+    limit = 1 + tolerance / 100
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before or 'skipped' in result or 'skipped' in before:
+            continue
+        p95, p95_before = result['latency_ms']['p95'], before['latency_ms']['p95']
+        if p95_before and p95 > p95_before * limit:
+            regressions.append(f"{name}: p95 {p95_before}ms -> {p95}ms")
+        rps, rps_before = result['requests_per_second'], before['requests_per_second']
+        if rps and rps * limit < rps_before:
+            regressions.append(f"{name}: {rps_before} -> {rps} req/s")
+    return regressions
+
+
+class _AsyncRunner:
+    """Runs coroutines of an async service on one background loop, from any thread"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name='bench-loop', daemon=True).start()
+
+    def __call__(self, result):
+        if inspect.isawaitable(result):
+            return asyncio.run_coroutine_threadsafe(result, self.loop).result()
+        return result
+
+
+def _use_mongomock() -> None:
+    """Make MongoDBService build mongomock clients; pool and driver options are dropped"""
+    import mongomock
+    from services.implementations.database import mongodb
+    mongodb.MongoClient = lambda uri, event_listeners=None, **options: mongomock.MongoClient(uri)
+
+
+def configure(workdir: Path, gcs: FakeGCSServer, mongo_uri: Optional[str]) -> str:
+    """Point the app's configuration at the stand-ins; returns the database backend used"""
+    key_path = write_service_account_key(workdir / 'service-account.json', f'{gcs.url}/token', PROJECT_ID)
+    os.environ.update({
+        'AUTH_PROVIDER': 'firebase',
+        'AUTH_PROJECT_ID': PROJECT_ID,
+        'AUTH_CREDENTIALS_PATH': str(key_path),
+        'DATABASE_PROVIDER': 'mongodb',
+        'DATABASE_DRIVER': 'pymongo',
+        'DATABASE_CONNECTION_STRING': mongo_uri or 'mongodb://localhost:27017',
+        'DATABASE_NAME': 'benchmarks',
+        'DATABASE_WARMUP': 'false',
+        'DATABASE_ENSURE_INDEXES': 'true',
+        'STORAGE_PROVIDER': 'gcs',
+        'STORAGE_BUCKET_NAME': BUCKET,
+        'STORAGE_PROJECT_ID': PROJECT_ID,
+        'STORAGE_CREDENTIALS_PATH': str(key_path),
+        'STORAGE_EMULATOR_HOST': gcs.url,
+        'SERVICE_PREWARM': 'false',
+        'ADMISSION_MAX_IN_FLIGHT': '0',
+        'GUNICORN_PRELOAD': 'false',
+    })
+    os.environ.pop('FIREBASE_AUTH_EMULATOR_HOST', None)
+    if mongo_uri:
+        return 'mongod'
+    try:
+        _use_mongomock()
+    except ImportError:
+        return None
+    return 'mongomock'
+
+
+def run_suite(args) -> Dict:
+    scenarios = args.scenarios.split(',') if args.scenarios else SCENARIOS
+    with tempfile.TemporaryDirectory() as workdir, FakeGCSServer() as gcs:
+        database_backend = configure(Path(workdir), gcs, args.mongo_uri)
+
+        from tests.mocks.token_issuer import FakeTokenIssuer
+        from services.factory import get_auth_service, get_database_service
+        from services.implementations.auth.public_keys import PublicKeyCache
+        from app import application
+
+        issuer = FakeTokenIssuer(project_id=PROJECT_ID)
+        auth_service = getattr(get_auth_service(), 'inner', get_auth_service())
+        auth_service.public_keys = PublicKeyCache(fetch=issuer.fetch)
+        token = issuer.issue(uid='bench-user', email='bench@example.com')
+        authorization = {'Authorization': f'Bearer {token}'}
+        clients = threading.local()
+
+        def client():
+            if not hasattr(clients, 'client'):
+                clients.client = application.test_client()
+            return clients.client
+
+        results = {}
+
+        def run(name: str, operation: Callable[[int], bool], requests: int = args.requests,
+                concurrency: int = args.concurrency, **extra) -> None:
+            if name not in scenarios:
+                return
+            logging.getLogger('bench').info(f"Running {name}")
+            results[name] = {**measure(operation, requests, concurrency, args.warmup), **extra}
+
+        # Auth: token verification served from the verified-token cache
+        run('validate_token', lambda i: client().post('/api/auth/validate', headers=authorization).status_code == 200)
+
+        # Auth: every token is new, so each request checks an RS256 signature
+        fresh_tokens = [issuer.issue(uid=f'user-{i}') for i in range(args.requests + args.warmup)] \
+            if 'validate_token_cold' in scenarios else []
+        run('validate_token_cold', lambda i: client().post(
+            '/api/auth/validate', headers={'Authorization': f'Bearer {fresh_tokens[i]}'}
+        ).status_code == 200)
+
+        # Database: single-document CRUD through the service layer
+        if database_backend is None:
+            requested = [name for name in ('db_insert_one', 'db_find_one', 'db_update_one', 'db_delete_one',
+                                           'bulk_ingest') if name in scenarios]
+            if requested:
+                # A run missing scenarios would not be comparable with a baseline
+                raise SystemExit(f"{', '.join(requested)} need a database: pass --mongo-uri or "
+                                 f"pip install -r requirements-test.txt (mongomock)")
+        else:
+            db = get_database_service()
+            call = _AsyncRunner()
+            collection = f'bench_items_{os.getpid()}'
+            # Warm-up requests use i < 0, so keys are shifted to stay distinct
+            offset = args.warmup
+            item = lambda i: {'key': i + offset, 'name': f'item {i}', 'amount': i * 1.5}
+            if 'db_insert_one' not in scenarios:
+                call(db.insert_many(collection, (item(i) for i in range(-offset, args.requests))))
+            run('db_insert_one', lambda i: bool(call(db.insert_one(collection, item(i)))))
+            run('db_find_one', lambda i: call(db.find_one(collection, {'key': i + offset})) is not None)
+            run('db_update_one', lambda i: call(db.update_one(collection, {'key': i + offset}, {'amount': -(i + 1)})))
+            run('db_delete_one', lambda i: call(db.delete_one(collection, {'key': i + offset})))
+
+            # Bulk ingest: insert_many of --batch-size rows per call
+            batch = args.batch_size
+            run('bulk_ingest', lambda i: call(db.insert_many(
+                f'{collection}_bulk',
+                ({'row': i * batch + j, 'name': f'row {j}', 'amount': j * 0.5} for j in range(batch))
+            ))['inserted_count'] == batch, requests=args.ingest_batches, concurrency=1, batch_size=batch)
+            if 'bulk_ingest' in results:
+                results['bulk_ingest']['rows_per_second'] = round(
+                    results['bulk_ingest']['requests_per_second'] * batch, 1
+                )
+            if hasattr(db, 'get_client'):
+                for name in (collection, f'{collection}_bulk'):
+                    db.get_client()[os.environ['DATABASE_NAME']].drop_collection(name)
+
+        # Storage: multipart upload, signed URLs and batch delete through /api/v1/files
+        # Distinct content per file, so deduplicated storage still uploads every one
+        payload = os.urandom(args.file_size)
+        run('upload', lambda i: client().post(
+            '/api/v1/files', headers=authorization,
+            data={'files': [(io.BytesIO(f'{i}-{n}:'.encode() + payload), f'file-{i}-{n}.bin')
+                            for n in range(args.files_per_request)]},
+            content_type='multipart/form-data'
+        ).status_code == 200, files_per_request=args.files_per_request, file_size=args.file_size)
+
+        names = [f'file-0-{n}.bin' for n in range(args.files_per_request)]
+        run('download_urls', lambda i: client().get(
+            '/api/v1/files/download-urls', headers=authorization,
+            query_string=[('filename', name) for name in names]
+        ).status_code == 200)
+
+        run('delete_files', lambda i: client().delete(
+            '/api/v1/files', headers=authorization,
+            json={'filenames': [f'file-{i}-{n}.bin' for n in range(args.files_per_request)]}
+        ).status_code == 200)
+
+        return {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': datetime.now(UTC).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'database': database_backend,
+                'storage': 'fake-gcs',
+                'gcs_requests': gcs.request_count
+            },
+            'scenarios': results
+        }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--requests', type=int, default=500, help="Timed requests per scenario")
+    parser.add_argument('--warmup', type=int, default=20, help="Untimed requests before each scenario")
+    parser.add_argument('--concurrency', type=int, default=1, help="Threads issuing requests")
+    parser.add_argument('--mongo-uri', help="Local mongod to use instead of mongomock")
+    parser.add_argument('--batch-size', type=int, default=1000, help="Rows per insert_many in bulk_ingest")
+    parser.add_argument('--ingest-batches', type=int, default=20, help="insert_many calls in bulk_ingest")
+    parser.add_argument('--files-per-request', type=int, default=2)
+    parser.add_argument('--file-size', type=int, default=64 * 1024, help="Bytes per uploaded file")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    parser.add_argument('--compare', help="Baseline JSON report to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=20.0, help="Allowed regression in percent")
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's INFO logging")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(',')) - set(SCENARIOS) if args.scenarios else set()
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = run_suite(args) if args.verbose else _quietly(run_suite, args)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), report, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+def _quietly(function, *args):
+    """Run function with the app's per-request logging turned down"""
+    logging.disable(logging.INFO)
+    try:
+        return function(*args)
+    finally:
+        logging.disable(logging.NOTSET)
+
+
+if __name__ == '__main__':
+    main()
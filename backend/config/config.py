@@ -7,6 +7,7 @@ class Config(BaseSettings):
     DATABASE_PROVIDER: str = "mongodb"
     DATABASE_CONNECTION_STRING: str
     DATABASE_NAME: str
+    DATABASE_DRIVER: str = "pymongo"
     
     # Firebase Auth settings
     AUTH_PROVIDER: str = "firebase"
@@ -58,6 +59,13 @@ class Config(BaseSettings):
             raise ValueError('DATABASE_PROVIDER must be mongodb')
         return v
 
+    @validator('DATABASE_DRIVER')
+    def validate_database_driver(cls, v):
+        """Validate database driver"""
+        if v not in ['pymongo', 'motor']:
+            raise ValueError('DATABASE_DRIVER must be either pymongo or motor')
+        return v
+
     @validator('AUTH_PROVIDER')
     def validate_auth_provider(cls, v):
         """Validate auth provider"""
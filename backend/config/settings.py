@@ -6,22 +6,87 @@ class Config:
     
     def __init__(self):
         self.FLASK_ENV: str = os.environ.get('FLASK_ENV', 'development')
+        # Build services on a background thread after startup instead of on first request
+        self.SERVICE_PREWARM: bool = os.environ.get('SERVICE_PREWARM', 'false').lower() == 'true'
+        self.SERVICE_PREWARM_DELAY: float = float(os.environ.get('SERVICE_PREWARM_DELAY', '0.5'))
+        # Admission control: requests run at once and wait for a slot per worker before 503 (0 disables)
+        self.ADMISSION_MAX_IN_FLIGHT: int = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '0'))
+        self.ADMISSION_MAX_QUEUE: int = int(os.environ.get('ADMISSION_MAX_QUEUE', '0'))
+        self.ADMISSION_QUEUE_TIMEOUT_MS: int = int(os.environ.get('ADMISSION_QUEUE_TIMEOUT_MS', '1000'))
+        self.ADMISSION_RETRY_AFTER: int = int(os.environ.get('ADMISSION_RETRY_AFTER', '1'))
+        # Request/service latency metrics served at /metrics
+        self.METRICS_ENABLED: bool = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
         
         # Auth settings
         self.AUTH_PROVIDER: str = os.environ.get('AUTH_PROVIDER', 'firebase')
         self.AUTH_PROJECT_ID: str = os.environ.get('AUTH_PROJECT_ID')
         self.AUTH_CREDENTIALS_PATH: str = os.environ.get('AUTH_CREDENTIALS_PATH')
+        self.AUTH_TOKEN_CACHE_SIZE: int = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', '1024'))
+        self.AUTH_PUBLIC_KEY_REFRESH_MARGIN: int = int(os.environ.get('AUTH_PUBLIC_KEY_REFRESH_MARGIN', '300'))
         
         # Database settings
         self.DATABASE_PROVIDER: str = os.environ.get('DATABASE_PROVIDER', 'mongodb')
         self.DATABASE_CONNECTION_STRING: str = os.environ.get('DATABASE_CONNECTION_STRING')
         self.DATABASE_NAME: str = os.environ.get('DATABASE_NAME')
+        # 'pymongo' for the blocking driver, 'motor' for the asyncio-native one
+        self.DATABASE_DRIVER: str = os.environ.get('DATABASE_DRIVER', 'pymongo')
+        
+        # Database connection pool settings
+        self.DATABASE_MAX_POOL_SIZE: int = int(os.environ.get('DATABASE_MAX_POOL_SIZE', '50'))
+        self.DATABASE_MIN_POOL_SIZE: int = int(os.environ.get('DATABASE_MIN_POOL_SIZE', '2'))
+        self.DATABASE_MAX_IDLE_TIME_MS: int = int(os.environ.get('DATABASE_MAX_IDLE_TIME_MS', '300000'))
+        self.DATABASE_SERVER_SELECTION_TIMEOUT_MS: int = int(os.environ.get('DATABASE_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+        self.DATABASE_CONNECT_TIMEOUT_MS: int = int(os.environ.get('DATABASE_CONNECT_TIMEOUT_MS', '10000'))
+        self.DATABASE_WAIT_QUEUE_TIMEOUT_MS: int = int(os.environ.get('DATABASE_WAIT_QUEUE_TIMEOUT_MS', '0'))
+        self.DATABASE_COMPRESSORS: str = os.environ.get('DATABASE_COMPRESSORS', 'zlib')
+        self.DATABASE_BULK_CHUNK_SIZE: int = int(os.environ.get('DATABASE_BULK_CHUNK_SIZE', '1000'))
+        self.DATABASE_WARMUP: bool = os.environ.get('DATABASE_WARMUP', 'true').lower() == 'true'
+        self.DATABASE_ENSURE_INDEXES: bool = os.environ.get('DATABASE_ENSURE_INDEXES', 'false').lower() == 'true'
+        # Read-through cache for find_one/find_user_by_email: "collection:ttl_seconds:max_entries;..."
+        self.DATABASE_CACHE_ENABLED: bool = os.environ.get('DATABASE_CACHE_ENABLED', 'false').lower() == 'true'
+        self.DATABASE_CACHE_COLLECTIONS: str = os.environ.get('DATABASE_CACHE_COLLECTIONS', 'users:60:10000')
+        # Development/test aids: explain() each new query shape and flag collection scans
+        self.DATABASE_EXPLAIN_QUERIES: bool = os.environ.get('DATABASE_EXPLAIN_QUERIES', 'false').lower() == 'true'
+        self.DATABASE_EXPLAIN_STRICT: bool = os.environ.get('DATABASE_EXPLAIN_STRICT', 'false').lower() == 'true'
         
         # Storage settings
         self.STORAGE_PROVIDER: str = os.environ.get('STORAGE_PROVIDER', 'gcs')
         self.STORAGE_PROJECT_ID: str = os.environ.get('STORAGE_PROJECT_ID')
         self.STORAGE_CREDENTIALS_PATH: str = os.environ.get('STORAGE_CREDENTIALS_PATH')
         self.STORAGE_BUCKET_NAME: str = os.environ.get('STORAGE_BUCKET_NAME')
+        self.STORAGE_UPLOAD_CHUNK_SIZE: int = int(os.environ.get('STORAGE_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+        self.STORAGE_UPLOAD_MAX_RECOVERIES: int = int(os.environ.get('STORAGE_UPLOAD_MAX_RECOVERIES', '5'))
+        self.STORAGE_MAX_CONCURRENCY: int = int(os.environ.get('STORAGE_MAX_CONCURRENCY', '8'))
+        self.STORAGE_SIGNED_URL_EXPIRATION: int = int(os.environ.get('STORAGE_SIGNED_URL_EXPIRATION', '3600'))
+        self.STORAGE_SIGNED_URL_CACHE_SIZE: int = int(os.environ.get('STORAGE_SIGNED_URL_CACHE_SIZE', '10000'))
+        
+        # Matching settings
+        self.MATCHING_BATCH_SIZE: int = int(os.environ.get('MATCHING_BATCH_SIZE', '1000'))
+        self.MATCHING_MAX_BLOCK_SIZE: int = int(os.environ.get('MATCHING_MAX_BLOCK_SIZE', '1000'))
+        self.MATCHING_WORKERS: int = int(os.environ.get('MATCHING_WORKERS', '0'))
+        self.MATCHING_BLOCK_PAIRS: int = int(os.environ.get('MATCHING_BLOCK_PAIRS', '200000'))
+        
+        # Parser settings
+        self.PARSER_BATCH_SIZE: int = int(os.environ.get('PARSER_BATCH_SIZE', '1000'))
+        self.PARSER_READ_CHUNK_SIZE: int = int(os.environ.get('PARSER_READ_CHUNK_SIZE', str(1024 * 1024)))
+        self.DATASET_CACHE_DIR: str = os.environ.get('DATASET_CACHE_DIR', '')
+        self.DATASET_CACHE_MAX_BYTES: int = int(os.environ.get('DATASET_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+        self.DATASET_CACHE_STORAGE: bool = os.environ.get('DATASET_CACHE_STORAGE', 'true').lower() == 'true'
+        
+        # Comparison settings
+        self.COMPARISON_MEMORY_BYTES: int = int(os.environ.get('COMPARISON_MEMORY_BYTES', str(256 * 1024 * 1024)))
+        self.COMPARISON_TEMP_DIR: str = os.environ.get('COMPARISON_TEMP_DIR', '')
+        self.COMPARISON_STREAM_MAX_BYTES: int = int(os.environ.get('COMPARISON_STREAM_MAX_BYTES',
+                                                                   str(64 * 1024 * 1024)))
+        
+        # Job queue settings
+        self.JOBS_MAX_ATTEMPTS: int = int(os.environ.get('JOBS_MAX_ATTEMPTS', '3'))
+        self.JOBS_RETRY_BASE_SECONDS: float = float(os.environ.get('JOBS_RETRY_BASE_SECONDS', '5'))
+        self.JOBS_RETRY_MAX_SECONDS: float = float(os.environ.get('JOBS_RETRY_MAX_SECONDS', '300'))
+        self.JOBS_LEASE_SECONDS: int = int(os.environ.get('JOBS_LEASE_SECONDS', '60'))
+        self.JOBS_POLL_INTERVAL_MS: int = int(os.environ.get('JOBS_POLL_INTERVAL_MS', '1000'))
+        self.JOBS_WORKER_CONCURRENCY: int = int(os.environ.get('JOBS_WORKER_CONCURRENCY', '4'))
+        self.JOBS_EMBEDDED_WORKER: bool = os.environ.get('JOBS_EMBEDDED_WORKER', 'false').lower() == 'true'
         
         # CORS settings
         cors_origins = os.environ.get('CORS_ORIGINS', '')
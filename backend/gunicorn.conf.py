@@ -0,0 +1,135 @@
+"""
+Gunicorn settings derived from the container's cgroup limits.
+
+Gunicorn loads ./gunicorn.conf.py automatically. Every value can be pinned
+through the environment:
+
+    WEB_CONCURRENCY            workers (default: CPU limit rounded up, capped by memory)
+    GUNICORN_THREADS           threads per worker (default: twice the admitted + queued requests)
+    GUNICORN_WORKER_MEMORY_MB  memory budget per worker used for the cap (default 256)
+    GUNICORN_PRELOAD           import the app once in the master before forking (default false)
+    GUNICORN_TIMEOUT           worker heartbeat timeout in seconds (default 0, off as on Cloud Run)
+    SERVER_MODE                wsgi (gthread workers, app:app) or asgi (uvicorn workers, asgi:app)
+    ADMISSION_MAX_IN_FLIGHT    requests run at once per worker (default 8 per CPU per worker)
+    ADMISSION_MAX_QUEUE        requests waiting for a slot per worker before 503 (default = in flight)
+"""
+import math
+import os
+from pathlib import Path
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+
+def _read(path: Path):
+    try:
+        return path.read_text().strip()
+    except OSError:
+        return None
+
+
+def cpu_limit() -> float:
+    """CPUs available to this container: cgroup quota, else affinity, else cpu_count"""
+    quota = _read(CGROUP_ROOT / 'cpu.max')  # cgroup v2: "<quota> <period>" or "max <period>"
+    if quota:
+        value, _, period = quota.partition(' ')
+        if value != 'max' and period:
+            return int(value) / int(period)
+    quota_us = _read(CGROUP_ROOT / 'cpu' / 'cpu.cfs_quota_us')  # cgroup v1
+    period_us = _read(CGROUP_ROOT / 'cpu' / 'cpu.cfs_period_us')
+    if quota_us and period_us and int(quota_us) > 0:
+        return int(quota_us) / int(period_us)
+    if hasattr(os, 'sched_getaffinity'):
+        return float(len(os.sched_getaffinity(0)))
+    return float(os.cpu_count() or 1)
+
+
+def memory_limit() -> int:
+    """Bytes available to this container, or 0 when unlimited"""
+    for path in (CGROUP_ROOT / 'memory.max', CGROUP_ROOT / 'memory' / 'memory.limit_in_bytes'):
+        value = _read(path)
+        # cgroup v1 reports "unlimited" as a huge page-aligned number
+        if value and value != 'max' and int(value) < 1 << 60:
+            return int(value)
+    return 0
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def plan(cpus: float, memory_bytes: int) -> dict:
+    """Workers, threads and admission limits for the given CPU and memory limits"""
+    worker_memory = _env_int('GUNICORN_WORKER_MEMORY_MB', 256) * 1024 * 1024
+    workers = max(1, math.ceil(cpus))
+    if memory_bytes:
+        workers = min(workers, max(1, memory_bytes // worker_memory))
+    workers = _env_int('WEB_CONCURRENCY', workers)
+
+    # I/O-bound requests: about 8 in flight per CPU, spread across the workers
+    in_flight = _env_int('ADMISSION_MAX_IN_FLIGHT', max(2, round(8 * cpus / workers)))
+    queue = _env_int('ADMISSION_MAX_QUEUE', in_flight)
+    # Requests wait for a thread in gunicorn's (or the ASGI executor's) unbounded
+    # queue before AdmissionController sees them. Half the threads run or queue
+    # admitted requests; the other half take the overflow to the controller so
+    # it is shed with a 503 at once instead of waiting for a thread
+    threads = _env_int('GUNICORN_THREADS', 2 * (in_flight + queue))
+    return {
+        'workers': workers,
+        'threads': threads,
+        'admission_max_in_flight': in_flight,
+        'admission_max_queue': queue
+    }
+
+
+_plan = plan(cpu_limit(), memory_limit())
+
+# The app reads its admission limits from the environment (config/settings.py)
+os.environ.setdefault('ADMISSION_MAX_IN_FLIGHT', str(_plan['admission_max_in_flight']))
+os.environ.setdefault('ADMISSION_MAX_QUEUE', str(_plan['admission_max_queue']))
+
+bind = f":{os.environ.get('PORT', '8080')}"
+workers = _plan['workers']
+timeout = _env_int('GUNICORN_TIMEOUT', 0)
+graceful_timeout = 30
+keepalive = 2
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'false').lower() == 'true'
+
+if os.environ.get('SERVER_MODE', 'wsgi') == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'asgi:app'
+    os.environ.setdefault('ASGI_THREADS', str(_plan['threads']))
+else:
+    worker_class = 'gthread'
+    wsgi_app = 'app:app'
+    threads = _plan['threads']
+
+loglevel = 'info'
+accesslog = '-'
+errorlog = '-'
+capture_output = True
+enable_stdio_inheritance = True
+
+
+def when_ready(server):
+    server.log.info(
+        f"cgroup limits: {cpu_limit():.2f} CPU, {memory_limit() // (1024 * 1024) or 'unlimited'} MiB; "
+        f"{workers} worker(s) x {_plan['threads']} threads, admission "
+        f"{os.environ['ADMISSION_MAX_IN_FLIGHT']} in flight + {os.environ['ADMISSION_MAX_QUEUE']} queued"
+    )
+
+
+def post_fork(server, worker):
+    if not preload_app:
+        return
+    # Clients built while preloading (MongoDB pool, Firebase/GCS sessions) belong
+    # to the master; drop them so each worker builds its own on first use
+    from services.factory import get_config, reset_services
+    reset_services()
+    config = get_config()
+    if config.SERVICE_PREWARM or config.DATABASE_WARMUP:
+        from app import start_prewarm
+        start_prewarm()
+    if config.JOBS_EMBEDDED_WORKER:
+        from apps.jobs.worker import JobWorker
+        JobWorker().start_in_thread()
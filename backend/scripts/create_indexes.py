@@ -1,16 +1,32 @@
-from motor.motor_asyncio import AsyncIOMotorClient
-import asyncio
-from config.config import Config
+import argparse
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
 
-async def create_indexes():
-    config = Config()
-    client = AsyncIOMotorClient(config.MONGODB_CONNECTION_STRING)
-    db = client[config.MONGODB_DATABASE]
-    
-    # Create unique index on email
-    await db.users.create_index('email', unique=True)
-    
+from config.settings import Config
+from services.implementations.database.indexes import registered_indexes
+from services.implementations.database.mongodb import MongoDBService
+
+def create_indexes(dry_run: bool = False):
+    """Apply the declarative index registry to the configured database"""
+    if dry_run:
+        for collection, specs in registered_indexes().items():
+            for spec in specs:
+                print(f"{collection}: {spec}")
+        return
+
+    service = MongoDBService(Config())
+    try:
+        created = service.ensure_indexes()
+    finally:
+        service.disconnect()
+
+    for collection, names in created.items():
+        print(f"{collection}: {', '.join(names)}")
     print("Indexes created successfully")
 
 if __name__ == "__main__":
-    asyncio.run(create_indexes()) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Create the MongoDB indexes declared in the index registry")
+    parser.add_argument('--dry-run', action='store_true', help="List the registry without connecting")
+    args = parser.parse_args()
+    create_indexes(dry_run=args.dry_run)
@@ -22,19 +22,9 @@ wait_for_app() {
 echo "PATH: $PATH"
 which gunicorn || echo "gunicorn not found in PATH"
 
-# Start Gunicorn in the background
-gunicorn --bind :$PORT \
-    --workers 1 \
-    --threads 8 \
-    --timeout 0 \
-    --graceful-timeout 30 \
-    --keep-alive 2 \
-    --log-level info \
-    --access-logfile - \
-    --error-logfile - \
-    --capture-output \
-    --enable-stdio-inheritance \
-    "app:app" &
+# Start Gunicorn in the background; gunicorn.conf.py derives workers, threads,
+# worker class (SERVER_MODE) and admission limits from the container limits
+gunicorn --config gunicorn.conf.py &
 
 # Store the Gunicorn PID
 GUNICORN_PID=$!
@@ -2,16 +2,25 @@ from typing import Optional
 from .interfaces.auth import AuthService
 from .interfaces.database import DatabaseService
 from .interfaces.storage import StorageService
-from .implementations.auth.firebase_auth import FirebaseAuthService
-from .implementations.database.mongodb import MongoDBService
-from .implementations.storage.gcs import GCSStorageService
 from config.settings import Config
+from shared.middleware.metrics import instrument_service
+from shared.utils.startup_timing import timed
+import logging
+import threading
+
+# Provider implementations are imported inside the getters: firebase_admin,
+# pymongo/motor and google-cloud-storage are slow to import and only the
+# configured provider should pay that cost, on first use.
+
+logger = logging.getLogger(__name__)
 
 # Singleton instances
 _auth_service: Optional[AuthService] = None
 _database_service: Optional[DatabaseService] = None
 _storage_service: Optional[StorageService] = None
 _config: Optional[Config] = None
+# Held while constructing, so the pre-warm thread and a request never build a service twice
+_lock = threading.RLock()
 
 def get_config() -> Config:
     """Get or create Config instance"""
@@ -24,31 +33,110 @@ def get_auth_service() -> AuthService:
     """Get or create AuthService instance"""
     global _auth_service
     if _auth_service is None:
-        config = get_config()
-        if config.AUTH_PROVIDER == 'firebase':
-            _auth_service = FirebaseAuthService(config)
-        else:
-            raise ValueError(f"Unsupported auth provider: {config.AUTH_PROVIDER}")
+        with _lock:
+            if _auth_service is None:
+                config = get_config()
+                if config.AUTH_PROVIDER == 'firebase':
+                    with timed('import', 'firebase_auth'):
+                        from .implementations.auth.firebase_auth import FirebaseAuthService
+                    with timed('service', 'auth'):
+                        _auth_service = instrument_service(
+                            FirebaseAuthService(config), 'auth', config.METRICS_ENABLED
+                        )
+                else:
+                    raise ValueError(f"Unsupported auth provider: {config.AUTH_PROVIDER}")
     return _auth_service
 
 def get_database_service() -> DatabaseService:
     """Get or create DatabaseService instance"""
     global _database_service
     if _database_service is None:
-        config = get_config()
-        if config.DATABASE_PROVIDER == 'mongodb':
-            _database_service = MongoDBService(config)
-        else:
-            raise ValueError(f"Unsupported database provider: {config.DATABASE_PROVIDER}")
+        with _lock:
+            if _database_service is None:
+                config = get_config()
+                if config.DATABASE_PROVIDER == 'mongodb' and config.DATABASE_DRIVER == 'motor':
+                    with timed('import', 'mongodb_motor'):
+                        from .implementations.database.mongodb_motor import MotorDatabaseService
+                    with timed('service', 'database'):
+                        service = MotorDatabaseService(config)
+                elif config.DATABASE_PROVIDER == 'mongodb':
+                    with timed('import', 'mongodb'):
+                        from .implementations.database.mongodb import MongoDBService
+                    with timed('service', 'database'):
+                        service = MongoDBService(config)
+                else:
+                    raise ValueError(f"Unsupported database provider: {config.DATABASE_PROVIDER}")
+                if config.DATABASE_CACHE_ENABLED:
+                    from .implementations.database.caching import CachingDatabaseService, parse_cache_policies
+                    service = CachingDatabaseService(service, parse_cache_policies(config.DATABASE_CACHE_COLLECTIONS))
+                _database_service = instrument_service(service, 'database', config.METRICS_ENABLED)
     return _database_service
 
 def get_storage_service() -> StorageService:
     """Get or create StorageService instance"""
     global _storage_service
     if _storage_service is None:
-        config = get_config()
-        if config.STORAGE_PROVIDER == 'gcs':
-            _storage_service = GCSStorageService(config)
-        else:
-            raise ValueError(f"Unsupported storage provider: {config.STORAGE_PROVIDER}")
+        with _lock:
+            if _storage_service is None:
+                config = get_config()
+                if config.STORAGE_PROVIDER == 'gcs':
+                    with timed('import', 'gcs'):
+                        from .implementations.storage.gcs import GCSStorageService
+                    with timed('service', 'storage'):
+                        service = GCSStorageService(
+                            bucket_name=config.STORAGE_BUCKET_NAME,
+                            credentials_path=config.STORAGE_CREDENTIALS_PATH,
+                            project_id=config.STORAGE_PROJECT_ID,
+                            chunk_size=config.STORAGE_UPLOAD_CHUNK_SIZE,
+                            max_recoveries=config.STORAGE_UPLOAD_MAX_RECOVERIES,
+                            max_concurrency=config.STORAGE_MAX_CONCURRENCY,
+                            url_expiration=config.STORAGE_SIGNED_URL_EXPIRATION,
+                            url_cache_size=config.STORAGE_SIGNED_URL_CACHE_SIZE
+                        )
+                    _storage_service = instrument_service(service, 'storage', config.METRICS_ENABLED)
+                else:
+                    raise ValueError(f"Unsupported storage provider: {config.STORAGE_PROVIDER}")
     return _storage_service
+
+def reset_services() -> None:
+    """
+    Forget the service singletons so they are rebuilt on next use.
+
+    Called in each gunicorn worker after fork when the app is preloaded:
+    MongoDB clients and HTTP sessions created in the master must not be
+    shared with the children.
+    """
+    global _auth_service, _database_service, _storage_service
+    with _lock:
+        _auth_service = None
+        _database_service = None
+        _storage_service = None
+
+def prewarm_services() -> None:
+    """
+    Construct every configured service and open the database pool.
+
+    Meant to run on a background thread once the server is accepting
+    connections, so the first real request does not pay for initialisation.
+    Failures are logged; the getters will retry on first use.
+    """
+    config = get_config()
+    steps = [('auth', get_auth_service), ('database', get_database_service)]
+    if config.STORAGE_BUCKET_NAME:
+        steps.append(('storage', get_storage_service))
+    for name, getter in steps:
+        try:
+            getter()
+        except Exception as e:
+            logger.warning(f"Pre-warming {name} service failed: {str(e)}")
+    warm_up_database()
+
+def warm_up_database() -> None:
+    """Open the database pool and round-trip once (DATABASE_WARMUP); failures are logged"""
+    try:
+        db_service = get_database_service()
+        if hasattr(db_service, 'warm_up'):
+            with timed('prewarm', 'database_pool'):
+                db_service.warm_up()
+    except Exception as e:
+        logger.warning(f"Database warm-up failed: {str(e)}")
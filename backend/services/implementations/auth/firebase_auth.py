@@ -1,10 +1,16 @@
-from typing import Optional, Dict
+from typing import Optional, Dict, Any
 import firebase_admin
 from firebase_admin import auth, credentials
+import google.oauth2.id_token
+from google.auth import jwt
 from ...interfaces.auth import AuthService
+from .public_keys import PublicKeyCache, ID_TOKEN_CERT_URI
+from shared.utils.ttl_cache import TTLCache
 from config.settings import Config
+import hashlib
 import logging
 import os
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +19,8 @@ class FirebaseAuthService(AuthService):
         """Initialize Firebase Auth Service with config"""
         self.config = config
         self.project_id = config.AUTH_PROJECT_ID
+        self.token_cache = TTLCache(max_size=config.AUTH_TOKEN_CACHE_SIZE, clock=time.time)
+        self.public_keys = PublicKeyCache(refresh_margin=config.AUTH_PUBLIC_KEY_REFRESH_MARGIN)
         
         try:
             # Try to get existing app
@@ -35,22 +43,64 @@ class FirebaseAuthService(AuthService):
                 raise
 
     def verify_token(self, token: str) -> Optional[Dict]:
-        """Verify Firebase ID token"""
+        """Verify Firebase ID token, serving repeat tokens from the local cache"""
         try:
             if not token:
                 return None
-                
-            decoded_token = auth.verify_id_token(token)
-            return {
+
+            cache_key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+            user = self.token_cache.get(cache_key)
+            if user is not None:
+                return user
+
+            decoded_token = self._verify_id_token(token)
+            user = {
                 'user_id': decoded_token['uid'],
                 'email': decoded_token.get('email'),
                 'name': decoded_token.get('name'),
                 'picture': decoded_token.get('picture')
             }
+            # Never keep a token around longer than it is valid
+            self.token_cache.set(cache_key, user, expires_at=decoded_token['exp'])
+            return user
         except Exception as e:
-            print(f"Token verification error: {str(e)}")
+            logger.warning(f"Token verification error: {str(e)}")
             return None
 
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters of the verified-token cache"""
+        return self.token_cache.stats()
+
+    def _verify_id_token(self, token: str) -> Dict[str, Any]:
+        """
+        Verify the token signature and Firebase claims against the in-process key cache.
+
+        Mirrors the checks made by firebase_admin.auth.verify_id_token, which would
+        otherwise fetch Google's certificates through its own HTTP cache.
+        """
+        if os.environ.get('FIREBASE_AUTH_EMULATOR_HOST'):
+            return auth.verify_id_token(token)
+
+        header = jwt.decode_header(token)
+        if not header.get('kid'):
+            raise ValueError('Firebase ID token has no "kid" claim')
+        if header.get('alg') != 'RS256':
+            raise ValueError(f"Firebase ID token has incorrect algorithm: {header.get('alg')}")
+
+        claims = google.oauth2.id_token.verify_token(
+            token,
+            request=self.public_keys,
+            audience=self.project_id,
+            certs_url=ID_TOKEN_CERT_URI
+        )
+        if claims.get('iss') != f"https://securetoken.google.com/{self.project_id}":
+            raise ValueError(f"Firebase ID token has incorrect issuer: {claims.get('iss')}")
+        subject = claims.get('sub')
+        if not subject or not isinstance(subject, str) or len(subject) > 128:
+            raise ValueError('Firebase ID token has an invalid "sub" claim')
+        claims['uid'] = subject
+        return claims
+
     async def create_user(self, email: str, password: str) -> Dict:
         try:
             user = auth.create_user(
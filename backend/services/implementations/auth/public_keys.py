@@ -0,0 +1,114 @@
+from typing import Callable, Optional
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Google's signing certificates for Firebase ID tokens
+ID_TOKEN_CERT_URI = 'https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com'
+
+_MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class _CachedResponse:
+    """Minimal google.auth.transport.Response carrying the cached certificate body"""
+
+    def __init__(self, data: bytes):
+        self.status = 200
+        self.headers = {}
+        self.data = data
+
+
+class PublicKeyCache:
+    """
+    In-process cache of Google's public signing certificates.
+
+    Instances are callable like a ``google.auth.transport.Request`` so they can be
+    passed straight to ``google.oauth2.id_token.verify_token``. Certificates are
+    refreshed by a daemon thread shortly before their Cache-Control max-age runs
+    out, so token verification never waits on the network after the first fetch.
+    """
+
+    def __init__(self, cert_url: str = ID_TOKEN_CERT_URI, refresh_margin: float = 300,
+                 retry_interval: float = 30, fetch: Optional[Callable[[str], tuple]] = None):
+        """
+        Initialize the key cache
+
+        Args:
+            cert_url: Certificate endpoint to fetch
+            refresh_margin: Seconds before expiry at which the background refresh runs
+            retry_interval: Seconds to wait before retrying a failed refresh
+            fetch: Optional callable returning (body, max_age) for a URL, used in tests
+        """
+        self.cert_url = cert_url
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._fetch = fetch or self._fetch_from_google
+        self._data: Optional[bytes] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_pid: Optional[int] = None
+
+    def __call__(self, url: str, method: str = 'GET', **kwargs) -> _CachedResponse:
+        """Serve the certificate endpoint from memory"""
+        if url != self.cert_url:
+            raise ValueError(f"PublicKeyCache only serves {self.cert_url}")
+        return _CachedResponse(self.get_certs())
+
+    def get_certs(self) -> bytes:
+        """Return the cached certificate JSON, fetching synchronously only when absent or stale"""
+        if self._data is None or time.time() >= self._expires_at:
+            with self._lock:
+                if self._data is None or time.time() >= self._expires_at:
+                    self.refresh()
+        self._ensure_refresher()
+        return self._data
+
+    def refresh(self) -> None:
+        """Fetch the certificates and record their expiry"""
+        body, max_age = self._fetch(self.cert_url)
+        json.loads(body)  # Reject malformed payloads before replacing good keys
+        self._data = body
+        self._expires_at = time.time() + max_age
+        logger.info(f"Refreshed Google public keys, valid for {max_age}s")
+
+    def _ensure_refresher(self) -> None:
+        # Threads do not survive fork, so each worker process starts its own
+        pid = os.getpid()
+        if self._refresher is not None and self._refresher_pid == pid and self._refresher.is_alive():
+            return
+        with self._lock:
+            if self._refresher is not None and self._refresher_pid == pid and self._refresher.is_alive():
+                return
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name='public-key-refresh', daemon=True
+            )
+            self._refresher_pid = pid
+            self._refresher.start()
+
+    def _refresh_loop(self) -> None:
+        while True:
+            delay = max(self._expires_at - time.time() - self.refresh_margin, 1)
+            time.sleep(delay)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Background public key refresh failed: {str(e)}")
+                time.sleep(self.retry_interval)
+
+    @staticmethod
+    def _fetch_from_google(url: str) -> tuple:
+        from google.auth.transport.requests import Request
+
+        response = Request()(url, method='GET')
+        if response.status != 200:
+            raise ValueError(f"Could not fetch certificates at {url}: HTTP {response.status}")
+        cache_control = response.headers.get('Cache-Control', '')
+        match = _MAX_AGE_PATTERN.search(cache_control)
+        max_age = int(match.group(1)) if match else 3600
+        return response.data, max_age
@@ -0,0 +1,75 @@
+from typing import Any, Dict, List
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+
+def to_write_model(operation: Dict[str, Any]):
+    """Translate a DatabaseService bulk operation into a pymongo write model"""
+    op = operation.get('op')
+    if op == 'insert_one':
+        return InsertOne(operation['document'])
+    if op == 'update_one':
+        return UpdateOne(operation['filter'], {'$set': operation['update']},
+                         upsert=operation.get('upsert', False))
+    if op == 'update_many':
+        return UpdateMany(operation['filter'], {'$set': operation['update']},
+                          upsert=operation.get('upsert', False))
+    if op == 'replace_one':
+        return ReplaceOne(operation['filter'], operation['replacement'],
+                          upsert=operation.get('upsert', False))
+    if op == 'delete_one':
+        return DeleteOne(operation['filter'])
+    if op == 'delete_many':
+        return DeleteMany(operation['filter'])
+    raise ValueError(f"Unsupported bulk operation: {op}")
+
+
+def new_bulk_result() -> Dict[str, Any]:
+    """Empty aggregate result for a chunked bulk write"""
+    return {
+        'inserted_count': 0,
+        'matched_count': 0,
+        'modified_count': 0,
+        'deleted_count': 0,
+        'upserted_count': 0,
+        'inserted_ids': [],
+        'upserted_ids': {},
+        'errors': [],
+        'chunks': 0
+    }
+
+
+def merge_bulk_result(total: Dict[str, Any], details: Dict[str, Any], offset: int,
+                      chunk: List[Dict[str, Any]], ordered: bool) -> None:
+    """
+    Fold one chunk's server reply into the aggregate result.
+
+    Args:
+        total: Aggregate result from new_bulk_result
+        details: BulkWriteResult.bulk_api_result or BulkWriteError.details
+        offset: Index of the chunk's first operation in the whole input
+        chunk: The operations sent in this chunk
+        ordered: Whether the server stopped at the first error
+    """
+    total['chunks'] += 1
+    total['inserted_count'] += details.get('nInserted', 0)
+    total['matched_count'] += details.get('nMatched', 0)
+    total['modified_count'] += details.get('nModified', 0)
+    total['deleted_count'] += details.get('nRemoved', 0)
+    total['upserted_count'] += details.get('nUpserted', 0)
+    for upserted in details.get('upserted', []):
+        total['upserted_ids'][offset + upserted['index']] = str(upserted['_id'])
+
+    failed = set()
+    for error in details.get('writeErrors', []):
+        failed.add(error['index'])
+        total['errors'].append({
+            'index': offset + error['index'],
+            'code': error.get('code'),
+            'message': error.get('errmsg')
+        })
+
+    # Ordered writes stop at the first error; nothing after it was attempted
+    executed = min(failed) if ordered and failed else len(chunk)
+    for index, operation in enumerate(chunk[:executed]):
+        if operation.get('op') == 'insert_one' and index not in failed:
+            total['inserted_ids'].append(str(operation['document']['_id']))
@@ -0,0 +1,166 @@
+from typing import Any, Dict, Iterable, Optional, Tuple
+from bson import json_util
+from ...interfaces.database import DatabaseService
+from shared.utils.ttl_cache import TTLCache
+import copy
+import inspect
+
+_MISSING = object()
+
+
+def parse_cache_policies(spec: str) -> Dict[str, Tuple[float, int]]:
+    """
+    Parse DATABASE_CACHE_COLLECTIONS.
+
+    Format: "collection:ttl_seconds:max_entries;..." e.g. "users:60:10000;currencies:3600:500"
+    """
+    policies = {}
+    for item in filter(None, (part.strip() for part in spec.split(';'))):
+        try:
+            collection, ttl, max_size = item.split(':')
+            policies[collection.strip()] = (float(ttl), int(max_size))
+        except ValueError:
+            raise ValueError(f"Invalid cache policy '{item}', expected collection:ttl_seconds:max_entries")
+    return policies
+
+
+class CachingDatabaseService(DatabaseService):
+    """
+    Read-through cache in front of any DatabaseService.
+
+    find_one and find_user_by_email results are cached per collection with a
+    TTL and LRU bound. Any write issued through this service clears the cache
+    of the collection it touches and bumps its generation, so a read that
+    raced the write cannot store a stale result. Writes from other processes
+    become visible when entries expire.
+    Works with both blocking and async implementations.
+    """
+
+    def __init__(self, inner: DatabaseService, policies: Dict[str, Tuple[float, int]]):
+        """
+        Args:
+            inner: The DatabaseService to wrap
+            policies: collection -> (ttl_seconds, max_entries); other collections are not cached
+        """
+        self.inner = inner
+        self.caches = {
+            collection: TTLCache(max_size=max_size, default_ttl=ttl)
+            for collection, (ttl, max_size) in policies.items()
+        }
+        self._generations = {collection: 0 for collection in self.caches}
+
+    def __getattr__(self, name: str) -> Any:
+        # Expose implementation extras (warm_up, get_pool_stats, ...) of the wrapped service
+        if name == 'inner':
+            raise AttributeError(name)
+        return getattr(self.inner, name)
+
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return hit/miss counters per cached collection"""
+        return {collection: cache.stats() for collection, cache in self.caches.items()}
+
+    def invalidate(self, collection: str) -> None:
+        """Drop every cached entry for a collection"""
+        cache = self.caches.get(collection)
+        if cache is not None:
+            self._generations[collection] += 1
+            cache.clear()
+
+    def connect(self) -> None:
+        return self.inner.connect()
+
+    def disconnect(self) -> None:
+        return self.inner.disconnect()
+
+    def find_one(self, collection: str, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Find a single document, served from cache when possible"""
+        cache = self.caches.get(collection)
+        if cache is None:
+            return self.inner.find_one(collection, query)
+        key = ('find_one', json_util.dumps(query, sort_keys=True))
+        cached = cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return self._resolved(copy.deepcopy(cached), getattr(type(self.inner), 'find_one', None))
+        return self._store(collection, key, self.inner.find_one(collection, query))
+
+    def find_many(self, collection: str, query: Dict[str, Any], **kwargs) -> Any:
+        return self.inner.find_many(collection, query, **kwargs)
+
+    def iter_many(self, collection: str, query: Dict[str, Any], **kwargs) -> Any:
+        return self.inner.iter_many(collection, query, **kwargs)
+
+    def insert_one(self, collection: str, document: Dict[str, Any]) -> Any:
+        return self._write(collection, self.inner.insert_one, collection, document)
+
+    def insert_many(self, collection: str, documents: Iterable[Dict[str, Any]], ordered: bool = False) -> Any:
+        return self._write(collection, self.inner.insert_many, collection, documents, ordered=ordered)
+
+    def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+                   upsert: bool = False) -> Any:
+        return self._write(collection, self.inner.update_one, collection, query, update, upsert=upsert)
+
+    def update_many(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+                    upsert: bool = False) -> Any:
+        return self._write(collection, self.inner.update_many, collection, query, update, upsert=upsert)
+
+    def bulk_write(self, collection: str, operations: Iterable[Dict[str, Any]], ordered: bool = True) -> Any:
+        return self._write(collection, self.inner.bulk_write, collection, operations, ordered=ordered)
+
+    def delete_one(self, collection: str, query: Dict[str, Any]) -> Any:
+        return self._write(collection, self.inner.delete_one, collection, query)
+
+    async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Find a user by email, served from the users cache when possible"""
+        cache = self.caches.get('users')
+        if cache is None:
+            return await self.inner.find_user_by_email(email)
+        key = ('find_user_by_email', email)
+        cached = cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return copy.deepcopy(cached)
+        return await self._store('users', key, self.inner.find_user_by_email(email))
+
+    async def create_user(self, user_data: Dict[str, Any]) -> str:
+        """Create a new user"""
+        self.invalidate('users')
+        try:
+            return await self.inner.create_user(user_data)
+        finally:
+            self.invalidate('users')
+
+    def _write(self, collection: str, method, *args, **kwargs) -> Any:
+        # Invalidate before and after, so a read racing the write cannot repopulate stale data
+        self.invalidate(collection)
+        result = method(*args, **kwargs)
+        if inspect.isawaitable(result):
+            async def finish():
+                try:
+                    return await result
+                finally:
+                    self.invalidate(collection)
+            return finish()
+        self.invalidate(collection)
+        return result
+
+    def _store(self, collection: str, key: Tuple, result: Any) -> Any:
+        generation = self._generations[collection]
+
+        def remember(value):
+            if self._generations[collection] == generation:
+                self.caches[collection].set(key, copy.deepcopy(value))
+            return value
+
+        if inspect.isawaitable(result):
+            async def finish():
+                return remember(await result)
+            return finish()
+        return remember(result)
+
+    @staticmethod
+    def _resolved(value: Any, method) -> Any:
+        # Keep the wrapped method's calling convention on a cache hit
+        if inspect.iscoroutinefunction(method):
+            async def resolved():
+                return value
+            return resolved()
+        return value
@@ -0,0 +1,88 @@
+from typing import Any, Dict
+from pymongo import monitoring
+from config.settings import Config
+import threading
+
+
+def build_client_options(config: Config) -> Dict[str, Any]:
+    """Build MongoClient/AsyncIOMotorClient keyword arguments from Config"""
+    options = {
+        'maxPoolSize': config.DATABASE_MAX_POOL_SIZE,
+        'minPoolSize': config.DATABASE_MIN_POOL_SIZE,
+        'maxIdleTimeMS': config.DATABASE_MAX_IDLE_TIME_MS,
+        'serverSelectionTimeoutMS': config.DATABASE_SERVER_SELECTION_TIMEOUT_MS,
+        'connectTimeoutMS': config.DATABASE_CONNECT_TIMEOUT_MS,
+        'appname': 'universal-matching-api'
+    }
+    if config.DATABASE_WAIT_QUEUE_TIMEOUT_MS:
+        options['waitQueueTimeoutMS'] = config.DATABASE_WAIT_QUEUE_TIMEOUT_MS
+    if config.DATABASE_COMPRESSORS:
+        # Unavailable compressors (missing zstandard/python-snappy) are dropped by the driver with a warning
+        options['compressors'] = config.DATABASE_COMPRESSORS
+    return options
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Tracks connection pool usage from CMAP events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of the pool counters"""
+        with self._lock:
+            return {
+                'open': self.open,
+                'checked_out': self.checked_out,
+                'available': max(self.open - self.checked_out, 0),
+                'waiting': self.waiting,
+                'checkout_failures': self.checkout_failures,
+                'pools_cleared': self.pools_cleared
+            }
+
+    def connection_check_out_started(self, event) -> None:
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event) -> None:
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event) -> None:
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event) -> None:
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event) -> None:
+        with self._lock:
+            self.open -= 1
+
+    def pool_cleared(self, event) -> None:
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event) -> None:
+        pass
+
+    def pool_ready(self, event) -> None:
+        pass
+
+    def pool_closed(self, event) -> None:
+        pass
+
+    def connection_ready(self, event) -> None:
+        pass
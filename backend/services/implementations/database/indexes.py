@@ -0,0 +1,88 @@
+from typing import Any, Dict, Iterator, List, Tuple
+import importlib
+
+# Declarative index registry: collection name -> index specifications.
+# Each spec takes the keyword arguments of pymongo.IndexModel plus 'keys'.
+INDEXES: Dict[str, List[Dict[str, Any]]] = {
+    'users': [
+        {'keys': [('email', 1)], 'unique': True, 'name': 'email_unique'}
+    ]
+}
+
+# Modules that declare their collections' indexes on import with
+# register_indexes; loaded before the registry is read, so
+# scripts/create_indexes.py and DATABASE_ENSURE_INDEXES see every collection
+INDEX_MODULES = (
+    'apps.app1.services.file_service',
+    'apps.jobs.services.job_queue',
+    'apps.matching.services.matching_service',
+    'apps.parser.services.parser_service',
+)
+
+
+class UnindexedQueryError(RuntimeError):
+    """Raised in strict explain mode when a query falls back to a collection scan"""
+
+
+def register_indexes(collection: str, *specs: Dict[str, Any]) -> None:
+    """Declare indexes for a collection, replacing specs with the same name"""
+    existing = {spec['name']: spec for spec in INDEXES.get(collection, [])}
+    for spec in specs:
+        existing[spec['name']] = spec
+    INDEXES[collection] = list(existing.values())
+
+
+def registered_indexes() -> Dict[str, List[Dict[str, Any]]]:
+    """The index registry, once every module in INDEX_MODULES has declared its indexes"""
+    for module in INDEX_MODULES:
+        importlib.import_module(module)
+    return INDEXES
+
+
+def index_models() -> Dict[str, List['IndexModel']]:
+    """Build pymongo IndexModels for every registered collection"""
+    # Imported here: declaring indexes must not pull pymongo into app start-up
+    from pymongo import IndexModel
+    models = {}
+    for collection, specs in registered_indexes().items():
+        models[collection] = [
+            IndexModel(spec['keys'], **{k: v for k, v in spec.items() if k != 'keys'})
+            for spec in specs
+        ]
+    return models
+
+
+def is_duplicate_key(error: Exception) -> bool:
+    """Whether a write failed on a unique index"""
+    from pymongo.errors import DuplicateKeyError
+    return isinstance(error, DuplicateKeyError)
+
+
+def iter_plan_stages(plan: Dict[str, Any]) -> Iterator[str]:
+    """Yield every stage name in an explain() plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        yield plan['stage']
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            yield from iter_plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        yield from iter_plan_stages(child)
+
+
+def uses_collection_scan(explain: Dict[str, Any]) -> bool:
+    """Whether the winning plan of an explain() result contains a COLLSCAN"""
+    winning_plan = explain.get('queryPlanner', {}).get('winningPlan', {})
+    return 'COLLSCAN' in iter_plan_stages(winning_plan)
+
+
+def query_shape(collection: str, query: Dict[str, Any], sort: Any = None) -> Tuple:
+    """Value-independent key identifying a query pattern"""
+    def shape(value):
+        if isinstance(value, dict):
+            return tuple(sorted((k, shape(v)) for k, v in value.items()))
+        if isinstance(value, (list, tuple)) and any(isinstance(v, dict) for v in value):
+            return tuple(shape(v) for v in value)
+        return None
+    return collection, shape(query), tuple(field for field, _ in (sort or []))
@@ -1,8 +1,15 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any
 from pymongo import MongoClient
-from ...interfaces.database import DatabaseService
+from pymongo.errors import BulkWriteError
+from ...interfaces.database import DatabaseService, SortSpec
+from .bulk import to_write_model, new_bulk_result, merge_bulk_result
+from .client_options import build_client_options, PoolStatsListener
+from .indexes import index_models, query_shape, uses_collection_scan, UnindexedQueryError
 from config.settings import Config
+from shared.utils.iterables import chunked
 import logging
+import os
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -12,20 +19,91 @@ class MongoDBService(DatabaseService):
         self.config = config
         self.client = None
         self.db = None
+        self.pool_stats = PoolStatsListener()
+        self._pid = None
+        self._explained_shapes = set()
+        self.collection_scans: List[Dict[str, Any]] = []
 
     def connect(self) -> None:
         """Connect to MongoDB"""
         try:
+            if self.client and self._pid != os.getpid():
+                # A client inherited across fork shares sockets with the parent;
+                # abandon it without closing and build one for this worker
+                logger.info("Discarding MongoDB client inherited from parent process")
+                self.client = None
+                self.db = None
+                self.pool_stats = PoolStatsListener()
             if not self.client:
-                self.client = MongoClient(self.config.DATABASE_CONNECTION_STRING)
+                self.client = MongoClient(
+                    self.config.DATABASE_CONNECTION_STRING,
+                    event_listeners=[self.pool_stats],
+                    **build_client_options(self.config)
+                )
                 self.db = self.client[self.config.DATABASE_NAME]
-                # Test connection
-                self.client.admin.command('ping')
+                self._pid = os.getpid()
                 logger.info("MongoDB connection initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize MongoDB connection: {str(e)}", exc_info=True)
             raise
 
+    def warm_up(self) -> None:
+        """Connect and round-trip once so the first request does not pay for it"""
+        started = time.perf_counter()
+        self._ensure_connected()
+        self.client.admin.command('ping')
+        logger.info(f"MongoDB warm-up completed in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def get_client(self) -> MongoClient:
+        """Return the connected client for this process"""
+        self._ensure_connected()
+        return self.client
+
+    def get_connection_string(self) -> str:
+        """Return the configured connection string"""
+        return self.config.DATABASE_CONNECTION_STRING
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool usage and limits"""
+        stats = self.pool_stats.stats()
+        stats['max_pool_size'] = self.config.DATABASE_MAX_POOL_SIZE
+        stats['min_pool_size'] = self.config.DATABASE_MIN_POOL_SIZE
+        return stats
+
+    def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Create every index in the registry; existing identical indexes are left untouched"""
+        try:
+            self._ensure_connected()
+            created = {}
+            for collection, models in index_models().items():
+                created[collection] = self.db[collection].create_indexes(models)
+                logger.info(f"Indexes ensured on {collection}: {created[collection]}")
+            return created
+        except Exception as e:
+            logger.error(f"MongoDB ensure_indexes error: {str(e)}", exc_info=True)
+            raise
+
+    def _ensure_connected(self) -> None:
+        if not self.client or self._pid != os.getpid():
+            self.connect()
+
+    def _check_query_plan(self, collection: str, query: Dict, sort: Optional[SortSpec] = None) -> None:
+        """In explain mode, flag query shapes whose winning plan is a collection scan"""
+        if not self.config.DATABASE_EXPLAIN_QUERIES:
+            return
+        shape = query_shape(collection, query, sort)
+        if shape in self._explained_shapes:
+            return
+        self._explained_shapes.add(shape)
+        explain = self.db[collection].find(query, sort=sort).explain()
+        if not uses_collection_scan(explain):
+            return
+        self.collection_scans.append({'collection': collection, 'query': query, 'sort': sort})
+        message = f"Unindexed query on {collection} (COLLSCAN): filter={query} sort={sort}"
+        if self.config.DATABASE_EXPLAIN_STRICT:
+            raise UnindexedQueryError(message)
+        logger.warning(message)
+
     def disconnect(self) -> None:
         """Disconnect from MongoDB"""
         try:
@@ -41,50 +119,98 @@ class MongoDBService(DatabaseService):
     def find_one(self, collection: str, query: Dict) -> Optional[Dict]:
         """Find a single document"""
         try:
-            if not self.client:
-                self.connect()
+            self._ensure_connected()
+            self._check_query_plan(collection, query)
             return self.db[collection].find_one(query)
         except Exception as e:
             logger.error(f"MongoDB find_one error: {str(e)}", exc_info=True)
             raise
 
-    def find_many(self, collection: str, query: Dict) -> List[Dict]:
+    def find_many(self, collection: str, query: Dict, projection: Optional[Dict] = None,
+                  sort: Optional[SortSpec] = None, limit: int = 0, skip: int = 0) -> List[Dict]:
         """Find multiple documents"""
+        return list(self.iter_many(collection, query, projection=projection, sort=sort,
+                                   limit=limit, skip=skip))
+
+    def iter_many(self, collection: str, query: Dict, projection: Optional[Dict] = None,
+                  sort: Optional[SortSpec] = None, batch_size: Optional[int] = None,
+                  limit: int = 0, skip: int = 0, after: Any = None) -> Iterator[Dict]:
+        """Stream matching documents one driver batch at a time"""
         try:
-            if not self.client:
-                self.connect()
-            return list(self.db[collection].find(query))
+            self._ensure_connected()
+            query, sort = self.keyset_query(query, sort, after)
+            self._check_query_plan(collection, query, sort)
+            cursor = self.db[collection].find(
+                query, projection, sort=sort, limit=limit, skip=skip, batch_size=batch_size or 0
+            )
+            with cursor:
+                yield from cursor
         except Exception as e:
-            logger.error(f"MongoDB find_many error: {str(e)}", exc_info=True)
+            logger.error(f"MongoDB iter_many error: {str(e)}", exc_info=True)
             raise
 
     def insert_one(self, collection: str, document: Dict) -> str:
         """Insert a single document"""
         try:
-            if not self.client:
-                self.connect()
+            self._ensure_connected()
             result = self.db[collection].insert_one(document)
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"MongoDB insert_one error: {str(e)}", exc_info=True)
             raise
 
-    def update_one(self, collection: str, query: Dict, update: Dict) -> bool:
+    def insert_many(self, collection: str, documents: Iterable[Dict], ordered: bool = False) -> Dict:
+        """Insert documents in chunks, reporting per-document errors"""
+        operations = ({'op': 'insert_one', 'document': document} for document in documents)
+        return self.bulk_write(collection, operations, ordered=ordered)
+
+    def update_one(self, collection: str, query: Dict, update: Dict, upsert: bool = False) -> bool:
         """Update a single document"""
         try:
-            if not self.client:
-                self.connect()
-            result = self.db[collection].update_one(query, {"$set": update})
-            return result.modified_count > 0
+            self._ensure_connected()
+            result = self.db[collection].update_one(query, {"$set": update}, upsert=upsert)
+            return result.modified_count > 0 or result.upserted_id is not None
         except Exception as e:
             logger.error(f"MongoDB update_one error: {str(e)}", exc_info=True)
             raise
 
+    def update_many(self, collection: str, query: Dict, update: Dict, upsert: bool = False) -> int:
+        """Update all matching documents"""
+        try:
+            self._ensure_connected()
+            result = self.db[collection].update_many(query, {"$set": update}, upsert=upsert)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"MongoDB update_many error: {str(e)}", exc_info=True)
+            raise
+
+    def bulk_write(self, collection: str, operations: Iterable[Dict], ordered: bool = True) -> Dict:
+        """Apply write operations in chunks of DATABASE_BULK_CHUNK_SIZE"""
+        try:
+            self._ensure_connected()
+            result = new_bulk_result()
+            offset = 0
+            for chunk in chunked(operations, self.config.DATABASE_BULK_CHUNK_SIZE):
+                requests = [to_write_model(operation) for operation in chunk]
+                try:
+                    details = self.db[collection].bulk_write(requests, ordered=ordered).bulk_api_result
+                except BulkWriteError as e:
+                    details = e.details
+                merge_bulk_result(result, details, offset, chunk, ordered)
+                offset += len(chunk)
+                if ordered and details.get('writeErrors'):
+                    break
+            if result['errors']:
+                logger.warning(f"MongoDB bulk_write on {collection}: {len(result['errors'])} failed operations")
+            return result
+        except Exception as e:
+            logger.error(f"MongoDB bulk_write error: {str(e)}", exc_info=True)
+            raise
+
     def delete_one(self, collection: str, query: Dict) -> bool:
         """Delete a single document"""
         try:
-            if not self.client:
-                self.connect()
+            self._ensure_connected()
             result = self.db[collection].delete_one(query)
             return result.deleted_count > 0
         except Exception as e:
@@ -94,8 +220,8 @@ class MongoDBService(DatabaseService):
     async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Find a user by email"""
         try:
-            if not self.client:
-                self.connect()
+            self._ensure_connected()
+            self._check_query_plan("users", {"email": email})
             return self.db["users"].find_one({"email": email})
         except Exception as e:
             logger.error(f"MongoDB find_user_by_email error: {str(e)}", exc_info=True)
@@ -104,8 +230,7 @@ class MongoDBService(DatabaseService):
     async def create_user(self, user_data: Dict[str, Any]) -> str:
         """Create a new user"""
         try:
-            if not self.client:
-                self.connect()
+            self._ensure_connected()
             result = self.db["users"].insert_one(user_data)
             return str(result.inserted_id)
         except Exception as e:
@@ -0,0 +1,269 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Any, TypeVar
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCursor, AsyncIOMotorDatabase
+from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
+from ...interfaces.database import DatabaseService, SortSpec
+from .bulk import to_write_model, new_bulk_result, merge_bulk_result
+from .client_options import build_client_options, PoolStatsListener
+from .indexes import index_models
+from config.settings import Config
+from shared.utils.iterables import chunked
+import asyncio
+import functools
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Motor clients bind to the event loop they are created on, while Flask's
+# async views run each request on a loop of its own. Each process therefore
+# runs one long-lived loop on a daemon thread and holds exactly one client
+# and pool on it; callers on any other loop hand their operations over.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_client: Optional[AsyncIOMotorClient] = None
+_pool_stats: Optional[PoolStatsListener] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+# Documents fetched per hand-over when iter_many is given no batch_size (the server's first batch)
+_DEFAULT_BATCH_SIZE = 101
+
+
+def get_shared_client(config: Config) -> AsyncIOMotorClient:
+    """Get or create this process's Motor client, bound to its loop thread"""
+    global _loop, _client, _pool_stats, _client_pid
+    with _client_lock:
+        if _client_pid != os.getpid():
+            # The client and loop thread inherited across fork are unusable; never close them from the child
+            _loop = _client = _pool_stats = None
+            _client_pid = os.getpid()
+        if _client is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name='motor-loop', daemon=True).start()
+            _pool_stats = PoolStatsListener()
+            _client = AsyncIOMotorClient(
+                config.DATABASE_CONNECTION_STRING,
+                io_loop=_loop,
+                event_listeners=[_pool_stats],
+                **build_client_options(config)
+            )
+        return _client
+
+
+def close_shared_clients() -> None:
+    """Close the Motor client owned by this process and stop its loop thread"""
+    global _loop, _client, _pool_stats
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+            _loop.call_soon_threadsafe(_loop.stop)
+        _loop = _client = _pool_stats = None
+
+
+async def run_on_client_loop(config: Config, operation: Callable[[], Awaitable[T]]) -> T:
+    """Await operation() on the shared client's loop, from whichever loop is running"""
+    get_shared_client(config)
+    loop = _loop
+    if asyncio.get_running_loop() is loop:
+        return await operation()
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(operation(), loop))
+
+
+def on_client_loop(method: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+    """Run a MotorDatabaseService coroutine method on the shared client's loop"""
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        return await run_on_client_loop(self.config, lambda: method(self, *args, **kwargs))
+    return wrapper
+
+
+class MotorDatabaseService(DatabaseService):
+    def __init__(self, config: Config):
+        """Initialize non-blocking MongoDB service"""
+        self.config = config
+
+    @property
+    def db(self) -> AsyncIOMotorDatabase:
+        """Database handle on this process's shared client"""
+        return get_shared_client(self.config)[self.config.DATABASE_NAME]
+
+    def get_client(self) -> MongoClient:
+        """Return the synchronous driver client under the shared Motor client; it shares the pool"""
+        return get_shared_client(self.config).delegate
+
+    def get_connection_string(self) -> str:
+        """Return the configured connection string"""
+        return self.config.DATABASE_CONNECTION_STRING
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Return connection pool usage and limits"""
+        get_shared_client(self.config)
+        stats = _pool_stats.stats()
+        stats['max_pool_size'] = self.config.DATABASE_MAX_POOL_SIZE
+        stats['min_pool_size'] = self.config.DATABASE_MIN_POOL_SIZE
+        return stats
+
+    @on_client_loop
+    async def connect(self) -> None:
+        """Connect to MongoDB"""
+        try:
+            await self.db.client.admin.command('ping')
+            logger.info("MongoDB (motor) connection initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize MongoDB connection: {str(e)}", exc_info=True)
+            raise
+
+    async def disconnect(self) -> None:
+        """Disconnect from MongoDB"""
+        try:
+            close_shared_clients()
+            logger.info("MongoDB (motor) connections closed")
+        except Exception as e:
+            logger.error(f"Error closing MongoDB connection: {str(e)}", exc_info=True)
+            raise
+
+    @on_client_loop
+    async def ensure_indexes(self) -> Dict[str, List[str]]:
+        """Create every index in the registry; existing identical indexes are left untouched"""
+        try:
+            created = {}
+            for collection, models in index_models().items():
+                created[collection] = await self.db[collection].create_indexes(models)
+                logger.info(f"Indexes ensured on {collection}: {created[collection]}")
+            return created
+        except Exception as e:
+            logger.error(f"MongoDB ensure_indexes error: {str(e)}", exc_info=True)
+            raise
+
+    @on_client_loop
+    async def find_one(self, collection: str, query: Dict) -> Optional[Dict]:
+        """Find a single document"""
+        try:
+            return await self.db[collection].find_one(query)
+        except Exception as e:
+            logger.error(f"MongoDB find_one error: {str(e)}", exc_info=True)
+            raise
+
+    async def find_many(self, collection: str, query: Dict, projection: Optional[Dict] = None,
+                        sort: Optional[SortSpec] = None, limit: int = 0, skip: int = 0) -> List[Dict]:
+        """Find multiple documents"""
+        return [doc async for doc in self.iter_many(collection, query, projection=projection,
+                                                    sort=sort, limit=limit, skip=skip)]
+
+    async def iter_many(self, collection: str, query: Dict, projection: Optional[Dict] = None,
+                        sort: Optional[SortSpec] = None, batch_size: Optional[int] = None,
+                        limit: int = 0, skip: int = 0, after: Any = None) -> AsyncIterator[Dict]:
+        """Stream matching documents, fetched on the client's loop a batch at a time"""
+        cursor = None
+        length = batch_size or _DEFAULT_BATCH_SIZE
+        try:
+            query, sort = self.keyset_query(query, sort, after)
+            cursor = self.db[collection].find(
+                query, projection, sort=sort, limit=limit, skip=skip, batch_size=batch_size or 0
+            )
+            while True:
+                next_batch = functools.partial(self._next_batch, cursor, length)
+                documents = await run_on_client_loop(self.config, next_batch)
+                if not documents:
+                    break
+                for document in documents:
+                    yield document
+        except Exception as e:
+            logger.error(f"MongoDB iter_many error: {str(e)}", exc_info=True)
+            raise
+        finally:
+            if cursor is not None:
+                await run_on_client_loop(self.config, cursor.close)
+
+    @staticmethod
+    async def _next_batch(cursor: AsyncIOMotorCursor, length: int) -> List[Dict]:
+        return await cursor.to_list(length)
+
+    @on_client_loop
+    async def insert_one(self, collection: str, document: Dict) -> str:
+        """Insert a single document"""
+        try:
+            result = await self.db[collection].insert_one(document)
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"MongoDB insert_one error: {str(e)}", exc_info=True)
+            raise
+
+    async def insert_many(self, collection: str, documents: Iterable[Dict], ordered: bool = False) -> Dict:
+        """Insert documents in chunks, reporting per-document errors"""
+        operations = ({'op': 'insert_one', 'document': document} for document in documents)
+        return await self.bulk_write(collection, operations, ordered=ordered)
+
+    @on_client_loop
+    async def update_one(self, collection: str, query: Dict, update: Dict, upsert: bool = False) -> bool:
+        """Update a single document"""
+        try:
+            result = await self.db[collection].update_one(query, {"$set": update}, upsert=upsert)
+            return result.modified_count > 0 or result.upserted_id is not None
+        except Exception as e:
+            logger.error(f"MongoDB update_one error: {str(e)}", exc_info=True)
+            raise
+
+    @on_client_loop
+    async def update_many(self, collection: str, query: Dict, update: Dict, upsert: bool = False) -> int:
+        """Update all matching documents"""
+        try:
+            result = await self.db[collection].update_many(query, {"$set": update}, upsert=upsert)
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"MongoDB update_many error: {str(e)}", exc_info=True)
+            raise
+
+    @on_client_loop
+    async def bulk_write(self, collection: str, operations: Iterable[Dict], ordered: bool = True) -> Dict:
+        """Apply write operations in chunks of DATABASE_BULK_CHUNK_SIZE"""
+        try:
+            result = new_bulk_result()
+            offset = 0
+            for chunk in chunked(operations, self.config.DATABASE_BULK_CHUNK_SIZE):
+                requests = [to_write_model(operation) for operation in chunk]
+                try:
+                    details = (await self.db[collection].bulk_write(requests, ordered=ordered)).bulk_api_result
+                except BulkWriteError as e:
+                    details = e.details
+                merge_bulk_result(result, details, offset, chunk, ordered)
+                offset += len(chunk)
+                if ordered and details.get('writeErrors'):
+                    break
+            if result['errors']:
+                logger.warning(f"MongoDB bulk_write on {collection}: {len(result['errors'])} failed operations")
+            return result
+        except Exception as e:
+            logger.error(f"MongoDB bulk_write error: {str(e)}", exc_info=True)
+            raise
+
+    @on_client_loop
+    async def delete_one(self, collection: str, query: Dict) -> bool:
+        """Delete a single document"""
+        try:
+            result = await self.db[collection].delete_one(query)
+            return result.deleted_count > 0
+        except Exception as e:
+            logger.error(f"MongoDB delete_one error: {str(e)}", exc_info=True)
+            raise
+
+    @on_client_loop
+    async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Find a user by email"""
+        try:
+            return await self.db["users"].find_one({"email": email})
+        except Exception as e:
+            logger.error(f"MongoDB find_user_by_email error: {str(e)}", exc_info=True)
+            raise
+
+    @on_client_loop
+    async def create_user(self, user_data: Dict[str, Any]) -> str:
+        """Create a new user"""
+        try:
+            result = await self.db["users"].insert_one(user_data)
+            return str(result.inserted_id)
+        except Exception as e:
+            logger.error(f"MongoDB create_user error: {str(e)}", exc_info=True)
+            raise
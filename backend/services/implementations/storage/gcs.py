@@ -1,19 +1,113 @@
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta, UTC
+import google.auth.credentials
 from google.cloud import storage
+from google.cloud.storage.batch import Batch
 from google.oauth2 import service_account
+from google.resumable_media import common as resumable_common
+from google.resumable_media.requests import ResumableUpload
+import requests
+import asyncio
+import logging
 import os
+import time
 from ...interfaces.storage import StorageService
+from shared.utils.concurrency import map_in_threads
+from shared.utils.iterables import chunked
+from shared.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# GCS requires resumable chunks to be multiples of 256 KiB
+_CHUNK_ALIGNMENT = 256 * 1024
+# Maximum sub-requests in one GCS JSON API batch
+_MAX_BATCH_SIZE = 100
+# Cached signed URLs are dropped this long before the URL itself expires
+_URL_REFRESH_MARGIN = 300
+
+
+class _ResultBatch(Batch):
+    """A Batch that keeps what finish() returns, one response per request; its context manager drops it"""
+
+    def finish(self, raise_exception=True):
+        self.responses = super().finish(raise_exception=raise_exception)
+        return self.responses
+
+
+class _ReplayableStream:
+    """
+    Forward-only stream wrapper that keeps the last chunk read in memory.
+
+    ResumableUpload.recover() seeks back to the last byte the server persisted,
+    which is always inside the chunk in flight. Keeping only that chunk lets a
+    non-seekable source (e.g. a Flask request body) resume after a failure
+    without buffering the whole file.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self._stream = stream
+        self._position = 0
+        self._chunk = b''
+        self._chunk_start = 0
+        self._replay_offset = None
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, position: int, whence: int = 0) -> int:
+        if whence != 0 or not self._chunk_start <= position <= self._chunk_start + len(self._chunk):
+            raise ValueError(f"Cannot seek to {position}; only the chunk in flight is retained")
+        self._replay_offset = position - self._chunk_start
+        self._position = position
+        return position
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            raise ValueError("Reads must be bounded to one chunk")
+        replay = b''
+        if self._replay_offset is not None:
+            replay = self._chunk[self._replay_offset:self._replay_offset + size]
+            self._replay_offset = None
+        remaining = size - len(replay)
+        fresh = b''
+        while remaining > 0:
+            data = self._stream.read(remaining)
+            if not data:
+                break
+            fresh += data
+            remaining -= len(data)
+        payload = replay + fresh
+        self._chunk_start = self._position
+        self._chunk = payload
+        self._position += len(payload)
+        return payload
 
 class GCSStorageService(StorageService):
-    def __init__(self, bucket_name: str, credentials_path: str = None, project_id: str = None):
+    def __init__(self, bucket_name: str, credentials_path: str = None, project_id: str = None,
+                 chunk_size: int = 8 * 1024 * 1024, max_recoveries: int = 5, max_concurrency: int = 8,
+                 url_expiration: int = 3600, url_cache_size: int = 10000):
         """
         Initialize GCS Storage Service
         Args:
             bucket_name: Name of the GCS bucket
             credentials_path: Path to service account credentials JSON file
             project_id: Google Cloud project ID
+            chunk_size: Bytes sent per resumable upload request (rounded to 256 KiB)
+            max_recoveries: Times a failed resumable upload is resumed before giving up
+            max_concurrency: Files transferred at once by upload_many/delete_many
+            url_expiration: Lifetime in seconds of the signed URLs handed out
+            url_cache_size: Maximum number of signed URLs kept in memory
         """
+        self.bucket_name = bucket_name
+        self.chunk_size = max(chunk_size // _CHUNK_ALIGNMENT, 1) * _CHUNK_ALIGNMENT
+        self.max_recoveries = max_recoveries
+        self.max_concurrency = max_concurrency
+        self.url_expiration = url_expiration
+        self.url_cache = TTLCache(
+            max_size=url_cache_size,
+            default_ttl=max(url_expiration - _URL_REFRESH_MARGIN, url_expiration / 2)
+        )
+        self.signing_credentials = None
         if credentials_path:
             credentials = service_account.Credentials.from_service_account_file(
                 credentials_path,
@@ -23,15 +117,24 @@ class GCSStorageService(StorageService):
                 credentials=credentials,
                 project=project_id
             )
+            self.signing_credentials = credentials
         else:
             self.storage_client = storage.Client()
-            
+            if not isinstance(getattr(self.storage_client, '_credentials', None),
+                              google.auth.credentials.Signing):
+                logger.warning("GCS credentials have no private key; signed URLs need STORAGE_CREDENTIALS_PATH")
+
         self.bucket = self.storage_client.bucket(bucket_name)
 
     async def upload_file(self, file: BinaryIO, path: str) -> str:
         """
-        Upload a file to GCS and return a signed URL that's valid for 1 hour
+        Upload a file to GCS and return a signed URL for reading it
         """
+        # On a worker thread: the client library blocks, and concurrent uploads should overlap
+        return await asyncio.to_thread(self._upload_file_sync, file, path)
+
+    def _upload_file_sync(self, file: BinaryIO, path: str) -> str:
+        """Blocking body of upload_file, shared with the thread pool used by upload_many"""
         try:
             # Validate file
             file.seek(0, 2)  # Seek to end
@@ -39,21 +142,157 @@ class GCSStorageService(StorageService):
                 raise ValueError("Cannot upload empty file")
             file.seek(0)  # Reset to beginning
 
-            blob = self.bucket.blob(path)
+            blob = self.bucket.blob(path, chunk_size=self.chunk_size)
             blob.upload_from_file(file, rewind=True)
             
-            # Generate a signed URL that expires in 1 hour
-            url = blob.generate_signed_url(
-                version="v4",
-                expiration=datetime.now(UTC) + timedelta(hours=1),
-                method="GET"
+            return self._signed_url(path)
+        except Exception as e:
+            raise ValueError(f"Failed to upload file: {str(e)}")
+
+    async def upload_stream(self, stream: BinaryIO, path: str, content_type: Optional[str] = None,
+                            chunk_size: Optional[int] = None) -> str:
+        """
+        Upload from a forward-only stream through a resumable session.
+
+        At most one chunk is held in memory; the stream is never measured,
+        seeked or spooled to disk. Transient failures are retried by the
+        resumable-media retry strategy and, if a chunk still fails, the session
+        is recovered from the last byte the server persisted. The transfer
+        runs on a worker thread, off the event loop.
+        """
+        return await asyncio.to_thread(self._upload_stream_sync, stream, path, content_type, chunk_size)
+
+    def _upload_stream_sync(self, stream: BinaryIO, path: str, content_type: Optional[str],
+                            chunk_size: Optional[int]) -> str:
+        """Blocking body of upload_stream"""
+        try:
+            chunk_size = self.chunk_size if chunk_size is None else \
+                max(chunk_size // _CHUNK_ALIGNMENT, 1) * _CHUNK_ALIGNMENT
+            transport = self.storage_client._http
+            upload_url = (
+                f"{self.storage_client._connection.API_BASE_URL}/upload/storage/v1/b/"
+                f"{self.bucket_name}/o?uploadType=resumable"
+            )
+            upload = ResumableUpload(upload_url, chunk_size)
+            source = _ReplayableStream(stream)
+            upload.initiate(
+                transport, source, {'name': path},
+                content_type or 'application/octet-stream', stream_final=False
             )
-            return url
+
+            recoveries = 0
+            while not upload.finished:
+                try:
+                    upload.transmit_next_chunk(transport)
+                except (requests.exceptions.RequestException, resumable_common.InvalidResponse) as e:
+                    if recoveries >= self.max_recoveries:
+                        raise
+                    recoveries += 1
+                    logger.warning(f"Resumable upload of {path} interrupted at byte "
+                                   f"{upload.bytes_uploaded}, recovering ({recoveries}): {str(e)}")
+                    time.sleep(min(2 ** recoveries, 30))
+                    if upload.invalid:
+                        # The server answered unexpectedly: ask it which bytes it persisted
+                        upload.recover(transport)
+                    else:
+                        # No answer arrived: resend the chunk in flight, whose reply reports what was kept
+                        source.seek(upload.bytes_uploaded)
+
+            if upload.bytes_uploaded == 0:
+                self.bucket.blob(path).delete()
+                raise ValueError("Cannot upload empty file")
+            logger.info(f"Streamed {upload.bytes_uploaded} bytes to {path}")
+
+            return self._signed_url(path)
         except Exception as e:
             raise ValueError(f"Failed to upload file: {str(e)}")
 
+    async def upload_many(self, files: List[Tuple[BinaryIO, str]],
+                          max_concurrency: Optional[int] = None) -> List[Dict]:
+        """Upload several files on a bounded thread pool; results are reported per file"""
+        results = await map_in_threads(
+            lambda item: self._upload_file_sync(*item), files, max_concurrency or self.max_concurrency
+        )
+        return [
+            {'path': path, 'url': url, 'error': str(error) if error else None}
+            for (_, path), (url, error) in zip(files, results)
+        ]
+
+    async def delete_many(self, paths: List[str], max_concurrency: Optional[int] = None) -> List[Dict]:
+        """Delete several files with GCS batch requests (up to 100 deletes per HTTP call)"""
+        batches = list(chunked(paths, _MAX_BATCH_SIZE))
+        results = await map_in_threads(self._delete_batch_sync, batches, max_concurrency or self.max_concurrency)
+        report = []
+        for batch_paths, (statuses, error) in zip(batches, results):
+            for path, status in zip(batch_paths, statuses or [None] * len(batch_paths)):
+                if error:
+                    report.append({'path': path, 'deleted': False, 'error': str(error)})
+                elif 200 <= status < 300:
+                    report.append({'path': path, 'deleted': True, 'error': None})
+                else:
+                    report.append({'path': path, 'deleted': False, 'error': f"HTTP {status}"})
+        return report
+
+    def _delete_batch_sync(self, paths: List[str]) -> List[int]:
+        """Send one batch of deletes and return the per-object HTTP status codes"""
+        for path in paths:
+            self.url_cache.pop(path)
+        with _ResultBatch(self.storage_client, raise_exception=False) as batch:
+            for path in paths:
+                self.bucket.delete_blob(path)
+        return [response.status_code for response in batch.responses]
+
+    async def open_stream(self, path: str, chunk_size: Optional[int] = None) -> BinaryIO:
+        """
+        Open a file for reading; each read fetches at most one chunk with a
+        ranged request, so large files are never held in memory. Reads block.
+        """
+        return self.bucket.blob(path).open('rb', chunk_size=chunk_size or self.chunk_size)
+
+    async def exists(self, path: str) -> bool:
+        return await asyncio.to_thread(self.bucket.blob(path).exists)
+
+    async def size(self, path: str) -> Optional[int]:
+        blob = await asyncio.to_thread(self.bucket.get_blob, path)
+        return None if blob is None else blob.size
+
+    async def move(self, source: str, target: str) -> None:
+        """Copy within the bucket (no bytes pass through the server), then delete the source"""
+        await asyncio.to_thread(self._move_sync, source, target)
+
+    def _move_sync(self, source: str, target: str) -> None:
+        self.url_cache.pop(target)
+        self.bucket.copy_blob(self.bucket.blob(source), self.bucket, target)
+        self.bucket.delete_blob(source)
+
+    async def get_download_url(self, path: str) -> str:
+        """
+        Return a signed GET URL for an existing file.
+
+        URLs are signed locally with the service-account key and cached until
+        shortly before they expire, so listing many files costs no remote calls.
+        The file's existence is not checked.
+        """
+        return self._signed_url(path)
+
+    def _signed_url(self, path: str) -> str:
+        url = self.url_cache.get(path)
+        if url is None:
+            url = self.bucket.blob(path).generate_signed_url(
+                version="v4",
+                expiration=datetime.now(UTC) + timedelta(seconds=self.url_expiration),
+                method="GET",
+                credentials=self.signing_credentials
+            )
+            self.url_cache.set(path, url)
+        return url
+
     async def delete_file(self, path: str) -> bool:
         """Delete a file from GCS"""
+        return await asyncio.to_thread(self._delete_file_sync, path)
+
+    def _delete_file_sync(self, path: str) -> bool:
+        self.url_cache.pop(path)
         try:
             blob = self.bucket.blob(path)
             blob.delete()
@@ -1,20 +1,109 @@
-from typing import BinaryIO
+from typing import BinaryIO, Dict, List, Optional, Tuple
+import asyncio
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
 from ...interfaces.storage import StorageService
+from shared.utils.concurrency import map_in_threads
+from shared.utils.iterables import chunked
+from shared.utils.ttl_cache import TTLCache
 
 class S3StorageService(StorageService):
-    def __init__(self, bucket_name: str, aws_access_key: str, aws_secret_key: str):
+    def __init__(self, bucket_name: str, aws_access_key: str, aws_secret_key: str,
+                 url_expiration: int = 3600, url_cache_size: int = 10000):
         self.s3 = boto3.client(
             's3',
             aws_access_key_id=aws_access_key,
             aws_secret_access_key=aws_secret_key
         )
         self.bucket_name = bucket_name
+        self.url_expiration = url_expiration
+        # Presigned URLs are signed locally; cache them until shortly before they expire
+        self.url_cache = TTLCache(max_size=url_cache_size, default_ttl=url_expiration * 0.9)
 
     async def upload_file(self, file_data: BinaryIO, path: str) -> str:
-        self.s3.upload_fileobj(file_data, self.bucket_name, path)
+        await asyncio.to_thread(self.s3.upload_fileobj, file_data, self.bucket_name, path)
         return f"https://{self.bucket_name}.s3.amazonaws.com/{path}"
 
+    async def upload_stream(self, stream: BinaryIO, path: str, content_type: Optional[str] = None,
+                            chunk_size: Optional[int] = None) -> str:
+        # upload_fileobj reads the stream part by part as a multipart upload
+        config = TransferConfig(multipart_chunksize=chunk_size) if chunk_size else TransferConfig()
+        extra_args = {'ContentType': content_type} if content_type else None
+        # On a worker thread: the transfer blocks, and so may the stream's reads
+        await asyncio.to_thread(self.s3.upload_fileobj, stream, self.bucket_name, path,
+                                ExtraArgs=extra_args, Config=config)
+        return f"https://{self.bucket_name}.s3.amazonaws.com/{path}"
+
+    async def get_download_url(self, path: str) -> str:
+        url = self.url_cache.get(path)
+        if url is None:
+            url = self.s3.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': self.bucket_name, 'Key': path},
+                ExpiresIn=self.url_expiration
+            )
+            self.url_cache.set(path, url)
+        return url
+
+    async def open_stream(self, path: str, chunk_size: Optional[int] = None) -> BinaryIO:
+        # The GetObject body streams from the open HTTP response as it is read
+        response = await asyncio.to_thread(self.s3.get_object, Bucket=self.bucket_name, Key=path)
+        return response['Body']
+
+    async def exists(self, path: str) -> bool:
+        try:
+            await asyncio.to_thread(self.s3.head_object, Bucket=self.bucket_name, Key=path)
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    async def size(self, path: str) -> Optional[int]:
+        try:
+            response = await asyncio.to_thread(self.s3.head_object, Bucket=self.bucket_name, Key=path)
+            return response['ContentLength']
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    async def move(self, source: str, target: str) -> None:
+        # Managed copy: server-side, in parts for objects over 5 GB
+        self.url_cache.pop(target)
+        await asyncio.to_thread(self.s3.copy, {'Bucket': self.bucket_name, 'Key': source}, self.bucket_name, target)
+        await asyncio.to_thread(self.s3.delete_object, Bucket=self.bucket_name, Key=source)
+
     async def delete_file(self, path: str) -> bool:
-        self.s3.delete_object(Bucket=self.bucket_name, Key=path)
-        return True 
\ No newline at end of file
+        self.url_cache.pop(path)
+        await asyncio.to_thread(self.s3.delete_object, Bucket=self.bucket_name, Key=path)
+        return True
+
+    async def upload_many(self, files: List[Tuple[BinaryIO, str]],
+                          max_concurrency: Optional[int] = None) -> List[Dict]:
+        def upload(item):
+            file_data, path = item
+            self.s3.upload_fileobj(file_data, self.bucket_name, path)
+            return f"https://{self.bucket_name}.s3.amazonaws.com/{path}"
+
+        results = await map_in_threads(upload, files, max_concurrency or self.max_concurrency)
+        return [
+            {'path': path, 'url': url, 'error': str(error) if error else None}
+            for (_, path), (url, error) in zip(files, results)
+        ]
+
+    async def delete_many(self, paths: List[str], max_concurrency: Optional[int] = None) -> List[Dict]:
+        # DeleteObjects removes up to 1000 keys per request and reports failures per key
+        report = []
+        for batch in chunked(paths, 1000):
+            response = self.s3.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': path} for path in batch], 'Quiet': True}
+            )
+            errors = {error['Key']: error.get('Message') for error in response.get('Errors', [])}
+            report.extend(
+                {'path': path, 'deleted': path not in errors, 'error': errors.get(path)}
+                for path in batch
+            )
+        return report
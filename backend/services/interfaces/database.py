@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any, Tuple
+
+# Sort specification: [(field, 1 | -1), ...]
+SortSpec = List[Tuple[str, int]]
 
 class DatabaseService(ABC):
     @abstractmethod
@@ -18,18 +21,79 @@ class DatabaseService(ABC):
         pass
 
     @abstractmethod
-    def find_many(self, collection: str, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def find_many(self, collection: str, query: Dict[str, Any],
+                  projection: Optional[Dict[str, Any]] = None, sort: Optional[SortSpec] = None,
+                  limit: int = 0, skip: int = 0) -> List[Dict[str, Any]]:
         """Find multiple documents"""
         pass
 
+    @abstractmethod
+    def iter_many(self, collection: str, query: Dict[str, Any],
+                  projection: Optional[Dict[str, Any]] = None, sort: Optional[SortSpec] = None,
+                  batch_size: Optional[int] = None, limit: int = 0, skip: int = 0,
+                  after: Any = None) -> Iterator[Dict[str, Any]]:
+        """
+        Stream matching documents without materialising the result set.
+
+        Async implementations return an async iterator instead.
+
+        Args:
+            collection: Collection name
+            query: Filter document
+            projection: Fields to include or exclude
+            sort: Sort specification; defaults to _id ascending when after is given
+            batch_size: Documents fetched per round trip
+            limit: Maximum number of documents (0 for no limit)
+            skip: Number of documents to skip
+            after: Keyset pagination; only documents sorted after this value of the
+                first sort field are returned
+        """
+        pass
+
     @abstractmethod
     def insert_one(self, collection: str, document: Dict[str, Any]) -> str:
         """Insert a single document"""
         pass
 
     @abstractmethod
-    def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any]) -> bool:
-        """Update a single document"""
+    def insert_many(self, collection: str, documents: Iterable[Dict[str, Any]],
+                    ordered: bool = False) -> Dict[str, Any]:
+        """
+        Insert documents in server-sized chunks.
+
+        Returns the aggregate bulk result: counts, inserted_ids and a list of
+        per-document errors as {'index', 'code', 'message'}.
+        """
+        pass
+
+    @abstractmethod
+    def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+                   upsert: bool = False) -> bool:
+        """Update a single document, inserting it when upsert is set and nothing matches"""
+        pass
+
+    @abstractmethod
+    def update_many(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+                    upsert: bool = False) -> int:
+        """Update all matching documents and return the number modified"""
+        pass
+
+    @abstractmethod
+    def bulk_write(self, collection: str, operations: Iterable[Dict[str, Any]],
+                   ordered: bool = True) -> Dict[str, Any]:
+        """
+        Apply mixed write operations in server-sized chunks.
+
+        Each operation is a dict with an 'op' key:
+            {'op': 'insert_one', 'document': {...}}
+            {'op': 'update_one' | 'update_many', 'filter': {...}, 'update': {...}, 'upsert': bool}
+            {'op': 'replace_one', 'filter': {...}, 'replacement': {...}, 'upsert': bool}
+            {'op': 'delete_one' | 'delete_many', 'filter': {...}}
+
+        Ordered writes stop at the first failing operation; unordered writes
+        attempt every operation. Errors are reported per operation with the
+        operation's index in the input.
+        """
         pass
 
     @abstractmethod
@@ -44,4 +108,15 @@ class DatabaseService(ABC):
 
     async def create_user(self, user_data: Dict[str, Any]) -> str:
         """Create a new user"""
-        return await self.insert_one("users", user_data) 
\ No newline at end of file
+        return await self.insert_one("users", user_data)
+
+    @staticmethod
+    def keyset_query(query: Dict[str, Any], sort: Optional[SortSpec],
+                     after: Any) -> Tuple[Dict[str, Any], Optional[SortSpec]]:
+        """Combine query with a keyset condition on the first sort field"""
+        if after is None:
+            return query, sort
+        sort = sort or [("_id", 1)]
+        field, direction = sort[0]
+        condition = {field: {"$gt" if direction >= 0 else "$lt": after}}
+        return ({"$and": [query, condition]} if query else condition), sort 
\ No newline at end of file
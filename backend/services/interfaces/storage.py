@@ -1,13 +1,87 @@
 from abc import ABC, abstractmethod
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from shared.utils.concurrency import gather_bounded
 
 class StorageService(ABC):
+    # Default number of files transferred at once by upload_many/delete_many
+    max_concurrency: int = 8
+
     @abstractmethod
     async def upload_file(self, file_data: BinaryIO, path: str) -> str:
         """Upload a file and return its public URL"""
         pass
 
+    @abstractmethod
+    async def upload_stream(self, stream: BinaryIO, path: str, content_type: Optional[str] = None,
+                            chunk_size: Optional[int] = None) -> str:
+        """Upload from a forward-only stream in chunks, reading it off the event loop; returns its URL"""
+        pass
+
+    @abstractmethod
+    async def open_stream(self, path: str, chunk_size: Optional[int] = None) -> BinaryIO:
+        """Open an existing file as a forward-only binary stream fetched chunk_size bytes at a time"""
+        pass
+
+    @abstractmethod
+    async def exists(self, path: str) -> bool:
+        """Whether a file exists at path"""
+        pass
+
+    @abstractmethod
+    async def size(self, path: str) -> Optional[int]:
+        """Size in bytes of the file at path, from its metadata; None if there is none"""
+        pass
+
+    async def move(self, source: str, target: str) -> None:
+        """
+        Move a file to another path, replacing any file there. This default
+        streams the bytes through the server; backends override it with a
+        server-side copy.
+        """
+        stream = await self.open_stream(source)
+        try:
+            await self.upload_stream(stream, target)
+        finally:
+            stream.close()
+        await self.delete_file(source)
+
+    @abstractmethod
+    async def get_download_url(self, path: str) -> str:
+        """Return a time-limited URL for reading an existing file"""
+        pass
+
     @abstractmethod
     async def delete_file(self, path: str) -> bool:
         """Delete a file by path"""
-        pass 
\ No newline at end of file
+        pass
+
+    async def upload_many(self, files: List[Tuple[BinaryIO, str]],
+                          max_concurrency: Optional[int] = None) -> List[Dict]:
+        """
+        Upload several files concurrently.
+
+        Returns one {'path', 'url', 'error'} result per file, in input order.
+        """
+        results = await gather_bounded(
+            [lambda f=file_data, p=path: self.upload_file(f, p) for file_data, path in files],
+            max_concurrency or self.max_concurrency
+        )
+        return [
+            {'path': path, 'url': url, 'error': str(error) if error else None}
+            for (_, path), (url, error) in zip(files, results)
+        ]
+
+    async def delete_many(self, paths: List[str], max_concurrency: Optional[int] = None) -> List[Dict]:
+        """
+        Delete several files concurrently.
+
+        Returns one {'path', 'deleted', 'error'} result per path, in input order.
+        """
+        results = await gather_bounded(
+            [lambda p=path: self.delete_file(p) for path in paths],
+            max_concurrency or self.max_concurrency
+        )
+        return [
+            {'path': path, 'deleted': bool(deleted), 'error': str(error) if error else None}
+            for path, (deleted, error) in zip(paths, results)
+        ]
@@ -0,0 +1,120 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import json
+import threading
+import time
+
+
+class AdmissionController:
+    """
+    Bounded admission queue in front of a WSGI app.
+
+    At most max_in_flight requests run at once. Up to max_queue more wait, for
+    at most queue_timeout seconds, for a slot. Anything beyond that is shed at
+    once with 503 + Retry-After, so under overload the admitted requests keep
+    their normal latency instead of every request slowing down together.
+    Limits are per process (gunicorn worker).
+    """
+
+    def __init__(self, wsgi_app: Callable, max_in_flight: int, max_queue: int = 0,
+                 queue_timeout: float = 1.0, retry_after: int = 1,
+                 exempt_paths: Iterable[str] = (),
+                 reject_headers: Optional[Callable[[Dict], List[Tuple[str, str]]]] = None):
+        self.wsgi_app = wsgi_app
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_queue = max(max_queue, 0)
+        self.queue_timeout = queue_timeout
+        self.retry_after = str(retry_after)
+        self.exempt_paths = frozenset(exempt_paths)
+        # Extra headers for 503s, e.g. CORS, so browsers can read the status
+        self.reject_headers = reject_headers
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self._condition = threading.Condition()
+        self._body = json.dumps({'error': 'Server is busy, retry later', 'status_code': 503}).encode()
+
+    def __call__(self, environ: Dict, start_response: Callable):
+        if environ.get('PATH_INFO') in self.exempt_paths:
+            return self.wsgi_app(environ, start_response)
+        if not self._admit():
+            return self._reject(environ, start_response)
+        try:
+            result = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._release()
+            raise
+        return _ReleasingIterable(result, self._release)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': self.in_flight,
+            'queued': self.queued,
+            'rejected': self.rejected,
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue
+        }
+
+    def reject(self, environ: Dict, start_response: Callable):
+        """Shed a request without queueing it (e.g. one that would wait for a server thread)"""
+        with self._condition:
+            self.rejected += 1
+        return self._reject(environ, start_response)
+
+    def _admit(self) -> bool:
+        with self._condition:
+            if self.in_flight < self.max_in_flight:
+                self.in_flight += 1
+                return True
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                return False
+            self.queued += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        return False
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.queued -= 1
+
+    def _release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def _reject(self, environ: Dict, start_response: Callable):
+        headers = [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(self._body))),
+            ('Retry-After', self.retry_after),
+        ]
+        if self.reject_headers is not None:
+            headers.extend(self.reject_headers(environ))
+        start_response('503 Service Unavailable', headers)
+        return [self._body]
+
+
+class _ReleasingIterable:
+    """Frees the admission slot once the server has finished sending the response"""
+
+    def __init__(self, iterable, release: Callable[[], None]):
+        self._iterable = iterable
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
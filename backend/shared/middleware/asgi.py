@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import asyncio
+from asgiref.wsgi import WsgiToAsgiInstance
+from shared.middleware.admission import AdmissionController
+
+
+class _PooledWsgiInstance(WsgiToAsgiInstance):
+    # asgiref's WsgiToAsgi is thread-sensitive and funnels every request through
+    # a single thread; run each request on the given pool instead. Not through
+    # sync_to_async, which would schedule async views onto the server's loop:
+    # from a plain pool thread each gets a loop of its own, as under gthread.
+    def __init__(self, wsgi_application, executor: ThreadPoolExecutor):
+        super().__init__(wsgi_application)
+        self.executor = executor
+
+    async def run_wsgi_app(self, body):
+        run = WsgiToAsgiInstance.__dict__['run_wsgi_app'].func
+        await asyncio.get_running_loop().run_in_executor(self.executor, run, self, body)
+
+
+def _closing(wsgi_app):
+    """
+    Call close() on the response iterable as WSGI requires; asgiref only iterates it.
+    AdmissionController frees its slot in close().
+    """
+    def app(environ, start_response):
+        result = wsgi_app(environ, start_response)
+        try:
+            yield from result
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+    return app
+
+
+class PooledWsgiToAsgi:
+    """
+    Serve a WSGI app over ASGI with a bounded pool of request threads.
+
+    The executor queues requests without limit once every thread is busy,
+    out of reach of an AdmissionController inside the app. Given that
+    controller, a request arriving while all threads are busy is shed with
+    its 503 on the event loop instead (its exempt paths still wait), so
+    threads should exceed the controller's in-flight + queue limits.
+    """
+
+    def __init__(self, wsgi_app, threads: int, admission: Optional[AdmissionController] = None):
+        self.wsgi_application = _closing(wsgi_app)
+        self.threads = threads
+        self.admission = admission
+        self.busy = 0
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            # Nothing to start or stop; acknowledge so servers do not log a warning
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            return await _PooledWsgiInstance(self.wsgi_application, self._executor)(scope, receive, send)
+        if (self.admission is not None and self.busy >= self.threads
+                and scope['path'] not in self.admission.exempt_paths):
+            return await self._shed(scope, send)
+        self.busy += 1
+        try:
+            await _PooledWsgiInstance(self.wsgi_application, self._executor)(scope, receive, send)
+        finally:
+            self.busy -= 1
+
+    async def _shed(self, scope, send):
+        environ = {'REQUEST_METHOD': scope['method'], 'PATH_INFO': scope['path']}
+        for name, value in scope.get('headers', []):
+            environ['HTTP_' + name.decode('latin1').upper().replace('-', '_')] = value.decode('latin1')
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'], response['headers'] = int(status.split(' ', 1)[0]), headers
+
+        body = b''.join(self.admission.reject(environ, start_response))
+        await send({'type': 'http.response.start', 'status': response['status'],
+                    'headers': [(name.lower().encode('latin1'), value.encode('latin1'))
+                                for name, value in response['headers']]})
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,74 @@
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import inspect
+import logging
+from flask import g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+
+def _bearer_token() -> Optional[str]:
+    auth_header = request.headers.get('Authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+    return auth_header[len('Bearer '):] or None
+
+
+def _unauthorized(message: str):
+    return jsonify({'error': message}), 401
+
+
+def require_user(view: Callable) -> Callable:
+    """
+    Require a valid Firebase ID token in the Authorization header.
+
+    The decoded claims are stored on flask.g.user. Works on both sync and
+    async views; for async views the (blocking) verification runs in a thread
+    so other coroutines on the loop keep running.
+    """
+    from services.factory import get_auth_service
+
+    def verify(token: str) -> Any:
+        # Returns the claims, or a coroutine for async AuthService implementations
+        try:
+            return get_auth_service().verify_token(token)
+        except Exception as e:
+            logger.warning(f"Token verification failed: {str(e)}")
+            return None
+
+    async def resolve(result: Any) -> Optional[Dict[str, Any]]:
+        if not inspect.isawaitable(result):
+            return result
+        try:
+            return await result
+        except Exception as e:
+            logger.warning(f"Token verification failed: {str(e)}")
+            return None
+
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            token = _bearer_token()
+            if token is None:
+                return _unauthorized('No token provided')
+            claims = await resolve(await asyncio.to_thread(verify, token))
+            if not claims:
+                return _unauthorized('Invalid token')
+            g.user = claims
+            return await view(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _bearer_token()
+        if token is None:
+            return _unauthorized('No token provided')
+        claims = verify(token)
+        if inspect.isawaitable(claims):
+            claims = asyncio.run(resolve(claims))
+        if not claims:
+            return _unauthorized('Invalid token')
+        g.user = claims
+        return view(*args, **kwargs)
+    return wrapper
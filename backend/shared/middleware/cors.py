@@ -0,0 +1,87 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from flask import Flask, Response, request
+
+Headers = List[Tuple[str, str]]
+
+
+class CorsPolicy:
+    """
+    CORS rules computed once at startup.
+
+    Allowed origins are a frozenset and every header value is built in the
+    constructor, so handling a request is one set lookup plus a few header
+    assignments. Preflight header lists are cached per origin.
+    """
+
+    def __init__(self, origins: Iterable[str],
+                 methods: Iterable[str] = ('GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'),
+                 allow_headers: Iterable[str] = ('Content-Type', 'Authorization'),
+                 expose_headers: Iterable[str] = ('Set-Cookie',),
+                 supports_credentials: bool = True,
+                 max_age: int = 3600):
+        self.origins = frozenset(origins)
+        self._response_headers: Headers = [('Vary', 'Origin')]
+        if supports_credentials:
+            self._response_headers.append(('Access-Control-Allow-Credentials', 'true'))
+        expose = ', '.join(expose_headers)
+        if expose:
+            self._response_headers.append(('Access-Control-Expose-Headers', expose))
+        self._preflight_headers: Headers = [
+            ('Access-Control-Allow-Methods', ', '.join(methods)),
+            ('Access-Control-Allow-Headers', ', '.join(allow_headers)),
+            ('Access-Control-Max-Age', str(max_age)),
+        ] + [header for header in self._response_headers if header[0] != 'Access-Control-Expose-Headers']
+        self._preflight_cache: Dict[str, Headers] = {}
+        self._response_cache: Dict[str, Headers] = {}
+
+    def is_allowed(self, origin: Optional[str]) -> bool:
+        return origin in self.origins
+
+    def preflight(self, origin: str) -> Response:
+        """Build the 204 response to a CORS preflight from an allowed origin"""
+        headers = self._preflight_cache.get(origin)
+        if headers is None:
+            headers = [('Access-Control-Allow-Origin', origin)] + self._preflight_headers
+            self._preflight_cache[origin] = headers
+        return Response(status=204, headers=headers)
+
+    def headers_for(self, origin: Optional[str]) -> Headers:
+        """CORS headers for a simple (non-preflight) response; empty for other origins"""
+        if origin not in self.origins:
+            return []
+        headers = self._response_cache.get(origin)
+        if headers is None:
+            headers = [('Access-Control-Allow-Origin', origin)] + self._response_headers
+            self._response_cache[origin] = headers
+        return headers
+
+    def apply(self, response: Response, origin: Optional[str]) -> Response:
+        """Add CORS headers to a response for an allowed origin"""
+        if origin in self.origins and 'Access-Control-Allow-Origin' not in response.headers:
+            headers = response.headers
+            for name, value in self.headers_for(origin):
+                if name == 'Vary':
+                    # Keep what the response already varies on (e.g. Accept-Encoding)
+                    response.vary.add(value)
+                else:
+                    headers[name] = value
+        return response
+
+
+def init_cors(app: Flask, policy: CorsPolicy) -> None:
+    """
+    Answer preflights before routing and add CORS headers to every response,
+    including error responses.
+    """
+
+    @app.before_request
+    def answer_preflight():
+        if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+            origin = request.headers.get('Origin')
+            if policy.is_allowed(origin):
+                return policy.preflight(origin)
+        return None
+
+    @app.after_request
+    def add_cors_headers(response):
+        return policy.apply(response, request.headers.get('Origin'))
@@ -0,0 +1,295 @@
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Tuple
+import functools
+import inspect
+import threading
+import time
+from flask import Flask, Response, g, request
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class for a labelled metric family"""
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        return lines + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+    type_name = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}"
+                for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label set"""
+    type_name = 'gauge'
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed observations per label set"""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        # label values -> [per-bucket counts (non-cumulative), sum, count]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels: str) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_number(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.expose()) + '\n'
+
+
+# Process-wide registry. Each gunicorn worker keeps its own; scrape every instance.
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route', ('method', 'route')))
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    'http_requests_total', 'HTTP requests by route and status code', ('method', 'route', 'status')))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    'http_requests_in_flight', 'HTTP requests currently being served'))
+SERVICE_CALL_DURATION = REGISTRY.register(Histogram(
+    'service_call_duration_seconds', 'Latency of auth, database and storage service calls',
+    ('service', 'method')))
+SERVICE_CALL_ERRORS = REGISTRY.register(Counter(
+    'service_call_errors_total', 'Service calls that raised', ('service', 'method')))
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def init_metrics(app: Flask, path: str = '/metrics') -> None:
+    """
+    Record latency, status and in-flight counts for every request and serve
+    the registry at path.
+
+    Routes are labelled by their URL rule (e.g. /api/v1/files/<file_id>), not
+    the raw path, so label cardinality stays bounded.
+    """
+
+    @app.before_request
+    def start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_recorded = False
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request(response):
+        _record(response.status_code)
+        return response
+
+    @app.teardown_request
+    def finish_request(error=None):
+        if getattr(g, '_metrics_start', None) is None:
+            return
+        # Requests that raised past the error handlers never reach after_request
+        if not g._metrics_recorded:
+            _record(500)
+        HTTP_IN_FLIGHT.dec()
+        g._metrics_start = None
+
+    @app.route(path, methods=['GET'])
+    def metrics():
+        return Response(REGISTRY.expose(), content_type=CONTENT_TYPE)
+
+
+def _record(status: int) -> None:
+    start = getattr(g, '_metrics_start', None)
+    if start is None or g._metrics_recorded:
+        return
+    g._metrics_recorded = True
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method, route=route)
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=str(status))
+
+
+class InstrumentedService:
+    """
+    Proxy that times every public method call of a service.
+
+    Works with blocking and async methods and with (async) generators such as
+    iter_many, whose time is measured until the caller finishes iterating.
+    Attributes that are not methods are passed through unchanged.
+    """
+
+    def __init__(self, inner: Any, service: str):
+        self.inner = inner
+        self.service = service
+        self._wrapped: Dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        if name in ('inner', 'service', '_wrapped'):
+            raise AttributeError(name)
+        attribute = getattr(self.inner, name)
+        if name.startswith('_') or not callable(attribute):
+            return attribute
+        wrapped = self._wrapped.get(name)
+        if wrapped is None or wrapped.__wrapped__ != attribute:
+            wrapped = self._wrapped[name] = self._instrument(name, attribute)
+        return wrapped
+
+    def _instrument(self, name: str, method):
+        service = self.service
+
+        def observe(start: float, failed: bool) -> None:
+            SERVICE_CALL_DURATION.observe(time.perf_counter() - start, service=service, method=name)
+            if failed:
+                SERVICE_CALL_ERRORS.inc(service=service, method=name)
+
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                observe(start, True)
+                raise
+            if inspect.isawaitable(result):
+                return _timed_awaitable(result, start, observe)
+            if inspect.isasyncgen(result):
+                return _timed_async_iterator(result, start, observe)
+            if inspect.isgenerator(result):
+                return _timed_iterator(result, start, observe)
+            observe(start, False)
+            return result
+
+        return call
+
+
+async def _timed_awaitable(awaitable, start: float, observe) -> Any:
+    try:
+        result = await awaitable
+    except Exception:
+        observe(start, True)
+        raise
+    observe(start, False)
+    return result
+
+
+def _timed_iterator(iterator, start: float, observe):
+    failed = False
+    try:
+        yield from iterator
+    except Exception:
+        failed = True
+        raise
+    finally:
+        observe(start, failed)
+
+
+async def _timed_async_iterator(iterator, start: float, observe):
+    failed = False
+    try:
+        async for item in iterator:
+            yield item
+    except Exception:
+        failed = True
+        raise
+    finally:
+        await iterator.aclose()
+        observe(start, failed)
+
+
+def instrument_service(service: Any, name: str, enabled: bool = True) -> Any:
+    """Wrap a service in an InstrumentedService unless instrumentation is disabled"""
+    return InstrumentedService(service, name) if enabled else service
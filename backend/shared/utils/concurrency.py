@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Tuple
+import asyncio
+import inspect
+
+
+async def gather_bounded(calls: Iterable[Callable[[], Awaitable[Any]]],
+                         max_concurrency: int) -> List[Tuple[Any, Exception]]:
+    """
+    Await coroutine factories with at most max_concurrency in flight.
+
+    Returns (result, error) pairs in input order; one failure never cancels the others.
+    """
+    semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+    async def run(call):
+        async with semaphore:
+            try:
+                return await call(), None
+            except Exception as e:
+                return None, e
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+async def map_in_threads(fn: Callable[..., Any], items: Iterable[Any],
+                         max_workers: int) -> List[Tuple[Any, Exception]]:
+    """
+    Run a blocking function over items on a bounded thread pool without blocking the event loop.
+
+    Returns (result, error) pairs in input order; one failure never cancels the others.
+    """
+    items = list(items)
+    if not items:
+        return []
+    loop = asyncio.get_running_loop()
+
+    def call(item):
+        try:
+            return fn(item), None
+        except Exception as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(min(max_workers, len(items)), 1)) as executor:
+        return list(await asyncio.gather(*(loop.run_in_executor(executor, call, item) for item in items)))
+
+
+async def call_maybe_async(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Call a service method that is blocking in some implementations and async in others.
+
+    Blocking calls run on a worker thread so the event loop keeps serving.
+    """
+    result = await asyncio.to_thread(fn, *args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def iterate_maybe_async(iterable: Any, batch_size: int = 1000) -> AsyncIterator[Any]:
+    """
+    Iterate a sync or async iterator (e.g. DatabaseService.iter_many) from a coroutine.
+
+    Sync iterators are advanced on a worker thread one batch at a time, so at
+    most batch_size items are held and the event loop is not blocked.
+    """
+    if hasattr(iterable, '__aiter__'):
+        async for item in iterable:
+            yield item
+        return
+    iterator = iter(iterable)
+    while True:
+        batch = await asyncio.to_thread(lambda: list(islice(iterator, batch_size)))
+        if not batch:
+            return
+        for item in batch:
+            yield item
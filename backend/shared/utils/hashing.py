@@ -0,0 +1,36 @@
+from typing import BinaryIO, Tuple
+import hashlib
+
+# Bytes hashed per read when hashing a whole file
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class HashingReader:
+    """Passes reads through, hashing (SHA-256) and counting the bytes as they go by"""
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.hash.update(data)
+        self.size += len(data)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    def hexdigest(self) -> str:
+        return self.hash.hexdigest()
+
+
+def hash_file(file_data: BinaryIO) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of a seekable file, read from the start; the position is restored to 0"""
+    file_data.seek(0)
+    reader = HashingReader(file_data)
+    while reader.read(_HASH_CHUNK_SIZE):
+        pass
+    file_data.seek(0)
+    return reader.hexdigest(), reader.size
@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Imported first thing by app.py, so this approximates interpreter start for the app
+_started_at = time.monotonic()
+_events: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed(kind: str, name: str) -> Iterator[None]:
+    """
+    Record how long a startup step takes.
+
+    kind groups the report ('import', 'service', 'app', 'prewarm'); name identifies the step.
+    Steps are recorded even when they raise.
+    """
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        record(kind, name, start, time.monotonic())
+
+
+def record(kind: str, name: str, start: float, end: float) -> None:
+    """Record a step that was measured elsewhere (monotonic timestamps)"""
+    with _lock:
+        _events.append({
+            'kind': kind,
+            'name': name,
+            'offset_ms': round((start - _started_at) * 1000, 1),
+            'duration_ms': round((end - start) * 1000, 1),
+            'thread': threading.current_thread().name
+        })
+
+
+def report() -> Dict[str, Any]:
+    """Return recorded steps grouped by kind, with totals, in the order they ran"""
+    with _lock:
+        events = list(_events)
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        group = grouped.setdefault(event['kind'], {'total_ms': 0.0, 'steps': []})
+        group['total_ms'] = round(group['total_ms'] + event['duration_ms'], 1)
+        group['steps'].append({k: v for k, v in event.items() if k != 'kind'})
+    return {
+        'uptime_ms': round((time.monotonic() - _started_at) * 1000, 1),
+        'steps': grouped
+    }
+
+
+def log_report() -> None:
+    """Log a one-line summary per kind"""
+    for kind, group in report()['steps'].items():
+        slowest = max(group['steps'], key=lambda step: step['duration_ms'])
+        logger.info(f"Startup {kind}: {group['total_ms']} ms "
+                    f"(slowest: {slowest['name']} {slowest['duration_ms']} ms)")
+
+
+def reset() -> None:
+    """Forget recorded steps (used by tests)"""
+    global _started_at
+    with _lock:
+        _events.clear()
+        _started_at = time.monotonic()
@@ -1,4 +1,5 @@
-from typing import BinaryIO, Dict, List, Optional, Any
+import io
+from typing import AsyncIterator, BinaryIO, Dict, Iterable, List, Optional, Any
 from backend.services.interfaces.storage import StorageService
 from backend.services.interfaces.database import DatabaseService
 from backend.services.interfaces.auth import AuthService
@@ -11,6 +12,31 @@ class MockStorageService(StorageService):
         self.files[path] = file_data.read()
         return f"http://mock-url/{path}"
 
+    async def upload_stream(self, stream: BinaryIO, path: str, content_type: Optional[str] = None,
+                            chunk_size: Optional[int] = None) -> str:
+        chunks = []
+        while True:
+            chunk = stream.read(chunk_size or 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.files[path] = b"".join(chunks)
+        return f"http://mock-url/{path}"
+
+    async def open_stream(self, path: str, chunk_size: Optional[int] = None) -> BinaryIO:
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return io.BytesIO(self.files[path])
+
+    async def exists(self, path: str) -> bool:
+        return path in self.files
+
+    async def size(self, path: str) -> Optional[int]:
+        return len(self.files[path]) if path in self.files else None
+
+    async def get_download_url(self, path: str) -> str:
+        return f"http://mock-url/{path}"
+
     async def delete_file(self, path: str) -> bool:
         if path in self.files:
             del self.files[path]
@@ -28,21 +54,55 @@ class MockDatabaseService(DatabaseService):
     async def disconnect(self) -> None:
         self.connected = False
 
+    @classmethod
+    def _matches(cls, item: Dict[str, Any], query: Dict[str, Any]) -> bool:
+        """Evaluate equality, $and and comparison filters used by the services"""
+        for key, value in query.items():
+            if key == "$and":
+                if not all(cls._matches(item, sub) for sub in value):
+                    return False
+            elif isinstance(value, dict) and any(k.startswith("$") for k in value):
+                actual = item.get(key)
+                for op, operand in value.items():
+                    if op == "$gt" and not (actual is not None and actual > operand):
+                        return False
+                    if op == "$lt" and not (actual is not None and actual < operand):
+                        return False
+                    if op == "$in" and actual not in operand:
+                        return False
+            elif item.get(key) != value:
+                return False
+        return True
+
     async def find_one(self, collection: str, query: Dict[str, Any]) -> Optional[Dict]:
         if collection not in self.collections:
             return None
         items = self.collections[collection]
-        return next((item for item in items if all(
-            item.get(k) == v for k, v in query.items()
-        )), None)
+        return next((item for item in items if self._matches(item, query)), None)
 
-    async def find_many(self, collection: str, query: Dict[str, Any]) -> List[Dict]:
-        if collection not in self.collections:
-            return []
-        return [item for item in self.collections[collection] if all(
-            item.get(k) == v for k, v in query.items()
+    async def find_many(self, collection: str, query: Dict[str, Any],
+                        projection: Optional[Dict[str, Any]] = None, sort: Optional[List] = None,
+                        limit: int = 0, skip: int = 0) -> List[Dict]:
+        return [item async for item in self.iter_many(
+            collection, query, projection=projection, sort=sort, limit=limit, skip=skip
         )]
 
+    async def iter_many(self, collection: str, query: Dict[str, Any],
+                        projection: Optional[Dict[str, Any]] = None, sort: Optional[List] = None,
+                        batch_size: Optional[int] = None, limit: int = 0, skip: int = 0,
+                        after: Any = None) -> AsyncIterator[Dict]:
+        query, sort = self.keyset_query(query, sort, after)
+        items = [item for item in self.collections.get(collection, []) if self._matches(item, query)]
+        for field, direction in reversed(sort or []):
+            items.sort(key=lambda item: item.get(field), reverse=direction < 0)
+        items = items[skip:]
+        if limit:
+            items = items[:limit]
+        for item in items:
+            if projection:
+                item = {k: v for k, v in item.items() if k in projection or k == "_id"}
+            yield item
+
     async def insert_one(self, collection: str, document: Dict[str, Any]) -> str:
         """Insert a single document"""
         if collection not in self.collections:
@@ -50,27 +110,78 @@ class MockDatabaseService(DatabaseService):
         self.collections[collection].append(document)
         return str(len(self.collections[collection]))
 
-    async def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any]) -> bool:
+    async def insert_many(self, collection: str, documents: Iterable[Dict[str, Any]],
+                          ordered: bool = False) -> Dict[str, Any]:
+        """Insert documents"""
+        operations = ({"op": "insert_one", "document": document} for document in documents)
+        return await self.bulk_write(collection, operations, ordered=ordered)
+
+    async def update_one(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+                         upsert: bool = False) -> bool:
         """Update a single document"""
-        if collection not in self.collections:
-            return False
-        for item in self.collections[collection]:
-            if all(item.get(k) == v for k, v in query.items()):
+        for item in self.collections.get(collection, []):
+            if self._matches(item, query):
                 item.update(update)
                 return True
+        if upsert:
+            await self.insert_one(collection, {**query, **update})
+            return True
         return False
 
+    async def update_many(self, collection: str, query: Dict[str, Any], update: Dict[str, Any],
+                          upsert: bool = False) -> int:
+        """Update all matching documents"""
+        matched = [item for item in self.collections.get(collection, []) if self._matches(item, query)]
+        for item in matched:
+            item.update(update)
+        if not matched and upsert:
+            await self.insert_one(collection, {**query, **update})
+        return len(matched)
+
+    async def bulk_write(self, collection: str, operations: Iterable[Dict[str, Any]],
+                         ordered: bool = True) -> Dict[str, Any]:
+        """Apply write operations one at a time"""
+        result = {"inserted_count": 0, "modified_count": 0, "deleted_count": 0,
+                  "inserted_ids": [], "errors": [], "chunks": 1}
+        for index, operation in enumerate(operations):
+            op = operation["op"]
+            if op == "insert_one":
+                result["inserted_ids"].append(await self.insert_one(collection, operation["document"]))
+                result["inserted_count"] += 1
+            elif op == "update_one":
+                result["modified_count"] += int(await self.update_one(
+                    collection, operation["filter"], operation["update"], operation.get("upsert", False)))
+            elif op == "update_many":
+                result["modified_count"] += await self.update_many(
+                    collection, operation["filter"], operation["update"], operation.get("upsert", False))
+            elif op == "delete_one":
+                result["deleted_count"] += int(await self.delete_one(collection, operation["filter"]))
+            elif op == "delete_many":
+                items = self.collections.get(collection, [])
+                kept = [item for item in items if not self._matches(item, operation["filter"])]
+                result["deleted_count"] += len(items) - len(kept)
+                self.collections[collection] = kept
+            else:
+                result["errors"].append({"index": index, "code": None, "message": f"Unsupported op {op}"})
+                if ordered:
+                    break
+        return result
+
     async def delete_one(self, collection: str, query: Dict[str, Any]) -> bool:
         """Delete a single document"""
         if collection not in self.collections:
             return False
         items = self.collections[collection]
         for i, item in enumerate(items):
-            if all(item.get(k) == v for k, v in query.items()):
+            if self._matches(item, query):
                 items.pop(i)
                 return True
         return False
 
+    async def find_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Find a user by email"""
+        return await self.find_one("users", {"email": email})
+
 class MockAuthService(AuthService):
     def __init__(self):
         self.users = {}  # Simulate user database
@@ -0,0 +1,58 @@
+import json
+import time
+from datetime import datetime, timedelta, UTC
+from typing import Dict, Optional
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+
+class FakeTokenIssuer:
+    """Issues Firebase-shaped ID tokens signed with a throwaway local RSA key"""
+
+    def __init__(self, project_id: str = "test-project", key_id: str = "test-key"):
+        self.project_id = project_id
+        self.key_id = key_id
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "fake-securetoken")])
+        now = datetime.now(UTC)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - timedelta(days=1))
+            .not_valid_after(now + timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        )
+        self.signer = crypt.RSASigner.from_string(private_pem, key_id=key_id)
+        self.certs = {key_id: cert.public_bytes(serialization.Encoding.PEM).decode()}
+        self.fetch_count = 0
+
+    def fetch(self, url: str) -> tuple:
+        """Serve the certificate endpoint, matching PublicKeyCache's fetch signature"""
+        self.fetch_count += 1
+        return json.dumps(self.certs).encode(), 3600
+
+    def issue(self, uid: str = "test_user", email: str = "test@example.com",
+              lifetime: int = 3600, claims: Optional[Dict] = None) -> str:
+        """Return a signed ID token for uid"""
+        now = int(time.time())
+        payload = {
+            "iss": f"https://securetoken.google.com/{self.project_id}",
+            "aud": self.project_id,
+            "sub": uid,
+            "email": email,
+            "iat": now,
+            "exp": now + lifetime
+        }
+        payload.update(claims or {})
+        return jwt.encode(self.signer, payload).decode()
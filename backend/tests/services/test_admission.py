@@ -0,0 +1,121 @@
+import importlib.util
+import os
+import threading
+import time
+from pathlib import Path
+import pytest
+from flask import Flask
+from werkzeug.test import Client
+from backend.shared.middleware.admission import AdmissionController
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def make_app(release: threading.Event):
+    app = Flask(__name__)
+
+    @app.route("/work")
+    def work():
+        release.wait(5)
+        return "done"
+
+    @app.route("/api/health")
+    def health():
+        return "ok"
+
+    return app
+
+
+class TestAdmissionController:
+    def run_concurrently(self, controller, count, path="/work"):
+        results = [None] * count
+
+        def call(i):
+            response = Client(controller).get(path, headers={"Origin": "https://a.example"}, buffered=True)
+            results[i] = (response.status_code, response.headers)
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_excess_requests_are_shed_with_retry_after(self):
+        release = threading.Event()
+        controller = AdmissionController(
+            make_app(release).wsgi_app, max_in_flight=2, max_queue=1, queue_timeout=5, retry_after=3,
+            reject_headers=lambda environ: [("Access-Control-Allow-Origin", environ["HTTP_ORIGIN"])]
+        )
+
+        threads, results = self.run_concurrently(controller, 5)
+        deadline = time.monotonic() + 5
+        while controller.rejected < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        statuses = sorted(status for status, _ in results)
+        assert statuses == [200, 200, 200, 503, 503]
+        rejected = next(headers for status, headers in results if status == 503)
+        assert rejected["Retry-After"] == "3"
+        assert rejected["Access-Control-Allow-Origin"] == "https://a.example"
+        assert controller.stats()["in_flight"] == 0
+
+    def test_queued_request_times_out(self):
+        release = threading.Event()
+        controller = AdmissionController(make_app(release).wsgi_app, max_in_flight=1, max_queue=1,
+                                         queue_timeout=0.05)
+
+        threads, results = self.run_concurrently(controller, 2)
+        threads[1].join(2)
+        release.set()
+        threads[0].join()
+
+        assert sorted(status for status, _ in results) == [200, 503]
+
+    def test_exempt_paths_bypass_limits(self):
+        release = threading.Event()
+        controller = AdmissionController(make_app(release).wsgi_app, max_in_flight=1,
+                                         exempt_paths=("/api/health",))
+
+        threads, _ = self.run_concurrently(controller, 1)
+        try:
+            assert Client(controller).get("/api/health").status_code == 200
+        finally:
+            release.set()
+            threads[0].join()
+
+
+class TestGunicornConfig:
+    @pytest.fixture
+    def conf(self, monkeypatch, tmp_path):
+        # Loading the config sets environment defaults; keep them out of the real environment
+        monkeypatch.setattr(os, "environ", {"PATH": os.environ.get("PATH", "")})
+        spec = importlib.util.spec_from_file_location("gunicorn_conf", BACKEND_DIR / "gunicorn.conf.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        monkeypatch.setattr(module, "CGROUP_ROOT", tmp_path)
+        os.environ.clear()
+        return module
+
+    def test_reads_cgroup_v2_limits(self, conf, tmp_path):
+        (tmp_path / "cpu.max").write_text("250000 100000\n")
+        (tmp_path / "memory.max").write_text(str(512 * 1024 * 1024))
+
+        assert conf.cpu_limit() == 2.5
+        assert conf.memory_limit() == 512 * 1024 * 1024
+
+    def test_plan_scales_with_cpu_and_is_capped_by_memory(self, conf):
+        assert conf.plan(1, 0) == {
+            "workers": 1, "threads": 32, "admission_max_in_flight": 8, "admission_max_queue": 8
+        }
+        assert conf.plan(4, 0)["workers"] == 4
+        assert conf.plan(4, 512 * 1024 * 1024)["workers"] == 2
+        assert conf.plan(0.5, 0)["admission_max_in_flight"] == 4
+
+    def test_environment_overrides(self, conf):
+        os.environ.update({"WEB_CONCURRENCY": "3", "ADMISSION_MAX_IN_FLIGHT": "5", "ADMISSION_MAX_QUEUE": "0"})
+
+        assert conf.plan(1, 0) == {
+            "workers": 3, "threads": 10, "admission_max_in_flight": 5, "admission_max_queue": 0
+        }
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import io
+import time
+import pytest
+from flask import Flask
+import services.factory as factory
+from backend.apps.app1.services.blob_store import blob_path
+from backend.shared.middleware.admission import AdmissionController
+from backend.shared.middleware.asgi import PooledWsgiToAsgi
+from backend.tests.mocks.mock_services import MockAuthService, MockDatabaseService, MockStorageService
+
+
+async def call_asgi(app, path, method="GET"):
+    """Send one HTTP request through an ASGI app and return (status, body)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"test")], "server": ("test", 80), "client": ("c", 1),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body")
+    return messages[0]["status"], body
+
+
+@pytest.mark.asyncio
+class TestPooledWsgiToAsgi:
+    async def test_slow_requests_overlap(self):
+        flask_app = Flask(__name__)
+
+        @flask_app.route("/slow")
+        def slow():
+            time.sleep(0.1)  # blocking upstream call
+            return "ok"
+
+        asgi_app = PooledWsgiToAsgi(flask_app, threads=32)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call_asgi(asgi_app, "/slow") for _ in range(20)))
+
+        assert results == [(200, b"ok")] * 20
+        # Serialised this would take 2s
+        assert time.perf_counter() - started < 1.0
+
+    async def test_async_views_overlap_their_blocking_calls(self):
+        flask_app = Flask(__name__)
+
+        @flask_app.route("/files")
+        async def files():
+            await asyncio.gather(*(asyncio.to_thread(time.sleep, 0.1) for _ in range(3)))
+            return "ok"
+
+        asgi_app = PooledWsgiToAsgi(flask_app, threads=2)
+
+        started = time.perf_counter()
+        results = await asyncio.wait_for(
+            asyncio.gather(*(call_asgi(asgi_app, "/files") for _ in range(4))), timeout=5
+        )
+
+        assert results == [(200, b"ok")] * 4
+        # Two requests at a time, each waiting about as long as one of its calls
+        assert time.perf_counter() - started < 0.5
+
+    async def test_overflow_is_shed_instead_of_waiting_for_a_thread(self):
+        flask_app = Flask(__name__)
+
+        @flask_app.route("/slow")
+        def slow():
+            time.sleep(0.2)
+            return "ok"
+
+        controller = AdmissionController(flask_app.wsgi_app, max_in_flight=1, max_queue=1, queue_timeout=1.0)
+        flask_app.wsgi_app = controller
+        asgi_app = PooledWsgiToAsgi(flask_app, threads=2, admission=controller)
+
+        async def timed_call():
+            started = time.perf_counter()
+            status, _ = await call_asgi(asgi_app, "/slow")
+            return status, time.perf_counter() - started
+
+        results = await asyncio.gather(*(timed_call() for _ in range(10)))
+
+        statuses = sorted(status for status, _ in results)
+        assert statuses == [200, 200] + [503] * 8
+        # Shed requests are answered at once; only the admitted and queued ones wait
+        assert sorted(seconds for _, seconds in results)[7] < 0.1
+        assert max(seconds for _, seconds in results) < 0.8
+        assert controller.stats()["rejected"] == 8 and asgi_app.busy == 0
+
+
+class TestFileRoutes:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        storage = MockStorageService()
+        monkeypatch.setattr(factory, "_auth_service", MockAuthService())
+        monkeypatch.setattr(factory, "_storage_service", storage)
+        monkeypatch.setattr(factory, "_database_service", MockDatabaseService())
+        from apps.app1.routes import files_bp
+        app = Flask(__name__)
+        app.register_blueprint(files_bp, url_prefix="/api/v1/files")
+        client = app.test_client()
+        client.storage = storage
+        return client
+
+    def test_requires_token(self, client):
+        assert client.get("/api/v1/files/download-urls?filename=a.csv").status_code == 401
+        response = client.get("/api/v1/files/download-urls?filename=a.csv",
+                              headers={"Authorization": "Bearer bad"})
+        assert response.status_code == 401
+
+    def test_upload_list_and_delete(self, client):
+        headers = {"Authorization": "Bearer valid_token"}
+
+        response = client.post("/api/v1/files", headers=headers, data={
+            "files": [(io.BytesIO(b"a,b"), "a.csv"), (io.BytesIO(b"c,d"), "b.csv")]
+        }, content_type="multipart/form-data")
+
+        a_path, b_path = (blob_path(hashlib.sha256(data).hexdigest()) for data in (b"a,b", b"c,d"))
+        assert response.status_code == 200
+        assert [f["path"] for f in response.get_json()["files"]] == [a_path, b_path]
+        assert client.storage.files[b_path] == b"c,d"
+
+        response = client.get("/api/v1/files/download-urls?filename=a.csv", headers=headers)
+        assert response.get_json()["urls"] == {"a.csv": f"http://mock-url/{a_path}"}
+
+        response = client.delete("/api/v1/files", headers=headers, json={"filenames": ["a.csv", "c.csv"]})
+        assert [f["deleted"] for f in response.get_json()["files"]] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_response_is_closed_after_sending():
+    flask_app = Flask(__name__)
+
+    @flask_app.route("/ok")
+    def ok():
+        return "ok"
+
+    controller = AdmissionController(flask_app.wsgi_app, max_in_flight=1)
+    flask_app.wsgi_app = controller
+
+    assert await call_asgi(PooledWsgiToAsgi(flask_app, threads=2), "/ok") == (200, b"ok")
+    assert controller.stats()["in_flight"] == 0
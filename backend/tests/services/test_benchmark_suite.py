@@ -0,0 +1,71 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from backend.benchmarks.standins import FakeGCSServer, write_service_account_key
+from backend.benchmarks.suite import compare, measure
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+def _report(p95: float, rps: float) -> dict:
+    return {"scenarios": {"validate_token": {"requests_per_second": rps, "latency_ms": {"p95": p95}}}}
+
+
+class TestFakeGCSServer:
+    @pytest.fixture
+    def server(self):
+        with FakeGCSServer() as server:
+            yield server
+
+    @pytest.fixture
+    def storage_service(self, server, tmp_path, monkeypatch):
+        from backend.services.implementations.storage.gcs import GCSStorageService
+        monkeypatch.setenv("STORAGE_EMULATOR_HOST", server.url)
+        key_path = write_service_account_key(tmp_path / "key.json", f"{server.url}/token")
+        return GCSStorageService("bench", credentials_path=str(key_path),
+                                 project_id="bench-project", chunk_size=256 * 1024)
+
+    @pytest.mark.asyncio
+    async def test_uploads_and_batch_deletes_round_trip(self, storage_service, server):
+        data = os.urandom(600 * 1024)
+
+        url = await storage_service.upload_file(io.BytesIO(b"hello"), "a/small.txt")
+        await storage_service.upload_stream(io.BytesIO(data), "a/large.bin")
+        results = await storage_service.delete_many(["a/small.txt", "a/missing.txt"])
+
+        assert "X-Goog-Signature" in url
+        assert server.objects == {("bench", "a/large.bin"): data}
+        assert [result["deleted"] for result in results] == [True, False]
+        assert results[1]["error"] == "HTTP 404"
+
+
+class TestSuite:
+    def test_measure_reports_percentiles_and_errors(self):
+        result = measure(lambda i: i % 4 != 0, requests=20, concurrency=2)
+
+        assert result["requests"] == 20
+        assert result["errors"] == 5
+        assert set(result["latency_ms"]) == {"p50", "p95", "p99"}
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        baseline = _report(p95=10.0, rps=100.0)
+
+        assert compare(baseline, _report(p95=11.0, rps=95.0), tolerance=20) == []
+        regressions = compare(baseline, _report(p95=13.0, rps=70.0), tolerance=20)
+        assert len(regressions) == 2
+
+    def test_suite_runs_against_stand_ins(self):
+        result = subprocess.run(
+            [sys.executable, "benchmarks/suite.py", "--requests", "3", "--warmup", "1",
+             "--scenarios", "validate_token,upload,delete_files"],
+            cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120
+        )
+
+        assert result.returncode == 0, result.stderr
+        report = json.loads(result.stdout)
+        assert set(report["scenarios"]) == {"validate_token", "upload", "delete_files"}
+        assert all(scenario["errors"] == 0 for scenario in report["scenarios"].values())
@@ -0,0 +1,76 @@
+import pytest
+from unittest.mock import MagicMock
+from backend.services.implementations.database.caching import CachingDatabaseService, parse_cache_policies
+from backend.tests.mocks.mock_services import MockDatabaseService
+
+
+@pytest.mark.asyncio
+class TestCachingDatabaseService:
+    @pytest.fixture
+    def inner(self):
+        service = MockDatabaseService()
+        service.collections["users"] = [{"email": "a@example.com", "name": "A"}]
+        service.collections["logs"] = [{"id": 1}]
+        return service
+
+    @pytest.fixture
+    def db_service(self, inner):
+        return CachingDatabaseService(inner, {"users": (60, 100)})
+
+    async def test_repeat_reads_are_served_from_cache(self, db_service, inner, mocker):
+        find_one = mocker.spy(inner, "find_one")
+
+        first = await db_service.find_one("users", {"email": "a@example.com"})
+        second = await db_service.find_one("users", {"email": "a@example.com"})
+
+        assert first == second == {"email": "a@example.com", "name": "A"}
+        assert find_one.call_count == 1
+        assert db_service.get_cache_stats()["users"]["hits"] == 1
+
+    async def test_cached_documents_are_copies(self, db_service):
+        first = await db_service.find_one("users", {"email": "a@example.com"})
+        first["name"] = "changed"
+
+        second = await db_service.find_one("users", {"email": "a@example.com"})
+        assert second["name"] == "A"
+
+    async def test_write_invalidates_collection(self, db_service, inner):
+        assert (await db_service.find_user_by_email("a@example.com"))["name"] == "A"
+
+        await db_service.update_one("users", {"email": "a@example.com"}, {"name": "B"})
+
+        assert (await db_service.find_user_by_email("a@example.com"))["name"] == "B"
+
+    async def test_missing_user_is_visible_after_create(self, db_service):
+        assert await db_service.find_user_by_email("new@example.com") is None
+
+        await db_service.insert_one("users", {"email": "new@example.com"})
+
+        assert await db_service.find_user_by_email("new@example.com") is not None
+
+    async def test_uncached_collection_passes_through(self, db_service, inner, mocker):
+        find_one = mocker.spy(inner, "find_one")
+
+        await db_service.find_one("logs", {"id": 1})
+        await db_service.find_one("logs", {"id": 1})
+
+        assert find_one.call_count == 2
+
+
+def test_blocking_service_keeps_sync_interface():
+    inner = MagicMock()
+    inner.find_one.return_value = {"code": "USD"}
+    db_service = CachingDatabaseService(inner, {"currencies": (3600, 10)})
+
+    assert db_service.find_one("currencies", {"code": "USD"}) == {"code": "USD"}
+    assert db_service.find_one("currencies", {"code": "USD"}) == {"code": "USD"}
+    assert inner.find_one.call_count == 1
+    assert db_service.get_pool_stats is inner.get_pool_stats
+
+
+def test_parse_cache_policies():
+    assert parse_cache_policies("users:60:100; currencies:3600:50") == {
+        "users": (60.0, 100), "currencies": (3600.0, 50)
+    }
+    with pytest.raises(ValueError):
+        parse_cache_policies("users:60")
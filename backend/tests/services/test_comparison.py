@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+import random
+import pytest
+from flask import Flask
+import services.factory as factory
+from apps.comparison.external_sort import ExternalSorter
+from apps.comparison.keyed_diff import MergeJoin, sort_key
+from apps.comparison.services.comparison_service import ComparisonService
+from apps.jobs.services.job_queue import JOBS_COLLECTION, JobQueue
+from apps.jobs.worker import JobWorker
+from backend.tests.mocks.mock_services import MockAuthService, MockDatabaseService, MockStorageService
+
+OLD = (
+    "id,name,amount\n"
+    "1,Alpha,10\n"
+    "2,Beta,20\n"
+    "3,Gamma,30\n"
+    "3,Gamma,31\n"
+    "A7,Text key,5\n"
+).encode()
+NEW = (
+    "id;name;amount;note\n"
+    "3;Gamma;30;x\n"
+    "1;Alpha;10.0;\n"
+    "4;Delta;40;\n"
+    "2;Beta;25;\n"
+    "A7;Text key;5;\n"
+).encode()
+SPEC = {"left": "old.csv", "right": "new.csv", "key": ["id"]}
+
+
+def store(storage, user_id="u1"):
+    # Files stored before content addressing resolve to their per-user path
+    for name, data in (("old.csv", OLD), ("new.csv", NEW)):
+        storage.files[f"users/{user_id}/files/{name}"] = data
+
+
+class TestExternalSort:
+    def test_spilled_runs_merge_in_order(self, tmp_path):
+        generator = random.Random(0)
+        items = [((generator.randrange(1000),), row, ["x" * 10]) for row in range(5000)]
+        sorter = ExternalSorter(memory_bytes=20000, directory=str(tmp_path), fan_in=4)
+
+        sorter.extend(items)
+        result = list(sorter.sorted())
+
+        assert result == sorted(items)
+        assert sorter.runs > 4 and sorter.merge_passes >= 1 and sorter.spilled_bytes > 0
+        sorter.close()
+        assert os.listdir(tmp_path) == []
+
+    def test_keys_of_mixed_types_pair_up(self):
+        left = sorted([(sort_key([value]), row, [value]) for row, value in enumerate([10, "10", None, 2.5, 2.5])])
+        right = sorted([(sort_key([value]), row, [value]) for row, value in enumerate([10.0, "b", 2.5])])
+
+        join = MergeJoin(iter(left), iter(right))
+        kinds = [(kind, (old or new)[2][0]) for kind, old, new in join]
+
+        assert kinds == [("deleted", None), ("matched", 2.5), ("deleted", 2.5), ("matched", 10),
+                         ("deleted", "10"), ("inserted", "b")]
+        assert join.duplicate_keys == 1
+
+
+@pytest.mark.asyncio
+class TestComparisonService:
+    @pytest.mark.parametrize("memory_bytes", [64 * 1024 * 1024, 1024])
+    async def test_files_are_diffed_by_key(self, memory_bytes, tmp_path):
+        storage = MockStorageService()
+        store(storage)
+        service = ComparisonService(storage, MockDatabaseService(), memory_bytes=memory_bytes,
+                                    directory=str(tmp_path))
+
+        comparison = await service.prepare("u1", SPEC)
+        events = [json.loads(line) for chunk in comparison.ndjson() for line in chunk.splitlines()]
+
+        assert events[0] == {"type": "columns", "key": ["id"], "compared": ["name", "amount"],
+                             "left_only": [], "right_only": ["note"]}
+        assert [(event["type"], event["key"]) for event in events[1:-1]] == [
+            ("changed", {"id": 2}), ("deleted", {"id": 3}), ("inserted", {"id": 4})
+        ]
+        assert events[1]["fields"] == {"amount": [20, 25]} and events[1]["left_row"] == 2
+        assert events[2]["record"] == {"id": 3, "name": "Gamma", "amount": 31}
+        summary = events[-1]
+        assert summary["unchanged"] == 3 and summary["duplicate_keys"] == 1
+        assert (summary["sort"]["left"]["runs"] > 0) == (memory_bytes == 1024)
+        assert os.listdir(tmp_path) == []
+
+    async def test_invalid_specs_are_rejected(self):
+        storage = MockStorageService()
+        store(storage)
+        service = ComparisonService(storage, MockDatabaseService())
+
+        with pytest.raises(ValueError, match="'key'"):
+            await service.prepare("u1", {"left": "old.csv", "right": "new.csv", "key": []})
+        with pytest.raises(ValueError, match="Key column"):
+            await service.prepare("u1", {**SPEC, "key": ["note"]})
+        with pytest.raises(ValueError, match="Compared column"):
+            await service.prepare("u1", {**SPEC, "compare": ["note"]})
+        with pytest.raises(FileNotFoundError):
+            await service.prepare("u1", {**SPEC, "right": "missing.csv"})
+
+
+class TestComparisonRoutes:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        db, storage = MockDatabaseService(), MockStorageService()
+        store(storage, "test_user")
+        monkeypatch.setattr(factory, "_auth_service", MockAuthService())
+        monkeypatch.setattr(factory, "_database_service", db)
+        monkeypatch.setattr(factory, "_storage_service", storage)
+        from apps.comparison.routes import comparison_bp
+        app = Flask(__name__)
+        app.register_blueprint(comparison_bp, url_prefix="/api/v1/comparison")
+        client = app.test_client()
+        client.db, client.storage = db, storage
+        return client
+
+    def test_diff_streams_as_ndjson(self, client):
+        response = client.post("/api/v1/comparison", json=SPEC, headers={"Authorization": "Bearer valid_token"})
+
+        assert response.status_code == 200 and response.mimetype == "application/x-ndjson"
+        events = [json.loads(line) for line in response.get_data().splitlines()]
+        assert [event["type"] for event in events] == ["columns", "changed", "deleted", "inserted", "summary"]
+        response = client.post("/api/v1/comparison", json={**SPEC, "left": "data.pdf"},
+                               headers={"Authorization": "Bearer valid_token"})
+        assert response.status_code == 400
+
+    def test_large_files_are_sent_to_the_queue(self, client, monkeypatch):
+        monkeypatch.setattr(factory.get_config(), "COMPARISON_STREAM_MAX_BYTES", len(OLD) + len(NEW) - 1)
+
+        response = client.post("/api/v1/comparison", json=SPEC, headers={"Authorization": "Bearer valid_token"})
+
+        assert response.status_code == 413 and "/api/v1/comparison/jobs" in response.get_json()["error"]
+
+    def test_queued_comparison_is_written_to_storage(self, client):
+        headers = {"Authorization": "Bearer valid_token"}
+
+        job_id = client.post("/api/v1/comparison/jobs", json=SPEC, headers=headers).get_json()["job_id"]
+        assert client.get(f"/api/v1/comparison/jobs/{job_id}/download-url", headers=headers).status_code == 409
+        asyncio.run(JobWorker(JobQueue(client.db), concurrency=1).run_once())
+
+        response = client.get(f"/api/v1/comparison/jobs/{job_id}/download-url", headers=headers)
+        path = f"comparisons/test_user/{job_id}.ndjson"
+        assert response.status_code == 200 and response.get_json()["url"] == f"http://mock-url/{path}"
+        assert response.get_json()["summary"]["changed"] == 1
+        lines = client.storage.files[path].splitlines()
+        assert len(lines) == 5 and json.loads(lines[-1])["type"] == "summary"
+        assert client.db.collections[JOBS_COLLECTION][0]["kind"] == "comparison.run"
@@ -0,0 +1,69 @@
+import pytest
+from flask import Flask, abort
+from backend.shared.middleware.cors import CorsPolicy, init_cors
+
+ALLOWED = "https://universalmatchingv2.web.app"
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    init_cors(app, CorsPolicy([ALLOWED, "http://localhost:5173"]))
+
+    @app.route("/api/auth/validate", methods=["POST"])
+    def validate():
+        return {"status": "success"}
+
+    @app.route("/api/files")
+    def compressed():
+        return {"files": []}, 200, {"Vary": "Accept-Encoding"}
+
+    @app.route("/api/auth/missing")
+    def missing():
+        abort(404)
+
+    return app.test_client()
+
+
+def test_preflight_is_answered_before_routing(client):
+    response = client.options("/api/auth/validate", headers={
+        "Origin": ALLOWED, "Access-Control-Request-Method": "POST"
+    })
+
+    assert response.status_code == 204
+    assert response.headers["Access-Control-Allow-Origin"] == ALLOWED
+    assert response.headers["Access-Control-Allow-Credentials"] == "true"
+    assert response.headers["Access-Control-Allow-Headers"] == "Content-Type, Authorization"
+    assert response.headers["Access-Control-Max-Age"] == "3600"
+
+
+def test_allowed_origin_gets_headers_once(client):
+    response = client.post("/api/auth/validate", headers={"Origin": ALLOWED})
+
+    assert response.headers.getlist("Access-Control-Allow-Origin") == [ALLOWED]
+    assert response.headers["Vary"] == "Origin"
+    assert "Access-Control-Allow-Methods" not in response.headers
+
+
+def test_origin_is_added_to_an_existing_vary(client):
+    response = client.get("/api/files", headers={"Origin": ALLOWED})
+
+    assert response.headers["Vary"] == "Accept-Encoding, Origin"
+
+
+def test_unknown_origin_gets_no_headers(client):
+    response = client.post("/api/auth/validate", headers={"Origin": "https://evil.example"})
+
+    assert "Access-Control-Allow-Origin" not in response.headers
+
+    preflight = client.options("/api/auth/validate", headers={
+        "Origin": "https://evil.example", "Access-Control-Request-Method": "POST"
+    })
+    assert "Access-Control-Allow-Origin" not in preflight.headers
+
+
+def test_error_responses_get_headers(client):
+    response = client.get("/api/auth/missing", headers={"Origin": ALLOWED})
+
+    assert response.status_code == 404
+    assert response.headers["Access-Control-Allow-Origin"] == ALLOWED
@@ -40,4 +40,37 @@ class TestDatabaseService:
         # Test finding multiple documents
         results = await db_service.find_many(collection, {"role": "user"})
         assert len(results) == 2
-        assert all(doc["role"] == "user" for doc in results) 
\ No newline at end of file
+        assert all(doc["role"] == "user" for doc in results) 
+
+    async def test_iter_many_streams_sorted_page(self, db_service):
+        db_service.collections["records"] = [{"_id": i, "value": i % 3} for i in range(10)]
+
+        results = [doc async for doc in db_service.iter_many(
+            "records", {}, sort=[("_id", -1)], skip=1, limit=3
+        )]
+
+        assert [doc["_id"] for doc in results] == [8, 7, 6]
+
+    async def test_iter_many_keyset_pagination(self, db_service):
+        db_service.collections["records"] = [{"_id": i, "value": i % 3} for i in range(10)]
+
+        first_page = await db_service.find_many("records", {"value": 0}, sort=[("_id", 1)], limit=2)
+        next_page = [doc async for doc in db_service.iter_many(
+            "records", {"value": 0}, limit=2, after=first_page[-1]["_id"]
+        )]
+
+        assert [doc["_id"] for doc in first_page] == [0, 3]
+        assert [doc["_id"] for doc in next_page] == [6, 9]
+
+    async def test_bulk_write_and_upsert(self, db_service):
+        await db_service.insert_many("records", [{"n": 1}, {"n": 2}])
+
+        result = await db_service.bulk_write("records", [
+            {"op": "update_one", "filter": {"n": 1}, "update": {"seen": True}},
+            {"op": "update_one", "filter": {"n": 3}, "update": {"seen": True}, "upsert": True},
+            {"op": "delete_one", "filter": {"n": 2}}
+        ])
+
+        assert result["errors"] == []
+        assert await db_service.update_many("records", {"seen": True}, {"checked": True}) == 2
+        assert [doc["n"] for doc in db_service.collections["records"]] == [1, 3]
@@ -0,0 +1,105 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from apps.matching.services.match_job_service import MatchJobService
+from apps.parser.columnar import ColumnarBuilder, ColumnarDataset
+from apps.parser.services.dataset_cache import STORAGE_PREFIX, DatasetCache
+from apps.parser.services.parser_service import DATASETS_COLLECTION, RECORDS_COLLECTION, ParserService
+from backend.tests.mocks.mock_services import MockDatabaseService, MockStorageService
+
+LEFT_CSV = b"name,city,amount\nRobert Smith,London,100\nAshcraft Ltd,Leeds,250\n\nJane Doe,York,75\n"
+RIGHT_CSV = b"name,city,amount\nRupert Smith,London,101\nAshcroft Ltd,Leeds,900\nJayne Do,York,75\n"
+
+
+def build(directory, records, columns=("name", "amount")):
+    builder = ColumnarBuilder(directory, list(columns))
+    builder.append(records[:1])
+    builder.append(records[1:])
+    builder.finish(key=os.path.basename(directory))
+    return ColumnarDataset(directory)
+
+
+class TestColumnarDataset:
+    def test_values_and_encoded_columns_round_trip(self, tmp_path):
+        records = [{"_row": 1, "name": "Zoë", "amount": 1.5}, {"_row": 3, "name": None, "amount": 7}]
+
+        dataset = build(tmp_path / "d", records)
+
+        assert dataset.row_numbers.tolist() == [1, 3]
+        assert dataset.values("name") == ["Zoë", None] and dataset.values("amount") == ["1.5", "7"]
+        assert dataset.values("missing") == [None, None]
+        assert dataset.encoded("name", "StringColumn") == {}
+        dataset.add_encoded("missing", "NumericColumn", {"values": [0.5, 1.5]})
+        assert dataset.encoded("missing", "NumericColumn")["values"].tolist() == [0.5, 1.5]
+
+
+@pytest.mark.asyncio
+class TestDatasetCache:
+    async def test_least_recently_used_datasets_are_evicted(self, tmp_path):
+        cache = DatasetCache(str(tmp_path), max_bytes=10 ** 9, use_storage=False)
+        records = [{"_row": row, "name": "x" * 100} for row in range(1, 51)]
+        for key in ("a", "b", "c"):
+            await cache.publish(key, cache_builder(cache, records))
+        os.utime(tmp_path / "a" / "manifest.json", (0, 0))
+        os.utime(tmp_path / "b" / "manifest.json", (1, 1))
+        await cache.open("a")
+
+        cache.max_bytes = 2 * ColumnarDataset(tmp_path / "a").manifest["bytes"] + 4096
+
+        assert cache.evict() == ["b"]
+        assert await cache.open("b") is None and (await cache.open("a")).rows == 50
+
+    async def test_a_cold_cache_downloads_from_storage(self, tmp_path):
+        storage = MockStorageService()
+        warm = DatasetCache(str(tmp_path / "warm"), storage=storage)
+        await warm.publish("k", cache_builder(warm, [{"_row": 1, "name": "Smith"}]))
+        assert f"{STORAGE_PREFIX}/k/manifest.json" in storage.files
+
+        cold = await DatasetCache(str(tmp_path / "cold"), storage=storage).open("k")
+
+        assert cold.values("name") == ["Smith"]
+
+
+def cache_builder(cache, records):
+    builder = cache.builder(["name"])
+    builder.append(records)
+    return builder
+
+
+@pytest.mark.asyncio
+class TestCachedMatchJobs:
+    async def test_cached_datasets_match_like_the_database(self, tmp_path):
+        db = MockDatabaseService()
+        cache = DatasetCache(str(tmp_path), storage=MockStorageService())
+        parser = ParserService(db, cache=cache)
+        spec = {"comparators": [{"field": "name", "method": "jaccard", "weight": 2},
+                                {"field": "name", "method": "jaro_winkler"},
+                                {"field": "city", "method": "exact"},
+                                {"field": "amount", "method": "numeric", "options": {"relative": 0.05}}],
+                "keys": [{"type": "soundex", "field": "name"}], "threshold": 0.5}
+        for side, data in (("left", LEFT_CSV), ("right", RIGHT_CSV)):
+            dataset = await parser.create("user-1", f"{side}.csv")
+            await parser.ingest(dataset, io.BytesIO(data))
+            spec[side] = {"collection": RECORDS_COLLECTION, "query": {"dataset_id": dataset["_id"]}}
+        assert all(dataset["cache_key"] for dataset in db.collections[DATASETS_COLLECTION])
+
+        results = {}
+        with ThreadPoolExecutor(1) as pool:
+            for name, service in (("database", MatchJobService(db, workers=1, pool=pool)),
+                                  ("cache", MatchJobService(db, workers=1, pool=pool, cache=cache)),
+                                  ("encoded", MatchJobService(db, workers=1, pool=pool, cache=cache))):
+                service.cache_enabled = name != "database"
+                job = await service.create("user-1", spec)
+                stats = await service.run(job["_id"])
+                assert stats["loaded_from"] == {"left": name if name == "database" else "cache",
+                                                "right": name if name == "database" else "cache"}
+                results[name] = [(r["left_id"], r["right_id"], r["score"])
+                                 for r in await service.results("user-1", job["_id"])]
+
+        assert results["cache"] == results["database"] == results["encoded"]
+        # Rows are numbered by file line, so the blank line leaves a gap
+        assert sorted((left[-2:], right[-2:]) for left, right, _ in results["database"]) == \
+            [(":1", ":1"), (":2", ":2"), (":4", ":3")]
+        left = await cache.open(db.collections[DATASETS_COLLECTION][0]["cache_key"])
+        assert set(left.encoded("name", "StringColumn")) == {"codes", "lengths", "bits", "tokens", "token_counts"}
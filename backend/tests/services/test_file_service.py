@@ -1,32 +1,182 @@
+import hashlib
+import io
+import time
 import pytest
-from backend.apps.app1.services.file_service import FileService
-from ..mocks.mock_services import MockStorageService
+from pymongo.errors import DuplicateKeyError
+from backend.apps.app1.services.blob_store import BLOBS_COLLECTION, blob_path
+from backend.apps.app1.services.file_service import FILE_REFS_COLLECTION, FileService
+from backend.services.implementations.storage import gcs
+from ..mocks.mock_services import MockDatabaseService, MockStorageService
+
+CONTENT = b"test content"
+SHA256 = hashlib.sha256(CONTENT).hexdigest()
+
+
+class UploadedFile(io.BytesIO):
+    """A werkzeug FileStorage-like seekable upload"""
+
+    def __init__(self, data: bytes, filename: str):
+        super().__init__(data)
+        self.filename = filename
+        self.content_type = "text/plain"
+
+
+class CountingStorage(MockStorageService):
+    def __init__(self):
+        super().__init__()
+        self.uploads = 0
+
+    async def upload_file(self, file_data, path):
+        self.uploads += 1
+        return await super().upload_file(file_data, path)
+
 
 class TestFileService:
     @pytest.fixture
     def file_service(self):
-        service = FileService()
-        service.storage = MockStorageService()
-        return service
+        return FileService(CountingStorage(), MockDatabaseService())
+
+    @pytest.fixture
+    def mock_file(self):
+        return UploadedFile(CONTENT, "test.txt")
 
     @pytest.mark.asyncio
     async def test_store_user_file(self, file_service, mock_file):
         # Act
         url = await file_service.store_user_file("user123", mock_file)
-        
+
         # Assert
-        assert url == "http://mock-url/users/user123/files/test.txt"
-        assert file_service.storage.files[f"users/user123/files/test.txt"] == b"test content"
+        assert url == f"http://mock-url/{blob_path(SHA256)}"
+        assert file_service.storage.files[blob_path(SHA256)] == CONTENT
+        assert await file_service.file_path("user123", "test.txt") == blob_path(SHA256)
+
+    @pytest.mark.asyncio
+    async def test_identical_content_is_uploaded_once(self, file_service):
+        results = await file_service.store_user_files("user123", [UploadedFile(CONTENT, "a.txt"),
+                                                                  UploadedFile(b"other", "b.txt")])
+        again = await file_service.store_user_file("user456", UploadedFile(CONTENT, "copy.txt"))
+
+        assert [result["error"] for result in results] == [None, None]
+        assert "deduplicated" not in results[0]
+        assert file_service.storage.uploads == 2 and again == results[0]["url"]
+        blob = await file_service.db.find_one(BLOBS_COLLECTION, {"_id": SHA256})
+        assert blob["refs"] == 2
+
+    @pytest.mark.asyncio
+    async def test_gcs_uploads_take_about_as_long_as_the_slowest(self, mocker):
+        mocker.patch.object(gcs.storage, "Client")
+        storage = gcs.GCSStorageService("test-bucket")
+        blob = storage.bucket.blob.return_value
+        blob.exists.side_effect = lambda: time.sleep(0.2) or False
+        blob.upload_from_file.side_effect = lambda *args, **kwargs: time.sleep(0.3)
+        blob.generate_signed_url.return_value = "https://signed"
+        file_service = FileService(storage, MockDatabaseService())
+
+        started = time.perf_counter()
+        results = await file_service.store_user_files(
+            "user123", [UploadedFile(f"content {i}".encode(), f"{i}.txt") for i in range(5)]
+        )
+
+        assert [result["error"] for result in results] == [None] * 5
+        # Each file takes 0.5s; one after another they would take 2.5s
+        assert time.perf_counter() - started < 0.9
+
+    @pytest.mark.asyncio
+    async def test_content_is_deleted_with_its_last_reference(self, file_service):
+        await file_service.store_user_file("user123", UploadedFile(CONTENT, "a.txt"))
+        await file_service.store_user_file("user456", UploadedFile(CONTENT, "b.txt"))
+
+        assert await file_service.delete_user_file("user123", "a.txt") is True
+        assert blob_path(SHA256) in file_service.storage.files
+        results = await file_service.delete_user_files("user456", ["b.txt"])
+
+        assert results == [{"path": blob_path(SHA256), "deleted": True, "error": None}]
+        assert file_service.storage.files == {}
+        assert file_service.db.collections[BLOBS_COLLECTION] == []
+
+    @pytest.mark.asyncio
+    async def test_reusing_a_filename_releases_the_replaced_content(self, file_service):
+        await file_service.store_user_file("user123", UploadedFile(b"v1", "a.txt"))
+        await file_service.store_user_file("user123", UploadedFile(CONTENT, "a.txt"))
+        await file_service.store_user_file("user123", UploadedFile(CONTENT, "a.txt"))
+
+        assert list(file_service.storage.files) == [blob_path(SHA256)]
+        assert len(file_service.db.collections[FILE_REFS_COLLECTION]) == 1
+        assert (await file_service.db.find_one(BLOBS_COLLECTION, {"_id": SHA256}))["refs"] == 1
+
+    @pytest.mark.asyncio
+    async def test_a_name_taken_concurrently_is_retried(self, file_service):
+        insert_one = file_service.db.insert_one
+
+        async def lose_the_race(collection, document):
+            if collection == FILE_REFS_COLLECTION and not file_service.db.collections.get(collection):
+                # Another upload of a.txt inserts its reference first
+                await insert_one(collection, {**document, "_id": "other", "sha256": "0" * 64})
+                raise DuplicateKeyError("duplicate key")
+            return await insert_one(collection, document)
+        file_service.db.insert_one = lose_the_race
+
+        await file_service.store_user_file("user123", UploadedFile(CONTENT, "a.txt"))
+
+        assert (await file_service._ref("user123", "a.txt"))["sha256"] == SHA256
+
+    @pytest.mark.asyncio
+    async def test_database_errors_are_not_retried(self, file_service):
+        insert_one, calls = file_service.db.insert_one, []
+
+        async def network_down(collection, document):
+            calls.append(collection)
+            if collection in failing:
+                raise ConnectionError("network down")
+            return await insert_one(collection, document)
+        file_service.db.insert_one = network_down
+
+        for failing in ({BLOBS_COLLECTION}, {FILE_REFS_COLLECTION}):
+            with pytest.raises(ConnectionError):
+                await file_service.store_user_file("user123", UploadedFile(CONTENT, "a.txt"))
+
+        assert calls == [BLOBS_COLLECTION, BLOBS_COLLECTION, FILE_REFS_COLLECTION]
+        # The failed link dropped the reference its put took
+        assert await file_service.db.find_one(BLOBS_COLLECTION, {"_id": SHA256}) is None
+
+    @pytest.mark.asyncio
+    async def test_download_urls_take_one_lookup(self, file_service):
+        await file_service.store_user_file("user123", UploadedFile(CONTENT, "a.txt"))
+        file_service.storage.files["users/user123/files/old.txt"] = b"old"
+
+        async def no_single_lookups(collection, query):
+            raise AssertionError("looked up one file at a time")
+        file_service.db.find_one = no_single_lookups
+        urls = await file_service.get_user_file_urls("user123", ["a.txt", "old.txt"])
+
+        assert urls == {"a.txt": f"http://mock-url/{blob_path(SHA256)}",
+                        "old.txt": "http://mock-url/users/user123/files/old.txt"}
+
+    @pytest.mark.asyncio
+    async def test_streams_are_hashed_while_uploading(self, file_service):
+        await file_service.stream_user_file("user123", "a.txt", io.BytesIO(CONTENT))
+        unread, other_user = io.BytesIO(CONTENT), io.BytesIO(CONTENT)
+
+        await file_service.stream_user_file("user123", "b.txt", unread, sha256=SHA256)
+        # Another user's hash alone does not prove they hold the content
+        await file_service.stream_user_file("user456", "c.txt", other_user, sha256=SHA256)
+
+        assert unread.tell() == 0 and other_user.tell() == len(CONTENT)
+        assert list(file_service.storage.files) == [blob_path(SHA256)]
+        assert (await file_service.db.find_one(BLOBS_COLLECTION, {"_id": SHA256}))["refs"] == 3
+        with pytest.raises(ValueError, match="does not match"):
+            await file_service.stream_user_file("user123", "c.txt", io.BytesIO(b"other"), sha256="0" * 64)
+        assert list(file_service.storage.files) == [blob_path(SHA256)]
 
     @pytest.mark.asyncio
     async def test_delete_user_file(self, file_service):
-        # Arrange
+        # Arrange: a file stored before content addressing
         path = "users/user123/files/test.txt"
         file_service.storage.files[path] = b"test content"
-        
+
         # Act
         result = await file_service.delete_user_file("user123", "test.txt")
-        
+
         # Assert
         assert result is True
-        assert path not in file_service.storage.files 
\ No newline at end of file
+        assert path not in file_service.storage.files
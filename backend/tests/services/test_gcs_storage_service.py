@@ -0,0 +1,205 @@
+import asyncio
+import io
+import threading
+import time
+import pytest
+import requests
+from backend.services.implementations.storage import gcs
+from backend.services.implementations.storage.gcs import GCSStorageService, _ReplayableStream
+
+
+class ForwardOnlyStream(io.RawIOBase):
+    """A request-body-like stream that cannot seek"""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._data.read(size)
+
+
+class FakeResumableUpload:
+    """Stands in for ResumableUpload; drops the connection once mid-upload"""
+    instances = []
+
+    def __init__(self, upload_url, chunk_size):
+        self.upload_url = upload_url
+        self.chunk_size = chunk_size
+        self.received = b""
+        self.bytes_uploaded = 0
+        self.finished = False
+        self.invalid = False
+        self.failed_once = False
+        self.threads = set()
+        FakeResumableUpload.instances.append(self)
+
+    def initiate(self, transport, stream, metadata, content_type, stream_final=True):
+        assert stream.tell() == 0
+        self.stream = stream
+        self.metadata = metadata
+
+    def transmit_next_chunk(self, transport):
+        self.threads.add(threading.current_thread())
+        start = self.stream.tell()
+        assert start == self.bytes_uploaded
+        payload = self.stream.read(self.chunk_size)
+        if start > 0 and not self.failed_once:
+            self.failed_once = True
+            # Server persisted half of the chunk before the connection dropped
+            self.received += payload[:len(payload) // 2]
+            raise requests.exceptions.ConnectionError("connection reset")
+        # Like the server, keep only the bytes not persisted yet
+        self.received += payload[len(self.received) - start:]
+        self.bytes_uploaded = len(self.received)
+        if len(payload) < self.chunk_size:
+            self.finished = True
+
+    def recover(self, transport):
+        self.stream.seek(len(self.received))
+        self.invalid = False
+
+
+class TestReplayableStream:
+    def test_seek_back_within_current_chunk(self):
+        stream = _ReplayableStream(ForwardOnlyStream(b"abcdefghij"))
+        assert stream.read(4) == b"abcd"
+        assert stream.read(4) == b"efgh"
+
+        stream.seek(6)
+
+        assert stream.tell() == 6
+        assert stream.read(4) == b"ghij"
+
+    def test_seek_before_current_chunk_is_rejected(self):
+        stream = _ReplayableStream(ForwardOnlyStream(b"abcdefghij"))
+        stream.read(4)
+        stream.read(4)
+
+        with pytest.raises(ValueError):
+            stream.seek(2)
+
+
+@pytest.mark.asyncio
+class TestGCSStreamingUpload:
+    @pytest.fixture
+    def storage_service(self, mocker):
+        mocker.patch.object(gcs.storage, "Client")
+        mocker.patch.object(gcs, "ResumableUpload", FakeResumableUpload)
+        mocker.patch.object(gcs.time, "sleep")
+        FakeResumableUpload.instances.clear()
+        service = GCSStorageService("test-bucket", chunk_size=256 * 1024)
+        service.storage_client._connection.API_BASE_URL = "https://storage.googleapis.com"
+        service.bucket.blob.return_value.generate_signed_url.return_value = "https://signed"
+        return service
+
+    async def test_stream_recovers_from_dropped_connection(self, storage_service):
+        data = bytes(range(256)) * 3000  # ~750 KiB, three chunks
+
+        url = await storage_service.upload_stream(ForwardOnlyStream(data), "users/u1/files/big.csv")
+
+        upload = FakeResumableUpload.instances[0]
+        assert url == "https://signed"
+        assert upload.received == data
+        assert upload.metadata == {"name": "users/u1/files/big.csv"}
+        assert "/b/test-bucket/o?uploadType=resumable" in upload.upload_url
+        assert threading.current_thread() not in upload.threads
+
+    async def test_chunk_size_is_aligned(self, storage_service):
+        await storage_service.upload_stream(ForwardOnlyStream(b"x" * 10), "a.txt", chunk_size=300 * 1024)
+
+        assert FakeResumableUpload.instances[0].chunk_size == 256 * 1024
+
+    async def test_empty_stream_is_rejected(self, storage_service):
+        with pytest.raises(ValueError, match="empty"):
+            await storage_service.upload_stream(ForwardOnlyStream(b""), "empty.txt")
+
+
+@pytest.mark.asyncio
+class TestGCSBatchOperations:
+    @pytest.fixture
+    def storage_service(self, mocker):
+        mocker.patch.object(gcs.storage, "Client")
+        service = GCSStorageService("test-bucket", max_concurrency=2)
+        service.bucket.blob.return_value.generate_signed_url.return_value = "https://signed"
+        return service
+
+    async def test_delete_many_uses_batches(self, storage_service, mocker):
+        deferred, batches = [], []
+
+        def finish(batch, raise_exception=True):
+            assert raise_exception is False
+            statuses = [404 if path == "f1" else 204 for path in deferred]
+            batches.append(len(deferred))
+            deferred.clear()
+            return [mocker.Mock(status_code=code) for code in statuses]
+
+        mocker.patch.object(gcs.Batch, "finish", finish)
+        storage_service.bucket.delete_blob.side_effect = deferred.append
+
+        results = await storage_service.delete_many([f"f{i}" for i in range(250)], max_concurrency=1)
+
+        # The JSON API takes at most 100 calls per batch request
+        assert batches == [100, 100, 50]
+        assert results[:3] == [
+            {"path": "f0", "deleted": True, "error": None},
+            {"path": "f1", "deleted": False, "error": "HTTP 404"},
+            {"path": "f2", "deleted": True, "error": None},
+        ]
+        assert all(result["deleted"] for result in results[2:])
+
+    async def test_upload_many_reports_failures(self, storage_service, mocker):
+        blob = storage_service.bucket.blob.return_value
+        blob.upload_from_file.side_effect = [None, IOError("network down")]
+
+        results = await storage_service.upload_many([(io.BytesIO(b"a"), "a"), (io.BytesIO(b"b"), "b")])
+
+        assert results[0] == {"path": "a", "url": "https://signed", "error": None}
+        assert results[1]["url"] is None and results[1]["error"]
+
+    async def test_single_file_calls_overlap(self, storage_service):
+        blob = storage_service.bucket.blob.return_value
+        blob.upload_from_file.side_effect = lambda *args, **kwargs: time.sleep(0.2)
+        blob.delete.side_effect = lambda: time.sleep(0.2)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(storage_service.upload_file(io.BytesIO(b"x"), f"f{i}") for i in range(5)))
+        await asyncio.gather(*(storage_service.delete_file(f"f{i}") for i in range(5)))
+
+        # Blocking client calls run on worker threads, so five of each take about as long as one
+        assert time.perf_counter() - started < 1.0
+
+
+@pytest.mark.asyncio
+class TestGCSSignedUrls:
+    @pytest.fixture
+    def storage_service(self, mocker):
+        mocker.patch.object(gcs.storage, "Client")
+        service = GCSStorageService("test-bucket", url_expiration=3600)
+        service.bucket.blob.return_value.generate_signed_url.side_effect = \
+            lambda **kwargs: f"https://signed/{len(service.url_cache)}"
+        return service
+
+    async def test_download_urls_are_cached(self, storage_service):
+        first = await storage_service.get_download_url("users/u1/files/a.csv")
+        second = await storage_service.get_download_url("users/u1/files/a.csv")
+
+        assert first == second
+        assert storage_service.bucket.blob.return_value.generate_signed_url.call_count == 1
+
+    async def test_cache_entry_expires_before_url(self, storage_service):
+        await storage_service.get_download_url("a.csv")
+
+        kwargs = storage_service.bucket.blob.return_value.generate_signed_url.call_args.kwargs
+        url_lifetime = (kwargs["expiration"] - gcs.datetime.now(gcs.UTC)).total_seconds()
+        assert kwargs["version"] == "v4"
+        assert storage_service.url_cache.default_ttl < url_lifetime - 60
+
+    async def test_delete_drops_cached_url(self, storage_service):
+        await storage_service.get_download_url("a.csv")
+
+        await storage_service.delete_file("a.csv")
+
+        assert len(storage_service.url_cache) == 0
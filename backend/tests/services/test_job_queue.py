@@ -0,0 +1,154 @@
+import time
+import pytest
+from flask import Flask
+import services.factory as factory
+from apps.jobs.registry import job_handler
+from apps.jobs.services.job_queue import JOBS_COLLECTION, JobQueue
+from apps.jobs.worker import JobWorker
+from backend.tests.mocks.mock_services import MockAuthService, MockDatabaseService, MockStorageService
+
+calls = []
+
+
+@job_handler('test.echo')
+async def echo(context):
+    calls.append(context.attempt)
+    if context.attempt < context.payload.get('fail_until', 0):
+        raise RuntimeError(f"attempt {context.attempt} failed")
+    await context.progress(step='done')
+    return {'echo': context.payload.get('value')}
+
+
+@pytest.fixture
+def db():
+    calls.clear()
+    return MockDatabaseService()
+
+
+@pytest.fixture
+def queue(db):
+    queue = JobQueue(db)
+    queue.retry_base = 0.0
+    return queue
+
+
+@pytest.mark.asyncio
+class TestJobQueue:
+    async def test_idempotency_key_returns_the_first_job(self, queue):
+        job, created = await queue.submit('test.echo', {'value': 1}, user_id='u1', idempotency_key='k')
+        again, created_again = await queue.submit('test.echo', {'value': 2}, user_id='u1', idempotency_key='k')
+        other, created_other = await queue.submit('test.echo', {'value': 3}, user_id='u2', idempotency_key='k')
+
+        assert created and not created_again and created_other
+        assert again['_id'] == job['_id'] and other['_id'] != job['_id']
+        with pytest.raises(ValueError, match="already used"):
+            await queue.submit('files.delete', {}, user_id='u1', idempotency_key='k')
+        with pytest.raises(ValueError, match="Unknown job kind"):
+            await queue.submit('no.such.kind')
+
+    async def test_a_job_is_claimed_by_one_worker_until_its_lease_expires(self, queue):
+        job, _ = await queue.submit('test.echo', user_id='u1')
+
+        first = await queue.claim('w1')
+        assert first['_id'] == job['_id'] and first['status'] == 'running' and first['attempts'] == 1
+        assert await queue.claim('w2') is None
+
+        queue.db.collections[JOBS_COLLECTION][0]['lease_until'] = time.time() - 1
+        second = await queue.claim('w2')
+        assert second['worker'] == 'w2' and second['attempts'] == 2
+        # The first worker lost its lease: its writes no longer apply
+        assert await queue.heartbeat(first) == 'lost'
+        assert not await queue.complete(first, {'stale': True})
+        assert await queue.complete(second, {'ok': True})
+        assert (await queue.get(job['_id']))['result'] == {'ok': True}
+
+    async def test_backoff_grows_exponentially_up_to_the_cap(self, queue):
+        queue.retry_base, queue.retry_max = 2.0, 10.0
+
+        delays = [queue.backoff(attempt) for attempt in (1, 2, 3, 10)]
+
+        assert 1.0 <= delays[0] <= 2.0 and 2.0 <= delays[1] <= 4.0 and 4.0 <= delays[2] <= 8.0
+        assert 5.0 <= delays[3] <= 10.0
+
+    async def test_cancel_stops_queued_jobs_and_flags_running_ones(self, queue):
+        queued, _ = await queue.submit('test.echo', user_id='u1')
+        running, _ = await queue.submit('test.echo', user_id='u1', delay=-1)
+        claimed = await queue.claim('w1')
+        assert claimed['_id'] == running['_id']
+
+        assert await queue.cancel(queued['_id'], 'someone-else') is None
+        assert (await queue.cancel(queued['_id'], 'u1'))['status'] == 'cancelled'
+        assert (await queue.cancel(running['_id'], 'u1'))['cancel_requested']
+        assert await queue.heartbeat(claimed) == 'cancelled'
+
+
+@pytest.mark.asyncio
+class TestJobWorker:
+    async def test_failed_attempts_are_retried_until_they_succeed(self, queue):
+        job, _ = await queue.submit('test.echo', {'value': 'x', 'fail_until': 3}, user_id='u1')
+        worker = JobWorker(queue, concurrency=1, poll_interval=0)
+
+        statuses = [(await worker.run_once())['status'] for _ in range(3)]
+
+        assert statuses == ['queued', 'queued', 'succeeded'] and calls == [1, 2, 3]
+        done = await queue.get(job['_id'])
+        assert done['result'] == {'echo': 'x'} and done['progress'] == {'step': 'done'}
+        assert await worker.run_once() is None
+
+    async def test_jobs_fail_once_attempts_are_exhausted(self, queue):
+        await queue.submit('test.echo', {'fail_until': 5}, user_id='u1', max_attempts=2)
+        worker = JobWorker(queue, concurrency=1, poll_interval=0)
+
+        await worker.run_once()
+        failed = await worker.run_once()
+
+        assert failed['status'] == 'failed' and failed['error'] == 'attempt 2 failed'
+        assert await worker.run_once() is None
+
+
+class TestJobRoutes:
+    @pytest.fixture
+    def client(self, db, monkeypatch):
+        monkeypatch.setattr(factory, "_auth_service", MockAuthService())
+        monkeypatch.setattr(factory, "_database_service", db)
+        monkeypatch.setattr(factory, "_storage_service", MockStorageService())
+        from apps.jobs.routes import jobs_bp
+        from apps.app1.routes import files_bp
+        app = Flask(__name__)
+        app.register_blueprint(jobs_bp, url_prefix="/api/v1/jobs")
+        app.register_blueprint(files_bp, url_prefix="/api/v1/files")
+        return app.test_client()
+
+    def test_submit_status_cancel_and_result(self, client):
+        headers = {"Authorization": "Bearer valid_token", "Idempotency-Key": "abc"}
+
+        response = client.post("/api/v1/jobs", json={"kind": "test.echo", "payload": {"value": 1}}, headers=headers)
+        replay = client.post("/api/v1/jobs", json={"kind": "test.echo"}, headers=headers)
+
+        assert response.status_code == 202 and replay.status_code == 200
+        job_id = response.get_json()["job_id"]
+        assert replay.get_json()["job_id"] == job_id
+        job = client.get(f"/api/v1/jobs/{job_id}", headers=headers).get_json()
+        assert job["status"] == "queued" and "user_id" not in job and "lease_token" not in job
+        assert client.get(f"/api/v1/jobs/{job_id}/result", headers=headers).status_code == 409
+        assert client.post(f"/api/v1/jobs/{job_id}/cancel", headers=headers).get_json()["status"] == "cancelled"
+        assert client.post(f"/api/v1/jobs/{job_id}/cancel", headers=headers).status_code == 409
+        assert client.get(f"/api/v1/jobs/{job_id}/result", headers=headers).get_json()["status"] == "cancelled"
+
+    def test_unknown_and_internal_kinds_are_rejected(self, client):
+        headers = {"Authorization": "Bearer valid_token"}
+
+        for kind in ("no.such.kind", "matching.run"):
+            assert client.post("/api/v1/jobs", json={"kind": kind}, headers=headers).status_code == 400
+        assert client.get("/api/v1/jobs/unknown", headers=headers).status_code == 404
+
+    def test_files_can_be_deleted_in_the_background(self, client, db):
+        headers = {"Authorization": "Bearer valid_token"}
+
+        response = client.delete("/api/v1/files", json={"filenames": ["a.csv"], "background": True},
+                                 headers=headers)
+
+        assert response.status_code == 202
+        job = db.collections[JOBS_COLLECTION][0]
+        assert job["kind"] == "files.delete" and job["payload"] == {"filenames": ["a.csv"]}
+        assert job["user_id"] == "test_user"
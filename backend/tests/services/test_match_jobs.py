@@ -0,0 +1,189 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from flask import Flask
+import services.factory as factory
+from apps.matching.parallel import SharedColumns, attach, get_process_pool, shutdown_process_pool
+from apps.matching.scoring import FieldComparator, encode_columns, score_columns
+from apps.matching.services.match_job_service import JOBS_COLLECTION, MatchJob, MatchJobService
+from apps.matching.services.matching_service import RESULTS_COLLECTION
+from apps.parser.services.parser_service import RECORDS_COLLECTION, ParserService
+from backend.tests.mocks.mock_services import MockAuthService, MockDatabaseService
+
+LEFT = [
+    {"_id": "l1", "name": "Robert Smith", "city": "London", "amount": 100},
+    {"_id": "l2", "name": "Ashcraft Ltd", "city": "Leeds", "amount": 250},
+    {"_id": "l3", "name": "Jane Doe", "city": "York", "amount": 75},
+]
+RIGHT = [
+    {"_id": "r1", "name": "Rupert Smith", "city": "London", "amount": 101},
+    {"_id": "r2", "name": "Ashcroft Ltd", "city": "Leeds", "amount": 900},
+    {"_id": "r3", "name": "Jayne Do", "city": "York", "amount": 75},
+]
+SPEC = {
+    "left": {"collection": "left"},
+    "right": {"collection": "right"},
+    "comparators": [
+        {"field": "name", "method": "jaro_winkler", "weight": 2},
+        {"field": "city", "method": "exact"},
+        {"field": "amount", "method": "numeric", "options": {"relative": 0.05}}
+    ],
+    "keys": [{"type": "soundex", "field": "name"}, {"type": "exact", "field": "city"}],
+    "threshold": 0.8
+}
+
+
+@pytest.fixture
+def db():
+    db = MockDatabaseService()
+    db.collections = {"left": [dict(r) for r in LEFT], "right": [dict(r) for r in RIGHT]}
+    return db
+
+
+class TestSharedColumns:
+    def test_attached_columns_score_like_the_originals(self):
+        comparators = [FieldComparator(spec["field"], spec["method"], **spec.get("options", {}))
+                       for spec in SPEC["comparators"]]
+        left, right = encode_columns(LEFT, comparators), encode_columns(RIGHT, comparators)
+        for comparator in comparators:
+            comparator.prepare(left[comparator.field])
+            comparator.prepare(right[comparator.field])
+        index = np.arange(3)
+
+        with SharedColumns({"left": left, "right": right}) as shared:
+            memory, sides = attach(shared.spec)
+            shared_scores, _ = score_columns(comparators, sides["left"], sides["right"], index, index)
+            del sides
+            memory.close()
+
+        scores, _ = score_columns(comparators, left, right, index, index)
+        assert shared_scores.tolist() == scores.tolist()
+
+
+class TestMatchJob:
+    @pytest.mark.parametrize("change, message", [
+        ({"left": {"collection": "match_jobs"}}, "cannot be matched"),
+        ({"right": {"collection": "$where"}}, "cannot be matched"),
+        ({"comparators": [{"field": "name", "method": "soundex"}]}, "Unknown comparison method"),
+        ({"keys": []}, "blocking key"),
+    ])
+    def test_invalid_specs_are_rejected(self, change, message):
+        with pytest.raises(ValueError, match=message):
+            MatchJob.from_dict({**SPEC, **change})
+
+
+@pytest.mark.asyncio
+class TestMatchJobService:
+    @pytest.fixture
+    def pool(self):
+        yield get_process_pool(2)
+        shutdown_process_pool()
+
+    async def test_job_scores_blocks_in_worker_processes(self, db, pool):
+        service = MatchJobService(db, workers=2, block_pairs=2, pool=pool)
+        job = await service.create("user-1", SPEC)
+
+        stats = await service.run(job["_id"])
+
+        stored = await service.get("user-1", job["_id"])
+        assert stored["status"] == "completed", stored["error"]
+        assert stats["candidates"] == 3 and stats["score_blocks"] == 2
+        assert stored["progress"]["pairs_scored"] == 3
+        results = await service.results("user-1", job["_id"])
+        # r2's amount is far off, which pulls Ashcraft/Ashcroft below the threshold
+        assert [(r["left_id"], r["right_id"]) for r in results] == [("l3", "r3"), ("l1", "r1")]
+        assert results[0]["fields"]["city"] == 1.0
+        assert await service.get("someone-else", job["_id"]) is None
+
+    async def test_failures_are_recorded_on_the_job(self, db):
+        service = MatchJobService(db, workers=1, pool=get_process_pool(1))
+        job = await service.create("user-1", {**SPEC, "comparators": [
+            {"field": "amount", "method": "numeric", "options": {"tolerance": 1}}
+        ]})
+
+        try:
+            assert await service.run(job["_id"]) is None
+        finally:
+            shutdown_process_pool()
+
+        stored = db.collections[JOBS_COLLECTION][0]
+        assert stored["status"] == "failed" and "tolerance" in stored["error"]
+        assert db.collections.get(RESULTS_COLLECTION, []) == []
+
+    async def test_incremental_job_rescores_only_changed_records(self, tmp_path):
+        db = MockDatabaseService()
+        parser = ParserService(db, batch_size=2)
+
+        async def parse(lines):
+            dataset = await parser.create("user-1", "data.csv", key=["id"])
+            await parser.ingest(dataset, io.BytesIO(("id,name,city,amount\n" + "\n".join(lines)).encode()))
+            return {"collection": RECORDS_COLLECTION, "query": {"dataset_id": dataset["_id"]}}
+
+        right = await parse(["a,Rupert Smith,London,101", "b,Ashcroft Ltd,Leeds,250", "c,Jayne Do,York,75",
+                             "d,Pete Jones,Bath,40"])
+        left_v1 = await parse(["1,Robert Smith,London,100", "2,Ashcraft Ltd,Leeds,250", "3,Jane Doe,York,75",
+                               "4,Peter Jones,Bath,40"])
+        # One record added (shifting the rows), one changed, one removed
+        left_v2 = await parse(["5,Ann Lee,Leeds,10", "1,Robert Smith,London,100", "2,Ashcraft Ltd,Leeds,900",
+                               "4,Peter Jones,Bath,40"])
+        spec = {key: SPEC[key] for key in ("comparators", "keys", "threshold")}
+        service = MatchJobService(db, workers=1, pool=ThreadPoolExecutor(1))
+        service.cache_enabled = False
+
+        async def run(job_spec):
+            job = await service.create("user-1", job_spec)
+            stats = await service.run(job["_id"])
+            results = await service.results("user-1", job["_id"])
+            return job, stats, sorted((r["left_id"], r["right_id"], r["score"]) for r in results)
+
+        previous, _, _ = await run({**spec, "left": left_v1, "right": right})
+        _, full_stats, full = await run({**spec, "left": left_v2, "right": right})
+        _, stats, incremental = await run({**spec, "left": left_v2, "right": right,
+                                           "incremental": {"previous_job": previous["_id"]}})
+
+        assert incremental == full and len(full) == 2
+        assert stats["incremental"]["carried_forward"] == 2 and stats["matches"] == 2
+        assert stats["incremental"]["left"] == {"added": 1, "removed": 1, "changed": 1, "unchanged": 2}
+        assert stats["candidates"] < full_stats["candidates"]
+        with pytest.raises(ValueError, match="same comparators"):
+            await service.create("user-1", {**spec, "threshold": 0.5, "left": left_v2, "right": right,
+                                            "incremental": {"previous_job": previous["_id"]}})
+
+
+class TestMatchingRoutes:
+    @pytest.fixture
+    def client(self, db, monkeypatch):
+        monkeypatch.setattr(factory, "_auth_service", MockAuthService())
+        monkeypatch.setattr(factory, "_database_service", db)
+        started = []
+
+        async def start(self, job_id, user_id=None):
+            started.append(job_id)
+        monkeypatch.setattr(MatchJobService, "start", start)
+        from apps.matching.routes import matching_bp
+        app = Flask(__name__)
+        app.register_blueprint(matching_bp, url_prefix="/api/v1/matching")
+        client = app.test_client()
+        client.started = started
+        return client
+
+    def test_job_is_created_started_and_readable_by_its_owner(self, client):
+        headers = {"Authorization": "Bearer valid_token"}
+
+        response = client.post("/api/v1/matching/jobs", json=SPEC, headers=headers)
+
+        assert response.status_code == 202
+        job_id = response.get_json()["job_id"]
+        assert client.started == [job_id]
+        job = client.get(f"/api/v1/matching/jobs/{job_id}", headers=headers).get_json()
+        assert job["status"] == "queued" and "user_id" not in job
+        assert client.get(f"/api/v1/matching/jobs/{job_id}/results", headers=headers).get_json() == {"results": []}
+        assert client.get("/api/v1/matching/jobs/unknown", headers=headers).status_code == 404
+
+    def test_invalid_spec_is_a_bad_request(self, client):
+        response = client.post("/api/v1/matching/jobs", json={**SPEC, "keys": []},
+                               headers={"Authorization": "Bearer valid_token"})
+
+        assert response.status_code == 400
+        assert client.started == []
@@ -0,0 +1,120 @@
+import pytest
+from apps.matching.blocking import (
+    SortedNeighbourhood, exact_key, normalize, phonetic_key, prefix_key, soundex
+)
+from apps.matching.scoring import FieldComparator
+from apps.matching.services.matching_service import (
+    BLOCK_COLLECTION, RESULTS_COLLECTION, Dataset, MatchingService
+)
+from shared.utils.concurrency import iterate_maybe_async
+from backend.tests.mocks.mock_services import MockDatabaseService
+
+LEFT = [
+    {"_id": "l1", "name": "Robert Smith", "city": "London"},
+    {"_id": "l2", "name": "Ashcraft Ltd", "city": "Leeds"},
+    {"_id": "l3", "name": "Jane Doe", "city": "York"},
+    {"_id": "l4", "name": "Zed Quinn", "city": "Bath"},
+]
+RIGHT = [
+    {"_id": "r1", "name": "Rupert Smith", "city": "London"},
+    {"_id": "r2", "name": "Ashcroft Ltd", "city": "Leeds"},
+    {"_id": "r3", "name": "Jayne Do", "city": "York"},
+    {"_id": "r4", "name": "Mary Major", "city": "Hull"},
+]
+
+
+class TestBlockingKeys:
+    @pytest.mark.parametrize("value, code", [
+        ("Robert", "R163"), ("Rupert", "R163"), ("Ashcraft", "A261"),
+        ("Tymczak", "T522"), ("Pfister", "P236"), ("", "")
+    ])
+    def test_soundex(self, value, code):
+        assert soundex(value) == code
+
+    def test_keys_are_normalized_and_namespaced(self):
+        record = {"name": "  Crème-Brûlée Co. ", "address": {"city": "Paris"}}
+
+        assert normalize(record["name"]) == "creme brulee co"
+        assert prefix_key("name", 4).key(record) == "prefix4:name:crem"
+        assert exact_key("address.city").key(record) == "exact:address.city:paris"
+        assert phonetic_key("missing").key(record) is None
+
+
+@pytest.mark.asyncio
+class TestMatchingService:
+    @pytest.fixture
+    def db(self):
+        db = MockDatabaseService()
+        db.collections = {"left": [dict(r) for r in LEFT], "right": [dict(r) for r in RIGHT]}
+        return db
+
+    async def collect(self, service, **kwargs):
+        stats = {}
+        pairs = [(left["_id"], right["_id"]) async for left, right in service.candidate_pairs(
+            Dataset("left"), Dataset("right"), stats=stats, **kwargs
+        )]
+        return pairs, stats
+
+    async def test_only_records_sharing_a_key_are_paired_once(self, db):
+        service = MatchingService(db, batch_size=2)
+
+        pairs, stats = await self.collect(
+            service, keys=[phonetic_key("name"), prefix_key("city", 3)], fields=["name"]
+        )
+
+        assert sorted(pairs) == [("l1", "r1"), ("l2", "r2"), ("l3", "r3")]
+        assert stats["candidates"] == 3
+        assert stats["left_records"] == stats["right_records"] == 4
+        assert db.collections[BLOCK_COLLECTION] == []
+
+    async def test_sorted_neighbourhood_pairs_adjacent_records(self, db):
+        service = MatchingService(db)
+
+        pairs, _ = await self.collect(
+            service, keys=[exact_key("name")], neighbourhood=SortedNeighbourhood("name", window=2)
+        )
+
+        # Sorted: l2 ashcraft, r2 ashcroft, l3 jane, r3 jayne, r4 mary, l1 robert, r1 rupert, l4 zed
+        assert sorted(pairs) == [("l1", "r1"), ("l1", "r4"), ("l2", "r2"), ("l3", "r2"), ("l3", "r3"), ("l4", "r1")]
+
+    async def test_oversized_blocks_are_skipped(self, db):
+        service = MatchingService(db, max_block_size=3)
+
+        pairs, stats = await self.collect(service, keys=[prefix_key("name", 1), exact_key("city")])
+
+        assert sorted(pairs) == [("l1", "r1"), ("l2", "r2"), ("l3", "r3")]
+        assert stats["oversized_blocks"] == 0
+        db.collections["right"].extend({"_id": f"x{i}", "name": "Lee", "city": "Leeds"} for i in range(3))
+        _, stats = await self.collect(service, keys=[exact_key("city")])
+        assert stats["oversized_blocks"] == 1
+
+    async def test_pairs_sharing_an_oversized_block_come_from_another_key(self, db):
+        for side in ("left", "right"):
+            for record in db.collections[side]:
+                record.update(city="London", email=f"{record['_id'][1:]}@example.com")
+        service = MatchingService(db, max_block_size=3)
+
+        pairs, stats = await self.collect(service, keys=[exact_key("city"), exact_key("email")])
+
+        assert sorted(pairs) == [("l1", "r1"), ("l2", "r2"), ("l3", "r3"), ("l4", "r4")]
+        assert stats["oversized_blocks"] == 1 and stats["candidates"] == 4
+
+    async def test_link_stores_scored_matches(self, db):
+        service = MatchingService(db)
+
+        stats = await service.link(
+            Dataset("left"), Dataset("right"),
+            comparators=[FieldComparator("name"), FieldComparator("city", method="exact")],
+            threshold=0.85, keys=[phonetic_key("name"), exact_key("city")]
+        )
+
+        results = db.collections[RESULTS_COLLECTION]
+        assert {(r["left_id"], r["right_id"]) for r in results} == {("l1", "r1"), ("l2", "r2"), ("l3", "r3")}
+        assert all(r["run_id"] == stats["run_id"] and r["fields"]["city"] == 1.0 for r in results)
+        assert stats["matches"] == 3
+        assert stats["comparisons_avoided"] == 1 - 3 / 16
+
+    async def test_sync_iterators_are_consumed_in_batches(self):
+        items = [item async for item in iterate_maybe_async(iter(range(5)), batch_size=2)]
+
+        assert items == [0, 1, 2, 3, 4]
@@ -0,0 +1,91 @@
+import pytest
+from flask import Flask
+from backend.shared.middleware import metrics
+from backend.shared.middleware.metrics import Histogram, InstrumentedService, init_metrics
+from backend.tests.mocks.mock_services import MockDatabaseService
+
+
+def test_histogram_exposition():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(5, route="/a")
+
+    lines = histogram.expose()
+
+    assert lines[:2] == ["# HELP latency_seconds Latency", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'latency_seconds_count{route="/a"} 3' in lines
+
+
+class TestMetricsMiddleware:
+    @pytest.fixture
+    def client(self):
+        app = Flask(__name__)
+        init_metrics(app)
+
+        @app.route("/api/v1/items/<item_id>")
+        def get_item(item_id):
+            if item_id == "missing":
+                return {"error": "not found"}, 404
+            return {"id": item_id}
+
+        return app.test_client()
+
+    def test_requests_are_labelled_by_route(self, client):
+        before = metrics.HTTP_REQUESTS.value(method="GET", route="/api/v1/items/<item_id>", status="404")
+
+        client.get("/api/v1/items/1")
+        client.get("/api/v1/items/missing")
+
+        assert metrics.HTTP_REQUESTS.value(method="GET", route="/api/v1/items/<item_id>", status="404") == before + 1
+        assert metrics.HTTP_REQUEST_DURATION.count(method="GET", route="/api/v1/items/<item_id>") >= 2
+        assert metrics.HTTP_IN_FLIGHT.value() == 0
+
+    def test_metrics_endpoint(self, client):
+        client.get("/api/v1/items/1")
+
+        response = client.get("/metrics")
+
+        assert response.content_type.startswith("text/plain; version=0.0.4")
+        body = response.get_data(as_text=True)
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert 'http_requests_total{method="GET",route="/api/v1/items/<item_id>",status="200"}' in body
+
+
+@pytest.mark.asyncio
+class TestInstrumentedService:
+    @pytest.fixture
+    def db_service(self):
+        inner = MockDatabaseService()
+        inner.collections["users"] = [{"email": "a@example.com"}]
+        return InstrumentedService(inner, "test_db")
+
+    async def test_async_calls_are_timed(self, db_service):
+        before = metrics.SERVICE_CALL_DURATION.count(service="test_db", method="find_one")
+
+        assert await db_service.find_one("users", {"email": "a@example.com"}) == {"email": "a@example.com"}
+
+        assert metrics.SERVICE_CALL_DURATION.count(service="test_db", method="find_one") == before + 1
+
+    async def test_async_generators_are_timed_until_exhausted(self, db_service):
+        before = metrics.SERVICE_CALL_DURATION.count(service="test_db", method="iter_many")
+
+        documents = [doc async for doc in db_service.iter_many("users", {})]
+
+        assert documents == [{"email": "a@example.com"}]
+        assert metrics.SERVICE_CALL_DURATION.count(service="test_db", method="iter_many") == before + 1
+
+    async def test_errors_are_counted(self, db_service, mocker):
+        mocker.patch.object(db_service.inner, "delete_one", side_effect=RuntimeError("down"))
+        before = metrics.SERVICE_CALL_ERRORS.value(service="test_db", method="delete_one")
+
+        with pytest.raises(RuntimeError):
+            await db_service.delete_one("users", {})
+
+        assert metrics.SERVICE_CALL_ERRORS.value(service="test_db", method="delete_one") == before + 1
+
+    def test_attributes_pass_through(self, db_service):
+        assert db_service.collections is db_service.inner.collections
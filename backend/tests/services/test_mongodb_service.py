@@ -0,0 +1,208 @@
+import pytest
+from unittest.mock import MagicMock
+from pymongo.errors import BulkWriteError
+from backend.config.settings import Config
+from backend.services.implementations.database import mongodb
+from backend.services.implementations.database.client_options import PoolStatsListener
+from backend.services.implementations.database.indexes import UnindexedQueryError
+from backend.services.implementations.database.mongodb import MongoDBService
+from services.implementations.database.indexes import registered_indexes
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setenv("DATABASE_CONNECTION_STRING", "mongodb://localhost:27017")
+    monkeypatch.setenv("DATABASE_NAME", "test_db")
+    monkeypatch.setenv("DATABASE_MAX_POOL_SIZE", "16")
+    monkeypatch.setenv("DATABASE_COMPRESSORS", "zstd,snappy")
+    return Config()
+
+
+@pytest.fixture
+def mongo_client(mocker):
+    return mocker.patch.object(mongodb, "MongoClient", side_effect=lambda *a, **kw: MagicMock())
+
+
+class TestMongoDBServicePool:
+    def test_client_is_built_from_config(self, config, mongo_client):
+        service = MongoDBService(config)
+        service.connect()
+
+        kwargs = mongo_client.call_args.kwargs
+        assert kwargs["maxPoolSize"] == 16
+        assert kwargs["compressors"] == "zstd,snappy"
+        assert kwargs["event_listeners"] == [service.pool_stats]
+
+    def test_connect_does_not_ping(self, config, mongo_client):
+        service = MongoDBService(config)
+        service.connect()
+
+        service.client.admin.command.assert_not_called()
+
+    def test_client_is_rebuilt_after_fork(self, config, mongo_client, mocker):
+        service = MongoDBService(config)
+        service.find_one("users", {})
+        parent_client = service.client
+
+        mocker.patch.object(mongodb.os, "getpid", return_value=-1)
+        service.find_one("users", {})
+
+        assert service.client is not parent_client
+        parent_client.close.assert_not_called()
+        assert mongo_client.call_count == 2
+
+    def test_pool_stats_track_checkouts(self):
+        listener = PoolStatsListener()
+        event = object()
+        listener.connection_created(event)
+        listener.connection_created(event)
+        listener.connection_check_out_started(event)
+        listener.connection_checked_out(event)
+        listener.connection_check_out_started(event)
+
+        stats = listener.stats()
+        assert stats["open"] == 2
+        assert stats["checked_out"] == 1
+        assert stats["available"] == 1
+        assert stats["waiting"] == 1
+
+
+class TestMongoDBServiceStreaming:
+    def test_iter_many_passes_cursor_options(self, config, mongo_client):
+        service = MongoDBService(config)
+        service.connect()
+        cursor = service.db["records"].find.return_value
+        cursor.__iter__.return_value = iter([{"_id": 5}, {"_id": 6}])
+
+        results = list(service.iter_many(
+            "records", {"kind": "a"}, projection={"name": 1}, batch_size=500, after=4
+        ))
+
+        assert results == [{"_id": 5}, {"_id": 6}]
+        service.db["records"].find.assert_called_once_with(
+            {"$and": [{"kind": "a"}, {"_id": {"$gt": 4}}]},
+            {"name": 1},
+            sort=[("_id", 1)], limit=0, skip=0, batch_size=500
+        )
+
+    def test_find_many_still_returns_list(self, config, mongo_client):
+        service = MongoDBService(config)
+        service.connect()
+        cursor = service.db["records"].find.return_value
+        cursor.__iter__.return_value = iter([{"_id": 1}])
+
+        assert service.find_many("records", {}) == [{"_id": 1}]
+
+
+class TestMongoDBServiceBulk:
+    @pytest.fixture
+    def service(self, config, mongo_client):
+        config.DATABASE_BULK_CHUNK_SIZE = 2
+        service = MongoDBService(config)
+        service.connect()
+        return service
+
+    @staticmethod
+    def _reply(requests, **details):
+        reply = {"nInserted": 0, "nMatched": 0, "nModified": 0, "nRemoved": 0,
+                 "nUpserted": 0, "upserted": [], "writeErrors": []}
+        reply.update(details)
+        return reply
+
+    def test_insert_many_is_chunked_and_reports_errors(self, service):
+        def bulk_write(requests, ordered):
+            for request in requests:
+                request._doc.setdefault("_id", request._doc["n"])
+            if requests[0]._doc["n"] == 2:
+                raise BulkWriteError(self._reply(requests, nInserted=1, writeErrors=[
+                    {"index": 0, "code": 11000, "errmsg": "duplicate key"}
+                ]))
+            return MagicMock(bulk_api_result=self._reply(requests, nInserted=len(requests)))
+
+        service.db["records"].bulk_write.side_effect = bulk_write
+
+        result = service.insert_many("records", ({"n": n} for n in range(5)))
+
+        assert service.db["records"].bulk_write.call_count == 3
+        assert result["chunks"] == 3
+        assert result["inserted_count"] == 4
+        assert result["inserted_ids"] == ["0", "1", "3", "4"]
+        assert result["errors"] == [{"index": 2, "code": 11000, "message": "duplicate key"}]
+
+    def test_ordered_bulk_write_stops_after_failed_chunk(self, service):
+        service.db["records"].bulk_write.side_effect = BulkWriteError(self._reply(
+            [], writeErrors=[{"index": 1, "code": 2, "errmsg": "bad update"}]
+        ))
+        operations = [{"op": "update_one", "filter": {"n": n}, "update": {"seen": True}, "upsert": True}
+                      for n in range(6)]
+
+        result = service.bulk_write("records", operations, ordered=True)
+
+        assert service.db["records"].bulk_write.call_count == 1
+        assert result["errors"][0]["index"] == 1
+
+    def test_update_one_upsert(self, service):
+        collection = service.db["records"]
+        collection.update_one.return_value = MagicMock(modified_count=0, upserted_id="new-id")
+
+        assert service.update_one("records", {"n": 1}, {"seen": True}, upsert=True) is True
+        collection.update_one.assert_called_once_with({"n": 1}, {"$set": {"seen": True}}, upsert=True)
+
+
+class TestMongoDBServiceIndexes:
+    COLLSCAN_PLAN = {"queryPlanner": {"winningPlan": {
+        "stage": "LIMIT", "inputStage": {"stage": "COLLSCAN", "filter": {}}
+    }}}
+    IXSCAN_PLAN = {"queryPlanner": {"winningPlan": {
+        "stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "email_unique"}
+    }}}
+
+    def test_ensure_indexes_applies_registry(self, config, mongo_client):
+        service = MongoDBService(config)
+        service.connect()
+
+        service.ensure_indexes()
+
+        models = service.db["users"].create_indexes.call_args.args[0]
+        assert models[0].document["name"] == "email_unique"
+        assert models[0].document["unique"] is True
+
+    def test_registry_declares_every_collection_without_services(self):
+        collections = registered_indexes()
+
+        assert {"users", "file_refs", "jobs", "match_block_keys", "match_results",
+                "datasets", "dataset_records"} <= set(collections)
+
+    def test_explain_mode_flags_collection_scan_once_per_shape(self, config, mongo_client, caplog):
+        config.DATABASE_EXPLAIN_QUERIES = True
+        service = MongoDBService(config)
+        service.connect()
+        service.db["records"].find.return_value.explain.return_value = self.COLLSCAN_PLAN
+
+        service.find_one("records", {"name": "a"})
+        service.find_one("records", {"name": "b"})
+
+        assert service.db["records"].find.return_value.explain.call_count == 1
+        assert service.collection_scans == [{"collection": "records", "query": {"name": "a"}, "sort": None}]
+        assert "COLLSCAN" in caplog.text
+
+    def test_strict_explain_mode_raises(self, config, mongo_client):
+        config.DATABASE_EXPLAIN_QUERIES = True
+        config.DATABASE_EXPLAIN_STRICT = True
+        service = MongoDBService(config)
+        service.connect()
+        service.db["users"].find.return_value.explain.return_value = self.COLLSCAN_PLAN
+
+        with pytest.raises(UnindexedQueryError):
+            service.find_one("users", {"name": "a"})
+
+    def test_indexed_query_passes(self, config, mongo_client):
+        config.DATABASE_EXPLAIN_QUERIES = True
+        config.DATABASE_EXPLAIN_STRICT = True
+        service = MongoDBService(config)
+        service.connect()
+        service.db["users"].find.return_value.explain.return_value = self.IXSCAN_PLAN
+
+        service.find_one("users", {"email": "a@example.com"})
+
+        assert service.collection_scans == []
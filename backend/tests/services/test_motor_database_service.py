@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from backend.config.settings import Config
+from backend.services import factory
+from backend.services.implementations.database import mongodb_motor
+from backend.services.implementations.database.mongodb_motor import MotorDatabaseService
+
+
+@pytest.fixture
+def motor_client(mocker):
+    client = MagicMock()
+    mocker.patch.object(mongodb_motor, "AsyncIOMotorClient", return_value=client)
+    mongodb_motor.close_shared_clients()
+    yield client
+    mongodb_motor.close_shared_clients()
+
+
+@pytest.fixture
+def config(monkeypatch):
+    monkeypatch.setenv("DATABASE_CONNECTION_STRING", "mongodb://localhost:27017")
+    monkeypatch.setenv("DATABASE_NAME", "test_db")
+    monkeypatch.setenv("DATABASE_DRIVER", "motor")
+    return Config()
+
+
+@pytest.mark.asyncio
+class TestMotorDatabaseService:
+    async def test_find_one_awaits_motor(self, motor_client, config):
+        collection = motor_client["test_db"]["users"]
+        collection.find_one = AsyncMock(return_value={"email": "a@example.com"})
+        service = MotorDatabaseService(config)
+
+        result = await service.find_user_by_email("a@example.com")
+
+        assert result == {"email": "a@example.com"}
+        collection.find_one.assert_awaited_once_with({"email": "a@example.com"})
+
+    async def test_client_is_shared_within_process(self, motor_client, config):
+        first = MotorDatabaseService(config)
+        second = MotorDatabaseService(config)
+
+        assert first.db.client is second.db.client
+        assert mongodb_motor.AsyncIOMotorClient.call_count == 1
+
+    async def test_pool_stats_come_from_the_shared_client(self, motor_client, config):
+        service = MotorDatabaseService(config)
+
+        stats = service.get_pool_stats()
+
+        assert stats["open"] == 0 and stats["max_pool_size"] == config.DATABASE_MAX_POOL_SIZE
+        listeners = mongodb_motor.AsyncIOMotorClient.call_args.kwargs["event_listeners"]
+        assert listeners == [mongodb_motor._pool_stats]
+        assert service.get_client() is motor_client.delegate
+
+    async def test_concurrent_calls_do_not_block(self, motor_client, config):
+        async def slow_find(query):
+            await asyncio.sleep(0.05)
+            return query
+
+        motor_client["test_db"]["items"].find_one = slow_find
+        service = MotorDatabaseService(config)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        results = await asyncio.gather(*(service.find_one("items", {"i": i}) for i in range(20)))
+
+        assert [r["i"] for r in results] == list(range(20))
+        assert loop.time() - started < 0.5
+
+
+def test_per_request_loops_share_one_client(motor_client, config):
+    collection = motor_client["test_db"]["items"]
+    collection.find_one = AsyncMock(return_value={"i": 1})
+    service = MotorDatabaseService(config)
+
+    # Flask runs each async view on a new event loop
+    for _ in range(5):
+        assert asyncio.run(service.find_one("items", {"i": 1})) == {"i": 1}
+
+    assert mongodb_motor.AsyncIOMotorClient.call_count == 1
+    assert mongodb_motor.AsyncIOMotorClient.call_args.kwargs["io_loop"] is mongodb_motor._loop
+
+
+def test_factory_selects_motor_driver(config, monkeypatch):
+    monkeypatch.setattr(factory, "_config", config)
+    monkeypatch.setattr(factory, "_database_service", None)
+
+    service = factory.get_database_service()
+
+    # The factory wraps every service in the metrics proxy
+    assert isinstance(service.inner, MotorDatabaseService)
@@ -0,0 +1,188 @@
+import io
+import pytest
+from flask import Flask
+import services.factory as factory
+import apps.parser.services.dataset_cache as dataset_cache
+from apps.jobs.services.job_queue import JOBS_COLLECTION
+from apps.parser.readers import RowNormaliser, normalise, read_csv
+from apps.parser.services.dataset_cache import DatasetCache
+from apps.parser.services.parser_service import DATASETS_COLLECTION, RECORDS_COLLECTION, ParserService
+from backend.tests.mocks.mock_services import MockAuthService, MockDatabaseService, MockStorageService
+
+CSV = (
+    "Name;Amount;Date;Code;\r\n"
+    "\"Smith; J\";\"1,234.50\";2024-01-02;007;x\r\n"
+    "\r\n"
+    "\"Multi\nline\";12;02/03/2024;010\r\n"
+    "Doe;n/a;2024-02-30;9;y\r\n"
+).encode()
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = DatasetCache(str(tmp_path / "cache"), storage=MockStorageService())
+    monkeypatch.setattr(dataset_cache, "_cache", cache)
+    return cache
+
+
+class ForwardOnlyStream(io.RawIOBase):
+    """A request-body-like stream that cannot seek"""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._data.read(size)
+
+
+class TestReaders:
+    @pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+    def test_csv_rows_do_not_depend_on_chunk_boundaries(self, chunk_size):
+        rows = list(read_csv(ForwardOnlyStream(CSV), chunk_size=chunk_size))
+
+        assert rows[0] == ["Name", "Amount", "Date", "Code", ""]
+        assert rows[1] == ["Smith; J", "1,234.50", "2024-01-02", "007", "x"]
+        assert rows[2] == [] and rows[3][0] == "Multi\nline" and len(rows) == 5
+
+    def test_cells_are_normalised(self):
+        assert [normalise(value) for value in ["12", "-3.5", "1,000", "007", " TRUE ", "", "n/a"]] == \
+            [12, -3.5, 1000, "007", True, None, "n/a"]
+
+    def test_schema_types_and_invalid_values(self):
+        normaliser = RowNormaliser(["amount", "date", "code", "code"], {"amount": "float", "date": "date",
+                                                                          "code": "str"})
+
+        assert normaliser.fields == ["amount", "date", "code", "code_2"]
+        assert normaliser(["1,234.50", "02/03/2024", "007", "1"]) == \
+            {"amount": 1234.5, "date": "2024-03-02", "code": "007", "code_2": 1}
+        assert normaliser(["n/a", "soon"]) == {"amount": None, "date": None, "code": None, "code_2": None}
+        assert normaliser.invalid_values == 2 and normaliser.ragged_rows == 1
+        with pytest.raises(ValueError, match="Unknown column type"):
+            RowNormaliser(["a"], {"a": "decimal"})
+
+
+@pytest.mark.asyncio
+class TestParserService:
+    async def test_stream_is_ingested_in_batches(self):
+        db = MockDatabaseService()
+        service = ParserService(db, batch_size=2, read_chunk_size=5)
+        dataset = await service.create("u1", "data.csv", schema={"Date": "date"})
+
+        stats = await service.ingest(dataset, ForwardOnlyStream(CSV))
+
+        stored = db.collections[DATASETS_COLLECTION][0]
+        assert stored["status"] == "ready" and stored["rows"] == 3
+        assert stored["columns"] == ["Name", "Amount", "Date", "Code", "column_5"]
+        assert stats["stages"]["read"]["rows"] == 4 and stats["stages"]["write"]["rows"] == 3
+        assert stats["ragged_rows"] == 1 and stats["invalid_values"] == 1
+        records = await service.records("u1", dataset["_id"])
+        assert [record["_row"] for record in records] == [1, 3, 4]
+        assert records[0] == {"_row": 1, "Name": "Smith; J", "Amount": 1234.5, "Date": "2024-01-02",
+                              "Code": "007", "column_5": "x"}
+        assert records[1]["Date"] == "2024-03-02" and records[2]["Amount"] == "n/a"
+        assert await service.records("u2", dataset["_id"]) is None
+
+    async def test_a_retried_ingest_replaces_earlier_records(self):
+        db = MockDatabaseService()
+        db.collections[RECORDS_COLLECTION] = [{"dataset_id": "other", "_row": 1}]
+        service = ParserService(db, batch_size=10)
+        dataset = await service.create("u1", "data.csv")
+
+        await service.ingest(dataset, io.BytesIO(CSV))
+        await service.ingest(dataset, io.BytesIO(CSV))
+
+        assert len(db.collections[RECORDS_COLLECTION]) == 4
+
+    async def test_stored_xlsx_file_is_ingested(self):
+        openpyxl = pytest.importorskip("openpyxl")
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["name", "amount"])
+        workbook.active.append(["Smith", 12.5])
+        data = io.BytesIO()
+        workbook.save(data)
+        storage = MockStorageService()
+        storage.files["users/u1/files/book.xlsx"] = data.getvalue()
+        service = ParserService(MockDatabaseService(), storage)
+        dataset = await service.create("u1", "book.xlsx", source="storage")
+
+        await service.ingest_file(dataset["_id"])
+
+        assert await service.records("u1", dataset["_id"]) == [{"_row": 1, "name": "Smith", "amount": 12.5}]
+
+    async def test_versions_are_diffed_by_key_or_by_content(self):
+        service = ParserService(MockDatabaseService(), batch_size=2)
+
+        async def parse(data, key=None):
+            dataset = await service.create("u1", "data.csv", key=key)
+            await service.ingest(dataset, io.BytesIO(data))
+            return dataset["_id"]
+
+        v1 = b"id,name,amount\n1,Smith,10\n2,Jones,20\n3,Doe,30\n"
+        # Reformatted, reordered and edited: 1 unchanged, 2 changed, 3 removed, 4 added
+        v2 = b"id,name,amount\n4,Lee,40\n2,Jones,25\n1,Smith,\"10.0\"\n"
+        keyed = await service.diff("u1", await parse(v2, ["id"]), await parse(v1, ["id"]))
+        by_content = await service.diff("u1", await parse(v2), await parse(v1))
+
+        assert keyed.summary(10) == {"added": 1, "removed": 1, "changed": 1, "unchanged": 1,
+                                     "rows": {"added": [1], "removed": [3], "changed": [[2, 2]]}}
+        assert by_content.summary() == {"added": 2, "removed": 2, "changed": 0, "unchanged": 1}
+        assert await service.diff("u2", await parse(v2), await parse(v1)) is None
+        with pytest.raises(ValueError, match="different key columns"):
+            await service.diff("u1", await parse(v2, ["id"]), await parse(v1))
+        with pytest.raises(ValueError, match="not in the file"):
+            await parse(v1, ["invoice"])
+
+
+class TestParserRoutes:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        db = MockDatabaseService()
+        monkeypatch.setattr(factory, "_auth_service", MockAuthService())
+        monkeypatch.setattr(factory, "_database_service", db)
+        from apps.parser.routes import parser_bp
+        app = Flask(__name__)
+        app.register_blueprint(parser_bp, url_prefix="/api/v1/parser")
+        client = app.test_client()
+        client.db = db
+        return client
+
+    def test_request_body_is_parsed_into_a_dataset(self, client):
+        headers = {"Authorization": "Bearer valid_token"}
+
+        response = client.post("/api/v1/parser/datasets?filename=data.csv", data=CSV, headers=headers)
+
+        assert response.status_code == 201
+        dataset = response.get_json()
+        assert dataset["status"] == "ready" and dataset["rows"] == 3 and "user_id" not in dataset
+        records = client.get(f"/api/v1/parser/datasets/{dataset['dataset_id']}/records?skip=1&limit=1",
+                             headers=headers).get_json()["records"]
+        assert [record["_row"] for record in records] == [3]
+
+    def test_versions_are_diffed(self, client):
+        headers = {"Authorization": "Bearer valid_token"}
+        previous, current = (client.post("/api/v1/parser/datasets?filename=data.csv&key=Name", data=data,
+                                          headers=headers).get_json()["dataset_id"]
+                             for data in (CSV, CSV.replace(b"Doe;n/a", b"Doe;12")))
+
+        response = client.get(f"/api/v1/parser/datasets/{current}/diff?previous={previous}", headers=headers)
+
+        assert response.status_code == 200
+        assert response.get_json()["rows"] == {"added": [], "removed": [], "changed": [[4, 4]]}
+        assert client.get(f"/api/v1/parser/datasets/{current}/diff", headers=headers).status_code == 400
+
+    def test_stored_file_is_queued(self, client):
+        response = client.post("/api/v1/parser/datasets/from-file", json={"filename": "data.csv"},
+                               headers={"Authorization": "Bearer valid_token"})
+
+        assert response.status_code == 202
+        job = client.db.collections[JOBS_COLLECTION][0]
+        assert job["kind"] == "parser.ingest" and job["payload"] == {"dataset_id": response.get_json()["dataset_id"]}
+
+    def test_unsupported_files_are_rejected(self, client):
+        response = client.post("/api/v1/parser/datasets?filename=data.pdf", data=b"%PDF",
+                               headers={"Authorization": "Bearer valid_token"})
+
+        assert response.status_code == 400
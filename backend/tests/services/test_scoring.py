@@ -0,0 +1,133 @@
+import random
+from datetime import date
+import numpy as np
+import pytest
+from apps.matching.scoring import (
+    DateColumn, FieldComparator, NumericColumn, StringColumn, date_similarity, exact_similarity,
+    jaccard_similarity, jaro_winkler_similarity, levenshtein_similarity, numeric_similarity, score_pairs
+)
+
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def jaro_winkler(a: str, b: str) -> float:
+    if not a or not b:
+        return 0.0
+    window = max(max(len(a), len(b)) // 2 - 1, 0)
+    used_a, used_b = [False] * len(a), [False] * len(b)
+    for i, char in enumerate(a):
+        for j in range(max(0, i - window), min(len(b), i + window + 1)):
+            if not used_b[j] and b[j] == char:
+                used_a[i] = used_b[j] = True
+                break
+    matches = sum(used_a)
+    if not matches:
+        return 0.0
+    in_order_a = [char for char, used in zip(a, used_a) if used]
+    in_order_b = [char for char, used in zip(b, used_b) if used]
+    transpositions = sum(x != y for x, y in zip(in_order_a, in_order_b)) / 2
+    jaro = (matches / len(a) + matches / len(b) + (matches - transpositions) / matches) / 3
+    if jaro <= 0.7:
+        return jaro
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+def _pairs(left, right):
+    index = np.arange(len(left))
+    return StringColumn(left), StringColumn(right), index, index
+
+
+class TestStringSimilarities:
+    @pytest.fixture
+    def strings(self):
+        rng = random.Random(3)
+        words = lambda count, letters: [  # noqa: E731
+            ''.join(rng.choice(letters) for _ in range(rng.randint(0, 70))).strip() for _ in range(count)
+        ]
+        return words(500, 'abc d'), words(500, 'abcd')
+
+    def test_levenshtein_matches_reference(self, strings):
+        left, right, li, ri = _pairs(*strings)
+
+        expected = [
+            1 - levenshtein(a, b) / max(len(a), len(b)) if a or b else 0.0
+            for a, b in zip(left.texts, right.texts)
+        ]
+        assert levenshtein_similarity(left, right, li, ri) == pytest.approx(expected)
+
+    def test_jaro_winkler_matches_reference(self, strings):
+        left, right, li, ri = _pairs(*strings)
+
+        expected = [jaro_winkler(a, b) for a, b in zip(left.texts, right.texts)]
+        assert jaro_winkler_similarity(left, right, li, ri) == pytest.approx(expected)
+        assert jaro_winkler_similarity(*_pairs(["martha"], ["marhta"])) == pytest.approx([0.961111], abs=1e-6)
+
+    def test_strings_are_normalized_and_truncated(self):
+        left, right, li, ri = _pairs(["Crème Brûlée", "x" * 80, "", "Acme Ltd"], ["creme-brulee", "x" * 63, "", "ltd acme"])
+
+        assert list(exact_similarity(left, right, li, ri)) == [1.0, 1.0, 0.0, 0.0]
+        assert list(levenshtein_similarity(left, right, li, ri))[2] == 0.0
+        assert list(jaccard_similarity(left, right, li, ri)) == [1.0, 1.0, 0.0, 1.0]
+
+    def test_jaccard_compares_word_sets(self):
+        left, right, li, ri = _pairs(["acme trading ltd", "acme"], ["acme ltd", "acme acme"])
+
+        assert list(jaccard_similarity(left, right, li, ri)) == pytest.approx([2 / 3, 1.0])
+
+
+class TestNumericAndDateSimilarities:
+    def test_numeric_tolerance(self):
+        left = NumericColumn([100, "1,000.00", None, 5])
+        right = NumericColumn([104, 1000, 5, "n/a"])
+        index = np.arange(4)
+
+        assert list(numeric_similarity(left, right, index, index, absolute=10)) == pytest.approx([0.6, 1.0, 0.0, 0.0])
+        assert numeric_similarity(left, right, index[:1], index[:1])[0] == 0.0
+        assert numeric_similarity(left, right, index[:1], index[:1], relative=0.08)[0] == pytest.approx(0.5192, abs=1e-4)
+
+    def test_date_distance(self):
+        left = DateColumn([date(2024, 1, 1), "2024-01-10", None])
+        right = DateColumn(["2024-01-04T12:00:00", "2024-01-10", "2024-01-10"])
+        index = np.arange(3)
+
+        assert list(date_similarity(left, right, index, index, max_days=6)) == pytest.approx([0.5, 1.0, 0.0])
+
+
+class TestFieldComparators:
+    def test_weighted_score_with_field_thresholds(self):
+        pair = ({"name": "Jon Smith", "amount": 100.0}, {"name": "John Smith", "amount": 150.0})
+
+        [(score, fields)] = score_pairs([pair], [
+            FieldComparator("name", "jaro_winkler", weight=3.0),
+            FieldComparator("amount", "numeric", weight=1.0, threshold=0.5, absolute=100)
+        ])
+
+        assert fields["amount"] == 0.5
+        assert score == pytest.approx((3 * fields["name"] + 0.5) / 4)
+        [(_, fields)] = score_pairs([pair], [FieldComparator("amount", "numeric", threshold=0.6, absolute=100)])
+        assert fields["amount"] == 0.0
+
+    def test_records_shared_between_pairs_are_scored_per_pair(self):
+        left = {"name": "acme"}
+        pairs = [(left, {"name": "acme"}), (left, {"name": "acne"}), ({"name": None}, {"name": "acme"})]
+
+        scores = [score for score, _ in score_pairs(pairs, [FieldComparator("name")])]
+
+        assert scores == pytest.approx([1.0, 0.75, 0.0])
+
+    def test_unknown_method_is_rejected(self):
+        with pytest.raises(ValueError):
+            FieldComparator("name", "soundex")
@@ -0,0 +1,74 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from backend.shared.utils import startup_timing
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+class TestStartupTiming:
+    @pytest.fixture(autouse=True)
+    def clean(self):
+        startup_timing.reset()
+        yield
+        startup_timing.reset()
+
+    def test_report_groups_steps_by_kind(self):
+        with startup_timing.timed("import", "fast"):
+            pass
+        with startup_timing.timed("service", "database"):
+            pass
+        startup_timing.record("import", "slow", 0.0, 0.25)
+
+        report = startup_timing.report()
+
+        assert set(report["steps"]) == {"import", "service"}
+        assert [step["name"] for step in report["steps"]["import"]["steps"]] == ["fast", "slow"]
+        assert report["steps"]["import"]["total_ms"] >= 250
+
+    def test_failed_steps_are_recorded(self):
+        with pytest.raises(RuntimeError):
+            with startup_timing.timed("service", "auth"):
+                raise RuntimeError("no credentials")
+
+        assert startup_timing.report()["steps"]["service"]["steps"][0]["name"] == "auth"
+
+
+def test_routes_import_does_not_load_provider_sdks():
+    # A fresh interpreter: other tests in this session import the SDKs themselves
+    code = (
+        "import sys, services.factory, apps.auth.routes; "
+        "print(sorted(m for m in ('firebase_admin', 'pymongo', 'motor', 'google.cloud.storage') "
+        "if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_blueprints_do_not_load_numpy():
+    code = (
+        "import sys, apps.parser.routes, apps.matching.routes, apps.comparison.routes; "
+        "print('numpy' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "False"
+
+
+def test_database_warm_up_does_not_delay_app_start():
+    # An unreachable server: a ping before the port is bound would wait out server selection
+    env = {**os.environ, "DATABASE_WARMUP": "true", "SERVICE_PREWARM": "false", "SERVICE_PREWARM_DELAY": "60",
+           "DATABASE_CONNECTION_STRING": "mongodb://127.0.0.1:9", "DATABASE_SERVER_SELECTION_TIMEOUT_MS": "3000"}
+    code = (
+        "import time; from app import create_app; started = time.perf_counter(); create_app(); "
+        "print(time.perf_counter() - started)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+
+    assert float(result.stdout.strip().splitlines()[-1]) < 2
@@ -1,3 +1,5 @@
+import asyncio
+import io
 import pytest
 from backend.tests.mocks.mock_services import MockStorageService
 
@@ -23,4 +25,40 @@ class TestStorageService:
 
     async def test_delete_nonexistent_file(self, storage_service):
         result = await storage_service.delete_file("nonexistent.txt")
-        assert result is False 
\ No newline at end of file
+        assert result is False
+
+    async def test_upload_many_runs_concurrently(self, storage_service, mocker):
+        in_flight = []
+        peak = []
+
+        async def slow_upload(file_data, path):
+            in_flight.append(path)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(path)
+            if path == "bad.txt":
+                raise IOError("upload failed")
+            return f"http://mock-url/{path}"
+
+        mocker.patch.object(storage_service, "upload_file", side_effect=slow_upload)
+        files = [(io.BytesIO(b"x"), f"{i}.txt") for i in range(6)] + [(io.BytesIO(b"x"), "bad.txt")]
+
+        results = await storage_service.upload_many(files, max_concurrency=3)
+
+        assert max(peak) == 3
+        assert [r["path"] for r in results] == [path for _, path in files]
+        assert results[0] == {"path": "0.txt", "url": "http://mock-url/0.txt", "error": None}
+        assert results[-1]["url"] is None and "upload failed" in results[-1]["error"]
+
+    async def test_delete_many_reports_per_file(self, storage_service):
+        storage_service.files["a.txt"] = b"a"
+
+        results = await storage_service.delete_many(["a.txt", "missing.txt"])
+
+        assert results == [
+            {"path": "a.txt", "deleted": True, "error": None},
+            {"path": "missing.txt", "deleted": False, "error": None},
+        ]
+
+    async def test_get_download_url(self, storage_service):
+        assert await storage_service.get_download_url("a.txt") == "http://mock-url/a.txt"
@@ -0,0 +1,73 @@
+import pytest
+from backend.config.settings import Config
+from backend.services.implementations.auth.firebase_auth import FirebaseAuthService
+from backend.services.implementations.auth.public_keys import PublicKeyCache
+from backend.shared.utils.ttl_cache import TTLCache
+from ..mocks.token_issuer import FakeTokenIssuer
+
+
+class TestTTLCache:
+    def test_entries_expire_at_deadline(self):
+        now = [100.0]
+        cache = TTLCache(max_size=10, clock=lambda: now[0])
+        cache.set("a", 1, expires_at=105.0)
+
+        assert cache.get("a") == 1
+        now[0] = 105.0
+        assert cache.get("a") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = TTLCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+
+class TestFirebaseTokenCache:
+    @pytest.fixture
+    def issuer(self):
+        return FakeTokenIssuer(project_id="test-project")
+
+    @pytest.fixture
+    def auth_service(self, issuer, mocker, monkeypatch):
+        monkeypatch.setenv("AUTH_PROJECT_ID", "test-project")
+        monkeypatch.delenv("FIREBASE_AUTH_EMULATOR_HOST", raising=False)
+        mocker.patch("firebase_admin.get_app")
+        service = FirebaseAuthService(Config())
+        service.public_keys = PublicKeyCache(fetch=issuer.fetch)
+        mocker.patch.object(service.public_keys, "_ensure_refresher")
+        return service
+
+    def test_verified_token_is_served_from_cache(self, auth_service, issuer, mocker):
+        token = issuer.issue(uid="user-1", email="user1@example.com")
+        verify = mocker.spy(auth_service, "_verify_id_token")
+
+        first = auth_service.verify_token(token)
+        second = auth_service.verify_token(token)
+
+        assert first == second
+        assert first["user_id"] == "user-1"
+        assert first["email"] == "user1@example.com"
+        assert verify.call_count == 1
+        assert auth_service.get_cache_stats()["hits"] == 1
+        assert issuer.fetch_count == 1
+
+    def test_token_for_other_project_is_rejected(self, auth_service):
+        other = FakeTokenIssuer(project_id="other-project")
+        auth_service.public_keys = PublicKeyCache(fetch=other.fetch)
+        auth_service.public_keys._ensure_refresher = lambda: None
+
+        assert auth_service.verify_token(other.issue()) is None
+        assert len(auth_service.token_cache) == 0
+
+    def test_expired_token_is_rejected(self, auth_service, issuer):
+        token = issuer.issue(claims={"iat": 1000, "exp": 2000})
+
+        assert auth_service.verify_token(token) is None